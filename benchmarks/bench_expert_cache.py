@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""MoE expert cache policies — replay routing traces, compare hit rates.
+
+``core.expert_pinning`` in ``warmup`` mode relies on a static hot set derived
+from an offline histogram. ``core.expert_cache`` adds online ARC / LFU-decay
+policies. This bench replays a routing trace through every policy at several
+slot counts and reports the expert hit rate (and transfers issued).
+
+Traces come from ``benchmarks/probe_expert_usage.py <model> trace.jsonl``.
+Without ``--trace`` a synthetic trace is generated: Zipf-distributed routing
+whose hot experts are reshuffled every ``--phase-steps`` decode steps
+(coding -> chat -> ...). The static baseline is built from the first
+``--profile-frac`` of the trace, like a profiling run before deployment.
+
+Pure Python — no torch needed.
+
+Usage:
+    python benchmarks/bench_expert_cache.py --slots 8,16,32
+    python benchmarks/bench_expert_cache.py --trace qwen_moe_trace.jsonl --slots 12,24
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from core.expert_cache import (  # noqa: E402
+    load_trace,
+    replay_trace,
+    static_hot_sets,
+)
+
+OUT_JSON = Path("benchmarks/results/bench_expert_cache.json")
+
+
+def synthetic_trace(layers: int, experts: int, top_k: int, steps: int,
+                    phase_steps: int, zipf_s: float, seed: int):
+    rng = random.Random(seed)
+    weights = [1.0 / (r + 1) ** zipf_s for r in range(experts)]
+    trace = []
+    perms = {}
+    for step in range(steps):
+        phase = step // phase_steps
+        for layer in range(layers):
+            if (phase, layer) not in perms:
+                perm = list(range(experts))
+                rng.shuffle(perm)
+                perms[(phase, layer)] = perm
+            perm = perms[(phase, layer)]
+            chosen = set()
+            while len(chosen) < top_k:
+                chosen.add(perm[rng.choices(range(experts), weights)[0]])
+            trace.append((layer, dict(Counter(chosen))))
+    return trace
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--trace", type=Path, default=None)
+    ap.add_argument("--slots", type=str, default="8,16,32")
+    ap.add_argument("--policies", type=str, default="static,lru,lfu,arc")
+    ap.add_argument("--half-life", type=float, default=256.0,
+                    help="LFU decay half-life, in calls per layer")
+    ap.add_argument("--profile-frac", type=float, default=0.1)
+    ap.add_argument("--layers", type=int, default=24)
+    ap.add_argument("--experts", type=int, default=64)
+    ap.add_argument("--top-k", type=int, default=4)
+    ap.add_argument("--steps", type=int, default=2000)
+    ap.add_argument("--phase-steps", type=int, default=500)
+    ap.add_argument("--zipf", type=float, default=1.1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    if args.trace:
+        trace = load_trace(str(args.trace))
+        source = str(args.trace)
+    else:
+        trace = synthetic_trace(args.layers, args.experts, args.top_k, args.steps,
+                                args.phase_steps, args.zipf, args.seed)
+        source = "synthetic"
+    profile = trace[:max(1, int(len(trace) * args.profile_frac))]
+
+    results = []
+    for slots in (int(x) for x in args.slots.split(",")):
+        hot = static_hot_sets(profile, slots)
+        for policy in args.policies.split(","):
+            kw = {"half_life": args.half_life} if policy == "lfu" else {}
+            r = replay_trace(trace, policy, slots, hot_sets=hot, **kw)
+            rates = [v["hit_rate"] for v in r["per_layer"].values()]
+            results.append({
+                "policy": policy, "slots": slots, "calls": r["calls"],
+                "hit_rate": r["hit_rate"], "staged_experts": r["staged_experts"],
+                "layer_hit_min": min(rates), "layer_hit_max": max(rates),
+                "per_layer": r["per_layer"],
+            })
+
+    print(f"trace: {source} ({len(trace)} calls)")
+    print(f"{'policy':<7} {'slots':>5} {'hit %':>7} {'layer min':>10} "
+          f"{'layer max':>10} {'staged':>9}")
+    for r in results:
+        print(f"{r['policy']:<7} {r['slots']:>5} {r['hit_rate'] * 100:>6.1f}% "
+              f"{r['layer_hit_min'] * 100:>9.1f}% {r['layer_hit_max'] * 100:>9.1f}% "
+              f"{r['staged_experts']:>9}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"trace": source, "calls": len(trace),
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
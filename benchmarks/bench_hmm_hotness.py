@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""HMM hotness — full rescore + sort vs lazily decayed per-tier index.
+
+``HierarchicalMemoryManager.eviction_cycle`` used to call
+``update_all_scores`` (an exponential decay for every registered block)
+and then sort every L1/L2 block to find the coldest ones; the L3 balancer
+sorted every L3 block the same way, both under the global lock. The
+manager now keeps log-score + timestamp per block and a per-tier heap, so
+victim selection is O(k log n) and a touch is O(log n).
+
+For each block count the bench registers blocks across L1/L2/L3, touches
+a Zipf-ish subset, then reports per-touch cost, the legacy
+rescore-and-sort selection time and the index selection time for the
+``--victims`` coldest L1/L2 blocks.
+
+Usage:
+    python benchmarks/bench_hmm_hotness.py --blocks 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("VRM_EXPERIMENTAL", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+from core.memory_block import MemoryBlock  # noqa: E402
+from experimental.hierarchical_memory import HierarchicalMemoryManager  # noqa: E402
+
+OUT_JSON = Path("benchmarks/results/bench_hmm_hotness.json")
+
+logging.getLogger("vramancer.hmem.v2").setLevel(logging.WARNING)
+
+
+def _legacy_select(hmem, k: int):
+    """The pre-index eviction path: rescore every block, sort L1/L2."""
+    now = time.time()
+    lam = math.log(2) / hmem._decay_half_life
+    for bid, meta in hmem.registry.items():
+        dt = max(0.0, now - hmem._last_touch.get(bid, now))
+        hmem._hot_scores[bid] = meta["access"] * math.exp(-lam * dt)
+    l12 = [(hmem._hot_scores.get(bid, 0.0), bid)
+           for bid, meta in hmem.registry.items() if meta["tier"] in ("L1", "L2")]
+    l12.sort(key=lambda x: x[0])
+    return [bid for _, bid in l12[:k]]
+
+
+def _run(n: int, touches: int, victims: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        hmem = HierarchicalMemoryManager(nvme_dir=tmp)
+        hmem._balancing = False
+        tiers = ("L1", "L2", "L3")
+        blocks = []
+        for i in range(n):
+            b = MemoryBlock(id=f"kv{i}", size_mb=1)
+            hmem.register_block(b, tiers[i % 3])
+            blocks.append(b)
+        picks = [blocks[min(n - 1, int(rng.paretovariate(1.2)) - 1)] for _ in range(touches)]
+        t0 = time.perf_counter()
+        for b in picks:
+            hmem.touch(b)
+        touch_us = (time.perf_counter() - t0) / touches * 1e6
+
+        t0 = time.perf_counter()
+        hmem._coldest(("L1", "L2"), victims)
+        index_ms = (time.perf_counter() - t0) * 1e3
+
+        t0 = time.perf_counter()
+        _legacy_select(hmem, victims)
+        legacy_ms = (time.perf_counter() - t0) * 1e3
+    return {"blocks": n, "touch_us": touch_us, "legacy_select_ms": legacy_ms,
+            "index_select_ms": index_ms, "speedup": legacy_ms / max(index_ms, 1e-6)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--blocks", type=str, default="10000,100000,1000000")
+    ap.add_argument("--touches", type=int, default=50000)
+    ap.add_argument("--victims", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = [_run(int(n), args.touches, args.victims, args.seed)
+               for n in args.blocks.split(",")]
+
+    print(f"{'blocks':>9} {'touch us':>9} {'legacy ms':>10} {'index ms':>9} {'speedup':>8}")
+    for r in results:
+        print(f"{r['blocks']:>9} {r['touch_us']:>9.2f} {r['legacy_select_ms']:>10.2f} "
+              f"{r['index_select_ms']:>9.3f} {r['speedup']:>7.0f}x")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"victims": args.victims, "touches": args.touches,
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
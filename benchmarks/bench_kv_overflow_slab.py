@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""append_token latency with KV overflow active — one lease per page vs slabs.
+
+Once the local page pool is exhausted, ``PagedKVCacheManager`` borrows
+overflow pages from ``VRAMLendingPool``. Borrowing one lease per page puts
+lender scoring, lease bookkeeping and the lending-buffer allocator on the
+decode path every ``page_size`` tokens. Slabs (``overflow_slab_pages``)
+borrow N pages per lease and carve them locally.
+
+The bench decodes ``--requests`` concurrent sequences round-robin on a
+deliberately tiny local pool so that almost every new page is an overflow
+page, frees finished requests to create churn, and reports append_token
+p50/p99/max per slab size. CPU-only — the lending pool runs with logical
+offsets (VRM_MINIMAL_TEST=1).
+
+Usage:
+    python benchmarks/bench_kv_overflow_slab.py --tokens 4096 --requests 16
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+OUT_JSON = Path("benchmarks/results/bench_kv_overflow_slab.json")
+
+
+def _percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, int(q * len(sorted_vals)))
+    return sorted_vals[idx]
+
+
+def _run(slab_pages: int, tokens: int, n_requests: int, local_pages: int) -> dict:
+    from core.paged_attention import PagedKVCacheManager, PagedKVConfig
+    from experimental.vram_lending import VRAMLendingPool
+
+    pool = VRAMLendingPool()
+    pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(20e9),
+                      device_name="RTX 3090", pcie_gen=4)
+    pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9),
+                      device_name="RTX 5070 Ti", pcie_gen=5)
+
+    cfg = PagedKVConfig(num_layers=32, num_kv_heads=8, head_dim=128,
+                        page_size=16, max_pages=local_pages, device="cuda:0",
+                        enable_lending=False, overflow_slab_pages=slab_pages)
+    mgr = PagedKVCacheManager(cfg)
+    mgr._lending_pool = pool
+
+    lat: list[float] = []
+    req_len = max(cfg.page_size, tokens // 4)
+    alive = {f"r{i}": 0 for i in range(n_requests)}
+    next_id = n_requests
+    for rid in alive:
+        mgr.allocate(rid)
+
+    for step in range(tokens):
+        for rid in list(alive):
+            t0 = time.perf_counter()
+            mgr.append_token(rid)
+            lat.append(time.perf_counter() - t0)
+            alive[rid] += 1
+            if alive[rid] >= req_len:
+                mgr.free(rid)
+                del alive[rid]
+                rid = f"r{next_id}"
+                next_id += 1
+                alive[rid] = 0
+                mgr.allocate(rid)
+
+    lat.sort()
+    st = pool.stats()
+    res = {
+        "slab_pages": slab_pages,
+        "appends": len(lat),
+        "p50_us": _percentile(lat, 0.50) * 1e6,
+        "p99_us": _percentile(lat, 0.99) * 1e6,
+        "max_us": lat[-1] * 1e6 if lat else 0.0,
+        "leases_created": st["total_leases_created"],
+        "overflow_borrows": mgr.stats()["overflow_borrows"],
+    }
+    pool.close()
+    return res
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--tokens", type=int, default=2048)
+    ap.add_argument("--requests", type=int, default=16)
+    ap.add_argument("--local-pages", type=int, default=8)
+    ap.add_argument("--slabs", type=str, default="1,4,8,16")
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    results = [
+        _run(int(n), args.tokens, args.requests, args.local_pages)
+        for n in args.slabs.split(",")
+    ]
+
+    print(f"{'slab':>5} {'appends':>8} {'p50 us':>8} {'p99 us':>8} "
+          f"{'max us':>9} {'leases':>7}")
+    for r in results:
+        print(f"{r['slab_pages']:>5} {r['appends']:>8} {r['p50_us']:>8.1f} "
+              f"{r['p99_us']:>8.1f} {r['max_us']:>9.1f} {r['leases_created']:>7}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()},
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Lending buffer churn simulation — bump allocator vs free-list arena.
+
+``VRAMLendingPool._find_buffer_offset`` used to be a bump allocator
+(``max(offset + size)`` over active leases): holes left by released leases
+were never reused, so under KV-overflow churn
+(``PagedKVCacheManager._borrow_overflow_page`` borrowing and returning
+pages constantly) the lending buffer looked exhausted long before it was.
+
+This bench replays the same random borrow/release trace against:
+  - ``bump``      : the legacy allocator, re-implemented here verbatim
+  - ``arena``     : ``LendingArena`` best-fit free list with coalescing
+  - ``arena+cmp`` : same, compacting when a request fits only in aggregate
+
+No GPU needed — offsets are logical.
+
+Usage:
+    python benchmarks/bench_lending_fragmentation.py --ops 200000 --buffer-mb 512
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+from experimental.vram_lending import LendingArena  # noqa: E402
+
+OUT_JSON = Path("benchmarks/results/bench_lending_fragmentation.json")
+
+
+class _BumpAllocator:
+    """Legacy behaviour: next offset = max end over live leases."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._live: dict[int, int] = {}
+
+    def alloc(self, size: int):
+        end = max((o + s for o, s in self._live.items()), default=0)
+        if end + size > self.capacity:
+            return None
+        self._live[end] = size
+        return end
+
+    def free(self, offset: int) -> None:
+        self._live.pop(offset, None)
+
+    def used(self) -> int:
+        return sum(self._live.values())
+
+
+def _trace(n_ops: int, page_bytes: int, seed: int):
+    """Random borrow/release trace. Sizes are 1-8 KV pages, biased small."""
+    rng = random.Random(seed)
+    for _ in range(n_ops):
+        if rng.random() < 0.55:
+            yield "borrow", page_bytes * rng.choice((1, 1, 1, 2, 2, 4, 8))
+        else:
+            yield "release", rng.random()
+
+
+def _run(name: str, alloc, n_ops: int, page_bytes: int, seed: int,
+         compact: bool = False) -> dict:
+    live: list[int] = []
+    failed = 0
+    failed_with_room = 0
+    borrows = 0
+    t0 = time.perf_counter()
+    for op, arg in _trace(n_ops, page_bytes, seed):
+        if op == "borrow":
+            borrows += 1
+            off = alloc.alloc(arg)
+            if off is None and compact and isinstance(alloc, LendingArena) \
+                    and alloc.fits_after_compaction(arg):
+                moves = alloc.compact()
+                live = [moves.get(o, o) for o in live]
+                off = alloc.alloc(arg)
+            if off is None:
+                failed += 1
+                free = (alloc.free_bytes if isinstance(alloc, LendingArena)
+                        else alloc.capacity - alloc.used())
+                if free >= arg:
+                    failed_with_room += 1
+            else:
+                live.append(off)
+        elif live:
+            idx = int(arg * len(live))
+            alloc.free(live.pop(idx))
+    elapsed = time.perf_counter() - t0
+
+    res = {
+        "allocator": name,
+        "borrows": borrows,
+        "failed": failed,
+        "failed_with_free_bytes": failed_with_room,
+        "fail_rate": failed / max(borrows, 1),
+        "us_per_op": elapsed / n_ops * 1e6,
+    }
+    if isinstance(alloc, LendingArena):
+        st = alloc.stats()
+        res["final_fragmentation"] = st["fragmentation"]
+        res["compactions"] = st["compactions"]
+    return res
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--ops", type=int, default=100_000)
+    ap.add_argument("--buffer-mb", type=int, default=512)
+    ap.add_argument("--page-kb", type=int, default=2048,
+                    help="KV page size (default: 2 MB, 32 layers x 16 tok fp16)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    capacity = args.buffer_mb * 1024 * 1024
+    page = args.page_kb * 1024
+
+    results = [
+        _run("bump", _BumpAllocator(capacity), args.ops, page, args.seed),
+        _run("arena", LendingArena(capacity), args.ops, page, args.seed),
+        _run("arena+cmp", LendingArena(capacity), args.ops, page, args.seed,
+             compact=True),
+    ]
+
+    print(f"{'allocator':<10} {'borrows':>8} {'failed':>8} {'fail%':>7} "
+          f"{'w/room':>8} {'us/op':>7} {'frag':>6}")
+    for r in results:
+        print(f"{r['allocator']:<10} {r['borrows']:>8} {r['failed']:>8} "
+              f"{r['fail_rate'] * 100:>6.1f}% {r['failed_with_free_bytes']:>8} "
+              f"{r['us_per_op']:>7.2f} {r.get('final_fragmentation', 0.0):>6.2f}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({
+        "ops": args.ops, "buffer_mb": args.buffer_mb,
+        "page_kb": args.page_kb, "seed": args.seed, "results": results,
+    }, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""L5 spill/reload throughput — one file per block vs segment store.
+
+``HierarchicalMemoryManager.spill_to_nvme`` historically wrote one file per
+block through ``FastNVMeTransfer.save_tensor`` and read it back with
+``FastNVMeTransfer.load_tensor``. ``SegmentSpillStore`` appends blocks to
+large preallocated segment files and reads them through mmap +
+``torch.frombuffer``.
+
+For each block size the bench spills ``--total-mb`` worth of blocks,
+reloads them all, then drops them (unlink vs mark-dead), and reports MB/s
+and blocks/s per phase. Page cache is not dropped between phases, so
+reload numbers measure the software path rather than the drive.
+
+Usage:
+    python benchmarks/bench_nvme_spill.py --sizes-kb 4,64,1024,16384,65536 \\
+        --total-mb 256 --dir /mnt/nvme/vrm_bench
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("VRM_EXPERIMENTAL", "1")
+
+import torch  # noqa: E402
+
+from experimental.hierarchical_memory import FastNVMeTransfer  # noqa: E402
+from experimental.spill_store import SegmentSpillStore  # noqa: E402
+
+OUT_JSON = Path("benchmarks/results/bench_nvme_spill.json")
+
+
+def _blocks(size_kb: int, total_mb: int):
+    n = max(4, (total_mb * 1024) // size_kb)
+    numel = size_kb * 1024 // 2
+    base = torch.randn(numel).to(torch.float16)
+    return [base for _ in range(n)]
+
+
+def _per_file(root: Path, blocks) -> dict:
+    root.mkdir(parents=True, exist_ok=True)
+    shape, dtype = tuple(blocks[0].shape), str(blocks[0].dtype)
+    t0 = time.perf_counter()
+    for i, t in enumerate(blocks):
+        FastNVMeTransfer.save_tensor(root / f"blk{i}.bin", t)
+    t1 = time.perf_counter()
+    for i in range(len(blocks)):
+        FastNVMeTransfer.load_tensor(root / f"blk{i}.bin", shape, dtype)
+    t2 = time.perf_counter()
+    for i in range(len(blocks)):
+        (root / f"blk{i}.bin").unlink()
+    t3 = time.perf_counter()
+    return {"spill_s": t1 - t0, "reload_s": t2 - t1, "drop_s": t3 - t2}
+
+
+def _segment(root: Path, blocks, segment_mb: int) -> dict:
+    store = SegmentSpillStore(root, segment_bytes=segment_mb * 1024 * 1024,
+                              background=False)
+    t0 = time.perf_counter()
+    for i, t in enumerate(blocks):
+        store.put(f"blk{i}", t)
+    t1 = time.perf_counter()
+    for i in range(len(blocks)):
+        store.get(f"blk{i}")
+    t2 = time.perf_counter()
+    for i in range(len(blocks)):
+        store.delete(f"blk{i}")
+    t3 = time.perf_counter()
+    store.close()
+    return {"spill_s": t1 - t0, "reload_s": t2 - t1, "drop_s": t3 - t2}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--sizes-kb", type=str, default="4,64,1024,16384,65536")
+    ap.add_argument("--total-mb", type=int, default=256,
+                    help="Bytes spilled per block size (at least 4 blocks)")
+    ap.add_argument("--segment-mb", type=int, default=256)
+    ap.add_argument("--dir", type=Path, default=None,
+                    help="Scratch directory (default: a temp dir; point at NVMe)")
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix="vrm_spill_", dir=args.dir))
+    results = []
+    try:
+        for kb in (int(x) for x in args.sizes_kb.split(",")):
+            blocks = _blocks(kb, args.total_mb)
+            mb = len(blocks) * kb / 1024
+            for name, fn in (
+                ("per_file", lambda: _per_file(scratch / f"file_{kb}", blocks)),
+                ("segment", lambda: _segment(scratch / f"seg_{kb}", blocks,
+                                             args.segment_mb)),
+            ):
+                r = fn()
+                results.append({
+                    "store": name, "block_kb": kb, "blocks": len(blocks),
+                    "spill_mbps": mb / r["spill_s"],
+                    "reload_mbps": mb / r["reload_s"],
+                    "spill_blocks_per_s": len(blocks) / r["spill_s"],
+                    "reload_blocks_per_s": len(blocks) / r["reload_s"],
+                    "drop_ms": r["drop_s"] * 1e3,
+                })
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"{'store':<9} {'block KB':>9} {'blocks':>7} {'spill MB/s':>11} "
+          f"{'reload MB/s':>12} {'spill blk/s':>12} {'drop ms':>8}")
+    for r in results:
+        print(f"{r['store']:<9} {r['block_kb']:>9} {r['blocks']:>7} "
+              f"{r['spill_mbps']:>11.0f} {r['reload_mbps']:>12.0f} "
+              f"{r['spill_blocks_per_s']:>12.0f} {r['drop_ms']:>8.1f}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"total_mb": args.total_mb,
+                                    "segment_mb": args.segment_mb,
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Placement solver — exact contiguous-partition DP vs the old DP + greedy repair.
+
+``compute_optimal_placement`` used to run a per-layer DP that ignored
+VRAM, then move layers off overloaded GPUs greedily. Under tight memory
+that scatters layers across GPUs (many boundary crossings) and can leave
+GPUs over capacity. The exact solver partitions the layers into one
+contiguous run per device under the memory limits.
+
+For each (layers, devices) size, random heterogeneous instances are
+solved both ways and scored with the same cost model:
+latency (compute + transfers), boundary crossings, memory overflow,
+and solve time. A second table compares the solver's objectives
+(``latency`` / ``throughput`` / ``combined``): batch-1 latency vs the
+bottleneck stage, which bounds pipelined requests/s.
+
+Usage:
+    python benchmarks/bench_placement_dp.py --layers 64,128,160 --devices 8 --instances 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+OUT_JSON = Path("benchmarks/results/bench_placement_dp.json")
+
+
+def _instance(rng, n_layers, n_devices, slack):
+    from core.layer_profiler import GPUProfile, LayerProfile
+    layers = [LayerProfile(index=i, latency_ms=rng.uniform(0.8, 1.6),
+                           total_memory_mb=rng.uniform(150, 450),
+                           activation_memory_mb=rng.uniform(4, 32))
+              for i in range(n_layers)]
+    need = sum(lp.total_memory_mb for lp in layers)
+    weights = [rng.uniform(0.5, 1.5) for _ in range(n_devices)]
+    gpus = [GPUProfile(index=g, name=f"gpu{g}", backend="cuda", total_vram_mb=48000,
+                       free_vram_mb=int(need * slack * w / sum(weights)),
+                       compute_throughput_gflops=rng.choice([20.0, 35.0, 60.0, 80.0]))
+            for g, w in enumerate(weights)]
+    return layers, gpus
+
+
+def _legacy(layers, gpus, bw):
+    """Per-layer DP without memory, then ``_enforce_vram_constraints`` (old solver)."""
+    from core.layer_profiler import PlacementPlan, _enforce_vram_constraints
+    max_g = max(g.compute_throughput_gflops for g in gpus)
+    cost = [[lp.latency_ms * max_g / g.compute_throughput_gflops for g in gpus] for lp in layers]
+    xfer = [lp.activation_memory_mb * 1024 * 1024 * 8 / (bw * 1e9) * 1000 for lp in layers]
+    dp, parent = [cost[0][:]], []
+    for i in range(1, len(layers)):
+        row, par = [], []
+        for g in range(len(gpus)):
+            best = min(range(len(gpus)),
+                       key=lambda p: dp[-1][p] + (xfer[i - 1] if p != g else 0.0))
+            row.append(dp[-1][best] + (xfer[i - 1] if best != g else 0.0) + cost[i][g])
+            par.append(best)
+        dp.append(row)
+        parent.append(par)
+    g = min(range(len(gpus)), key=lambda k: dp[-1][k])
+    assign = [g]
+    for par in reversed(parent):
+        g = par[g]
+        assign.append(g)
+    plan = PlacementPlan(assignments=[(i, gpus[g].index) for i, g in enumerate(reversed(assign))])
+    return _enforce_vram_constraints(plan, layers, gpus)
+
+
+def _score(plan, layers, gpus, bw):
+    by_index = {g.index: g for g in gpus}
+    max_g = max(g.compute_throughput_gflops for g in gpus)
+    latency, crossings = 0.0, 0
+    used = {g.index: 0.0 for g in gpus}
+    prev = None
+    for layer_idx, dev in plan.assignments:
+        lp = layers[layer_idx]
+        latency += lp.latency_ms * max_g / by_index[dev].compute_throughput_gflops
+        used[dev] += lp.total_memory_mb
+        if prev is not None and dev != prev:
+            crossings += 1
+            latency += layers[layer_idx - 1].activation_memory_mb * 1024 * 1024 * 8 / (bw * 1e9) * 1000
+        prev = dev
+    overflow = sum(max(0.0, used[g.index] - g.free_vram_mb) for g in gpus)
+    return latency, crossings, overflow
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--layers", type=str, default="64,128,160")
+    ap.add_argument("--devices", type=int, default=8)
+    ap.add_argument("--instances", type=int, default=5)
+    ap.add_argument("--slack", type=float, default=1.15,
+                    help="total free VRAM / total layer memory")
+    ap.add_argument("--bandwidth-gbps", type=float, default=16.0)
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    from core.layer_profiler import compute_optimal_placement
+
+    rng = random.Random(0)
+    results = []
+    for n_layers in (int(x) for x in args.layers.split(",")):
+        for _ in range(args.instances):
+            layers, gpus = _instance(rng, n_layers, args.devices, args.slack)
+            row = {"layers": n_layers, "devices": args.devices}
+            for name, solve in (("legacy", lambda: _legacy(layers, gpus, args.bandwidth_gbps)),
+                                ("exact", lambda: compute_optimal_placement(
+                                    layers, gpus, args.bandwidth_gbps))):
+                t0 = time.perf_counter()
+                plan = solve()
+                ms = (time.perf_counter() - t0) * 1e3
+                lat, cross, over = _score(plan, layers, gpus, args.bandwidth_gbps)
+                row[name] = {"solve_ms": ms, "latency_ms": lat, "crossings": cross,
+                             "overflow_mb": over}
+            for objective in ("latency", "throughput", "combined"):
+                t0 = time.perf_counter()
+                plan = compute_optimal_placement(layers, gpus, args.bandwidth_gbps,
+                                                 objective=objective)
+                row[objective] = {"solve_ms": (time.perf_counter() - t0) * 1e3,
+                                  "latency_ms": plan.estimated_latency_ms,
+                                  "bottleneck_ms": plan.estimated_bottleneck_ms}
+            results.append(row)
+
+    print(f"devices={args.devices} slack={args.slack} bw={args.bandwidth_gbps} GB/s "
+          f"({args.instances} instances per size, means)")
+    print(f"{'layers':>6} {'solver':<7} {'solve ms':>9} {'latency ms':>11} "
+          f"{'crossings':>10} {'overflow MB':>12}")
+    for n_layers in sorted({r["layers"] for r in results}):
+        rows = [r for r in results if r["layers"] == n_layers]
+        for name in ("legacy", "exact"):
+            mean = {k: sum(r[name][k] for r in rows) / len(rows) for k in rows[0][name]}
+            print(f"{n_layers:>6} {name:<7} {mean['solve_ms']:>9.1f} {mean['latency_ms']:>11.2f} "
+                  f"{mean['crossings']:>10.1f} {mean['overflow_mb']:>12.0f}")
+
+    print(f"\n{'layers':>6} {'objective':<11} {'solve ms':>9} {'latency ms':>11} "
+          f"{'bottleneck ms':>14} {'pipelined req/s':>16}")
+    for n_layers in sorted({r["layers"] for r in results}):
+        rows = [r for r in results if r["layers"] == n_layers]
+        for name in ("latency", "throughput", "combined"):
+            mean = {k: sum(r[name][k] for r in rows) / len(rows) for k in rows[0][name]}
+            print(f"{n_layers:>6} {name:<11} {mean['solve_ms']:>9.1f} {mean['latency_ms']:>11.2f} "
+                  f"{mean['bottleneck_ms']:>14.2f} {1000 / mean['bottleneck_ms']:>16.1f}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()},
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
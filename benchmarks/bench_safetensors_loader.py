@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Partial model load — from_pretrained paths vs layer-range mmap loader.
+
+A pipeline worker that serves layers ``[start, end)`` used to go through
+``from_pretrained``: either the whole model (``HuggingFaceBackend``) or
+``cross_node.load_partial_model`` with the other layers offloaded to disk
+by accelerate. ``core.safetensors_loader`` memory-maps the shards and
+only touches the tensors of the assigned range.
+
+The bench writes a synthetic multi-shard Llama checkpoint (random bf16
+weights), then loads it in a fresh subprocess per method and reports
+wall time, the bytes the method materialised (non-meta parameters) and
+peak RSS growth (``VmHWM`` minus the RSS after imports). Each run then
+reads every materialised parameter once — what copying it to a GPU would
+do — so lazily mapped pages are counted; ``--no-touch`` skips that and
+only runs one forward pass through the assigned layers.
+
+Usage:
+    python benchmarks/bench_safetensors_loader.py --layers 16 --hidden 1024 --range 4,8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+OUT_JSON = Path("benchmarks/results/bench_safetensors_loader.json")
+METHODS = ("from_pretrained", "partial_accelerate", "partial_mmap")
+
+
+def _status_mb(key: str) -> float:
+    """``VmRSS`` / ``VmHWM`` of this process in MB (HWM is per address space,
+    so unlike ``ru_maxrss`` it is not inherited from the forking parent)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _worker(method: str, path: str, start: int, end: int, touch: bool) -> dict:
+    """Runs in a subprocess: load with ``method``, forward once, report."""
+    import logging
+    logging.disable(logging.WARNING)
+    import torch
+    from transformers import AutoModelForCausalLM
+    import core.cross_node as cn
+
+    base = _status_mb("VmRSS")
+    t0 = time.perf_counter()
+    if method == "from_pretrained":
+        model = AutoModelForCausalLM.from_pretrained(path, dtype=torch.bfloat16)
+    else:
+        os.environ["VRM_MMAP_LOADER"] = "1" if method == "partial_mmap" else "0"
+        cn.load_partial_model(path, start, end, device="cpu", dtype_str="bfloat16")
+        model = cn._partial_model
+    load_s = time.perf_counter() - t0
+    params = [p for p in model.parameters() if not p.is_meta]
+    materialised = sum(p.numel() * p.element_size() for p in params) / 2**20
+    if touch:
+        for p in params:
+            p.float().sum()
+    hidden = model.config.hidden_size
+    cn._worker_forward_tensor(model, torch.randn(1, 8, hidden, dtype=torch.bfloat16),
+                              start, end, seq_len=8)
+    return {"method": method, "load_s": load_s, "materialised_mb": materialised,
+            "peak_rss_mb": _status_mb("VmHWM") - base,
+            "rss_after_mb": _status_mb("VmRSS") - base}
+
+
+def _make_checkpoint(path: str, args) -> float:
+    import torch
+    from transformers import AutoModelForCausalLM, LlamaConfig
+    cfg = LlamaConfig(hidden_size=args.hidden, intermediate_size=int(args.hidden * 2.75),
+                      num_hidden_layers=args.layers, num_attention_heads=args.hidden // 64,
+                      num_key_value_heads=max(1, args.hidden // 256), vocab_size=args.vocab,
+                      tie_word_embeddings=False)
+    with torch.device("cpu"):
+        model = AutoModelForCausalLM.from_config(cfg).to(torch.bfloat16)
+    model.save_pretrained(path, max_shard_size=f"{args.shard_mb}MB")
+    size = sum(p.numel() * p.element_size() for p in model.parameters())
+    del model
+    return size / 2**20
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--layers", type=int, default=16)
+    ap.add_argument("--hidden", type=int, default=1024)
+    ap.add_argument("--vocab", type=int, default=32000)
+    ap.add_argument("--shard-mb", type=int, default=64)
+    ap.add_argument("--range", type=str, default="4,8", help="start,end layers of the worker")
+    ap.add_argument("--methods", type=str, default=",".join(METHODS))
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    ap.add_argument("--no-touch", action="store_true")
+    ap.add_argument("--worker", nargs=4, metavar=("METHOD", "PATH", "START", "END"),
+                    help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        m, p, s, e = args.worker
+        print(json.dumps(_worker(m, p, int(s), int(e), not args.no_touch)))
+        return 0
+
+    start, end = (int(x) for x in args.range.split(","))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        size_mb = _make_checkpoint(tmp, args)
+        shards = len([f for f in os.listdir(tmp) if f.endswith(".safetensors")])
+        env = dict(os.environ, VRM_MINIMAL_TEST="1", PYTHONPATH=str(ROOT))
+        for method in args.methods.split(","):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", method, tmp, str(start), str(end)]
+                + (["--no-touch"] if args.no_touch else []),
+                capture_output=True, text=True, env=env, cwd=str(ROOT))
+            if proc.returncode != 0:
+                print(f"{method}: failed\n{proc.stderr[-2000:]}")
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    print(f"checkpoint: {size_mb:.0f} MB in {shards} shards, worker layers [{start}, {end}) "
+          f"of {args.layers}")
+    print(f"{'method':<20} {'load s':>8} {'materialised MB':>16} {'peak RSS MB':>12} "
+          f"{'RSS after MB':>13}")
+    for r in results:
+        print(f"{r['method']:<20} {r['load_s']:>8.2f} {r['materialised_mb']:>16.0f} "
+              f"{r['peak_rss_mb']:>12.0f} {r['rss_after_mb']:>13.0f}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"checkpoint_mb": size_mb, "shards": shards,
+                                    "range": [start, end], "layers": args.layers,
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Tensor-parallel decode — full re-forward vs per-shard KV cache.
+
+``TPModel.generate_greedy`` used to re-run the whole sequence every step,
+so tokens/s fell with the generated length. This bench generates with a
+synthetic Llama model split over ``--devices`` (default two CPU
+"devices") three ways and reports tokens/s at several lengths:
+
+  - ``tp_nocache``: ``TPModel.generate(use_cache=False)`` (old behaviour)
+  - ``tp_cache``:   ``TPModel.generate()`` with ``TPKVCache``
+  - ``hf_single``:  unsharded HF ``generate`` on the first device
+
+Usage:
+    python benchmarks/bench_tp_decode.py --lengths 64,256 --hidden 256 --layers 4
+    python benchmarks/bench_tp_decode.py --devices cuda:0,cuda:1 --hidden 2048
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+OUT_JSON = Path("benchmarks/results/bench_tp_decode.json")
+
+
+def _sync(devices):
+    import torch
+    for d in devices:
+        if d.startswith("cuda"):
+            torch.cuda.synchronize(d)
+
+
+def _timed(fn, devices) -> float:
+    _sync(devices)
+    t0 = time.perf_counter()
+    fn()
+    _sync(devices)
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--devices", type=str, default="cpu,cpu")
+    ap.add_argument("--hidden", type=int, default=256)
+    ap.add_argument("--layers", type=int, default=4)
+    ap.add_argument("--heads", type=int, default=8)
+    ap.add_argument("--vocab", type=int, default=1000)
+    ap.add_argument("--prompt", type=int, default=32)
+    ap.add_argument("--lengths", type=str, default="32,128,256")
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    import torch
+    from transformers import AutoModelForCausalLM, LlamaConfig
+    from core.tensor_parallel import TPModel
+
+    devices = args.devices.split(",")
+    cfg = LlamaConfig(hidden_size=args.hidden, intermediate_size=args.hidden * 3,
+                      num_hidden_layers=args.layers, num_attention_heads=args.heads,
+                      num_key_value_heads=max(1, args.heads // 2), vocab_size=args.vocab,
+                      max_position_embeddings=4096)
+    torch.manual_seed(0)
+    model = AutoModelForCausalLM.from_config(cfg).eval()
+    ids = torch.randint(0, args.vocab, (1, args.prompt))
+    tp = TPModel(model, devices)
+    hf = model.to(devices[0])
+
+    runs = {
+        "tp_nocache": lambda n: tp.generate(ids, n, eos_token_id=-1, use_cache=False),
+        "tp_cache": lambda n: tp.generate(ids, n, eos_token_id=-1),
+        "hf_single": lambda n: hf.generate(ids.to(devices[0]), max_new_tokens=n,
+                                           min_new_tokens=n, do_sample=False, pad_token_id=0),
+    }
+    results = []
+    with torch.no_grad():
+        runs["tp_cache"](4)                                     # warm-up
+        for n in (int(x) for x in args.lengths.split(",")):
+            row = {"new_tokens": n}
+            for name, fn in runs.items():
+                row[name] = n / _timed(lambda: fn(n), devices)
+            results.append(row)
+
+    print(f"devices={devices} hidden={args.hidden} layers={args.layers} prompt={args.prompt}")
+    print(f"{'new tokens':>10} " + " ".join(f"{name + ' tok/s':>18}" for name in runs)
+          + f" {'cache speedup':>14}")
+    for r in results:
+        print(f"{r['new_tokens']:>10} " + " ".join(f"{r[name]:>18.1f}" for name in runs)
+              + f" {r['tp_cache'] / r['tp_nocache']:>13.1f}x")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"devices": devices, "hidden": args.hidden,
+                                    "layers": args.layers, "prompt": args.prompt,
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
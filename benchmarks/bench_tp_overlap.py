@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Tensor-parallel layer timing — sequential vs concurrent shards vs overlapped all-reduce.
+
+``TPAttention`` / ``TPMLP`` used to launch each shard's work one after the
+other and then all-reduce; on real GPUs that serialises the devices and
+leaves the link idle during compute. This bench simulates the devices on
+CPU: every shard linear sleeps for its FLOPs at ``--device-gflops`` and
+every all-reduce sleeps for a ring all-reduce of its bytes over
+``--link-gbps`` (plus ``--hop-us`` per step), on top of the (small) real
+CPU work. Sleeps release the GIL, so concurrency shows up as it would
+with one stream per GPU.
+
+Modes (``TPModel.set_execution``):
+  - ``sequential``:        one shard after the other, one all-reduce per projection
+  - ``concurrent``:        one thread per device
+  - ``overlap_<c>``:       concurrent + row-parallel output split in ``c`` blocks,
+                           block ``i``'s all-reduce overlapping block ``i + 1``
+
+Usage:
+    python benchmarks/bench_tp_overlap.py --tp 2 --tokens 256 --device-gflops 20 --link-gbps 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+OUT_JSON = Path("benchmarks/results/bench_tp_overlap.json")
+
+
+def _simulate(tp_mod, device_gflops: float, link_gbps: float, hop_us: float) -> None:
+    """Patch TPLinear / the all-reduce with modelled device and link latency."""
+    real_forward = tp_mod.TPLinear.forward
+    real_reduce = tp_mod._nccl_all_reduce
+
+    def forward(self, x, rows=None):
+        out_f = (rows[1] - rows[0]) if rows else self.weight.shape[0]
+        flops = 2 * (x.numel() // x.shape[-1]) * x.shape[-1] * out_f
+        time.sleep(flops / (device_gflops * 1e9))
+        return real_forward(self, x, rows=rows)
+
+    def all_reduce(tensors):
+        n = len(tensors)
+        nbytes = tensors[0].numel() * tensors[0].element_size()
+        time.sleep(2 * (n - 1) / n * nbytes / (link_gbps * 1e9 / 8)
+                   + 2 * (n - 1) * hop_us * 1e-6)
+        real_reduce(tensors)
+
+    tp_mod.TPLinear.forward = forward
+    tp_mod._nccl_all_reduce = all_reduce
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--tp", type=int, default=2)
+    ap.add_argument("--hidden", type=int, default=256)
+    ap.add_argument("--layers", type=int, default=2)
+    ap.add_argument("--tokens", type=int, default=256, help="prefill tokens per forward")
+    ap.add_argument("--device-gflops", type=float, default=20.0)
+    ap.add_argument("--link-gbps", type=float, default=1.0)
+    ap.add_argument("--hop-us", type=float, default=20.0)
+    ap.add_argument("--chunks", type=str, default="2,4")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", type=Path, default=OUT_JSON)
+    args = ap.parse_args()
+
+    import torch
+    from transformers import AutoModelForCausalLM, LlamaConfig
+    import core.tensor_parallel as tp_mod
+
+    cfg = LlamaConfig(hidden_size=args.hidden, intermediate_size=args.hidden * 3,
+                      num_hidden_layers=args.layers, num_attention_heads=8,
+                      num_key_value_heads=8, vocab_size=256)
+    torch.manual_seed(0)
+    model = AutoModelForCausalLM.from_config(cfg).eval()
+    tpm = tp_mod.TPModel(model, ["cpu"] * args.tp)
+    _simulate(tp_mod, args.device_gflops, args.link_gbps, args.hop_us)
+
+    modes = [("sequential", False, 1), ("concurrent", True, 1)] + [
+        (f"overlap_{c}", True, int(c)) for c in args.chunks.split(",")]
+    results = []
+    with torch.no_grad():
+        for phase, n_tok in (("prefill", args.tokens), ("decode", 1)):
+            ids = torch.randint(0, 256, (1, n_tok))
+            ref = None
+            for name, concurrent, chunks in modes:
+                tpm.set_execution(concurrent=concurrent, overlap_chunks=chunks)
+                tpm(ids)                                        # warm-up
+                best = float("inf")
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    logits = tpm(ids)
+                    best = min(best, time.perf_counter() - t0)
+                if ref is None:
+                    ref = logits
+                results.append({"phase": phase, "mode": name, "ms": best * 1e3,
+                                "max_abs_diff": float((logits - ref).abs().max())})
+
+    print(f"tp={args.tp} hidden={args.hidden} layers={args.layers} tokens={args.tokens} "
+          f"device={args.device_gflops:g} GFLOP/s link={args.link_gbps:g} GB/s")
+    print(f"{'phase':<8} {'mode':<12} {'ms':>9} {'speedup':>8} {'max |diff|':>11}")
+    base = {}
+    for r in results:
+        base.setdefault(r["phase"], r["ms"])
+        print(f"{r['phase']:<8} {r['mode']:<12} {r['ms']:>9.2f} "
+              f"{base[r['phase']] / r['ms']:>7.2f}x {r['max_abs_diff']:>11.1e}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"args": {k: str(v) for k, v in vars(args).items()},
+                                    "results": results}, indent=2))
+    print(f"\nWritten: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
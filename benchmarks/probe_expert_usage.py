@@ -10,7 +10,11 @@ Méthode : post_hook sur chaque `mlp.gate` (nn.Linear -> router_logits), on calc
 le top-k et on compte les activations par (couche, expert). On distingue le PREFILL
 (forward du prompt, seq>1, union d'experts) du DÉCODE (seq==1, top-k par token).
 
-Usage: python benchmarks/probe_expert_usage.py [modele]
+Trace optionnelle : avec un 2e argument, chaque appel de routeur est écrit en
+JSONL ``{"layer": i, "ids": [[...top-k...], ...]}`` — rejouable par
+``benchmarks/bench_expert_cache.py --trace`` (core.expert_cache.load_trace).
+
+Usage: python benchmarks/probe_expert_usage.py [modele] [trace.jsonl]
 """
 import os, sys, json, collections
 os.environ["VRM_DISABLE_TURBO"] = "1"
@@ -25,6 +29,8 @@ PROMPTS = [
     "Refactor this loop into a list comprehension: result=[]\nfor x in data:\n  if x>0: result.append(x*2)",
 ]
 MAXNEW = 80
+TRACE_PATH = sys.argv[2] if len(sys.argv) > 2 else None
+trace_f = open(TRACE_PATH, "w") if TRACE_PATH else None
 
 tok = AutoTokenizer.from_pretrained(MODEL)
 if tok.pad_token_id is None:
@@ -53,6 +59,8 @@ def make_hook(lidx):
         seq = idx.shape[0]
         flat = idx.reshape(-1).tolist()
         counts[lidx].update(flat)
+        if trace_f is not None:
+            trace_f.write(json.dumps({"layer": lidx, "ids": idx.tolist()}) + "\n")
         if seq > 1:
             prefill_unique[lidx] = len(set(flat))
         else:
@@ -72,6 +80,10 @@ for p in PROMPTS:
     ids = tok(p, return_tensors="pt").input_ids.to(model.device if hasattr(model, "device") else "cuda:0")
     model.generate(ids, max_new_tokens=MAXNEW, do_sample=False, pad_token_id=tok.pad_token_id)
 
+if trace_f is not None:
+    trace_f.close()
+    print(f"Trace de routage : {TRACE_PATH}", flush=True)
+
 # Agrégat sur toutes les couches
 agg = collections.Counter()
 for lidx, c in counts.items():
@@ -1,5 +1,16 @@
 # core/__init__.py
+"""VRAMancer core package.
+
+The public helpers below are resolved lazily (PEP 562 ``__getattr__``):
+``import core`` — and therefore ``from core import __version__`` in
+``vramancer version`` — no longer drags in torch, transformers or the
+Prometheus client. The real implementation is imported on first access
+and cached in the module namespace; stubs are used in minimal mode or
+when the import fails (unless ``VRM_STRICT_IMPORT=1``).
+"""
+import importlib as _importlib
 import os as _os
+
 __version__ = "2.0.0"
 _STRICT = _os.environ.get('VRM_STRICT_IMPORT','0') in {'1','true','TRUE'}
 
@@ -23,29 +34,43 @@ class _StubScheduler:
     def predict(self, x): return x
 
 
-# -- Resolve real implementations or fall back to stubs --------------------
-_use_stubs = bool(_os.environ.get('VRM_MINIMAL_TEST')
-                  or _os.environ.get('VRM_DASHBOARD_MINIMAL', '0') == '1')
+# -- Lazy resolution of real implementations -------------------------------
+# name -> (submodule, attribute, stub)
+_LAZY = {
+    "get_device_type": (".utils", "get_device_type", _stub_get_device_type),
+    "assign_block_to_device": (".utils", "assign_block_to_device", _stub_assign_block),
+    "get_tokenizer": (".utils", "get_tokenizer", _stub_get_tokenizer),
+    "GPUMonitor": (".monitor", "GPUMonitor", _StubGPUMonitor),
+    "SimpleScheduler": (".scheduler", "SimpleScheduler", _StubScheduler),
+}
+
+
+def _use_stubs():
+    return bool(_os.environ.get('VRM_MINIMAL_TEST')
+                or _os.environ.get('VRM_DASHBOARD_MINIMAL', '0') == '1')
 
-if _use_stubs:
-    get_device_type = _stub_get_device_type
-    assign_block_to_device = _stub_assign_block
-    get_tokenizer = _stub_get_tokenizer
-    GPUMonitor = _StubGPUMonitor
-    SimpleScheduler = _StubScheduler
-else:
+
+def __getattr__(name):
     try:
-        from .utils import get_device_type, assign_block_to_device, get_tokenizer  # type: ignore
-        from .monitor import GPUMonitor  # type: ignore
-        from .scheduler import SimpleScheduler  # type: ignore
-    except Exception:
-        if _STRICT:
-            raise
-        get_device_type = _stub_get_device_type
-        assign_block_to_device = _stub_assign_block
-        get_tokenizer = _stub_get_tokenizer
-        GPUMonitor = _StubGPUMonitor
-        SimpleScheduler = _StubScheduler
+        module, attr, stub = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    if _use_stubs():
+        value = stub
+    else:
+        try:
+            value = getattr(_importlib.import_module(module, __name__), attr)
+        except Exception:
+            if _STRICT:
+                raise
+            value = stub
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
 
 __all__ = [
     "get_device_type",
@@ -36,21 +36,10 @@ except ImportError:
     _fused_sample = None
     _HAS_FUSED_SAMPLE = False
 
-# ---------------------------------------------------------------------------
-# Early patch: transformers.modeling_utils.no_init_weights
-# auto_gptq 0.7.x imports this at module level; it was removed in
-# transformers >= 5.x.  Patch BEFORE any auto_gptq import happens.
-# ---------------------------------------------------------------------------
-try:
-    import contextlib as _contextlib
-    import transformers.modeling_utils as _tmu
-    if not hasattr(_tmu, 'no_init_weights'):
-        @_contextlib.contextmanager
-        def _no_init_weights(_enable=True):
-            yield
-        _tmu.no_init_weights = _no_init_weights
-except Exception:
-    pass
+# Note: the transformers >= 5 ``no_init_weights`` shim needed by auto_gptq
+# 0.7.x is installed by ``HuggingFaceBackend._ensure_gptq_imports`` right
+# before GPTQ loading — importing transformers here cost every importer of
+# this module (``vramancer health``, the API) several seconds.
 
 
 # ---------------------------------------------------------------------------
@@ -1273,10 +1262,16 @@ class HuggingFaceBackend(BaseLLMBackend):
             else:
                 num_gpus = _torch.cuda.device_count() if _HAS_TORCH and _torch.cuda.is_available() else 1
 
+            # Weight streaming: load on CPU; the pipeline then places the
+            # resident layers and stages the rest (core.weight_streaming).
+            if getattr(self, "_weight_streaming", False) and not quant_mode:
+                kwargs["device_map"] = "cpu"
+                kwargs["low_cpu_mem_usage"] = True
+                self.log.info("Weight streaming: loading model on CPU for layer placement")
             # NVFP4 Blackwell: load on CPU, quantize post-load via torchao,
             # then move to GPU. This is fundamentally different from BnB
             # which quantizes during from_pretrained.
-            if quant_mode == "nvfp4":
+            elif quant_mode == "nvfp4":
                 kwargs["device_map"] = "cpu"
                 kwargs["low_cpu_mem_usage"] = True
                 if "torch_dtype" not in kwargs and "dtype" not in kwargs:
@@ -1405,8 +1400,9 @@ class HuggingFaceBackend(BaseLLMBackend):
         except Exception as e:
             self.log.warning(f"Tokenizer load failed: {e}")
 
-        # Initialize TurboEngine (compiled decode bypass)
-        if not os.environ.get("VRM_DISABLE_TURBO"):
+        # Initialize TurboEngine (compiled decode bypass). Skipped under
+        # weight streaming: the compiled graph would bake in slot bindings.
+        if not os.environ.get("VRM_DISABLE_TURBO") and not getattr(self, "_weight_streaming", False):
             self._init_turbo_engine()
 
         return self.model
@@ -0,0 +1,407 @@
+"""Context (sequence) parallelism for long-prompt prefill — ring attention.
+
+A 64k–128k token prompt can run out of memory during prefill on one
+device even when decode would fit: activations, the full K/V and the
+attention working set all scale with the prompt. ``tensor_parallel``
+splits heads and the layer-split pipeline (``model_splitter``,
+``cross_node``) splits layers; neither splits the sequence.
+
+Here the prompt is cut into one contiguous chunk per device and every
+layer runs chunk-local, except attention, which is a ring:
+
+  - device ``i`` keeps its queries and starts with its own K/V block
+  - at step ``s`` it attends to block ``(i - s) % N`` and merges the
+    partial result with an online softmax (running output + log-sum-exp),
+    while the K/V blocks move one hop around the ring
+    (``tensor_parallel._ring_transfer``) on the communication thread
+  - under a causal mask, blocks entirely in a chunk's future are skipped
+
+Each block is attended tile by tile (``ATTN_TILE`` query rows x key
+columns, flash-attention style), so the float32 scores never exceed one
+``[b, heads, tile, tile]`` tile whatever the chunk size. No device ever
+holds more than its own chunk plus two K/V blocks in flight. Layer weights are streamed to each device one layer at a time.
+The per-chunk K/V produced by prefill is handed to the paged cache
+(``PagedKVCacheManager.write_kv_range``) or to a HF ``DynamicCache``
+for decode.
+
+Supported models: Llama-style decoders (Llama, Mistral, Qwen2/3).
+"""
+from __future__ import annotations
+
+import copy
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("context_parallel")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.context_parallel")
+
+
+# ---------------------------------------------------------------------------
+# Memory accounting
+# ---------------------------------------------------------------------------
+
+# Query rows / key columns per attention tile. One tile of float32 scores,
+# b * heads * ATTN_TILE**2 * 4 bytes (128 MB at 32 heads), is the largest
+# temporary of a ring step.
+ATTN_TILE = 1024
+
+
+class _MemTracker:
+    """Peak bytes of the attention working set per device."""
+
+    def __init__(self, devices: Sequence[str]):
+        self.peak: Dict[int, int] = {i: 0 for i in range(len(devices))}
+
+    def sample(self, i: int, *tensors: Any, extra: int = 0) -> None:
+        n = extra + sum(t.numel() * t.element_size() for t in tensors if t is not None)
+        if n > self.peak[i]:
+            self.peak[i] = n
+
+
+def _nbytes(t: Any) -> int:
+    return t.numel() * t.element_size()
+
+
+# ---------------------------------------------------------------------------
+# Ring attention
+# ---------------------------------------------------------------------------
+
+def _tile_attention(q: Any, k: Any, v: Any, q_off: int, k_off: int, causal: bool,
+                    scale: float) -> Optional[Tuple[Any, Any]]:
+    """Attention of one query tile over one key tile, ``(out, lse)`` in float32.
+
+    None when the causal mask hides the whole tile. Rows that see no key of
+    the tile get a zero output and a huge negative LSE, so merging them is
+    a no-op.
+    """
+    nq, nk = q.shape[2], k.shape[2]
+    if causal and k_off > q_off + nq - 1:
+        return None
+    scores = torch.matmul(q.float(), k.float().transpose(-1, -2)) * scale
+    if causal and k_off + nk - 1 > q_off:
+        q_pos = torch.arange(q_off, q_off + nq, device=q.device).unsqueeze(1)
+        k_pos = torch.arange(k_off, k_off + nk, device=q.device).unsqueeze(0)
+        scores = scores.masked_fill(k_pos > q_pos, float("-inf"))
+    lse = torch.logsumexp(scores, dim=-1, keepdim=True).clamp_min(torch.finfo(torch.float32).min)
+    out = torch.matmul(torch.exp(scores - lse), v.float())
+    return out, lse
+
+
+def _block_attention(q: Any, k: Any, v: Any, q_off: int, k_off: int, causal: bool,
+                     scale: float, tile: int = ATTN_TILE) -> Optional[Tuple[Any, Any, int]]:
+    """Attention of one query chunk over one K/V block.
+
+    Query rows and key columns are taken ``tile`` at a time and the key
+    tiles are merged with an online softmax, so the float32 scores are
+    ``[b, heads, tile, tile]`` at most. Returns ``(out, lse, score_bytes)``
+    with ``out``/``lse`` in float32 and ``score_bytes`` the largest score
+    tile, or None when the causal mask hides the whole block. ``k``/``v``
+    are already expanded to the query heads.
+    """
+    nq, nk = q.shape[2], k.shape[2]
+    if causal and k_off > q_off + nq - 1:
+        return None
+    tile = max(1, tile)
+    b, heads, _, d = q.shape
+    out = torch.empty(b, heads, nq, v.shape[-1], dtype=torch.float32, device=q.device)
+    lse = torch.empty(b, heads, nq, 1, dtype=torch.float32, device=q.device)
+    score_bytes = 0
+    for qa in range(0, nq, tile):
+        qb = min(qa + tile, nq)
+        acc = acc_lse = None
+        for ka in range(0, nk, tile):
+            kb = min(ka + tile, nk)
+            res = _tile_attention(q[:, :, qa:qb], k[:, :, ka:kb], v[:, :, ka:kb],
+                                  q_off + qa, k_off + ka, causal, scale)
+            if res is None:
+                break                                  # later key tiles are masked too
+            acc, acc_lse = _merge(acc, acc_lse, *res)
+            score_bytes = max(score_bytes, b * heads * (qb - qa) * (kb - ka) * 4)
+        out[:, :, qa:qb] = acc
+        lse[:, :, qa:qb] = acc_lse
+    return out, lse, score_bytes
+
+
+def _merge(out: Any, lse: Any, blk_out: Any, blk_lse: Any) -> Tuple[Any, Any]:
+    """Online-softmax merge of two partial attention results."""
+    if out is None:
+        return blk_out, blk_lse
+    new_lse = torch.logaddexp(lse, blk_lse)
+    out = out * torch.exp(lse - new_lse) + blk_out * torch.exp(blk_lse - new_lse)
+    return out, new_lse
+
+
+def _expand_kv(t: Any, heads: int) -> Any:
+    if t.shape[1] == heads:
+        return t
+    return t.repeat_interleave(heads // t.shape[1], dim=1)
+
+
+def ring_attention(qs: List[Any], ks: List[Any], vs: List[Any], devices: Sequence[str],
+                   causal: bool = True, scale: Optional[float] = None,
+                   concurrent: bool = True, tracker: Optional[_MemTracker] = None,
+                   tile: int = ATTN_TILE) -> List[Any]:
+    """Attention over a sequence split in contiguous chunks, one per device.
+
+    ``qs[i]``: ``[b, heads, n_i, d]`` on ``devices[i]``; ``ks[i]``/``vs[i]``:
+    ``[b, kv_heads, n_i, d]`` for the same positions (chunk ``i`` covers
+    positions ``sum(n_0..n_{i-1}) ..``). Returns the per-chunk outputs in
+    the query dtype, identical (up to float error) to dense attention over
+    the concatenated sequence. ``tile`` bounds the score working set (see
+    ``_block_attention``).
+    """
+    from core.tensor_parallel import _comm_pool, _ring_transfer, _run_shards
+
+    n = len(devices)
+    offsets = [0]
+    for q in qs[:-1]:
+        offsets.append(offsets[-1] + q.shape[2])
+    if scale is None:
+        scale = 1.0 / math.sqrt(qs[0].shape[-1])
+    heads = qs[0].shape[1]
+    acc: List[Any] = [None] * n
+    lse: List[Any] = [None] * n
+    held = [(ks[i], vs[i], i) for i in range(n)]          # (k, v, source chunk)
+
+    def rotate(blocks):
+        return [(_ring_transfer(blocks[(i - 1) % n][0], devices[i]),
+                 _ring_transfer(blocks[(i - 1) % n][1], devices[i]),
+                 blocks[(i - 1) % n][2]) for i in range(n)]
+
+    for step in range(n):
+        nxt = _comm_pool().submit(rotate, held) if step < n - 1 else None
+
+        def work(i: int, blocks=held, incoming=nxt is not None) -> None:
+            k, v, j = blocks[i]
+            res = _block_attention(qs[i], _expand_kv(k, heads), _expand_kv(v, heads),
+                                   offsets[i], offsets[j], causal, scale, tile)
+            if res is None:
+                return
+            out, blk_lse, score_bytes = res
+            acc[i], lse[i] = _merge(acc[i], lse[i], out, blk_lse)
+            if tracker is not None:
+                # own queries + accumulator + held block + the block in flight
+                # + one score tile
+                tracker.sample(i, qs[i], acc[i], lse[i], k, v,
+                               k if incoming else None, v if incoming else None,
+                               extra=score_bytes)
+
+        _run_shards(list(devices), work, concurrent)
+        if nxt is not None:
+            held = nxt.result()
+    return [acc[i].to(qs[i].dtype) for i in range(n)]
+
+
+# ---------------------------------------------------------------------------
+# Model-level prefill
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ContextParallelResult:
+    """Output of ``context_parallel_prefill``."""
+
+    logits: Any                                  # [b, n_last, vocab] (last chunk)
+    kv: List[List[Tuple[Any, Any]]]              # kv[layer][chunk] = (k, v) on its device
+    offsets: List[int]                           # first position of each chunk
+    devices: List[str]
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def seq_len(self) -> int:
+        return self.offsets[-1] + self.kv[0][-1][0].shape[2]
+
+    def to_paged(self, manager: Any, request_id: str, batch_index: int = 0) -> int:
+        """Write the prompt K/V into a ``PagedKVCacheManager``, chunk by chunk.
+
+        Raises RuntimeError if the cache ran out of pages part-way.
+        """
+        written = 0
+        for layer_idx, chunks in enumerate(self.kv):
+            for (k, v), start in zip(chunks, self.offsets):
+                written += manager.write_kv_range(request_id, layer_idx, start,
+                                                  k[batch_index], v[batch_index])
+        expected = len(self.kv) * self.seq_len
+        if written != expected:
+            raise RuntimeError(f"Paged KV cache full: wrote {written} of {expected} "
+                               f"token-layers for {request_id}")
+        return written
+
+    def to_hf_cache(self, device: Optional[str] = None) -> Any:
+        """Gather the K/V on ``device`` (default: first) as a HF ``DynamicCache``."""
+        from transformers import DynamicCache
+        device = device or self.devices[0]
+        cache = DynamicCache()
+        for layer_idx, chunks in enumerate(self.kv):
+            k = torch.cat([c[0].to(device) for c in chunks], dim=2)
+            v = torch.cat([c[1].to(device) for c in chunks], dim=2)
+            cache.update(k, v, layer_idx)
+        return cache
+
+
+def split_sequence(seq_len: int, num_chunks: int) -> List[Tuple[int, int]]:
+    """Contiguous ``[start, end)`` ranges, sizes differing by at most one."""
+    num_chunks = max(1, min(num_chunks, seq_len))
+    base, extra = divmod(seq_len, num_chunks)
+    out, start = [], 0
+    for i in range(num_chunks):
+        end = start + base + (1 if i < extra else 0)
+        out.append((start, end))
+        start = end
+    return out
+
+
+def _apply_rotary(x: Any, cos: Any, sin: Any) -> Any:
+    from core.tensor_parallel import _apply_rotary_pos_emb
+    return _apply_rotary_pos_emb(x, cos, sin)
+
+
+def _on_device(module: Any, device: str) -> Any:
+    """``module`` on ``device``: itself if already there, else a transient copy."""
+    try:
+        p = next(module.parameters())
+    except StopIteration:
+        return module
+    if p.device == torch.device(device):
+        return module
+    return copy.deepcopy(module).to(device)
+
+
+def context_parallel_prefill(model: Any, input_ids: Any, devices: Sequence[str],
+                             concurrent: bool = True) -> ContextParallelResult:
+    """Prefill ``input_ids`` with the sequence split across ``devices``.
+
+    Runs a Llama-style HF CausalLM layer by layer; each device processes
+    its chunk and attention is computed with ``ring_attention``. Returns
+    the logits of the last chunk (enough to sample the first token) and
+    the per-chunk K/V for the decode cache.
+    """
+    if not _TORCH:
+        raise RuntimeError("context_parallel_prefill requires torch")
+    base = getattr(model, "model", None)
+    if base is None or not hasattr(base, "layers") or not hasattr(base.layers[0], "self_attn"):
+        raise ValueError(f"Context parallelism supports Llama-style decoders, "
+                         f"not {type(model).__name__}")
+    from core.tensor_parallel import _run_shards
+
+    devices = list(devices)
+    cfg = model.config
+    heads = cfg.num_attention_heads
+    kv_heads = getattr(cfg, "num_key_value_heads", None) or heads
+    head_dim = getattr(cfg, "head_dim", None) or cfg.hidden_size // heads
+    ranges = split_sequence(input_ids.shape[1], len(devices))
+    devices = devices[:len(ranges)]
+    offsets = [a for a, _ in ranges]
+    tracker = _MemTracker(devices)
+    home = next(model.parameters()).device
+    t0 = time.perf_counter()
+
+    with torch.no_grad():
+        hidden, pos_emb = [], []
+        for (a, b), dev in zip(ranges, devices):
+            ids = input_ids[:, a:b].to(home)
+            h = base.embed_tokens(ids)
+            pos = torch.arange(a, b, device=home).unsqueeze(0)
+            cos, sin = base.rotary_emb(h, pos)
+            hidden.append(h.to(dev))
+            pos_emb.append((cos.to(dev), sin.to(dev)))
+
+        kv: List[List[Tuple[Any, Any]]] = []
+        for layer in base.layers:
+            local = [_on_device(layer, dev) for dev in devices]
+            qs, ks, vs = [None] * len(devices), [None] * len(devices), [None] * len(devices)
+
+            def project(i: int) -> None:
+                lyr, h = local[i], hidden[i]
+                attn = lyr.self_attn
+                x = lyr.input_layernorm(h)
+                bsz, n, _ = x.shape
+                q = attn.q_proj(x).view(bsz, n, heads, head_dim)
+                k = attn.k_proj(x).view(bsz, n, kv_heads, head_dim)
+                v = attn.v_proj(x).view(bsz, n, kv_heads, head_dim).transpose(1, 2)
+                if hasattr(attn, "q_norm"):                     # Qwen3
+                    q, k = attn.q_norm(q), attn.k_norm(k)
+                cos, sin = pos_emb[i]
+                qs[i] = _apply_rotary(q.transpose(1, 2), cos, sin)
+                ks[i] = _apply_rotary(k.transpose(1, 2), cos, sin)
+                vs[i] = v
+
+            _run_shards(devices, project, concurrent)
+            kv.append([(ks[i], vs[i]) for i in range(len(devices))])
+            outs = ring_attention(qs, ks, vs, devices, causal=True,
+                                  scale=getattr(local[0].self_attn, "scaling", None),
+                                  concurrent=concurrent, tracker=tracker)
+
+            def finish(i: int) -> None:
+                lyr, h = local[i], hidden[i]
+                bsz, n, _ = h.shape
+                h = h + lyr.self_attn.o_proj(outs[i].transpose(1, 2).reshape(bsz, n, -1))
+                hidden[i] = h + lyr.mlp(lyr.post_attention_layernorm(h))
+
+            _run_shards(devices, finish, concurrent)
+            del local
+
+        last = hidden[-1].to(home)
+        logits = model.lm_head(base.norm(last))
+
+    kv_bytes = [sum(_nbytes(kv[l][i][0]) + _nbytes(kv[l][i][1]) for l in range(len(kv)))
+                for i in range(len(devices))]
+    stats = {
+        "seconds": round(time.perf_counter() - t0, 4),
+        "chunks": [b - a for a, b in ranges],
+        "attn_peak_bytes": [tracker.peak[i] for i in range(len(devices))],
+        "kv_bytes": kv_bytes,
+        "activation_bytes": [_nbytes(h) for h in hidden],
+    }
+    return ContextParallelResult(logits=logits, kv=kv, offsets=offsets, devices=devices,
+                                 stats=stats)
+
+
+def memory_report(seq_len: int, num_devices: int, num_layers: int, num_heads: int,
+                  num_kv_heads: int, head_dim: int, hidden_size: int,
+                  dtype_bytes: int = 2, tile: int = ATTN_TILE) -> Dict[str, Dict[str, float]]:
+    """Estimated prefill memory per device (MB), dense vs ring attention.
+
+    Counts the prompt K/V for all layers, the hidden states of the chunk
+    and the attention working set (one float32 score tile + accumulator
+    for one layer). The dense baseline is single-device flash attention:
+    it also tiles its scores, so the gap is the sequence-proportional
+    memory. Weights are excluded: they are the same in both cases.
+    """
+    def mb(x: float) -> float:
+        return round(x / 2**20, 1)
+
+    def per_device(chunk: int, kv_block: int, blocks_held: int) -> Dict[str, float]:
+        kv = 2 * num_layers * num_kv_heads * chunk * head_dim * dtype_bytes
+        act = chunk * hidden_size * dtype_bytes * 4       # residual, norm, q, attn out
+        scores = num_heads * min(chunk, tile) * min(kv_block, tile) * 4
+        acc = num_heads * chunk * (head_dim + 1) * 4
+        blocks = blocks_held * 2 * num_heads * kv_block * head_dim * dtype_bytes
+        total = kv + act + scores + acc + blocks
+        return {"kv_mb": mb(kv), "activations_mb": mb(act), "scores_mb": mb(scores),
+                "ring_blocks_mb": mb(blocks), "total_mb": mb(total)}
+
+    chunk = -(-seq_len // max(1, num_devices))
+    return {"dense_single_device": per_device(seq_len, seq_len, 1),
+            "ring_per_device": per_device(chunk, chunk, 2)}
+
+
+__all__ = [
+    "ContextParallelResult",
+    "context_parallel_prefill",
+    "memory_report",
+    "ring_attention",
+    "split_sequence",
+]
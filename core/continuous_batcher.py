@@ -8,6 +8,35 @@ Implements iteration-level scheduling inspired by Orca/vLLM:
 
 This is the **#1 missing feature** that vLLM/TGI have and VRAMancer lacked.
 
+Speculative mode (``draft_model_callable=...``): speculation used to be
+single-request only, so a multi-tenant server had to choose between
+batching and speculation. Now, with a draft source set:
+  - Every decode request drafts its own tokens. The source can be a draft
+    model, prompt lookup or n-gram, and may return fewer than asked.
+  - The draft length is adaptive per request, from that request's
+    acceptance history.
+  - One verifier pass scores all drafts. The variable-length drafts are
+    right-padded and the per-request KV caches left-padded, under a 4D
+    mask with per-request position ids.
+  - Acceptance is exact speculative sampling. The batched KV is then
+    sliced back per request, keeping only the accepted positions (per
+    request rollback).
+
+CUDA-graph decode (``cuda_graph_runner=...``): the decode step used to
+rebuild a padded DynamicCache from per-request caches on every step, so
+its shapes changed constantly and no graph could be captured. With a
+runner set:
+  - After prefill, each request's KV moves into a row ("slot") of one
+    ``StaticKVCache``. Slots stay a contiguous prefix: a finishing request
+    hands its row to the last one.
+  - Every decode step writes all rows at a shared cursor, under a per-row
+    validity mask and per-request position ids.
+  - The runner pads the batch to its bucket (1, 2, 4, ...) with masked
+    dummy rows and replays the graph captured for that bucket. Each
+    bucket's graph reads the fixed-address view over the first ``bucket``
+    rows. The runner's graph cache is raised to hold every bucket up to
+    ``max_batch_size``.
+
 Architecture:
     ContinuousBatcher
       ├── RequestQueue           (thread-safe intake)
@@ -68,6 +97,7 @@ except ImportError:
 class RequestStatus(Enum):
     WAITING = auto()
     ACTIVE = auto()
+    FINISHING = auto()   # out of the batch, text still being decoded
     FINISHED = auto()
     CANCELLED = auto()
     ERROR = auto()
@@ -98,6 +128,14 @@ class InferenceRequest:
     # Streaming callback (optional)
     on_token: Optional[Callable[[str], None]] = None
 
+    # Speculative mode: adaptive draft length and its (accepted, drafted) history
+    spec_gamma: int = 0
+    spec_window: List[Tuple[int, int]] = field(default_factory=list)
+    drafter: Any = None
+
+    # CUDA-graph decode: row of the batcher's StaticKVCache
+    kv_slot: Optional[int] = None
+
 
 # ---------------------------------------------------------------------------
 # Continuous Batcher
@@ -123,6 +161,11 @@ class ContinuousBatcher:
         device: str = "auto",
         verbose: bool = True,
         paged_kv_manager: Any = None,
+        draft_model_callable: Any = None,
+        spec_gamma: Optional[int] = None,
+        spec_gamma_min: int = 1,
+        spec_gamma_max: int = 8,
+        cuda_graph_runner: Any = None,
     ):
         self.model = model
         self.tokenizer = tokenizer
@@ -131,6 +174,28 @@ class ContinuousBatcher:
         self.verbose = verbose
         self.paged_kv = paged_kv_manager
 
+        # Speculative mode (None = plain one-token decode)
+        self.draft_model = draft_model_callable
+        self.spec_gamma = (spec_gamma if spec_gamma is not None
+                           else int(os.environ.get("VRM_SPEC_GAMMA", "5")))
+        self.spec_gamma_min = max(1, spec_gamma_min)
+        self.spec_gamma_max = max(self.spec_gamma_min, spec_gamma_max)
+        self._spec_window_size = int(os.environ.get("VRM_SPEC_WINDOW", "10"))
+        self._spec_drafted = 0
+        self._spec_accepted = 0
+        self._spec_passes = 0
+
+        # CUDA-graph decode over a slot-based StaticKVCache (None = eager)
+        self.cuda_graph_runner = cuda_graph_runner
+        self._static_kv: Any = None
+        self._slot_owners: List[InferenceRequest] = []
+
+        # busy_callback(True) before the loop's first forward on an idle
+        # batcher (may block, e.g. while the pipeline migrates weights),
+        # busy_callback(False) once the batch drains
+        self.busy_callback: Optional[Callable[[bool], None]] = None
+        self._busy = False
+
         # Device
         if device == "auto":
             if _TORCH and torch.cuda.is_available():
@@ -255,7 +320,7 @@ class ContinuousBatcher:
     def stats(self) -> Dict[str, Any]:
         """Return batcher statistics."""
         elapsed = time.time() - self._start_time if self._start_time else 0
-        return {
+        out = {
             "running": self._running,
             "waiting": len(self._waiting),
             "active": len(self._active),
@@ -270,6 +335,15 @@ class ContinuousBatcher:
                 self._total_tokens_generated / max(self._total_iterations, 1)
             ),
         }
+        if self.draft_model is not None:
+            out["speculative"] = {
+                "drafted": self._spec_drafted,
+                "accepted": self._spec_accepted,
+                "verify_passes": self._spec_passes,
+                "acceptance_rate": self._spec_accepted / max(1, self._spec_drafted),
+                "gammas": {r.request_id: r.spec_gamma for r in self._active},
+            }
+        return out
 
     @property
     def pending_count(self) -> int:
@@ -297,6 +371,8 @@ class ContinuousBatcher:
                 if slots > 0 and self._waiting:
                     to_prepare = self._waiting[:slots]
                     self._waiting = self._waiting[slots:]
+            if to_prepare:
+                self._set_busy(True)       # prefill is a forward too
 
             # Phase 1b: Tokenize OUTSIDE lock — batch tokenization reduces GIL overhead
             # Instead of N individual tokenizer calls (each acquiring GIL), batch them
@@ -335,6 +411,7 @@ class ContinuousBatcher:
                 batch = list(self._active)
 
             if not batch:
+                self._set_busy(False)
                 # Wait for new work instead of polling
                 with self._has_work:
                     if not self._waiting and not self._active:
@@ -357,6 +434,17 @@ class ContinuousBatcher:
 
             # Yield CPU — adaptive sleep based on load
             time.sleep(0.0001)  # busy
+        self._set_busy(False)
+
+    def _set_busy(self, busy: bool) -> None:
+        if busy == self._busy:
+            return
+        self._busy = busy
+        if self.busy_callback is not None:
+            try:
+                self.busy_callback(busy)
+            except Exception as e:
+                _logger.debug("busy_callback(%s) failed: %s", busy, e)
 
     def _batch_prepare_requests(self, requests: List[InferenceRequest]) -> None:
         """Batch-tokenize all prompts in a single call to minimize GIL overhead.
@@ -402,9 +490,9 @@ class ContinuousBatcher:
                 if batch_ids is not None:
                     # HF path: extract from padded tensor
                     if batch_mask is not None:
-                        mask = batch_mask[i]
-                        valid_len = mask.sum().item()
-                        req.input_ids = batch_ids[i:i+1, :valid_len]
+                        # Select by mask: tokenizers may pad left or right
+                        mask = batch_mask[i].bool()
+                        req.input_ids = batch_ids[i:i+1, mask]
                     else:
                         req.input_ids = batch_ids[i:i+1]
                 elif rust_ids is not None:
@@ -510,6 +598,8 @@ class ContinuousBatcher:
           3. No global lock held during compute (lock scope narrowed in _loop).
         """
         self._total_iterations += 1
+        # A request finished earlier in this loop pass is decoding its text
+        batch = [r for r in batch if r.status == RequestStatus.ACTIVE]
 
         if not _TORCH or self.model is None:
             # Stub mode: advance each request by one "token"
@@ -519,6 +609,9 @@ class ContinuousBatcher:
                     self._finish_request(req, req.prompt + " [stub output]")
             return
 
+        if self.paged_kv:
+            self._requeue_preempted(batch)
+
         # Separate prefill (no KV cache yet) from decode (have KV cache)
         prefill = [r for r in batch if r.kv_cache is None]
         decode = [r for r in batch if r.kv_cache is not None]
@@ -528,11 +621,37 @@ class ContinuousBatcher:
             self._forward_batched_prefill(prefill)
 
         # --- Decode: coalesce into ONE batched forward pass ---
-        if len(decode) >= 2:
+        if decode and self.draft_model is not None:
+            self._forward_speculative_decode(decode)
+        elif decode and self.cuda_graph_runner is not None:
+            self._forward_graph_decode(decode)
+        elif len(decode) >= 2:
             self._forward_batched_decode(decode)
         elif len(decode) == 1:
             self._forward_single(decode[0], is_prefill=False)
 
+    def _requeue_preempted(self, batch: List[InferenceRequest]) -> None:
+        """Send requests whose paged KV was preempted back through prefill.
+
+        The pager drops a preempted request's pages without saving them,
+        so its cache is rebuilt by prefilling everything generated so far.
+        """
+        was_preempted = getattr(self.paged_kv, "was_preempted", None)
+        if was_preempted is None:
+            return
+        for req in batch:
+            try:
+                if not was_preempted(req.request_id):
+                    continue
+                self._release_slot(req)
+                req.kv_cache = None
+                req.drafter = None
+                self.paged_kv.allocate(req.request_id)
+                _logger.debug("Paged KV of %s was preempted, re-prefilling %d tokens",
+                              req.request_id, req.generated_ids.shape[1])
+            except Exception as e:
+                _logger.debug("Re-queue of preempted %s failed: %s", req.request_id, e)
+
     # ------------------------------------------------------------------
     # Batched prefill
     # ------------------------------------------------------------------
@@ -634,10 +753,12 @@ class ContinuousBatcher:
             padded_ids[i, max_len - seq_len:] = req.generated_ids[0]
             attention_mask[i, max_len - seq_len:] = 1
 
-        # Single batched forward
+        # Single batched forward. Position ids follow the mask so the
+        # left-padded rows see the same positions as an unpadded prefill.
         output = self.model(
             padded_ids,
             attention_mask=attention_mask,
+            position_ids=(attention_mask.cumsum(-1) - 1).clamp_min(0),
             use_cache=True,
         )
         logits = output.logits if hasattr(output, 'logits') else output
@@ -649,9 +770,10 @@ class ContinuousBatcher:
                 req_logits = logits[i:i+1, -1:, :]
                 next_logits = req_logits.squeeze(1)
 
-                # Extract per-request KV cache
+                # Extract per-request KV cache (without its left padding)
                 if new_kv:
-                    req.kv_cache = self._unbatch_kv_cache(new_kv, i)
+                    req.kv_cache = self._unbatch_kv_cache(
+                        new_kv, i, pad=max_len - req.generated_ids.shape[1])
                 else:
                     req.kv_cache = None
 
@@ -866,30 +988,323 @@ class ContinuousBatcher:
 
         return tuple(padded_kv), mask
 
-    def _unbatch_kv_cache(self, batched_kv: Tuple, idx: int) -> Tuple:
-        """Extract one request's KV cache from a batched KV cache."""
+    def _unbatch_kv_cache(self, batched_kv: Tuple, idx: int, pad: int = 0) -> Tuple:
+        """Extract one request's KV cache from a batched KV cache.
+
+        *pad* left-padding positions are dropped.
+        """
         # Handle DynamicCache (transformers 5.x) directly
-        try:
-            from transformers import DynamicCache
-            if isinstance(batched_kv, DynamicCache):
-                cache = DynamicCache()
-                for layer_idx in range(len(batched_kv)):
-                    cache.update(
-                        batched_kv.key_cache[layer_idx][idx:idx + 1],
-                        batched_kv.value_cache[layer_idx][idx:idx + 1],
-                        layer_idx,
-                    )
-                return cache
-        except ImportError:
-            pass
+        if hasattr(batched_kv, "layers") or hasattr(batched_kv, "key_cache"):
+            return self._build_kv_cache([
+                (k[idx:idx + 1, :, pad:], v[idx:idx + 1, :, pad:])
+                for k, v in self._kv_layers(batched_kv)
+            ])
         result = []
         for layer_kv in batched_kv:
             # Use indexing to be robust against caches that store more than
             # (key, value) per layer (e.g. sin/cos embeddings in some impls).
             k, v = layer_kv[0], layer_kv[1]
-            result.append((k[idx:idx + 1], v[idx:idx + 1]))
+            result.append((k[idx:idx + 1, :, pad:], v[idx:idx + 1, :, pad:]))
         return tuple(result)
 
+    @staticmethod
+    def _kv_layers(cache: Any) -> List[Tuple[Any, Any]]:
+        """Per-layer ``(key, value)`` of a DynamicCache or legacy tuple cache."""
+        if hasattr(cache, "layers"):
+            return [(layer.keys, layer.values) for layer in cache.layers]
+        if hasattr(cache, "key_cache"):
+            return list(zip(cache.key_cache, cache.value_cache))
+        return [(layer[0], layer[1]) for layer in cache]
+
+    @staticmethod
+    def _build_kv_cache(layers: List[Tuple[Any, Any]]) -> Any:
+        """A DynamicCache holding *layers* (legacy tuple without transformers)."""
+        try:
+            from transformers import DynamicCache
+        except ImportError:
+            return tuple(layers)
+        cache = DynamicCache()
+        for layer_idx, (k, v) in enumerate(layers):
+            cache.update(k, v, layer_idx)
+        return cache
+
+    # ------------------------------------------------------------------
+    # CUDA-graph decode
+    # ------------------------------------------------------------------
+
+    def _ensure_static_kv(self) -> Any:
+        """The slot cache, sized for the bucket that holds max_batch_size."""
+        if self._static_kv is None:
+            from core.cuda_graph_decode import bucket_for
+            from core.turbo_engine import StaticKVCache
+            runner = self.cuda_graph_runner
+            cfg = self.model.config
+            n_heads = cfg.num_attention_heads
+            param = next(self.model.parameters())
+            rows = (bucket_for(self.max_batch_size, runner.buckets) if runner.buckets
+                    else None) or self.max_batch_size
+            # Buckets bound the graph count. Room for every bucket this
+            # batcher can reach, or ramp-up fills the cache with small
+            # buckets and the steady-state batch never gets a graph.
+            runner.max_cache_entries = max(runner.max_cache_entries,
+                                           sum(b <= rows for b in runner.buckets))
+            self._static_kv = StaticKVCache(
+                n_layers=cfg.num_hidden_layers,
+                n_kv_heads=getattr(cfg, "num_key_value_heads", None) or n_heads,
+                head_dim=getattr(cfg, "head_dim", None) or cfg.hidden_size // n_heads,
+                max_seq_len=runner.max_seq_len,
+                device=param.device,
+                dtype=param.dtype,
+                batch_size=rows,
+            )
+        return self._static_kv
+
+    def _release_slot(self, req: InferenceRequest) -> None:
+        """Give *req*'s row back; the last row moves into it."""
+        if req.kv_slot is None or self._static_kv is None:
+            return
+        slot, req.kv_slot = req.kv_slot, None
+        if req.kv_cache is self._static_kv:
+            req.kv_cache = None          # the row now belongs to another request
+        moved = self._static_kv.release(slot)
+        last = self._slot_owners.pop()
+        if moved != slot:
+            last.kv_slot = slot
+            self._slot_owners[slot] = last
+
+    def _leave_static_kv(self) -> None:
+        """Drop graph decode: every slot goes back to a per-request cache."""
+        static = self._static_kv
+        if static is not None:
+            if static.cursor < static.max_seq_len:
+                static.valid[:, static.cursor] = 0      # half-written step
+            for req in self._slot_owners:
+                if req.kv_cache is static:
+                    req.kv_cache = self._build_kv_cache(static.export(req.kv_slot))
+                req.kv_slot = None
+        self._slot_owners = []
+        self._static_kv = None
+        self.cuda_graph_runner = None
+
+    def _forward_graph_decode(self, requests: List[InferenceRequest]) -> None:
+        """One decode step for all slotted requests through the bucketed
+        CUDA graph runner (eager until a bucket is captured)."""
+        eager: List[InferenceRequest] = []
+        try:
+            static = self._ensure_static_kv()
+            for req in requests:
+                if req.kv_slot is not None:
+                    continue
+                layers = self._kv_layers(req.kv_cache)
+                if layers[0][0].shape[2] != req.generated_ids.shape[1] - 1:
+                    eager.append(req)            # prompt still being chunked
+                    continue
+                req.kv_slot = static.acquire()
+                self._slot_owners.append(req)
+                static.load(req.kv_slot, layers)
+                req.kv_cache = static
+            rows = self._slot_owners
+            if sorted(r.kv_slot for r in requests if r.kv_slot is not None) != list(range(len(rows))):
+                raise RuntimeError("static KV slots out of sync with the decode batch")
+            rows = list(rows)
+            device = static.write_pos.device
+            ids = torch.cat([r.generated_ids[:, -1:] for r in rows]).to(device)
+            pos = torch.tensor([[r.generated_ids.shape[1] - 1] for r in rows], device=device)
+            mask = static.begin_step(len(rows))
+            runner = self.cuda_graph_runner
+            bucket = runner.bucket_size(len(rows)) or len(rows)
+            logits = runner.forward(ids, attention_mask=mask, position_ids=pos,
+                                    past_key_values=static.view(bucket), use_cache=True)
+            static.end_step()
+        except Exception as e:
+            _logger.warning("CUDA-graph decode failed (%s), back to eager decode", e)
+            self._leave_static_kv()
+            for req in requests:
+                self._forward_single(req, is_prefill=False)
+            return
+
+        for i, req in enumerate(rows):
+            next_logits = logits[i:i + 1, -1, :]
+            if req.temperature != 1.0 or req.top_p != 1.0 or req.top_k != 50:
+                next_token = self._sample(next_logits, req.temperature, req.top_k, req.top_p)
+            else:
+                next_token = torch.argmax(next_logits, dim=-1, keepdim=True)
+            self._emit_tokens(req, [int(next_token.reshape(-1)[0])])
+        for req in eager:
+            self._forward_single(req, is_prefill=False)
+
+    # ------------------------------------------------------------------
+    # Speculative decode
+    # ------------------------------------------------------------------
+
+    def _draft_for(self, req: InferenceRequest) -> Tuple[List[int], Any]:
+        """Draft up to ``req.spec_gamma`` tokens: ``(tokens, probs or None)``."""
+        if req.spec_gamma <= 0:
+            req.spec_gamma = min(max(self.spec_gamma, self.spec_gamma_min),
+                                 self.spec_gamma_max)
+        # The verifier always adds one token (correction or bonus)
+        budget = req.max_new_tokens - req.tokens_generated
+        if budget <= 0:
+            return [], None
+        gamma = min(req.spec_gamma, budget - 1)
+        if gamma <= 0:
+            return [], None
+        if req.drafter is None:
+            factory = getattr(self.draft_model, "for_request", None)
+            req.drafter = factory() if factory is not None else self.draft_model
+        try:
+            out = req.drafter(req.generated_ids, gamma)
+        except Exception as e:
+            _logger.debug("Draft failed for %s: %s", req.request_id, e)
+            return [], None
+        tokens, probs = out if isinstance(out, tuple) else (out, None)
+        if tokens is None:
+            return [], None
+        tokens = [int(t) for t in torch.as_tensor(tokens).reshape(-1)[:gamma].tolist()]
+        if probs is not None and tokens:
+            probs = probs.reshape(-1, probs.shape[-1])[:len(tokens)].float()
+        return tokens, (probs if tokens else None)
+
+    def _request_probs(self, logits: Any, req: InferenceRequest) -> Any:
+        """Target distribution for *req*, matching how ``_sample`` is chosen:
+        greedy for default settings, else temperature / top-k / top-p."""
+        from core.speculative_decoding import target_probs
+        logits = logits.float()
+        sampled = req.temperature != 1.0 or req.top_p != 1.0 or req.top_k != 50
+        if not sampled or req.temperature <= 0:
+            return target_probs(logits, 0.0)
+        logits = logits / req.temperature
+        if 0 < req.top_k < logits.size(-1):
+            kth = torch.topk(logits, req.top_k, dim=-1).values[:, -1:]
+            logits = logits.masked_fill(logits < kth, float("-inf"))
+        if req.top_p < 1.0:
+            sorted_logits, order = torch.sort(logits, descending=True)
+            sorted_probs = torch.softmax(sorted_logits, dim=-1)
+            drop = sorted_probs.cumsum(dim=-1) - sorted_probs >= req.top_p
+            logits = logits.scatter(-1, order, sorted_logits.masked_fill(drop, float("-inf")))
+        return torch.softmax(logits, dim=-1)
+
+    def _forward_speculative_decode(self, requests: List[InferenceRequest]) -> None:
+        """Verify every request's draft in ONE batched forward pass.
+
+        Each request feeds its uncached tokens (normally just the last one,
+        more after a chunked prefill) plus its drafts, right-padded to the
+        longest row, on top of its own KV cache, left-padded to the longest
+        cache. Rows get a 4D mask over their real cache and causal new
+        positions, and position ids continuing their own sequence. After
+        speculative sampling, each request keeps its cache plus the accepted
+        positions only. The newest token is fed next step, as in plain decode.
+        """
+        from core.speculative_decoding import adapt_gamma, speculative_accept
+
+        drafts = [self._draft_for(req) for req in requests]
+        try:
+            caches = [self._kv_layers(req.kv_cache) for req in requests]
+            lengths = [layers[0][0].shape[2] for layers in caches]
+            max_len = max(lengths)
+            pending = [req.generated_ids[0, n:].tolist() for req, n in zip(requests, lengths)]
+            width = max(len(p) + len(tokens) for p, (tokens, _) in zip(pending, drafts))
+            device = caches[0][0][0].device
+            dtype = caches[0][0][0].dtype
+            batch = len(requests)
+
+            pad_id = 0
+            if self.tokenizer is not None and getattr(self.tokenizer, "pad_token_id", None) is not None:
+                pad_id = self.tokenizer.pad_token_id
+            ids = torch.full((batch, width), pad_id, dtype=torch.long, device=device)
+            allow = torch.zeros(batch, width, max_len + width, dtype=torch.bool, device=device)
+            causal = torch.ones(width, width, dtype=torch.bool, device=device).tril()
+            for b, (req, (tokens, _)) in enumerate(zip(requests, drafts)):
+                row = pending[b] + tokens
+                ids[b, :len(row)] = torch.tensor(row, device=device)
+                allow[b, :, max_len - lengths[b]:max_len] = True
+                allow[b, :, max_len:] = causal
+            positions = (torch.tensor(lengths, device=device)[:, None]
+                         + torch.arange(width, device=device))
+            mask = torch.zeros(allow.shape, dtype=dtype, device=device)
+            mask.masked_fill_(~allow, torch.finfo(dtype).min)
+
+            batched_kv = self._build_kv_cache([
+                (torch.cat([torch.nn.functional.pad(layers[i][0], (0, 0, max_len - n, 0))
+                            for layers, n in zip(caches, lengths)]),
+                 torch.cat([torch.nn.functional.pad(layers[i][1], (0, 0, max_len - n, 0))
+                            for layers, n in zip(caches, lengths)]))
+                for i in range(len(caches[0]))
+            ])
+            output = self.model(
+                ids, attention_mask=mask[:, None], position_ids=positions,
+                past_key_values=batched_kv, use_cache=True,
+            )
+            logits = output.logits if hasattr(output, 'logits') else output
+            new_layers = self._kv_layers(output.past_key_values)
+        except Exception as e:
+            _logger.warning("Speculative batched verify failed: %s, falling back to sequential", e)
+            for req in requests:
+                self._forward_single(req, is_prefill=False)
+            return
+
+        self._spec_passes += 1
+        for b, (req, (tokens, draft_probs)) in enumerate(zip(requests, drafts)):
+            try:
+                first = len(pending[b]) - 1
+                probs = self._request_probs(logits[b, first:first + len(tokens) + 1], req)
+                if draft_probs is not None:
+                    draft_probs = draft_probs.to(probs.device)
+                    if draft_probs.shape[-1] < probs.shape[-1]:
+                        draft_probs = torch.nn.functional.pad(
+                            draft_probs, (0, probs.shape[-1] - draft_probs.shape[-1]))
+                accepted, next_token = speculative_accept(tokens, probs, draft_probs)
+
+                # Per-request rollback: real cache + fed tokens + accepted drafts
+                start = max_len - lengths[b]
+                end = max_len + len(pending[b]) + accepted
+                req.kv_cache = self._build_kv_cache([
+                    (k[b:b + 1, :, start:end], v[b:b + 1, :, start:end])
+                    for k, v in new_layers
+                ])
+
+                self._spec_drafted += len(tokens)
+                self._spec_accepted += accepted
+                if tokens:
+                    req.spec_gamma = adapt_gamma(
+                        req.spec_window, accepted, len(tokens), req.spec_gamma,
+                        self.spec_gamma_min, self.spec_gamma_max, self._spec_window_size)
+                self._emit_tokens(req, tokens[:accepted] + [next_token])
+            except Exception as e:
+                _logger.warning("Speculative scatter failed for %s: %s", req.request_id, e)
+                req.status = RequestStatus.ERROR
+                if req.future and not req.future.done():
+                    req.future.set_exception(e)
+
+    def _emit_tokens(self, req: InferenceRequest, tokens: List[int]) -> None:
+        """Append *tokens*, stopping at EOS or the token budget."""
+        budget = req.max_new_tokens - req.tokens_generated
+        if budget <= 0 or req.status != RequestStatus.ACTIVE:
+            return
+        tokens = tokens[:budget]
+        if not tokens:
+            return
+        if req.stop_token_id is not None and req.stop_token_id in tokens:
+            tokens = tokens[:tokens.index(req.stop_token_id) + 1]
+        new = torch.tensor([tokens], dtype=req.generated_ids.dtype,
+                           device=req.generated_ids.device)
+        req.generated_ids = torch.cat([req.generated_ids, new], dim=-1)
+        req.tokens_generated += len(tokens)
+        self._total_tokens_generated += len(tokens)
+
+        if req.on_token and self.tokenizer:
+            try:
+                for token in tokens:
+                    token_text = self.tokenizer.decode([token], skip_special_tokens=True)
+                    if token_text:
+                        req.on_token(token_text)
+            except Exception as _spec_cb_err:
+                _logger.debug("Streaming callback (speculative) failed for %s: %s",
+                              req.request_id, _spec_cb_err)
+
+        if tokens[-1] == req.stop_token_id or req.tokens_generated >= req.max_new_tokens:
+            self._finish_request_decode(req)
+
     def _forward_single(self, req: InferenceRequest, is_prefill: bool) -> None:
         """Forward pass for a single request with KV cache."""
         try:
@@ -1002,6 +1417,13 @@ class ContinuousBatcher:
         Offloads tokenizer.decode() to the thread pool so it doesn't
         block the batcher loop while decoding large outputs.
         """
+        # Take the request out of the batch on the loop thread: it must not
+        # be stepped again while the tokenizer pool decodes its text.
+        # Slots move rows, so they are released here too.
+        req.status = RequestStatus.FINISHING
+        self._release_slot(req)
+        req.kv_cache = None
+        req.drafter = None
         if self.tokenizer is None:
             self._finish_request(req, req.prompt)
             return
@@ -1033,6 +1455,7 @@ class ContinuousBatcher:
 
         # Free KV cache
         req.kv_cache = None
+        req.drafter = None
 
         # Free paged KV slots if using paged attention
         if self.paged_kv:
@@ -1053,7 +1476,9 @@ class ContinuousBatcher:
         """Remove finished/errored requests from active batch."""
         still_active = []
         for req in self._active:
-            if req.status in (RequestStatus.FINISHED, RequestStatus.ERROR, RequestStatus.CANCELLED):
+            if req.status in (RequestStatus.FINISHING, RequestStatus.FINISHED,
+                              RequestStatus.ERROR, RequestStatus.CANCELLED):
+                self._release_slot(req)
                 self._completed.append(req)
             else:
                 still_active.append(req)
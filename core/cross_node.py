@@ -75,17 +75,28 @@ def bytes_to_tensor(data: bytes, device: str = "cpu") -> "torch.Tensor":
 
 def tensor_to_raw(t: "torch.Tensor") -> Tuple[bytes, int, Tuple[int, ...], int]:
     """Serialize tensor to raw bytes + metadata. ~10x faster than torch.save."""
-    t = t.detach().contiguous().cpu()
+    t = t.detach()
     dtype_code = _DTYPE_TO_CODE.get(t.dtype, 0)
     shape = tuple(t.shape)
-    if t.dtype == torch.bfloat16:
-        # numpy has no bfloat16 — view as uint16 for raw bytes
-        raw = t.view(torch.uint16).numpy().tobytes()
+    if t.is_cuda:
+        # Stage through a pooled pinned buffer; tobytes() copies out of it
+        from core.host_arena import get_host_arena
+        with get_host_arena().acquire(t.numel() * t.element_size()) as lease:
+            host = lease.view(shape, t.dtype)
+            host.copy_(t)
+            raw = _host_bytes(host)
     else:
-        raw = t.numpy().tobytes()
+        raw = _host_bytes(t.contiguous().cpu())
     return raw, dtype_code, shape, len(raw)
 
 
+def _host_bytes(t: "torch.Tensor") -> bytes:
+    if t.dtype == torch.bfloat16:
+        # numpy has no bfloat16 — view as uint16 for raw bytes
+        return t.view(torch.uint16).numpy().tobytes()
+    return t.numpy().tobytes()
+
+
 def raw_to_tensor(data: bytes, dtype_code: int, shape: Tuple[int, ...],
                   device: str = "cpu") -> "torch.Tensor":
     """Deserialize raw bytes to tensor. ~10x faster than torch.load."""
@@ -541,6 +552,19 @@ def get_model_info(model) -> dict:
 
 # ─── Partial model loading (worker role) ─────────────────────────
 
+def _local_checkpoint_dir(model_name: str) -> Optional[str]:
+    """Local directory holding *model_name*'s safetensors, if any (no download)."""
+    from core.safetensors_loader import has_safetensors
+    if os.path.isdir(model_name):
+        return model_name if has_safetensors(model_name) else None
+    try:
+        from huggingface_hub import snapshot_download
+        path = snapshot_download(model_name, local_files_only=True)
+    except Exception:
+        return None
+    return path if has_safetensors(path) else None
+
+
 def load_partial_model(model_name: str, start_layer: int, end_layer: int,
                        device: str = "cuda:0",
                        dtype_str: str = "bfloat16") -> dict:
@@ -548,6 +572,11 @@ def load_partial_model(model_name: str, start_layer: int, end_layer: int,
 
     Memory-efficient: unused layers stay on CPU with disk offload.
     Only the specified layers consume GPU VRAM.
+
+    When *model_name* resolves to a local safetensors checkpoint (and
+    ``VRM_MMAP_LOADER`` is not 0), only the tensors of the assigned range
+    are memory-mapped and copied to *device*; other layers stay on the
+    meta device.
     """
     global _partial_model
     from transformers import AutoModelForCausalLM, AutoConfig
@@ -557,6 +586,27 @@ def load_partial_model(model_name: str, start_layer: int, end_layer: int,
                  "float32": torch.float32}
     dtype = dtype_map.get(dtype_str, torch.bfloat16)
 
+    local_dir = _local_checkpoint_dir(model_name)
+    if local_dir is not None and os.environ.get("VRM_MMAP_LOADER", "1") != "0":
+        from core.safetensors_loader import build_partial_model
+        logger.info("Loading partial model %s (mmap): layers %d-%d on %s",
+                    model_name, start_layer, end_layer, device)
+        t0 = time.time()
+        _partial_model, stats = build_partial_model(
+            local_dir, start_layer, end_layer, device=device, dtype=dtype)
+        elapsed = time.time() - t0
+        logger.info("Partial model loaded in %.1fs (%d tensors, %d/%d shards)",
+                    elapsed, stats["tensors"], stats["shards_read"], stats["shards_total"])
+        start_layer, end_layer = stats["layers"]
+        return {
+            "model_name": model_name,
+            "num_layers": stats["num_layers"],
+            "layers_on_gpu": list(range(start_layer, end_layer)),
+            "gpu_device": device,
+            "load_seconds": round(elapsed, 1),
+            "loader": "mmap",
+        }
+
     config = AutoConfig.from_pretrained(model_name)
     num_layers = config.num_hidden_layers
     end_layer = min(end_layer, num_layers)
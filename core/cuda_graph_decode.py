@@ -5,8 +5,28 @@ the captured kernel launch sequence instead of re-dispatching Python
 each step.  This eliminates CPU-side overhead (~10-30 % speedup on
 small batch sizes where the GPU is underutilised).
 
+Batch-size buckets: one graph per exact batch size, capped at
+``max_cache_entries``, meant that under continuous batching (where the
+batch size changes almost every step) most steps ran eager. Now:
+  - Graphs are captured per bucket (default 1, 2, 4, ..., 64). A batch of
+    n rows is padded up to the smallest bucket >= n with masked dummy rows
+    (pad token, position 0, attending only to one position).
+  - When the cache is full, the smallest *captured* bucket >= n is used
+    instead, so a few large graphs still cover small batches. Callers that
+    know their largest batch (the continuous batcher) size the cache to
+    hold every bucket up to it.
+  - Each bucket keeps its own static input / mask / position buffers.
+    Callers that pass a full-width ``attention_mask`` and ``position_ids``
+    (per-row positions, as in continuous batching) have them copied in
+    before each replay. Without a mask, the runner advances a shared
+    position as before.
+  - ``bucket_for`` / ``pad_to_bucket`` / ``additive_mask`` are plain
+    tensor functions, testable without CUDA.
+  - The continuous batcher drives it through ``StaticKVCache``
+    (core/turbo_engine.py), whose rows are request slots and whose
+    ``view(bucket)`` is the fixed-address cache a bucket's graph captures.
+
 Limitations:
-  - Static shapes only: one graph is captured per (batch_size,) key.
   - KV cache must use a **static buffer** (pre-allocated max length)
     with a position mask — not the default HuggingFace growing tuple.
   - NCCL / P2P ops inside the captured region are not supported.
@@ -19,14 +39,15 @@ LIMITATION (NOT A BUG) — CUDA_GRAPH_MULTI_GPU:
   graph replay. See: docs/reports/TECHNICAL_DEBT.md#CUDA_GRAPH_MULTI_GPU
 
 Usage inside VRAMancer:
-  runner = CUDAGraphRunner(model, max_batch_size=8)
-  for step in range(max_new_tokens):
-      logits = runner.forward(input_ids_1token, past_key_values, ...)
+  runner = CUDAGraphRunner(model, max_seq_len=2048)
+  bucket = runner.bucket_size(batch)
+  logits = runner.forward(ids, attention_mask=mask, position_ids=pos,
+                          past_key_values=static_kv.view(bucket))
 """
 
 import os
 import logging
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 _logger = logging.getLogger("vramancer.cuda_graph")
 
@@ -37,9 +58,51 @@ except ImportError:
     torch = None  # type: ignore
     _HAS_TORCH = False
 
+DEFAULT_BUCKETS: Tuple[int, ...] = (1, 2, 4, 8, 16, 32, 64)
+
+
+def bucket_for(batch_size: int, buckets: Sequence[int] = DEFAULT_BUCKETS) -> Optional[int]:
+    """Smallest bucket >= *batch_size*, or None if the batch is larger than all."""
+    for bucket in sorted(buckets):
+        if bucket >= batch_size:
+            return bucket
+    return None
+
+
+def pad_to_bucket(
+    bucket: int,
+    input_ids: "torch.Tensor",
+    attention_mask: Optional["torch.Tensor"] = None,
+    position_ids: Optional["torch.Tensor"] = None,
+    pad_token_id: int = 0,
+) -> Tuple["torch.Tensor", Optional["torch.Tensor"], Optional["torch.Tensor"]]:
+    """Append ``bucket - batch`` dummy rows to a decode batch.
+
+    Dummy rows get *pad_token_id*, position 0 and a mask that keeps only
+    column 0. Their softmax stays finite, and their logits are dropped.
+    """
+    extra = bucket - input_ids.shape[0]
+    if extra < 0:
+        raise ValueError(f"batch of {input_ids.shape[0]} does not fit bucket {bucket}")
+    if extra == 0:
+        return input_ids, attention_mask, position_ids
+    input_ids = torch.cat([input_ids, input_ids.new_full((extra, input_ids.shape[1]), pad_token_id)])
+    if attention_mask is not None:
+        dummy = attention_mask.new_zeros((extra, attention_mask.shape[-1]))
+        dummy[:, 0] = 1
+        attention_mask = torch.cat([attention_mask, dummy])
+    if position_ids is not None:
+        position_ids = torch.cat([position_ids, position_ids.new_zeros((extra, position_ids.shape[-1]))])
+    return input_ids, attention_mask, position_ids
+
+
+def additive_mask(mask: "torch.Tensor", dtype: "torch.dtype") -> "torch.Tensor":
+    """[B, S] 0/1 mask → [B, 1, 1, S] additive mask (0 or dtype min)."""
+    return (1 - mask[:, None, None, :].to(dtype)) * torch.finfo(dtype).min
+
 
 class _GraphState:
-    """Internal state for a captured CUDA graph (one per batch size)."""
+    """Internal state for a captured CUDA graph (one per batch bucket)."""
     __slots__ = (
         "graph", "static_input", "static_logits",
         "static_mask", "static_pos", "static_cache_pos", "cur_pos",
@@ -57,20 +120,24 @@ class _GraphState:
 
 
 class CUDAGraphRunner:
-    """Per-batch-size CUDA graph cache for single-token decode.
+    """Per-bucket CUDA graph cache for single-token decode.
 
-    On the first call for a given batch size the runner performs a
-    warmup forward, captures the graph, then replays it on every
-    subsequent call — bypassing Python dispatch entirely.
+    On the first calls for a given bucket the runner runs eager (padded to
+    the bucket), then captures the graph and replays it on every subsequent
+    call — bypassing Python dispatch entirely. ``buckets=None`` keys graphs
+    by exact batch size, as before.
 
     For correct decode, the model's KV cache must use **static buffers**
     (pre-allocated at max sequence length) with in-place updates, not
     HuggingFace's default growing-tuple DynamicCache.  The caller must
     provide ``past_key_values`` that writes KV in-place (e.g. StaticCache
-    from transformers >= 4.38 or VRAMancer's StaticKVCache).
+    from transformers >= 4.38 or VRAMancer's StaticKVCache), sized for
+    ``bucket_size(batch)`` rows.
 
     Static buffers for ``attention_mask``, ``position_ids`` and
     ``cache_position`` are managed internally and updated between replays.
+    A 2D mask is turned into an additive 4D mask for caches that do not
+    build their own (anything without ``get_mask_sizes``).
     """
 
     def __init__(
@@ -80,20 +147,39 @@ class CUDAGraphRunner:
         warmup_steps: int = 3,
         enabled: bool = True,
         max_seq_len: int = 2048,
+        buckets: Optional[Sequence[int]] = DEFAULT_BUCKETS,
+        pad_token_id: int = 0,
     ):
         self.model = model
         self.max_cache_entries = max_cache_entries
         self.warmup_steps = warmup_steps
         self.max_seq_len = max_seq_len
+        self.buckets: Tuple[int, ...] = tuple(sorted(set(buckets))) if buckets else ()
+        self.pad_token_id = pad_token_id
         self.enabled = enabled and _HAS_TORCH and torch.cuda.is_available()
 
-        # graph_key → _GraphState
+        # graph_key (bucket) → _GraphState
         self._graphs: Dict[int, "_GraphState"] = {}
         self._call_counts: Dict[int, int] = {}
 
         if not self.enabled:
             _logger.debug("CUDAGraphRunner disabled (no CUDA)")
 
+    def bucket_size(self, batch_size: int) -> Optional[int]:
+        """Rows the next ``forward`` of *batch_size* will run with.
+
+        The smallest bucket that fits, or, once the graph cache is full,
+        the smallest captured bucket that fits. ``None`` if no bucket fits
+        (the batch then runs eager, unpadded).
+        """
+        if not (self.enabled and self.buckets):
+            return batch_size
+        bucket = bucket_for(batch_size, self.buckets)
+        if bucket is None or bucket in self._graphs or len(self._graphs) < self.max_cache_entries:
+            return bucket
+        captured = bucket_for(batch_size, self._graphs.keys())
+        return captured if captured is not None else bucket
+
     def forward(
         self,
         input_ids: "torch.Tensor",
@@ -107,6 +193,8 @@ class CUDAGraphRunner:
             The single new token(s) for this decode step.
         **model_kwargs
             Forwarded to model (past_key_values, attention_mask, etc.).
+            ``attention_mask`` [B, S] and ``position_ids`` [B, 1] are
+            padded with the batch.
 
         Returns
         -------
@@ -129,32 +217,63 @@ class CUDAGraphRunner:
                 return self._eager_forward(input_ids, **model_kwargs)
 
         bs = input_ids.size(0)
+        key = self.bucket_size(bs)
+        if key is None:
+            # Larger than every bucket — eager, unpadded
+            return self._eager_forward(input_ids, **model_kwargs)
+        input_ids, model_kwargs = self._pad(key, input_ids, model_kwargs)
 
         # Count calls to decide when to capture
-        self._call_counts[bs] = self._call_counts.get(bs, 0) + 1
+        self._call_counts[key] = self._call_counts.get(key, 0) + 1
 
-        # Not enough warmup yet — run eager
-        if self._call_counts[bs] <= self.warmup_steps:
-            return self._eager_forward(input_ids, **model_kwargs)
+        # Not enough warmup yet — run eager (same padded shapes)
+        if self._call_counts[key] <= self.warmup_steps:
+            return self._eager_forward(input_ids, **model_kwargs)[:bs]
 
-        # Graph already captured for this batch size — replay
-        if bs in self._graphs:
-            return self._replay(bs, input_ids, **model_kwargs)
+        # Graph already captured for this bucket — replay
+        if key in self._graphs:
+            return self._replay(key, input_ids, **model_kwargs)[:bs]
 
         # Capture now
         if len(self._graphs) < self.max_cache_entries:
-            return self._capture_and_run(bs, input_ids, **model_kwargs)
+            return self._capture_and_run(key, input_ids, **model_kwargs)[:bs]
 
         # Cache full — eager fallback
-        return self._eager_forward(input_ids, **model_kwargs)
+        return self._eager_forward(input_ids, **model_kwargs)[:bs]
+
+    def _pad(self, bucket: int, input_ids, kwargs: Dict[str, Any]):
+        """Pad ids, mask and positions up to *bucket* rows."""
+        if input_ids.size(0) == bucket:
+            return input_ids, kwargs
+        kwargs = dict(kwargs)
+        input_ids, mask, pos = pad_to_bucket(
+            bucket, input_ids, kwargs.get("attention_mask"), kwargs.get("position_ids"),
+            self.pad_token_id,
+        )
+        if mask is not None:
+            kwargs["attention_mask"] = mask
+        if pos is not None:
+            kwargs["position_ids"] = pos
+        return input_ids, kwargs
+
+    def _model_mask(self, mask, past_key_values):
+        """2D mask → additive 4D for caches that don't build their own."""
+        if (mask is None or mask.dim() != 2 or past_key_values is None
+                or hasattr(past_key_values, "get_mask_sizes")):
+            return mask
+        dtype = getattr(past_key_values, "dtype", None) or torch.float32
+        return additive_mask(mask, dtype)
 
     def _eager_forward(self, input_ids, **kwargs):
+        if "attention_mask" in kwargs:
+            kwargs["attention_mask"] = self._model_mask(
+                kwargs["attention_mask"], kwargs.get("past_key_values"))
         with torch.no_grad():
             out = self.model(input_ids, **kwargs)
             return out.logits if hasattr(out, "logits") else out[0]
 
     def _capture_and_run(self, bs: int, input_ids, **kwargs):
-        """Capture a CUDA graph for batch_size=bs.
+        """Capture a CUDA graph for bucket *bs* (inputs already padded).
 
         Creates static buffers for input_ids, attention_mask, position_ids
         and cache_position so that replay can update them without breaking
@@ -167,43 +286,58 @@ class CUDAGraphRunner:
         # Static input buffer (stays on same memory address)
         static_input = input_ids.clone()
 
-        # Static attention_mask — pre-allocate at max_seq_len, filled with 1s
-        # Graph captures the address; we update the contents between replays.
-        cur_seq_len = kwargs.get("attention_mask", input_ids).shape[-1] if "attention_mask" in kwargs else 1
-        static_mask = torch.ones(bs, self.max_seq_len, dtype=torch.long, device=device)
-        # Zero out positions beyond current sequence
-        if cur_seq_len < self.max_seq_len:
-            static_mask[:, cur_seq_len:] = 0
-
-        # Static position_ids for the new token
-        static_pos = torch.tensor([[cur_seq_len - 1]], device=device).expand(bs, 1).clone()
+        mask = kwargs.get("attention_mask")
+        if mask is not None and mask.dim() == 2:
+            # Caller-managed full-width mask and per-row positions
+            cur_seq_len = mask.shape[-1]
+            static_mask = mask.clone()
+            pos = kwargs.get("position_ids")
+            static_pos = (pos.clone() if pos is not None
+                          else (mask.sum(-1, keepdim=True) - 1).clamp_min(0))
+            mask_view = static_mask
+        else:
+            # Static attention_mask — pre-allocate at max_seq_len, filled with 1s
+            # Graph captures the address; we update the contents between replays.
+            cur_seq_len = 1
+            static_mask = torch.ones(bs, self.max_seq_len, dtype=torch.long, device=device)
+            # Zero out positions beyond current sequence
+            if cur_seq_len < self.max_seq_len:
+                static_mask[:, cur_seq_len:] = 0
+            # Static position_ids for the new token
+            static_pos = torch.tensor([[cur_seq_len - 1]], device=device).expand(bs, 1).clone()
+            mask_view = static_mask[:, :cur_seq_len]
 
         # Static cache_position
-        static_cache_pos = torch.tensor([cur_seq_len - 1], dtype=torch.long, device=device)
-
-        # Build static kwargs — replace dynamic tensors with static buffers
-        static_kwargs = dict(kwargs)
-        static_kwargs["attention_mask"] = static_mask[:, :cur_seq_len]
-        if "position_ids" in kwargs or True:  # always provide for graph safety
-            static_kwargs["position_ids"] = static_pos
-        if "cache_position" in kwargs:
-            static_kwargs["cache_position"] = static_cache_pos
+        cache_pos = kwargs.get("cache_position")
+        static_cache_pos = (cache_pos.clone() if cache_pos is not None
+                            else torch.tensor([cur_seq_len - 1], dtype=torch.long, device=device))
+
+        pkv = kwargs.get("past_key_values")
+
+        def run():
+            # Build static kwargs — replace dynamic tensors with static buffers.
+            # The 2D → 4D mask conversion is part of the captured graph.
+            static_kwargs = dict(kwargs)
+            static_kwargs["attention_mask"] = self._model_mask(mask_view, pkv)
+            static_kwargs["position_ids"] = static_pos  # always provide for graph safety
+            if "cache_position" in kwargs:
+                static_kwargs["cache_position"] = static_cache_pos
+            with torch.no_grad():
+                out = self.model(static_input, **static_kwargs)
+            return out.logits if hasattr(out, "logits") else out[0]
 
         # Warmup inside capture stream
         stream = torch.cuda.Stream()
         with torch.cuda.stream(stream):
             for _ in range(2):
-                with torch.no_grad():
-                    out = self.model(static_input, **static_kwargs)
+                run()
 
         torch.cuda.current_stream().wait_stream(stream)
 
         # Capture
         graph = torch.cuda.CUDAGraph()
         with torch.cuda.graph(graph):
-            with torch.no_grad():
-                static_out = self.model(static_input, **static_kwargs)
-                static_logits = static_out.logits if hasattr(static_out, "logits") else static_out[0]
+            static_logits = run()
 
         state = _GraphState(
             graph=graph,
@@ -223,9 +357,27 @@ class CUDAGraphRunner:
         return static_logits.clone()
 
     def _replay(self, bs: int, input_ids, **kwargs):
-        """Replay a previously captured graph, advancing KV position."""
+        """Replay a previously captured graph with updated static buffers."""
         state = self._graphs[bs]
 
+        mask = kwargs.get("attention_mask")
+        if mask is not None and mask.dim() == 2:
+            if mask.shape != state.static_mask.shape:
+                # Captured for another mask width — recapture on a later call
+                _logger.warning("CUDA graph mask width %d != %d, falling back",
+                                mask.shape[-1], state.static_mask.shape[-1])
+                del self._graphs[bs]
+                return self._eager_forward(input_ids, **kwargs)
+            state.static_input.copy_(input_ids)
+            state.static_mask.copy_(mask)
+            pos = kwargs.get("position_ids")
+            state.static_pos.copy_(pos if pos is not None
+                                   else (mask.sum(-1, keepdim=True) - 1).clamp_min(0))
+            if kwargs.get("cache_position") is not None:
+                state.static_cache_pos.copy_(kwargs["cache_position"])
+            state.graph.replay()
+            return state.static_logits.clone()
+
         # Advance position by 1 (one new token per decode step)
         state.cur_pos += 1
         if state.cur_pos >= self.max_seq_len:
@@ -18,7 +18,7 @@ The module is intentionally *stateless* — each attribute read hits
 from __future__ import annotations
 
 import os
-from typing import Optional
+from typing import Optional, Tuple
 
 
 def _bool(key: str, default: str = "") -> bool:
@@ -148,12 +148,20 @@ class _Flags:
     def SPEC_WINDOW(self) -> int:
         return _int("VRM_SPEC_WINDOW", 32)
 
+    @property
+    def BATCH_SPECULATIVE(self) -> bool:
+        """Speculative decoding inside the continuous batcher (per-request
+        adaptive draft length, one batched verifier pass)."""
+        return _bool("VRM_BATCH_SPECULATIVE")
+
     @property
     def PROMPT_LOOKUP(self) -> int:
         """N-gram prompt lookup decoding (transformers
         ``prompt_lookup_num_tokens``). 0 = disabled, 10 recommended.
         Lossless: candidate tokens copied from the prompt are verified by
-        the model itself before being accepted (T7.1)."""
+        the model itself before being accepted (T7.1). Speculative paths
+        without a draft model use the suffix-automaton drafter
+        (``core.prompt_lookup``) with the same N as maximum draft length."""
         return _int("VRM_PROMPT_LOOKUP", 0)
 
     # ── TurboEngine / CUDA graphs ─────────────────────────────────────
@@ -177,6 +185,28 @@ class _Flags:
     def CUDA_GRAPH_WARMUP(self) -> int:
         return _int("VRM_CUDA_GRAPH_WARMUP", 3)
 
+    @property
+    def CUDA_GRAPH_BUCKETS(self) -> Tuple[int, ...]:
+        """Batch-size buckets for decode graphs; batches are padded up to
+        the nearest one. Empty = one graph per exact batch size."""
+        raw = _str("VRM_CUDA_GRAPH_BUCKETS", "1,2,4,8,16,32,64")
+        return tuple(int(b) for b in raw.split(",") if b.strip())
+
+    # ── Weight streaming ───────────────────────────────────────────────
+    @property
+    def WEIGHT_STREAMING(self) -> bool:
+        return _bool("VRM_WEIGHT_STREAMING")
+
+    @property
+    def STREAM_RESIDENT_LAYERS(self) -> int:
+        """Decoder layers kept resident per device. -1 = size from free VRAM."""
+        return _int("VRM_STREAM_RESIDENT_LAYERS", -1)
+
+    @property
+    def STREAM_SOURCE(self) -> str:
+        """Where streamed layer masters live: ``cpu`` or ``cuda:N``."""
+        return _str("VRM_STREAM_SOURCE", "cpu")
+
     # ── KV cache / compression ─────────────────────────────────────────
     @property
     def KV_COMPRESSION(self) -> str:
@@ -194,6 +224,22 @@ class _Flags:
     def SPARSE_V_RATIO(self) -> float:
         return _float("VRM_SPARSE_V_RATIO", 1.0)
 
+    @property
+    def KV_SLAB_PAGES(self) -> int:
+        return _int("VRM_KV_SLAB_PAGES", 8)
+
+    @property
+    def KV_ASYNC_EVICT(self) -> bool:
+        return _bool("VRM_KV_ASYNC_EVICT")
+
+    @property
+    def KV_EVICT_LOW_WM(self) -> float:
+        return _float("VRM_KV_EVICT_LOW_WM", 0.05)
+
+    @property
+    def KV_EVICT_HIGH_WM(self) -> float:
+        return _float("VRM_KV_EVICT_HIGH_WM", 0.10)
+
     # ── Transfer / memory ──────────────────────────────────────────────
     @property
     def TRANSFER_METHOD(self) -> str:
@@ -517,7 +563,7 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_QUANTIZATION":         ("backend", "Quantization mode (nvfp4|nf4|int8|gptq|awq|empty)."),
     "VRM_TRUST_REMOTE_CODE":    ("backend", "Pass trust_remote_code=True to HF."),
     "VRM_DRAFT_MODEL":          ("backend", "Speculative decoding draft model id."),
-    "VRM_PROMPT_LOOKUP":        ("backend", "N-gram prompt lookup decoding (prompt_lookup_num_tokens). 0=off, 10 recommended."),
+    "VRM_PROMPT_LOOKUP":        ("backend", "N-gram prompt lookup decoding (prompt_lookup_num_tokens; suffix-automaton drafter for speculative paths without a draft model). 0=off, 10 recommended."),
     "VRM_FORCE_BASIC_TOKENIZER": ("backend", "Use BasicTokenizer fallback."),
     "VRM_TOKENIZER_WORKERS":    ("backend", "Tokenizer thread pool size."),
     "VRM_DISABLE_ONNX":         ("backend", "Disable ONNX export pathway."),
@@ -528,7 +574,10 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_GPU_ORDER":            ("backend", "Mirror of CUDA_DEVICE_ORDER."),
     "VRM_VLLM_TARGET_GPU":      ("backend", "vLLM compute device when lending."),
     "VRM_HETERO_STRATEGY":      ("backend", "Placement: profiled|vram|balanced."),
+    "VRM_SERVING_MODE":         ("backend", "interactive|pipeline|batch|continuous: placement objective (latency/throughput/combined)."),
     "VRM_PARALLEL_MODE":        ("backend", "pp (pipeline) | tp (tensor)."),
+    "VRM_TP_CONCURRENT":        ("backend", "Run tensor-parallel shards on one thread per device (0 = sequential)."),
+    "VRM_TP_OVERLAP_CHUNKS":    ("backend", "Row-parallel output chunks whose all-reduce overlaps the next chunk (0 = auto)."),
     "VRM_SPLIT_RATIOS":         ("backend", "Manual VRAM split ratios (CSV)."),
     "VRM_PREFILL_CHUNK":        ("backend", "Chunked prefill chunk size."),
     "VRM_CONTINUOUS_BATCHING":  ("backend", "Enable continuous batcher."),
@@ -536,9 +585,14 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_CUDA_GRAPH":           ("backend", "Persistent CUDA Graph decode."),
     "VRM_CUDA_GRAPH_CACHE":     ("backend", "CUDA Graph cache count or path."),
     "VRM_CUDA_GRAPH_WARMUP":    ("backend", "Warmup iters before graph capture."),
+    "VRM_CUDA_GRAPH_BUCKETS":   ("backend", "Decode graph batch buckets, comma-separated (default 1,2,...,64). Empty = exact sizes."),
+    "VRM_WEIGHT_STREAMING":     ("backend", "Stream non-resident decoder layers into staging slots."),
+    "VRM_STREAM_RESIDENT_LAYERS": ("backend", "Resident decoder layers (-1 = size from free VRAM)."),
+    "VRM_STREAM_SOURCE":        ("backend", "Streamed weight source: cpu (pinned) or cuda:N."),
     "VRM_SPEC_GAMMA":           ("backend", "Speculative draft length γ."),
     "VRM_SPEC_WINDOW":          ("backend", "Speculative rolling window."),
     "VRM_SPEC_ADAPTIVE":        ("backend", "Adaptive γ on accept rate."),
+    "VRM_BATCH_SPECULATIVE":    ("backend", "Speculative decoding in the continuous batcher (draft from VRM_DRAFT_MODEL)."),
     "VRM_DEBUG_SAMPLING":       ("backend", "Per-branch sampling counters."),
 
     # ---- transfer ---------------------------------------------------------
@@ -549,6 +603,13 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_FASTPATH_IF":          ("transfer", "Fastpath network interface."),
     "VRM_FASTPATH_BENCH_TTL":   ("transfer", "Fastpath bench cache TTL (s)."),
     "VRM_TRANSPORT_TIMEOUT":    ("transfer", "Generic transport timeout (s)."),
+    "VRM_HOST_ARENA_MB":        ("transfer", "Cap of the pooled host staging arena (MB)."),
+    "VRM_HOST_ARENA_PIN":       ("transfer", "Page-lock host staging buffers when CUDA is present."),
+    "VRM_MMAP_LOADER":          ("transfer", "Layer-range mmap safetensors loader for partial model loads."),
+    "VRM_LOAD_WORKERS":         ("transfer", "Threads reading safetensors shards in parallel."),
+    "VRM_PLACEMENT_CACHE":      ("transfer", "On-disk cache of profiles and placement plans (0 = off)."),
+    "VRM_PLACEMENT_CACHE_DIR":  ("transfer", "Directory of the placement cache."),
+    "VRM_PLACEMENT_REFRESH":    ("transfer", "Ignore and rewrite cached profiles / plans."),
 
     # ---- KV / compression -------------------------------------------------
     "VRM_KV_COMPRESSION":       ("kv", "KV cache codec (turboquant|fp8)."),
@@ -558,6 +619,10 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_KV_DRAM_LIMIT_GB":     ("kv", "DRAM cap for KV offload (GB)."),
     "VRM_KV_LEND":              ("kv", "Allow KV cache to use lending pool."),
     "VRM_KV_LEND_ATTENTION":    ("kv", "Lend KV during attention compute."),
+    "VRM_KV_SLAB_PAGES":        ("kv", "Overflow KV pages borrowed per lease."),
+    "VRM_KV_ASYNC_EVICT":       ("kv", "Reclaim KV pages in a background thread."),
+    "VRM_KV_EVICT_LOW_WM":      ("kv", "Free-page fraction that wakes the reclaimer."),
+    "VRM_KV_EVICT_HIGH_WM":     ("kv", "Free-page fraction the reclaimer refills to."),
     "VRM_KV_OFFLOAD_ENGRAM":    ("kv", "Offload cold KV pages to NVMe."),
 
     # ---- VRAM lending -----------------------------------------------------
@@ -567,7 +632,12 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_RECLAIM_THRESHOLD":    ("lending", "Util triggering reclaim."),
     "VRM_LENDING_INTERVAL":     ("lending", "Lending monitor poll (s)."),
     "VRM_REBALANCE_INTERVAL":   ("lending", "Block rebalancer interval (s)."),
-    "VRM_EP_STAGING_MODE":      ("lending", "Expert pinning: stream_every|warmup|mirror_only."),
+    "VRM_EP_STAGING_MODE":      ("lending", "Expert pinning: stream_every|warmup|mirror_only|cache."),
+    "VRM_EP_CACHE_POLICY":      ("lending", "Expert cache policy in cache mode: arc|lfu."),
+    "VRM_EP_CACHE_SLOTS":       ("lending", "Resident cold experts per layer in cache mode (0 = 1/4 of cold)."),
+    "VRM_EP_PREFETCH":          ("lending", "Predict next-layer experts and stage them ahead: cooc|probe (off by default)."),
+    "VRM_EP_PREFETCH_TOPN":     ("lending", "Experts predicted per layer for prefetch (default 8)."),
+    "VRM_EP_PREFETCH_TRACE":    ("lending", "Routing trace (JSONL) to warm-start the co-occurrence predictor."),
 
     # ---- cluster / HA -----------------------------------------------------
     "VRM_NODE_ID":              ("cluster", "Override node identifier."),
@@ -628,6 +698,15 @@ _KNOWN_FLAGS: dict[str, tuple[str, str]] = {
     "VRM_CACHE_DIR":            ("misc", "Model/cache directory."),
     "VRM_AUTOSAVE_INTERVAL":    ("misc", "Autosave interval (s)."),
     "VRM_AUTOSAVE_MEMORY":      ("misc", "Hierarchical memory autosave."),
+    "VRM_NVME_SPILL_STORE":     ("misc", "L5 spill to segment files (0 = file per block)."),
+    "VRM_NVME_SEGMENT_MB":      ("misc", "L5 spill segment file size (MB)."),
+    "VRM_PREFETCH_WORKERS":     ("misc", "Hierarchical memory prefetch worker threads."),
+    "VRM_PREFETCH_BW_MBPS":     ("misc", "Prefetch bandwidth cap per source tier (MB/s, e.g. L5:2000,L3:8000)."),
+    "VRM_L3_BUDGET_MB":         ("misc", "Host RAM (L3) byte budget for hierarchical memory (0 = half of RAM)."),
+    "VRM_L3_HIGH_WM":           ("misc", "L3 fraction of budget that triggers an NVMe spill (default 0.90)."),
+    "VRM_L3_LOW_WM":            ("misc", "L3 fraction of budget a spill brings usage back to (default 0.75)."),
+    "VRM_PSI_THRESHOLD":        ("misc", "Memory PSI some-avg10 (%) that triggers an L3 spill (0 = off)."),
+    "VRM_PSI_POLL_S":           ("misc", "Memory PSI poll interval (s)."),
 }
 
 
@@ -675,7 +754,8 @@ def dump_flags() -> str:
         lines.append("| Flag | Description |")
         lines.append("|------|-------------|")
         for name, desc in rows:
-            lines.append(f"| `{name}` | {desc.replace('|', '\\|')} |")
+            cell = desc.replace("|", "\\|")
+            lines.append(f"| `{name}` | {cell} |")
         lines.append("")
     return "\n".join(lines)
 
@@ -0,0 +1,598 @@
+"""Routing-aware MoE expert cache — online admission/eviction per layer.
+
+``core.expert_pinning`` derives a static hot set from an offline histogram.
+Routing shifts with the workload (coding vs chat), so that hot set goes
+stale. This module keeps a bounded set of resident experts per MoE layer
+and updates it from the live ``topk_ids`` of every call:
+
+  - ``LFUDecayPolicy``: frequency score per expert, incremented by the
+    number of tokens routed to it and halved every ``half_life`` calls
+    (decay applied lazily on touch).
+  - ``ARCPolicy``: Adaptive Replacement Cache (recency T1 / frequency T2
+    lists plus ghost lists that steer the split).
+  - ``LRUPolicy`` / ``StaticPolicy``: baselines for the simulator.
+
+Experts routed by the current call are pinned: they are never chosen as
+victims for each other's admission. When one call routes to more experts
+than the layer has slots, the excess is reported as ``bypass``.
+
+``ExpertSlotCache`` applies a policy to real weights: the fixed hot set
+plus ``capacity`` cached experts live in ``(fixed + capacity, ...)`` slot
+tensors on the compute device, all misses of a call are gathered from the
+masters and staged in one transfer per weight family, and
+``prepare(topk_ids)`` returns ids remapped to slots. ``core.expert_pinning``
+swaps these slot tensors in for the layer's full expert weights.
+
+The policies and the trace simulator (``load_trace`` / ``replay_trace``)
+are pure Python, so recorded routing traces can be replayed anywhere.
+"""
+from __future__ import annotations
+
+import json
+import math
+from collections import Counter, OrderedDict, namedtuple
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+POLICIES = ("arc", "lfu", "lru", "static")
+
+AccessResult = namedtuple("AccessResult", ["hits", "misses", "evicted", "bypass"])
+
+
+# ---------------------------------------------------------------------------
+# Policies
+# ---------------------------------------------------------------------------
+
+class LRUPolicy:
+    """Least-recently-used baseline."""
+
+    name = "lru"
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self._order: "OrderedDict[int, None]" = OrderedDict()
+
+    def __contains__(self, expert: int) -> bool:
+        return expert in self._order
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @property
+    def resident(self) -> set:
+        return set(self._order)
+
+    def access(self, counts: Mapping[int, int]) -> AccessResult:
+        hits, misses, evicted, bypass = [], [], [], []
+        pinned = set(counts)
+        for e in counts:
+            if e in self._order:
+                self._order.move_to_end(e)
+                hits.append(e)
+                continue
+            misses.append(e)
+            if len(self._order) >= self.capacity:
+                victim = next((k for k in self._order if k not in pinned), None)
+                if victim is None:
+                    bypass.append(e)
+                    continue
+                del self._order[victim]
+                evicted.append(victim)
+            self._order[e] = None
+        return AccessResult(hits, misses, evicted, bypass)
+
+
+class LFUDecayPolicy:
+    """LFU with exponential decay, driven by per-call routing counts.
+
+    Each expert carries ``(score, stamp)``; its current score is
+    ``score * 0.5 ** ((clock - stamp) / half_life)``. Decay is applied
+    lazily when an expert is touched, so a call costs O(routed experts)
+    plus one scan of the residents when a victim is needed. Scores of
+    non-resident experts are kept (up to ``history`` entries) so a
+    returning expert is not treated as brand new.
+    """
+
+    name = "lfu"
+
+    def __init__(self, capacity: int, half_life: float = 256.0,
+                 history: Optional[int] = None):
+        self.capacity = int(capacity)
+        self.half_life = float(half_life)
+        self.history = int(history) if history is not None else 8 * self.capacity
+        self._clock = 0
+        self._score: Dict[int, Tuple[float, int]] = {}
+        self._resident: set = set()
+
+    def __contains__(self, expert: int) -> bool:
+        return expert in self._resident
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    @property
+    def resident(self) -> set:
+        return set(self._resident)
+
+    def score(self, expert: int) -> float:
+        s, stamp = self._score.get(expert, (0.0, self._clock))
+        return s * math.pow(0.5, (self._clock - stamp) / self.half_life)
+
+    def access(self, counts: Mapping[int, int]) -> AccessResult:
+        self._clock += 1
+        for e, n in counts.items():
+            self._score[e] = (self.score(e) + n, self._clock)
+
+        hits, misses, evicted, bypass = [], [], [], []
+        pinned = set(counts)
+        # Admit the most-routed misses first so overflow bypasses the rare ones
+        for e in sorted(counts, key=lambda k: -counts[k]):
+            if e in self._resident:
+                hits.append(e)
+                continue
+            misses.append(e)
+            if len(self._resident) >= self.capacity:
+                candidates = [k for k in self._resident if k not in pinned]
+                if not candidates:
+                    bypass.append(e)
+                    continue
+                victim = min(candidates, key=self.score)
+                self._resident.discard(victim)
+                evicted.append(victim)
+            self._resident.add(e)
+        if len(self._score) > self.capacity + self.history:
+            self._trim_history()
+        return AccessResult(hits, misses, evicted, bypass)
+
+    def _trim_history(self) -> None:
+        cold = sorted((k for k in self._score if k not in self._resident), key=self.score)
+        for k in cold[:len(self._score) - self.capacity - self.history]:
+            del self._score[k]
+
+
+class ARCPolicy:
+    """Adaptive Replacement Cache (Megiddo & Modha, FAST '03).
+
+    ``T1`` holds experts seen once recently, ``T2`` experts seen at least
+    twice; ``B1``/``B2`` remember what each list evicted. A ghost hit in
+    ``B1`` grows the recency target ``p``, one in ``B2`` shrinks it, so the
+    split tracks whether the routing is currently scan-like (prefill over
+    many experts) or skewed (decode on a hot subset).
+    """
+
+    name = "arc"
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self.p = 0.0
+        self.t1: "OrderedDict[int, None]" = OrderedDict()
+        self.t2: "OrderedDict[int, None]" = OrderedDict()
+        self.b1: "OrderedDict[int, None]" = OrderedDict()
+        self.b2: "OrderedDict[int, None]" = OrderedDict()
+
+    def __contains__(self, expert: int) -> bool:
+        return expert in self.t1 or expert in self.t2
+
+    def __len__(self) -> int:
+        return len(self.t1) + len(self.t2)
+
+    @property
+    def resident(self) -> set:
+        return set(self.t1) | set(self.t2)
+
+    @staticmethod
+    def _lru_unpinned(lst: "OrderedDict[int, None]", pinned: set) -> Optional[int]:
+        return next((k for k in lst if k not in pinned), None)
+
+    def _replace(self, expert: int, pinned: set) -> Optional[int]:
+        """Demote one resident to its ghost list; return it (None = all pinned)."""
+        prefer_t1 = self.t1 and (len(self.t1) > self.p
+                                 or (expert in self.b2 and len(self.t1) == int(self.p)))
+        order = ((self.t1, self.b1), (self.t2, self.b2))
+        if not prefer_t1:
+            order = order[::-1]
+        for src, ghost in order:
+            victim = self._lru_unpinned(src, pinned)
+            if victim is not None:
+                del src[victim]
+                ghost[victim] = None
+                return victim
+        return None
+
+    def access(self, counts: Mapping[int, int]) -> AccessResult:
+        hits, misses, evicted, bypass = [], [], [], []
+        pinned = set(counts)
+        c = self.capacity
+        for e in counts:
+            if e in self.t1 or e in self.t2:
+                self.t1.pop(e, None)
+                self.t2.pop(e, None)
+                self.t2[e] = None
+                hits.append(e)
+                continue
+            misses.append(e)
+            if e in self.b1:
+                self.p = min(c, self.p + max(len(self.b2) / len(self.b1), 1.0))
+                target = self.t2
+            elif e in self.b2:
+                self.p = max(0.0, self.p - max(len(self.b1) / len(self.b2), 1.0))
+                target = self.t2
+            else:
+                target = self.t1
+                l1 = len(self.t1) + len(self.b1)
+                total = l1 + len(self.t2) + len(self.b2)
+                if l1 >= c:
+                    if self.b1:
+                        self.b1.popitem(last=False)
+                    else:
+                        victim = self._lru_unpinned(self.t1, pinned)
+                        if victim is None:
+                            bypass.append(e)
+                            continue
+                        del self.t1[victim]
+                        evicted.append(victim)
+                elif total >= 2 * c and self.b2:
+                    self.b2.popitem(last=False)
+            if len(self) >= c:
+                victim = self._replace(e, pinned)
+                if victim is None:
+                    bypass.append(e)
+                    continue
+                evicted.append(victim)
+            self.b1.pop(e, None)
+            self.b2.pop(e, None)
+            target[e] = None
+        return AccessResult(hits, misses, evicted, bypass)
+
+
+class StaticPolicy:
+    """Fixed resident set (the offline-histogram hot set); never admits."""
+
+    name = "static"
+
+    def __init__(self, capacity: int, hot: Iterable[int] = ()):
+        self.capacity = int(capacity)
+        self._hot = frozenset(list(hot)[:self.capacity])
+
+    def __contains__(self, expert: int) -> bool:
+        return expert in self._hot
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    @property
+    def resident(self) -> set:
+        return set(self._hot)
+
+    def access(self, counts: Mapping[int, int]) -> AccessResult:
+        hits = [e for e in counts if e in self._hot]
+        misses = [e for e in counts if e not in self._hot]
+        return AccessResult(hits, misses, [], misses)
+
+
+def make_policy(name: str, capacity: int, **kwargs) -> Any:
+    """Build a policy by name (``arc`` | ``lfu`` | ``lru`` | ``static``)."""
+    name = (name or "arc").lower()
+    if name == "arc":
+        return ARCPolicy(capacity)
+    if name == "lfu":
+        return LFUDecayPolicy(capacity, **kwargs)
+    if name == "lru":
+        return LRUPolicy(capacity)
+    if name == "static":
+        return StaticPolicy(capacity, **kwargs)
+    raise ValueError(f"unknown expert cache policy {name!r} (expected one of {POLICIES})")
+
+
+# ---------------------------------------------------------------------------
+# Per-layer stats
+# ---------------------------------------------------------------------------
+
+class LayerCacheStats:
+    """Hit/miss accounting for one layer (expert-level, per call).
+
+    Every miss costs one expert transfer, whether it is admitted or
+    bypassed (streamed for this call only).
+    """
+
+    __slots__ = ("calls", "hits", "misses", "evictions", "bypass")
+
+    def __init__(self):
+        self.calls = self.hits = self.misses = 0
+        self.evictions = self.bypass = 0
+
+    def record(self, res: AccessResult) -> None:
+        self.calls += 1
+        self.hits += len(res.hits)
+        self.misses += len(res.misses)
+        self.evictions += len(res.evicted)
+        self.bypass += len(res.bypass)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls, "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "bypass": self.bypass,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Slot cache on real weights
+# ---------------------------------------------------------------------------
+
+class ExpertSlotCache:
+    """Resident expert slots for one MoE layer.
+
+    Parameters
+    ----------
+    masters : dict name -> tensor or list of tensors
+        Per-expert weights (e.g. ``w13``, ``w2`` and their scales), on the
+        host or a lender device. Row ``i`` holds expert ``i`` unless
+        ``master_rows`` maps it elsewhere; a list of per-row views (lease
+        slices) is accepted in place of a tensor.
+    capacity : int
+        Cached slots on ``device``.
+    device : str or torch.device
+        Compute device holding the slot tensors.
+    policy : str or policy object
+        Replacement policy (``arc`` by default).
+    fixed : dict name -> tensor, optional
+        Rows of always-resident experts (the hot set), shape
+        ``(len(fixed_ids), ...)``. They take the first slots and never go
+        through the policy.
+    fixed_ids : sequence of int
+        Expert id of each ``fixed`` row.
+    num_experts : int, optional
+        Size of the expert id space (default: number of master rows).
+    master_rows : dict expert -> master row, optional
+        Where each cacheable expert lives in ``masters``.
+
+    Each slot tensor has ``len(fixed_ids) + capacity`` rows, so it can be
+    handed to an unmodified MoE kernel in place of the full
+    ``(num_experts, ...)`` weight together with the ids from ``prepare``.
+    """
+
+    def __init__(self, masters: Mapping[str, Any], capacity: int, device: Any,
+                 policy: Any = "arc", fixed: Optional[Mapping[str, Any]] = None,
+                 fixed_ids: Iterable[int] = (), num_experts: Optional[int] = None,
+                 master_rows: Optional[Mapping[int, int]] = None, **policy_kwargs):
+        if not _TORCH:
+            raise RuntimeError("ExpertSlotCache requires torch")
+        if not masters:
+            raise ValueError("ExpertSlotCache needs at least one weight family")
+        self.masters = dict(masters)
+        self.master_rows = dict(master_rows) if master_rows is not None else None
+        self.num_experts = int(num_experts if num_experts is not None
+                               else len(next(iter(self.masters.values()))))
+        self.capacity = int(capacity)
+        self.device = torch.device(device)
+        self.policy = (make_policy(policy, capacity, **policy_kwargs)
+                       if isinstance(policy, str) else policy)
+        self.fixed_ids = [int(e) for e in fixed_ids]
+        n_fixed = len(self.fixed_ids)
+        self.slots = {}
+        for name, m in self.masters.items():
+            row = m[0]
+            slot = torch.empty((n_fixed + self.capacity, *row.shape), dtype=row.dtype,
+                               device=self.device)
+            if n_fixed:
+                slot[:n_fixed].copy_((fixed or {})[name])
+            self.slots[name] = slot
+        self.slot_of = torch.full((self.num_experts,), -1, dtype=torch.long, device=self.device)
+        self.fixed_mask = torch.zeros(self.num_experts, dtype=torch.bool, device=self.device)
+        if n_fixed:
+            ids = torch.tensor(self.fixed_ids, dtype=torch.long, device=self.device)
+            self.slot_of[ids] = torch.arange(n_fixed, device=self.device)
+            self.fixed_mask[ids] = True
+        self._fixed = frozenset(self.fixed_ids)
+        self._slot: Dict[int, int] = {}
+        self._free = list(range(n_fixed + self.capacity - 1, n_fixed - 1, -1))
+        self.stats_ = LayerCacheStats()
+        self.bytes_staged = 0
+        self.transfers = 0
+
+    def __contains__(self, expert: int) -> bool:
+        return expert in self._slot or expert in self._fixed
+
+    def _cached_ids(self, topk_ids: Any) -> Any:
+        flat = topk_ids.reshape(-1)
+        flat = flat[(flat >= 0) & (flat < self.num_experts)]
+        return flat[~self.fixed_mask[flat]]
+
+    def split(self, topk_ids: Any) -> List[Tuple[int, int]]:
+        """Token ranges of ``topk_ids`` whose cached experts fit the slots.
+
+        One range in the common case; a prefill batch that routes to more
+        non-fixed experts than ``capacity`` is cut into consecutive runs.
+        Raises RuntimeError if a single token needs more than ``capacity``.
+        """
+        n = int(topk_ids.shape[0]) if topk_ids.dim() > 1 else 1
+        if torch.unique(self._cached_ids(topk_ids)).numel() <= self.capacity:
+            return [(0, n)]
+        rows = topk_ids.reshape(n, -1).tolist()
+        ranges, start, seen = [], 0, set()
+        for i, row in enumerate(rows):
+            need = {e for e in row if 0 <= e < self.num_experts and e not in self._fixed}
+            if len(need) > self.capacity:
+                raise RuntimeError(
+                    f"one token routes to {len(need)} cached experts but the layer "
+                    f"cache has {self.capacity} slots"
+                )
+            if len(seen | need) > self.capacity:
+                ranges.append((start, i))
+                start, seen = i, set()
+            seen |= need
+        ranges.append((start, n))
+        return ranges
+
+    def prepare(self, topk_ids: Any) -> Any:
+        """Make every expert in ``topk_ids`` resident; return slot ids.
+
+        All misses of the call are staged together. Raises RuntimeError
+        when the call routes to more experts than there are slots (see
+        ``split``).
+        """
+        ids, cnt = torch.unique(self._cached_ids(topk_ids), return_counts=True)
+        counts = dict(zip(ids.tolist(), cnt.tolist()))
+        res = self.policy.access(counts)
+        self.stats_.record(res)
+        if res.bypass:
+            raise RuntimeError(
+                f"call routes to {len(counts)} experts but the layer cache has "
+                f"{self.capacity} slots"
+            )
+        self._apply(res)
+        valid = (topk_ids >= 0) & (topk_ids < self.num_experts)
+        return torch.where(valid, self.slot_of[topk_ids.clamp(0, self.num_experts - 1)], topk_ids)
+
+    def prefetch(self, experts: Iterable[int]) -> List[int]:
+        """Admit predicted ``experts`` ahead of their call; return those staged.
+
+        Goes through the policy like a one-token access but is not counted
+        in the hit/miss stats, so the later demand access reports the hit.
+        """
+        want = [int(e) for e in experts
+                if 0 <= int(e) < self.num_experts and int(e) not in self][:self.capacity]
+        if not want:
+            return []
+        res = self.policy.access({e: 1 for e in want})
+        self._apply(AccessResult(res.hits, [e for e in res.misses if e not in res.bypass],
+                                 res.evicted, res.bypass))
+        return [e for e in res.misses if e not in res.bypass]
+
+    def _apply(self, res: AccessResult) -> None:
+        for e in res.evicted:
+            self._free.append(self._slot.pop(e))
+            self.slot_of[e] = -1
+        if res.misses:
+            self._stage(res.misses)
+
+    def _stage(self, experts: List[int]) -> None:
+        slots = [self._free.pop() for _ in experts]
+        dst = torch.tensor(slots, dtype=torch.long, device=self.device)
+        rows = [self.master_rows[e] for e in experts] if self.master_rows is not None else experts
+        for name, master in self.masters.items():
+            if isinstance(master, torch.Tensor):
+                src = torch.tensor(rows, dtype=torch.long, device=master.device)
+                batch = master.index_select(0, src)  # one contiguous gather on the source
+            else:  # list of per-row views
+                batch = torch.stack([master[r] for r in rows])
+            if batch.device.type == "cpu" and self.device.type == "cuda":
+                batch = batch.pin_memory()
+            self.slots[name].index_copy_(0, dst, batch.to(self.device, non_blocking=True))
+            self.bytes_staged += batch.numel() * batch.element_size()
+        self.transfers += 1
+        for e, s in zip(experts, slots):
+            self._slot[e] = s
+        self.slot_of[torch.tensor(experts, dtype=torch.long, device=self.device)] = dst
+
+    def stats(self) -> Dict[str, Any]:
+        d = self.stats_.as_dict()
+        d.update({
+            "policy": getattr(self.policy, "name", type(self.policy).__name__),
+            "capacity": self.capacity,
+            "fixed": len(self.fixed_ids),
+            "resident": len(self._slot),
+            "bytes_staged": self.bytes_staged,
+            "transfers": self.transfers,
+        })
+        return d
+
+
+# ---------------------------------------------------------------------------
+# Trace simulator (pure Python)
+# ---------------------------------------------------------------------------
+
+def load_trace(path: str) -> List[Tuple[int, Dict[int, int]]]:
+    """Read a routing trace: one JSON object per line, ``{"layer", "ids"}``.
+
+    ``ids`` is the flattened ``topk_ids`` of one MoE call (any nesting is
+    flattened). Returns ``[(layer, {expert: tokens_routed})]`` in order.
+    """
+    out: List[Tuple[int, Dict[int, int]]] = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            out.append((int(rec["layer"]), dict(Counter(_flatten(rec["ids"])))))
+    return out
+
+
+def _flatten(ids: Any) -> Iterable[int]:
+    for x in ids:
+        if isinstance(x, (list, tuple)):
+            yield from _flatten(x)
+        elif x >= 0:
+            yield int(x)
+
+
+def static_hot_sets(trace: Iterable[Tuple[int, Mapping[int, int]]],
+                    capacity: int) -> Dict[int, List[int]]:
+    """Per-layer top-``capacity`` experts by routed tokens (offline histogram)."""
+    hist: Dict[int, Counter] = {}
+    for layer, counts in trace:
+        hist.setdefault(layer, Counter()).update(counts)
+    return {layer: [e for e, _ in c.most_common(capacity)] for layer, c in hist.items()}
+
+
+def replay_trace(trace: Iterable[Tuple[int, Mapping[int, int]]], policy: str,
+                 capacity: int, hot_sets: Optional[Mapping[int, Iterable[int]]] = None,
+                 **policy_kwargs) -> Dict[str, Any]:
+    """Replay ``trace`` through one policy per layer; return hit rates.
+
+    ``hot_sets`` seeds ``static`` (see ``static_hot_sets``). The result
+    has overall ``hit_rate``, ``staged_experts`` (expert transfers the
+    policy would issue) and a ``per_layer`` breakdown.
+    """
+    policies: Dict[int, Any] = {}
+    stats: Dict[int, LayerCacheStats] = {}
+    for layer, counts in trace:
+        pol = policies.get(layer)
+        if pol is None:
+            kw = dict(policy_kwargs)
+            if policy == "static":
+                kw["hot"] = (hot_sets or {}).get(layer, ())
+            pol = policies[layer] = make_policy(policy, capacity, **kw)
+            stats[layer] = LayerCacheStats()
+        stats[layer].record(pol.access(counts))
+
+    hits = sum(s.hits for s in stats.values())
+    misses = sum(s.misses for s in stats.values())
+    return {
+        "policy": policy,
+        "capacity": capacity,
+        "calls": sum(s.calls for s in stats.values()),
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "staged_experts": misses,
+        "bypass": sum(s.bypass for s in stats.values()),
+        "per_layer": {layer: stats[layer].as_dict() for layer in sorted(stats)},
+    }
+
+
+__all__ = [
+    "POLICIES",
+    "AccessResult",
+    "ARCPolicy",
+    "ExpertSlotCache",
+    "LFUDecayPolicy",
+    "LRUPolicy",
+    "LayerCacheStats",
+    "StaticPolicy",
+    "load_trace",
+    "make_policy",
+    "replay_trace",
+    "static_hot_sets",
+]
@@ -41,6 +41,33 @@ Only ``stream_every`` mode produces non-zero ``cold_experts_streamed``.
 
 Bench scripts (e.g. ``benchmarks/bench_qwen3_coder_pinning.py``) display both
 ``X streamed / Y cache-hits`` so the data plane is observable in either mode.
+
+Online cache mode
+-----------------
+``cache`` drops the cold rows from the compute GPU. After the post-load
+mirror, each layer's expert weights are replaced by the slot tensors of a
+``core.expert_cache.ExpertSlotCache``: the hot experts in fixed rows plus
+``VRM_EP_CACHE_SLOTS`` cached cold experts (default a quarter of the cold
+set, at least ``top_k``). Each ``apply()`` remaps ``topk_ids`` onto those
+rows before the unmodified kernel runs, so residency is bounded.
+Admission and eviction follow ``VRM_EP_CACHE_POLICY`` (``arc`` or
+``lfu``), driven by the live ``topk_ids`` counts. Every miss of a call is
+staged from the lender mirror in one gathered transfer per weight family.
+A batch that routes to more cold experts than there are slots (prefill)
+runs as consecutive token chunks that each fit. Per-layer hit rates are
+reported under ``cache_hit_rate_per_layer`` in ``get_runtime_stats()``.
+
+Predictive prefetch
+-------------------
+With ``VRM_EP_PREFETCH=cooc`` (cross-layer co-occurrence table) or
+``probe`` (linear probe on the MoE input hidden state), each ``apply()``
+of layer L predicts layer L+1's experts (``core.expert_prefetch``) and
+stages the predicted cold ones on the prefetch stream *without* waiting,
+so the copy overlaps layer L's kernels. Layer L+1 waits on the recorded
+event and skips the experts already staged. In ``cache`` mode the
+prediction is admitted into the next layer's slots. Only meaningful in
+``stream_every`` and ``cache`` modes; the predictor learns online and can
+be warm-started from a routing trace (``VRM_EP_PREFETCH_TRACE``).
 """
 
 from __future__ import annotations
@@ -50,6 +77,7 @@ import logging
 import os
 import threading
 import time
+import weakref
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -78,7 +106,18 @@ _LENDING_LEASE = None  # VRAMLease
 #                    still correct). After ~10 tokens, runtime PCIe drops to 0.
 #   "mirror_only"  : Post-load mirror only. apply() hook is a stats-only no-op.
 #                    Equivalent to native vLLM speed; lender holds idle mirror.
+#   "cache"        : Hot experts + a bounded slot cache of cold experts on the
+#                    compute GPU (core.expert_cache); topk_ids are remapped
+#                    onto the slots, cold rows are freed.
 _STAGING_MODE: str = "warmup"
+_STAGING_MODES = ("stream_every", "warmup", "mirror_only", "cache")
+_CACHE_POLICY: str = "arc"
+_CACHE_SLOTS: int = 0  # 0 = a quarter of the layer's cold experts
+_PREFETCH_MODES = ("cooc", "probe")
+_PREDICTOR = None  # core.expert_prefetch predictor, None = prefetch off
+_PREFETCH_KIND: str = ""
+_PREFETCH_TOPN: int = 8
+_LAST_ROUTED: Optional[Tuple[int, Any]] = None  # (layer_id, predictor input)
 
 # Per-layer mirror state. Populated lazily by the post-load hook.
 # layer_id -> {
@@ -90,6 +129,9 @@ _STAGING_MODE: str = "warmup"
 #   "w2_scale_cold": torch.Tensor | None,
 #   "hot_mask": torch.Tensor,         # (num_experts,) bool on cuda:0
 #   "ref": weakref to layer,
+#   "cache": ExpertSlotCache | None,  # "cache" mode: the layer's resident slots
+#   "prefetched": set[int],           # experts staged ahead by layer_id - 1
+#   "prefetch_event": torch.cuda.Event | None,
 # }
 _LAYER_STATE: Dict[int, Dict[str, Any]] = {}
 _PREFETCH_STREAM = None  # torch.cuda.Stream on compute GPU
@@ -102,6 +144,9 @@ _STATS = {
     "cold_experts_streamed": 0,    # cumulative count of (layer_id, expert_id) hits
     "cold_bytes_streamed": 0,       # cumulative bytes copied lender→compute at apply
     "cold_cache_hits": 0,           # B-2: cold expert hit but already resident, skip
+    "staged_batches": 0,            # gathered lender→compute transfers issued
+    "prefetch_issued": 0,           # experts staged one layer ahead
+    "prefetch_useful": 0,           # ... that the next layer actually missed on
     "first_apply_t": 0.0,
     "last_apply_t": 0.0,
     "staging_mode": "warmup",
@@ -207,7 +252,8 @@ def install(
     """
     global _INSTALLED, _HOT_REGISTRY, _NUM_LAYERS, _NUM_EXPERTS
     global _COMPUTE_GPU, _LENDER_GPU, _TOPK_PCT, _LENDING_POOL, _LENDING_LEASE
-    global _PREFETCH_STREAM, _STAGING_MODE
+    global _PREFETCH_STREAM, _STAGING_MODE, _CACHE_POLICY, _CACHE_SLOTS
+    global _PREDICTOR, _PREFETCH_TOPN
 
     with _INSTALL_LOCK:
         if _INSTALLED:
@@ -217,7 +263,7 @@ def install(
         # Resolve staging mode (env var > arg > default).
         env_mode = os.environ.get("VRM_EP_STAGING_MODE", "").strip().lower()
         mode = env_mode or staging_mode or "warmup"
-        if mode not in ("stream_every", "warmup", "mirror_only"):
+        if mode not in _STAGING_MODES:
             logger.warning(
                 "[expert_pinning] unknown staging_mode=%r, falling back to 'warmup'",
                 mode,
@@ -225,6 +271,13 @@ def install(
             mode = "warmup"
         _STAGING_MODE = mode
         _STATS["staging_mode"] = mode
+        if mode == "cache":
+            _CACHE_POLICY = os.environ.get("VRM_EP_CACHE_POLICY", "arc").strip().lower() or "arc"
+            try:
+                _CACHE_SLOTS = int(os.environ.get("VRM_EP_CACHE_SLOTS", "0"))
+            except ValueError:
+                _CACHE_SLOTS = 0
+            _STATS["cache_policy"] = _CACHE_POLICY
 
         derived = compute_hot_from_histogram(
             histogram_path, topk_pct=topk_pct, cache_path=cache_path
@@ -240,6 +293,7 @@ def install(
         _LENDER_GPU = int(lender_gpu)
         _LENDING_POOL = lending_pool
         _LENDING_LEASE = lending_lease
+        _PREDICTOR = _make_predictor(_NUM_EXPERTS)
 
         _patch_fp8_moe_method()
 
@@ -271,9 +325,55 @@ def get_runtime_stats() -> Dict[str, Any]:
     """Snapshot of the cumulative pinning counters (safe to call any time)."""
     s = dict(_STATS)
     s["layers_in_state"] = len(_LAYER_STATE)
+    per_layer = {
+        layer_id: round(st["cache_stats"].hit_rate, 4)
+        for layer_id, st in sorted(_LAYER_STATE.items())
+        if st.get("cache_stats") is not None
+    }
+    if per_layer:
+        s["cache_hit_rate_per_layer"] = per_layer
+    if s["prefetch_issued"]:
+        s["prefetch_precision"] = round(s["prefetch_useful"] / s["prefetch_issued"], 4)
     return s
 
 
+def _make_predictor(num_experts: int) -> Any:
+    """Build the cross-layer predictor selected by ``VRM_EP_PREFETCH``."""
+    global _PREFETCH_TOPN, _PREFETCH_KIND
+    kind = os.environ.get("VRM_EP_PREFETCH", "").strip().lower()
+    if kind in ("", "0", "off", "false"):
+        return None
+    if kind in ("1", "true", "on"):
+        kind = "cooc"
+    if kind not in _PREFETCH_MODES:
+        logger.warning("[expert_pinning] unknown VRM_EP_PREFETCH=%r, prefetch disabled", kind)
+        return None
+    if _STAGING_MODE not in ("stream_every", "cache"):
+        logger.warning(
+            "[expert_pinning] VRM_EP_PREFETCH ignored in staging_mode=%s", _STAGING_MODE,
+        )
+        return None
+    try:
+        _PREFETCH_TOPN = int(os.environ.get("VRM_EP_PREFETCH_TOPN", "8"))
+    except ValueError:
+        _PREFETCH_TOPN = 8
+
+    from core.expert_prefetch import CooccurrencePredictor, LinearProbePredictor
+    if kind == "probe":
+        predictor = LinearProbePredictor(num_experts, top_n=_PREFETCH_TOPN)
+    else:
+        trace_path = os.environ.get("VRM_EP_PREFETCH_TRACE", "").strip()
+        if trace_path:
+            from core.expert_cache import load_trace
+            predictor = CooccurrencePredictor.from_trace(load_trace(trace_path),
+                                                         top_n=_PREFETCH_TOPN)
+        else:
+            predictor = CooccurrencePredictor(top_n=_PREFETCH_TOPN)
+    _PREFETCH_KIND = kind
+    _STATS["prefetch"] = kind
+    return predictor
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # Internal: vLLM Fp8MoEMethod patching
 # ────────────────────────────────────────────────────────────────────────────
@@ -300,6 +400,20 @@ def _patch_fp8_moe_method() -> None:
             )
 
     def patched_apply(self, layer, x, topk_weights, topk_ids, shared_experts_input):
+        cache = _slot_cache(layer)
+        if cache is not None:
+            # The layer only holds hot + slot rows now: staging and the id
+            # remap are required for a correct result, so errors propagate.
+            if _PREDICTOR is not None:
+                try:
+                    _prefetch_next_layer(layer, topk_ids, x)
+                except Exception as e:
+                    logger.debug(
+                        "[expert_pinning] next-layer prefetch failed for layer %s: %s",
+                        getattr(layer, "layer_name", "?"), e,
+                    )
+            return _apply_cached(original_apply, self, layer, cache, x, topk_weights,
+                                 topk_ids, shared_experts_input)
         try:
             _stage_cold_for_call(layer, topk_ids)
         except Exception as e:
@@ -307,6 +421,14 @@ def _patch_fp8_moe_method() -> None:
                 "[expert_pinning] apply-time staging failed for layer %s: %s",
                 getattr(layer, "layer_name", "?"), e,
             )
+        if _PREDICTOR is not None:
+            try:
+                _prefetch_next_layer(layer, topk_ids, x)
+            except Exception as e:
+                logger.debug(
+                    "[expert_pinning] next-layer prefetch failed for layer %s: %s",
+                    getattr(layer, "layer_name", "?"), e,
+                )
         return original_apply(self, layer, x, topk_weights, topk_ids, shared_experts_input)
 
     Fp8MoEMethod.process_weights_after_loading = patched_pwal  # type: ignore[assignment]
@@ -490,9 +612,17 @@ def _post_load_mirror_cold(layer) -> None:
         # After post-load mirror, every cold row on cuda:0 is correct (we never
         # zeroed it). So initialize the residency set to ALL cold ids — the
         # "warmup" mode then short-circuits every per-call stream as a hit.
-        # In "stream_every" mode this set is ignored.
+        # In "stream_every" mode this set is ignored; in "cache" mode the
+        # slot cache owns residency instead.
         "resident_cold": set(cold_ids),
+        "cache": None,
+        "cache_stats": None,
+        "ref": weakref.ref(layer),
+        "prefetched": set(),
+        "prefetch_event": None,
     }
+    if _STAGING_MODE == "cache" and cold_ids:
+        _install_slot_cache(layer, _LAYER_STATE[layer_id], sorted(hot_set))
     _STATS["layers_hooked"] += 1
     _STATS["bytes_mirrored_to_lender"] += bytes_total
 
@@ -505,10 +635,104 @@ def _post_load_mirror_cold(layer) -> None:
         )
 
 
+def _install_slot_cache(layer, state, hot_ids: List[int]) -> None:
+    """Replace the layer's expert weights with hot rows + a bounded slot cache.
+
+    The full ``(num_experts, ...)`` tensors are released; cold experts are
+    staged from the lender mirrors on demand (see ``_apply_cached``).
+    """
+    import torch
+    from core.expert_cache import ExpertSlotCache
+
+    families = _families(layer, state)
+    slots = _CACHE_SLOTS if _CACHE_SLOTS > 0 else max(1, len(state["cold_ids"]) // 4)
+    slots = min(max(slots, int(getattr(layer, "top_k", 1) or 1)), len(state["cold_ids"]))
+    device = getattr(layer, families[0][0]).device
+    hot_idx = torch.tensor(hot_ids, dtype=torch.long, device=device)
+    cache = ExpertSlotCache(
+        {attr: cold for attr, cold in families}, slots, device, policy=_CACHE_POLICY,
+        fixed={attr: getattr(layer, attr).index_select(0, hot_idx) for attr, _ in families},
+        fixed_ids=hot_ids, num_experts=state["num_experts"], master_rows=state["cold_remap"],
+    )
+    for attr, _ in families:
+        setattr(layer, attr, torch.nn.Parameter(cache.slots[attr], requires_grad=False))
+    state["cache"] = cache
+    state["cache_stats"] = cache.stats_
+
+
+def _slot_cache(layer) -> Any:
+    """The layer's ``ExpertSlotCache`` in ``cache`` mode, else None."""
+    try:
+        state = _LAYER_STATE.get(int(layer.layer_id))
+    except Exception:
+        return None
+    return state.get("cache") if state is not None else None
+
+
 # ────────────────────────────────────────────────────────────────────────────
 # Internal: per-call cold expert staging
 # ────────────────────────────────────────────────────────────────────────────
 
+def _count_apply() -> None:
+    _STATS["apply_calls"] += 1
+    now = time.perf_counter()
+    if _STATS["first_apply_t"] == 0.0:
+        _STATS["first_apply_t"] = now
+    _STATS["last_apply_t"] = now
+
+
+def _apply_cached(original_apply, method, layer, cache, x, topk_weights, topk_ids,
+                  shared_experts_input):
+    """``cache`` mode apply: stage misses into slots and run on slot ids.
+
+    Batches whose cold experts do not fit the slots run as consecutive
+    token chunks (``ExpertSlotCache.split``); their outputs are
+    concatenated.
+    """
+    import torch
+
+    _count_apply()
+    state = _LAYER_STATE[int(layer.layer_id)]
+    prefetched = _take_prefetched(state)
+    st = cache.stats_
+    hits, misses = st.hits, st.misses
+    nbytes, transfers = cache.bytes_staged, cache.transfers
+
+    ranges = cache.split(topk_ids)
+    outs = []
+    for start, end in ranges:
+        if len(ranges) == 1:
+            args = (x, topk_weights, topk_ids, shared_experts_input)
+        else:
+            args = (x[start:end], topk_weights[start:end], topk_ids[start:end],
+                    _token_rows(shared_experts_input, start, end, x.shape[0]))
+        ids = cache.prepare(args[2])
+        outs.append(original_apply(method, layer, args[0], args[1], ids, args[3]))
+
+    if st.hits + st.misses > hits + misses:
+        _STATS["apply_calls_with_cold"] += 1
+    _STATS["cold_cache_hits"] += st.hits - hits
+    _STATS["cold_experts_streamed"] += st.misses - misses
+    _STATS["cold_bytes_streamed"] += cache.bytes_staged - nbytes
+    _STATS["staged_batches"] += cache.transfers - transfers
+    if prefetched:
+        routed = set(torch.unique(topk_ids).tolist())
+        _STATS["prefetch_useful"] += len(prefetched & routed)
+    if len(outs) == 1:
+        return outs[0]
+    if isinstance(outs[0], tuple):
+        return tuple(None if parts[0] is None else torch.cat(parts)
+                     for parts in zip(*outs))
+    return torch.cat(outs)
+
+
+def _token_rows(t, start: int, end: int, num_tokens: int):
+    """Slice a per-token tensor argument; pass anything else through."""
+    if t is not None and hasattr(t, "shape") and t.dim() > 0 and t.shape[0] == num_tokens:
+        return t[start:end]
+    return t
+
+
 def _stage_cold_for_call(layer, topk_ids) -> None:
     """Walk topk_ids → identify cold experts → ensure they're resident on cuda:0.
 
@@ -517,14 +741,14 @@ def _stage_cold_for_call(layer, topk_ids) -> None:
       - ``warmup``      (B-2)  : copy only for cold experts not yet resident.
                                  After warmup the runtime PCIe traffic is 0.
       - ``mirror_only``        : stats-only no-op (matches native vLLM speed).
+
+    ``cache`` mode layers go through ``_apply_cached`` instead. All experts
+    copied by one call go through ``_stage_batch`` (one gathered transfer
+    per weight family).
     """
     import torch
 
-    _STATS["apply_calls"] += 1
-    now = time.perf_counter()
-    if _STATS["first_apply_t"] == 0.0:
-        _STATS["first_apply_t"] = now
-    _STATS["last_apply_t"] = now
+    _count_apply()
 
     if _STAGING_MODE == "mirror_only":
         return
@@ -537,6 +761,7 @@ def _stage_cold_for_call(layer, topk_ids) -> None:
     state = _LAYER_STATE.get(layer_id)
     if state is None:
         return
+    prefetched = _take_prefetched(state)
 
     if not isinstance(topk_ids, torch.Tensor) or topk_ids.numel() == 0:
         return
@@ -572,57 +797,166 @@ def _stage_cold_for_call(layer, topk_ids) -> None:
         if not unique_cold:
             return
 
-    w13 = layer.w13_weight
-    w2 = layer.w2_weight
-    w13_cold = state["w13_cold"]
-    w2_cold = state["w2_cold"]
-    cold_remap = state["cold_remap"]
+    if prefetched:
+        covered = sum(1 for e in unique_cold if int(e) in prefetched)
+        _STATS["prefetch_useful"] += covered
+        unique_cold = [e for e in unique_cold if int(e) not in prefetched]
 
-    bytes_streamed = 0
-    cold_count = 0
+    cold_remap = state["cold_remap"]
+    experts = [int(e) for e in unique_cold if int(e) in cold_remap]
+    if not experts:
+        return
+    locals_ = [cold_remap[e] for e in experts]
+    families = _families(layer, state)
 
     stream = _PREFETCH_STREAM
     if stream is not None:
         stream.wait_stream(torch.cuda.current_stream(_COMPUTE_GPU))
     cm = torch.cuda.stream(stream) if stream is not None else _NullCM()
     with cm:
-        for e in unique_cold:
-            local = cold_remap.get(int(e))
-            if local is None:
-                continue
-            w13[e].copy_(w13_cold[local], non_blocking=True)
-            w2[e].copy_(w2_cold[local], non_blocking=True)
-            bytes_streamed += w13[e].numel() * w13[e].element_size()
-            bytes_streamed += w2[e].numel() * w2[e].element_size()
-            if state["w13_scale_cold"] is not None:
-                w13_scale_attr = (
-                    "w13_weight_scale" if hasattr(layer, "w13_weight_scale")
-                    else "w13_weight_scale_inv"
-                )
-                w13_s = getattr(layer, w13_scale_attr, None)
-                if w13_s is not None and w13_s.shape[0] == num_experts:
-                    w13_s[e].copy_(state["w13_scale_cold"][local], non_blocking=True)
-            if state["w2_scale_cold"] is not None:
-                w2_scale_attr = (
-                    "w2_weight_scale" if hasattr(layer, "w2_weight_scale")
-                    else "w2_weight_scale_inv"
-                )
-                w2_s = getattr(layer, w2_scale_attr, None)
-                if w2_s is not None and w2_s.shape[0] == num_experts:
-                    w2_s[e].copy_(state["w2_scale_cold"][local], non_blocking=True)
-            cold_count += 1
+        bytes_streamed = _stage_batch(layer, families, experts, locals_, num_experts)
     if stream is not None:
         torch.cuda.current_stream(_COMPUTE_GPU).wait_stream(stream)
 
-    _STATS["cold_experts_streamed"] += cold_count
+    _STATS["cold_experts_streamed"] += len(experts)
     _STATS["cold_bytes_streamed"] += bytes_streamed
+    _STATS["staged_batches"] += 1
 
     # B-2: mark streamed experts as resident on cuda:0. Their rows now hold
     # the correct bytes and won't be touched until eviction (none in B-2).
-    if _STAGING_MODE == "warmup" and cold_count > 0:
-        resident = state["resident_cold"]
-        for e in unique_cold:
-            resident.add(int(e))
+    if _STAGING_MODE == "warmup":
+        state["resident_cold"].update(experts)
+
+
+def _families(layer, state) -> List[Tuple[str, Any]]:
+    """(layer attribute, lender mirror) pairs to stage for one expert."""
+    families = [("w13_weight", state["w13_cold"]), ("w2_weight", state["w2_cold"])]
+    if state["w13_scale_cold"] is not None:
+        families.append((
+            "w13_weight_scale" if hasattr(layer, "w13_weight_scale") else "w13_weight_scale_inv",
+            state["w13_scale_cold"],
+        ))
+    if state["w2_scale_cold"] is not None:
+        families.append((
+            "w2_weight_scale" if hasattr(layer, "w2_weight_scale") else "w2_weight_scale_inv",
+            state["w2_scale_cold"],
+        ))
+    return families
+
+
+def _take_prefetched(state) -> set:
+    """Claim the experts staged ahead for this layer and order their copy.
+
+    The compute stream waits on the prefetch event, so the rows are complete
+    before this layer's kernel reads them.
+    """
+    prefetched = state.get("prefetched")
+    if not prefetched:
+        return set()
+    state["prefetched"] = set()
+    event, state["prefetch_event"] = state.get("prefetch_event"), None
+    if event is not None:
+        import torch
+        torch.cuda.current_stream(_COMPUTE_GPU).wait_event(event)
+    return prefetched
+
+
+def _prefetch_next_layer(layer, topk_ids, x=None) -> None:
+    """Predict layer L+1's experts from layer L and stage them asynchronously.
+
+    Also feeds the (L-1 -> L) routing pair to the predictor, so it learns
+    online from the live batch. The copy is issued on ``_PREFETCH_STREAM``
+    and only recorded — layer L's kernels run while it is in flight.
+    """
+    global _LAST_ROUTED
+    import torch
+
+    try:
+        layer_id = int(layer.layer_id)
+    except Exception:
+        return
+    if not isinstance(topk_ids, torch.Tensor) or topk_ids.numel() == 0:
+        return
+    flat = topk_ids.reshape(-1)
+    flat = flat[flat >= 0]
+    ids, counts = torch.unique(flat, return_counts=True)
+    routed = dict(zip(ids.tolist(), counts.tolist()))
+
+    if _PREFETCH_KIND == "probe":
+        if x is None:
+            return
+        inp = x.detach()
+    else:
+        inp = routed
+    prev, _LAST_ROUTED = _LAST_ROUTED, (layer_id, inp)
+    if prev is not None and prev[0] + 1 == layer_id:
+        _PREDICTOR.observe(prev[0], prev[1], routed)
+
+    nxt = _LAYER_STATE.get(layer_id + 1)
+    if nxt is None or nxt.get("ref") is None:
+        return
+    nxt_layer = nxt["ref"]()
+    if nxt_layer is None:
+        return
+    cold_remap = nxt["cold_remap"]
+    cache = nxt.get("cache")
+    experts = [
+        int(e) for e in _PREDICTOR.predict(layer_id, inp, _PREFETCH_TOPN)
+        if int(e) in cold_remap and not (cache is not None and int(e) in cache)
+    ]
+    if not experts:
+        return
+    locals_ = [cold_remap[e] for e in experts]
+
+    stream = _PREFETCH_STREAM
+    event = None
+    if stream is not None:
+        stream.wait_stream(torch.cuda.current_stream(_COMPUTE_GPU))
+    cm = torch.cuda.stream(stream) if stream is not None else _NullCM()
+    with cm:
+        if cache is not None:
+            before = cache.bytes_staged
+            experts = cache.prefetch(experts)
+            nbytes = cache.bytes_staged - before
+        else:
+            nbytes = _stage_batch(nxt_layer, _families(nxt_layer, nxt), experts, locals_,
+                                  nxt["num_experts"])
+        if stream is not None:
+            event = torch.cuda.Event()
+            event.record(stream)
+    if not experts:
+        return
+    nxt["prefetched"] = set(experts)
+    nxt["prefetch_event"] = event
+    _STATS["prefetch_issued"] += len(experts)
+    _STATS["cold_bytes_streamed"] += nbytes
+    _STATS["staged_batches"] += 1
+
+
+def _stage_batch(layer, families, experts: List[int], locals_: List[int],
+                 num_experts: int) -> int:
+    """Copy ``experts`` from the lender mirrors into the layer in one go.
+
+    Per weight family the cold rows are gathered on the lender into one
+    contiguous block, sent as a single transfer and scattered into the
+    compute-side ``(num_experts, ...)`` tensor with ``index_copy_``.
+    """
+    import torch
+
+    nbytes = 0
+    for attr, cold in families:
+        dst = getattr(layer, attr, None)
+        if dst is None or dst.shape[0] != num_experts:
+            continue
+        if isinstance(cold, torch.Tensor):
+            src_idx = torch.tensor(locals_, dtype=torch.long, device=cold.device)
+            batch = cold.index_select(0, src_idx)
+        else:  # list of lease views
+            batch = torch.stack([cold[i] for i in locals_])
+        dst_idx = torch.tensor(experts, dtype=torch.long, device=dst.device)
+        dst.index_copy_(0, dst_idx, batch.to(dst.device, non_blocking=True))
+        nbytes += batch.numel() * batch.element_size()
+    return nbytes
 
 
 class _NullCM:
@@ -0,0 +1,236 @@
+"""Predictive MoE expert prefetch — guess layer L+1's experts at layer L.
+
+Cold-expert staging (``core.expert_pinning``) can only start once layer
+L+1's router has produced ``topk_ids``, so every miss is exposed latency.
+Routing is strongly correlated across adjacent layers (same token, similar
+hidden state), which lets layer L's routing predict layer L+1's and start
+the copies while layer L computes.
+
+Two predictors, same interface (``observe`` to learn, ``predict`` to guess):
+
+  - ``CooccurrencePredictor``: per layer, table of "expert e at L was
+    followed by expert n at L+1" counts. Pure Python; learns online or
+    from recorded traces (``core.expert_cache.load_trace`` format).
+  - ``LinearProbePredictor``: per-layer linear probe on layer L's hidden
+    state (the MoE input), trained online with a multi-label logistic
+    loss against the experts L+1 actually routed to. Needs torch.
+
+``replay_prefetch`` replays a routing trace through a predictor and an
+expert cache policy and reports prediction precision/recall plus the
+stall time prefetch would save under a simple copy/compute timing model —
+no GPU involved.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+
+class CooccurrencePredictor:
+    """Cross-layer expert co-occurrence table.
+
+    ``predict(layer, routed)`` scores every expert of layer+1 by
+    ``sum_e w_e * P(n at L+1 | e at L)`` where ``w_e`` is the share of
+    layer-L tokens routed to ``e``; ties and empty rows fall back to the
+    marginal frequency at layer+1.
+    """
+
+    def __init__(self, top_n: int = 8):
+        self.top_n = int(top_n)
+        self._table: Dict[int, Dict[int, Counter]] = {}
+        self._row_total: Dict[int, Counter] = {}
+        self._prior: Dict[int, Counter] = {}
+
+    @classmethod
+    def from_trace(cls, trace: Sequence[Tuple[int, Mapping[int, int]]],
+                   top_n: int = 8) -> "CooccurrencePredictor":
+        """Build a table from a recorded trace (consecutive L, L+1 entries)."""
+        pred = cls(top_n=top_n)
+        for (la, a), (lb, b) in zip(trace, trace[1:]):
+            if la + 1 == lb:
+                pred.observe(la, a, b)
+        return pred
+
+    def observe(self, layer: int, routed: Mapping[int, int],
+                next_routed: Mapping[int, int]) -> None:
+        rows = self._table.setdefault(layer, {})
+        totals = self._row_total.setdefault(layer, Counter())
+        nxt = list(next_routed)
+        for e in routed:
+            rows.setdefault(e, Counter()).update(nxt)
+            totals[e] += len(nxt)
+        self._prior.setdefault(layer + 1, Counter()).update(nxt)
+
+    def predict(self, layer: int, routed: Mapping[int, int],
+                top_n: Optional[int] = None) -> List[int]:
+        top_n = self.top_n if top_n is None else int(top_n)
+        rows = self._table.get(layer, {})
+        totals = self._row_total.get(layer, Counter())
+        tokens = sum(routed.values()) or 1
+        scores: Counter = Counter()
+        for e, n_tok in routed.items():
+            row = rows.get(e)
+            if not row:
+                continue
+            w = n_tok / tokens / totals[e]
+            for n, c in row.items():
+                scores[n] += w * c
+        ranked = [e for e, _ in scores.most_common(top_n)]
+        if len(ranked) < top_n:
+            seen = set(ranked)
+            for e, _ in self._prior.get(layer + 1, Counter()).most_common():
+                if len(ranked) >= top_n:
+                    break
+                if e not in seen:
+                    ranked.append(e)
+        return ranked
+
+
+class LinearProbePredictor:
+    """Per-layer linear probe: hidden state at L -> experts at L+1.
+
+    Weights are created lazily on the device/dtype of the first features
+    seen for a layer. ``observe`` takes one SGD step on the multi-label
+    logistic loss; ``predict`` takes the max sigmoid over tokens and
+    returns the ``top_n`` experts.
+    """
+
+    def __init__(self, num_experts: int, top_n: int = 8, lr: float = 0.05):
+        if not _TORCH:
+            raise RuntimeError("LinearProbePredictor requires torch")
+        self.num_experts = int(num_experts)
+        self.top_n = int(top_n)
+        self.lr = float(lr)
+        self._w: Dict[int, Any] = {}
+        self._b: Dict[int, Any] = {}
+
+    def _params(self, layer: int, features: Any) -> Tuple[Any, Any]:
+        w = self._w.get(layer)
+        if w is None:
+            dim = features.shape[-1]
+            w = self._w[layer] = torch.zeros(self.num_experts, dim, device=features.device)
+            self._b[layer] = torch.zeros(self.num_experts, device=features.device)
+        return w, self._b[layer]
+
+    def observe(self, layer: int, features: Any, next_routed: Iterable[int]) -> None:
+        x = features.reshape(-1, features.shape[-1]).float()
+        w, b = self._params(layer, x)
+        target = torch.zeros(self.num_experts, device=x.device)
+        idx = [int(e) for e in next_routed if 0 <= int(e) < self.num_experts]
+        if idx:
+            target[idx] = 1.0
+        xm = x.mean(0)
+        p = torch.sigmoid(w @ xm + b)
+        grad = p - target
+        w -= self.lr * torch.outer(grad, xm)
+        b -= self.lr * grad
+
+    def predict(self, layer: int, features: Any, top_n: Optional[int] = None) -> List[int]:
+        top_n = self.top_n if top_n is None else int(top_n)
+        if layer not in self._w:
+            return []
+        x = features.reshape(-1, features.shape[-1]).float()
+        w, b = self._w[layer], self._b[layer]
+        scores = torch.sigmoid(x @ w.T + b).amax(0)
+        k = min(top_n, self.num_experts)
+        return torch.topk(scores, k).indices.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Trace replay (pure Python)
+# ---------------------------------------------------------------------------
+
+def replay_prefetch(trace: Sequence[Tuple[int, Mapping[int, int]]], predictor: Any,
+                    capacity: int, policy: str = "arc", top_n: Optional[int] = None,
+                    compute_ms: float = 0.5, copy_ms: float = 0.25) -> Dict[str, Any]:
+    """Replay ``trace`` with one-layer-ahead prefetch; report accuracy and stall.
+
+    Consecutive trace entries ``(L, a)``, ``(L+1, b)`` form a prediction
+    pair: after observing ``a`` the predictor guesses ``b`` (then learns
+    from the real ``b``, i.e. online). Each layer has its own expert cache
+    (``policy``, ``capacity`` slots); prefetch never changes cache
+    admission, so the demand misses are identical with and without it.
+
+    Timing model per layer: prefetch copies (``copy_ms`` per expert, one
+    copy engine) overlap layer L's ``compute_ms``; copies that do not fit
+    in that window, plus demand misses not covered by the prefetch, stall
+    layer L+1. Without prefetch every miss stalls.
+
+    Precision/recall are measured on misses (experts that would need a
+    copy) of layers that had a prediction — the first layer of each token
+    has none and only shows up in the stall totals; ``*_all`` variants
+    measure against everything routed.
+    """
+    from core.expert_cache import make_policy
+
+    caches: Dict[int, Any] = {}
+
+    def cache(layer):
+        c = caches.get(layer)
+        if c is None:
+            c = caches[layer] = make_policy(policy, capacity)
+        return c
+
+    tp = fp = fn = tp_all = pred_all = routed_all = 0
+    issued = useful = 0
+    stall_base = stall_pref = 0.0
+    pending: Optional[Tuple[int, set]] = None
+    prev: Optional[Tuple[int, Mapping[int, int]]] = None
+
+    for layer, routed in trace:
+        c = cache(layer)
+        resident_before = c.resident
+        res = c.access(routed)
+        misses = set(res.misses)
+        stall_base += len(misses) * copy_ms
+
+        if pending is not None and pending[0] == layer:
+            predicted = pending[1]
+            prefetched = predicted - resident_before
+            covered = misses & prefetched
+            overflow = max(0.0, len(prefetched) * copy_ms - compute_ms)
+            stall_pref += overflow + len(misses - prefetched) * copy_ms
+            issued += len(prefetched)
+            useful += len(covered)
+            tp += len(covered)
+            fp += len(prefetched - misses)
+            fn += len(misses - prefetched)
+            tp_all += len(predicted & set(routed))
+            pred_all += len(predicted)
+            routed_all += len(routed)
+        else:
+            stall_pref += len(misses) * copy_ms
+
+        if prev is not None and prev[0] + 1 == layer:
+            predictor.observe(prev[0], prev[1], routed)
+        guess = predictor.predict(layer, routed, top_n)
+        pending = (layer + 1, set(guess))
+        prev = (layer, routed)
+
+    return {
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "precision_all": tp_all / pred_all if pred_all else 0.0,
+        "recall_all": tp_all / routed_all if routed_all else 0.0,
+        "prefetch_issued": issued,
+        "prefetch_useful": useful,
+        "prefetch_wasted": issued - useful,
+        "stall_ms_baseline": stall_base,
+        "stall_ms_prefetch": stall_pref,
+        "stall_ms_saved": stall_base - stall_pref,
+        "stall_saved_pct": (100.0 * (stall_base - stall_pref) / stall_base) if stall_base else 0.0,
+    }
+
+
+__all__ = [
+    "CooccurrencePredictor",
+    "LinearProbePredictor",
+    "replay_prefetch",
+]
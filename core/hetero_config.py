@@ -181,6 +181,7 @@ class HeteroConfig:
     # Split strategy
     split_ratios: Dict[int, float] = field(default_factory=dict)
     split_strategy: str = "vram_weighted"  # vram_weighted, compute_weighted, balanced
+    placement_objective: str = "latency"   # latency, throughput, combined
 
     # Transfer strategy
     p2p_capable: bool = False
@@ -223,6 +224,7 @@ class HeteroConfig:
             f"  Cooperative Pool:     {self.total_pool_gb:.1f} GB",
             f"  Max model size:       ~{self.model_max_gb:.1f} GB",
             f"  Split strategy:       {self.split_strategy}",
+            f"  Placement objective:  {self.placement_objective}",
             f"  Transfer:             {self.transfer_method}",
             f"  P2P capable:          {self.p2p_capable}",
             f"  Recommended batch:    {self.recommended_batch_size}",
@@ -356,6 +358,13 @@ def probe_p2p(gpu_a: int, gpu_b: int) -> bool:
     if not _TORCH or _MINIMAL:
         return False
 
+    from core.placement_cache import get_placement_cache
+    cache = get_placement_cache()
+    return cache.cached("p2p", cache.fingerprint(pair=[gpu_a, gpu_b]),
+                        lambda: _probe_p2p_uncached(gpu_a, gpu_b), bool)
+
+
+def _probe_p2p_uncached(gpu_a: int, gpu_b: int) -> bool:
     # Fast path: CUDA API says yes
     try:
         if torch.cuda.can_device_access_peer(gpu_a, gpu_b):
@@ -443,9 +452,42 @@ def _detect_vm() -> bool:
     return False
 
 
+def _objective_split_ratios(
+    gpus: List[DetectedGPU],
+    objective: str,
+    model_size_gb: Optional[float],
+    n_slices: int = 100,
+) -> Dict[int, float]:
+    """Split ratios from the placement solver on a uniform-layer model.
+
+    The model is cut into ``n_slices`` equal layers; each GPU's speed is
+    its ``effective_compute`` and its capacity the free VRAM minus the
+    1 GB safety margin. For ``throughput`` this balances stage times
+    under the VRAM limits instead of weighting VRAM and compute by hand.
+    """
+    from core.layer_profiler import GPUProfile as _PlacementGPU
+    from core.layer_profiler import LayerProfile, compute_optimal_placement
+
+    slice_mb = (model_size_gb or 0.0) * 1024 / n_slices
+    layers = [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=slice_mb)
+              for i in range(n_slices)]
+    devices = [_PlacementGPU(index=g.index, name=g.name, backend=g.vendor,
+                             total_vram_mb=int(g.total_vram_gb * 1024),
+                             free_vram_mb=int(max(g.free_vram_gb - 1.0, 0.0) * 1024),
+                             compute_throughput_gflops=g.effective_compute)
+               for g in gpus]
+    plan = compute_optimal_placement(layers, devices, transfer_bandwidth_gbps=1.0,
+                                     objective=objective)
+    counts = {g.index: 0 for g in gpus}
+    for _, gpu_idx in plan.assignments:
+        counts[gpu_idx] += 1
+    return {idx: n / n_slices for idx, n in counts.items()}
+
+
 def auto_configure(
     strategy: str = "balanced",
     model_size_gb: Optional[float] = None,
+    serving_mode: Optional[str] = None,
 ) -> HeteroConfig:
     """Auto-detect GPUs and compute optimal heterogeneous configuration.
 
@@ -459,6 +501,12 @@ def auto_configure(
         Overridden by env var VRM_HETERO_STRATEGY if set.
     model_size_gb : float, optional
         Expected model size. Used to compute if model fits and optimal split.
+    serving_mode : str, optional
+        "interactive" (batch-1 latency), "pipeline"/"batch" (throughput) or
+        "continuous" (combined); defaults to VRM_SERVING_MODE. Selects
+        ``placement_objective``; for the throughput and combined objectives
+        the split ratios come from the placement solver (balanced stage
+        times under VRAM limits) instead of ``strategy``.
 
     Returns
     -------
@@ -470,8 +518,19 @@ def auto_configure(
     if env_strategy in ("vram_weighted", "compute_weighted", "balanced"):
         strategy = env_strategy
 
+    from core.layer_profiler import placement_objective_for
+    try:
+        objective = placement_objective_for(serving_mode)
+    except ValueError:
+        if serving_mode is not None:
+            raise
+        _log.warning("Ignoring invalid VRM_SERVING_MODE=%r",
+                     os.environ.get("VRM_SERVING_MODE"))
+        objective = "latency"
+
     gpus = detect_gpus()
-    config = HeteroConfig(gpus=gpus, split_strategy=strategy)
+    config = HeteroConfig(gpus=gpus, split_strategy=strategy,
+                          placement_objective=objective)
 
     if not gpus:
         _log.info("No GPUs detected — returning CPU-only config")
@@ -493,6 +552,11 @@ def auto_configure(
     if len(gpus) == 1:
         gpus[0].split_ratio = 1.0
         config.split_ratios = {gpus[0].index: 1.0}
+    elif objective != "latency":
+        config.split_ratios = _objective_split_ratios(gpus, objective, model_size_gb)
+        config.split_strategy = f"placement_{objective}"
+        for gpu in gpus:
+            gpu.split_ratio = config.split_ratios[gpu.index]
     else:
         total_weight = 0.0
         weights: Dict[int, float] = {}
@@ -595,8 +659,9 @@ def auto_configure(
         config.recommended_max_tokens = 512
 
     _log.info(
-        "Auto-config: %d GPUs, %.1f GB pool, strategy=%s, transfer=%s",
-        len(gpus), config.total_pool_gb, strategy, config.transfer_method,
+        "Auto-config: %d GPUs, %.1f GB pool, strategy=%s, objective=%s, transfer=%s",
+        len(gpus), config.total_pool_gb, config.split_strategy, objective,
+        config.transfer_method,
     )
 
     return config
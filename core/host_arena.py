@@ -0,0 +1,322 @@
+"""Shared host staging arena for GPU <-> CPU copies.
+
+Device-to-host staging used to allocate a fresh (often pageable) tensor
+per call: ``HierarchicalMemoryManager._move_gpu_to_cpu``,
+``TransferManager._transfer_cpu_staged``, ``PagedKVCacheManager._page_to_host``
+and ``cross_node.tensor_to_raw``. Pageable copies run at roughly half the
+PCIe rate, and per-call ``cudaHostAlloc`` is slow and fragments the host
+heap. ``HostArena`` keeps a pool of page-locked ``uint8`` buffers instead:
+
+  - size classes: four per power of two (``2^k * {1, 1.25, 1.5, 1.75}``),
+    so a request wastes at most 25 % of its buffer
+  - leases: ``acquire(nbytes)`` returns a reference-counted ``HostLease``;
+    the buffer goes back to its class free list when the count drops to 0.
+    ``release(event)`` defers reuse until a CUDA event has completed, for
+    copies still in flight
+  - cap: pooled bytes (leased + cached) never exceed ``cap_bytes``; free
+    buffers are trimmed to make room, and a request that still does not
+    fit gets an unpooled, unpinned buffer (counted as ``overflow``)
+
+A free buffer is only handed out again once no tensor view of it is alive
+(checked through the storage use count), so a released lease never
+aliases data a caller still holds. ``empty()`` / ``copy_to_host()`` tie
+the lease to the lifetime of the returned tensor, for host copies that
+are kept (HMM L3 residents, offloaded KV pages).
+
+Without CUDA the arena does not pin and degrades to a plain reusable
+buffer pool with the same accounting.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("host_arena")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.host_arena")
+
+MIN_CLASS = 4096
+_SUBCLASSES = 4
+
+
+def size_class(nbytes: int, min_class: int = MIN_CLASS) -> int:
+    """Smallest class size >= ``nbytes`` (four classes per power of two)."""
+    n = max(int(nbytes), min_class)
+    top = 1 << (n - 1).bit_length()          # next power of two >= n
+    if top <= min_class:
+        return top
+    base = top >> 1
+    step = base // _SUBCLASSES
+    return base + -(-(n - base) // step) * step
+
+
+def _storage_refs(buf: Any) -> int:
+    """Number of tensors sharing ``buf``'s storage (0 if unknown)."""
+    try:
+        return torch._C._storage_Use_Count(buf.untyped_storage()._cdata)
+    except Exception:
+        return 0
+
+
+class _Buffer:
+    __slots__ = ("tensor", "size", "pinned", "base_refs", "event")
+
+    def __init__(self, tensor: Any, size: int, pinned: bool):
+        self.tensor = tensor
+        self.size = size
+        self.pinned = pinned
+        self.base_refs = _storage_refs(tensor)
+        self.event = None
+
+    def reusable(self) -> bool:
+        if self.event is not None:
+            try:
+                if not self.event.query():
+                    return False
+            except Exception:
+                pass
+            self.event = None
+        return _storage_refs(self.tensor) <= self.base_refs
+
+
+class HostLease:
+    """Reference-counted handle on one arena buffer."""
+
+    __slots__ = ("nbytes", "_buf", "_arena", "_refs", "__weakref__")
+
+    def __init__(self, arena: Optional["HostArena"], buf: _Buffer, nbytes: int):
+        self.nbytes = int(nbytes)
+        self._buf = buf
+        self._arena = arena
+        self._refs = 1
+
+    @property
+    def buffer(self) -> Any:
+        """The whole class-sized ``uint8`` buffer."""
+        return self._buf.tensor
+
+    @property
+    def pinned(self) -> bool:
+        return self._buf.pinned
+
+    def view(self, shape: Tuple[int, ...], dtype: Any) -> Any:
+        """Typed view over the first ``nbytes`` of the buffer."""
+        return self._buf.tensor[: self.nbytes].view(dtype).view(shape)
+
+    def retain(self) -> "HostLease":
+        if self._refs <= 0:
+            raise RuntimeError("retain() on a released host lease")
+        self._refs += 1
+        return self
+
+    def release(self, event: Any = None) -> None:
+        """Drop one reference; ``event`` delays reuse until it completes."""
+        if self._refs <= 0:
+            return
+        if event is not None:
+            self._buf.event = event
+        self._refs -= 1
+        if self._refs == 0 and self._arena is not None:
+            self._arena._recycle(self._buf)
+
+    def __enter__(self) -> "HostLease":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class HostArena:
+    """Size-classed pool of (pinned) host staging buffers."""
+
+    def __init__(self, cap_bytes: int = 1 << 30, pin: Optional[bool] = None,
+                 min_class: int = MIN_CLASS):
+        if not _TORCH:
+            raise RuntimeError("HostArena requires torch")
+        self.cap_bytes = int(cap_bytes)
+        self.min_class = int(min_class)
+        if pin is None:
+            pin = torch.cuda.is_available()
+        self.pin = bool(pin)
+        self._lock = threading.Lock()
+        self._free: Dict[int, List[_Buffer]] = {}
+        self._held = 0          # pooled bytes, leased or cached
+        self._cached = 0        # pooled bytes sitting in free lists
+        self._pinned = 0
+        self._stats = {"leases": 0, "reused": 0, "allocated": 0, "overflow": 0,
+                       "trimmed": 0, "busy_skips": 0, "peak_held": 0}
+
+    # --- allocation ---
+    def _alloc(self, size: int) -> _Buffer:
+        if self.pin:
+            try:
+                return _Buffer(torch.empty(size, dtype=torch.uint8, pin_memory=True), size, True)
+            except Exception as e:
+                log.warning(f"Pinned host allocation failed ({e}); arena falls back to pageable")
+                self.pin = False
+        return _Buffer(torch.empty(size, dtype=torch.uint8), size, False)
+
+    def _take_free(self, size: int) -> Optional[_Buffer]:
+        free = self._free.get(size)
+        if not free:
+            return None
+        for i in range(len(free) - 1, -1, -1):
+            if free[i].reusable():
+                return free.pop(i)
+            self._stats["busy_skips"] += 1
+        return None
+
+    def _trim_locked(self, need: int) -> None:
+        """Free cached buffers (largest classes first) until ``need`` bytes fit."""
+        for size in sorted(self._free, reverse=True):
+            free = self._free[size]
+            i = 0
+            while i < len(free) and self._held + need > self.cap_bytes:
+                if free[i].reusable():
+                    buf = free.pop(i)
+                    self._drop(buf)
+                    self._cached -= buf.size
+                    self._stats["trimmed"] += 1
+                else:
+                    i += 1
+            if self._held + need <= self.cap_bytes:
+                return
+
+    def _drop(self, buf: _Buffer) -> None:
+        self._held -= buf.size
+        if buf.pinned:
+            self._pinned -= buf.size
+
+    def acquire(self, nbytes: int) -> HostLease:
+        """Lease a host buffer of at least ``nbytes`` bytes."""
+        size = size_class(nbytes, self.min_class)
+        with self._lock:
+            self._stats["leases"] += 1
+            buf = self._take_free(size)
+            if buf is not None:
+                self._cached -= size
+                self._stats["reused"] += 1
+            else:
+                if self._held + size > self.cap_bytes:
+                    self._trim_locked(size)
+                if self._held + size > self.cap_bytes:
+                    self._stats["overflow"] += 1
+                    buf = _Buffer(torch.empty(max(int(nbytes), 1), dtype=torch.uint8),
+                                  max(int(nbytes), 1), False)
+                    return HostLease(None, buf, nbytes)
+                buf = self._alloc(size)
+                self._held += size
+                if buf.pinned:
+                    self._pinned += size
+                self._stats["allocated"] += 1
+                self._stats["peak_held"] = max(self._stats["peak_held"], self._held)
+        self._publish()
+        return HostLease(self, buf, nbytes)
+
+    def _recycle(self, buf: _Buffer) -> None:
+        with self._lock:
+            if self._held > self.cap_bytes:     # cap lowered while leased
+                self._drop(buf)
+                return
+            self._free.setdefault(buf.size, []).append(buf)
+            self._cached += buf.size
+
+    # --- tensor helpers ---
+    def empty(self, shape: Tuple[int, ...], dtype: Any) -> Any:
+        """Host tensor backed by the arena, returned when the tensor dies."""
+        shape = tuple(shape)
+        numel = 1
+        for d in shape:
+            numel *= int(d)
+        itemsize = getattr(dtype, "itemsize", None) or torch.empty((), dtype=dtype).element_size()
+        nbytes = numel * itemsize
+        lease = self.acquire(nbytes)
+        out = lease.view(shape, dtype)
+        weakref.finalize(out, lease.release)
+        return out
+
+    def copy_to_host(self, src: Any, stream: Any = None) -> Any:
+        """Copy ``src`` into an arena-backed host tensor (see ``empty``).
+
+        With a CUDA ``stream`` the copy is issued on it and only that
+        stream is synchronised.
+        """
+        host = self.empty(src.shape, src.dtype)
+        if stream is not None and getattr(src, "is_cuda", False):
+            with torch.cuda.stream(stream):
+                host.copy_(src, non_blocking=True)
+            stream.synchronize()
+        else:
+            host.copy_(src)
+        return host
+
+    # --- maintenance / reporting ---
+    def trim(self, keep_bytes: int = 0) -> int:
+        """Release cached buffers until at most ``keep_bytes`` stay cached."""
+        freed = 0
+        with self._lock:
+            for size in sorted(self._free, reverse=True):
+                free = self._free[size]
+                i = 0
+                while i < len(free) and self._cached > keep_bytes:
+                    if free[i].reusable():
+                        buf = free.pop(i)
+                        self._drop(buf)
+                        self._cached -= buf.size
+                        freed += buf.size
+                        self._stats["trimmed"] += 1
+                    else:
+                        i += 1
+        self._publish()
+        return freed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            s.update(cap_bytes=self.cap_bytes, pinned=self.pin,
+                     bytes_held=self._held, bytes_cached=self._cached,
+                     bytes_leased=self._held - self._cached,
+                     bytes_pinned=self._pinned)
+        s["reuse_rate"] = round(s["reused"] / s["leases"], 4) if s["leases"] else 0.0
+        return s
+
+    def _publish(self) -> None:
+        try:
+            from core.metrics import HOST_ARENA_BYTES_PINNED, HOST_ARENA_REUSE_RATE
+        except Exception:
+            return
+        HOST_ARENA_BYTES_PINNED.set(self._pinned)
+        leases = self._stats["leases"]
+        HOST_ARENA_REUSE_RATE.set(self._stats["reused"] / leases if leases else 0.0)
+
+
+_ARENA: Optional[HostArena] = None
+_ARENA_LOCK = threading.Lock()
+
+
+def get_host_arena() -> HostArena:
+    """Process-wide arena (cap ``VRM_HOST_ARENA_MB``, pinning ``VRM_HOST_ARENA_PIN``)."""
+    global _ARENA
+    if _ARENA is None:
+        with _ARENA_LOCK:
+            if _ARENA is None:
+                cap_mb = float(os.environ.get("VRM_HOST_ARENA_MB", "1024"))
+                pin = os.environ.get("VRM_HOST_ARENA_PIN", "1") != "0"
+                _ARENA = HostArena(cap_bytes=int(cap_mb * 1024 * 1024),
+                                   pin=pin and torch.cuda.is_available())
+    return _ARENA
+
+
+__all__ = ["HostArena", "HostLease", "get_host_arena", "size_class"]
@@ -25,6 +25,7 @@ Usage:
 
 from __future__ import annotations
 
+import dataclasses
 import os
 import sys
 import time
@@ -127,6 +128,7 @@ class InferencePipeline:
         self._lora: Optional[Any] = None  # LoraManager (lazy, S5 hot-swap)
         self.cuda_graph_runner: Optional[Any] = None  # CUDA Graph for decode steps
         self.tp_model: Optional[Any] = None  # Tensor Parallel model wrapper
+        self.weight_streamer: Optional[Any] = None  # WeightStreamer (weight_streaming mode)
         self._turboquant_cache_factory: Optional[Any] = None  # HF-native TurboQuant cache
 
         # T7.6 auto-heal state — survives across requests for the lifetime
@@ -140,6 +142,14 @@ class InferencePipeline:
         self._rebalancing = False
         self._rebalance_interval = (_flags.REBALANCE_INTERVAL if _flags else float(os.environ.get("VRM_REBALANCE_INTERVAL", "5.0")))
 
+        # Online re-placement (enable_online_placement): proposals from live
+        # per-layer timings, applied between requests
+        self.online_rebalancer: Optional[Any] = None
+        self._pending_replacement: Optional[Any] = None
+        self._request_gate = threading.Condition()
+        self._active_requests = 0
+        self._migrating = False
+
         # Model info
         self.model_name: Optional[str] = None
         self.num_gpus: int = 0
@@ -164,6 +174,7 @@ class InferencePipeline:
         self,
         model_name: str,
         num_gpus: Optional[int] = None,
+        weight_streaming: Optional[bool] = None,
         **model_kwargs,
     ) -> "InferencePipeline":
         """Load a model and prepare for inference.
@@ -174,6 +185,10 @@ class InferencePipeline:
             HuggingFace model name, or model identifier for vLLM/Ollama.
         num_gpus : int, optional
             Number of GPUs to use. Auto-detected if None.
+        weight_streaming : bool, optional
+            Keep N decoder layers resident on the compute GPU and stream
+            the rest through two staging slots (HuggingFace backend only).
+            Defaults to ``VRM_WEIGHT_STREAMING``.
         **model_kwargs
             Additional kwargs passed to the backend's load_model().
 
@@ -271,6 +286,17 @@ class InferencePipeline:
                     setattr(self.backend, '_estimated_model_size_bytes',
                             int(_est_gb * (1024 ** 3)))
 
+            # 4c. Weight streaming: the backend loads on CPU, placement
+            # happens in step 5c.
+            if weight_streaming is None:
+                weight_streaming = (_flags.WEIGHT_STREAMING if _flags
+                                    else os.environ.get("VRM_WEIGHT_STREAMING", "") in ("1", "true", "yes"))
+            _streaming = bool(weight_streaming) and _backend_type_for_pool == 'huggingface'
+            if weight_streaming and not _streaming:
+                _logger.warning("Weight streaming not supported on %s backend — ignored",
+                                _backend_type_for_pool)
+            setattr(self.backend, '_weight_streaming', _streaming)
+
             # 5. Load model via backend, with T7.6 auto-heal load-time
             # OOM recovery ladder:
             #   (c) retry once with +10% extra VRAM reserve margin per GPU
@@ -336,6 +362,10 @@ class InferencePipeline:
                     except Exception as e:
                         _logger.debug("Pool update_gpu_usage(%d) failed: %s", i, e)
 
+            # 5c. Weight streaming placement (resident layers + staging slots)
+            if _streaming:
+                self._init_weight_streaming()
+
             # 6. Inject transfer manager into backend for multi-GPU activation transfer
             if hasattr(self.backend, 'transfer_manager'):
                 self.backend.transfer_manager = self.transfer_manager
@@ -349,7 +379,7 @@ class InferencePipeline:
             # which shards weights across GPUs and uses NCCL all-reduce.
             # Default: "pp" (pipeline parallelism via model_splitter).
             _parallel_mode = (_flags.PARALLEL_MODE if _flags else os.environ.get("VRM_PARALLEL_MODE", "pp").lower())
-            if self.num_gpus > 1 and _parallel_mode == "tp":
+            if self.num_gpus > 1 and _parallel_mode == "tp" and self.weight_streamer is None:
                 try:
                     from core.tensor_parallel import apply_tensor_parallel
                     model = getattr(self.backend, "model", None)
@@ -367,7 +397,7 @@ class InferencePipeline:
                     self.tp_model = None
 
             # 7. Split model across GPUs (only in PP mode, skip if TP)
-            if self.num_gpus > 1 and self.tp_model is None:
+            if self.num_gpus > 1 and self.tp_model is None and self.weight_streamer is None:
                 try:
                     self.blocks = self.backend.split_model(self.num_gpus)
                     _logger.info("Model split into %d blocks", len(self.blocks))
@@ -533,6 +563,25 @@ class InferencePipeline:
         str
             Generated text.
         """
+        self._enter_request()
+        try:
+            return self._generate(prompt, max_new_tokens, temperature, top_p, top_k,
+                                  enable_speculative, draft_model_callable, **kwargs)
+        finally:
+            self._exit_request()
+
+    def _generate(
+        self,
+        prompt: str,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        top_k: int,
+        enable_speculative: bool,
+        draft_model_callable,
+        **kwargs,
+    ) -> str:
+        """Body of ``generate`` (which tracks requests in flight)."""
         self._ensure_loaded()
 
         # T7.6 auto-heal (point b): a prior generation-time OOM persistently
@@ -594,7 +643,7 @@ class InferencePipeline:
                 # --- Speculative Decoding ---
                 if enable_speculative:
                     from core.speculative_decoding import (
-                        SwarmSpeculativeDecoder, create_draft_callable,
+                        CachedCausalLM, SwarmSpeculativeDecoder, create_draft_callable,
                     )
                     # Auto-create draft callable from backend if not provided
                     _draft = draft_model_callable
@@ -606,9 +655,14 @@ class InferencePipeline:
                             main_model_name=self.model_name,
                         )
                     if _draft is not None:
+                        # KV-cached verifier when the backend exposes an HF
+                        # model; otherwise full-sequence infer() per round.
+                        _hf = getattr(self.backend, "model", None)
+                        _verify = (CachedCausalLM(_hf) if hasattr(_hf, "config")
+                                   else self.infer)
                         decoder = SwarmSpeculativeDecoder(
                             draft_model_callable=_draft,
-                            swarm_verify_callable=self.infer,
+                            swarm_verify_callable=_verify,
                             gamma=(_flags.SPEC_GAMMA if _flags else int(os.environ.get("VRM_SPEC_GAMMA", "5"))),
                             temperature=temperature,
                             adaptive=(_flags.SPEC_ADAPTIVE if _flags else os.environ.get("VRM_SPEC_ADAPTIVE", "1") != "0"),
@@ -702,7 +756,13 @@ class InferencePipeline:
             Model output (logits or hidden states).
         """
         self._ensure_loaded()
+        self._enter_request()
+        try:
+            return self._infer(input_ids)
+        finally:
+            self._exit_request()
 
+    def _infer(self, input_ids: Any) -> Any:
         if _METRICS:
             INFER_REQUESTS.inc()
 
@@ -900,6 +960,46 @@ class InferencePipeline:
         except Exception as e:
             _logger.warning("Fault tolerance init failed: %s", e)
 
+    def _init_weight_streaming(self) -> None:
+        """Place the loaded model for layer-weight streaming.
+
+        The compute GPU holds the non-layer modules, N resident decoder
+        layers (``VRM_STREAM_RESIDENT_LAYERS``, sized from free VRAM by
+        default) and two staging slots. The remaining layers stream in
+        model order from pinned host memory or from ``VRM_STREAM_SOURCE``
+        (e.g. ``cuda:1``, as in ``benchmarks/poc_tiering_offload_gpu1.py``).
+        """
+        model = getattr(self.backend, 'model', None)
+        if model is None or isinstance(model, str):
+            return
+        if not (_TORCH and torch.cuda.is_available()):
+            _logger.info("Weight streaming requested without CUDA — model stays on CPU")
+            return
+
+        resident = (_flags.STREAM_RESIDENT_LAYERS if _flags
+                    else int(os.environ.get("VRM_STREAM_RESIDENT_LAYERS", "-1")))
+        source = (_flags.STREAM_SOURCE if _flags
+                  else os.environ.get("VRM_STREAM_SOURCE", "cpu"))
+        # Compute on the GPU with the most free memory that is not the source
+        candidates = [i for i in range(torch.cuda.device_count())
+                      if source != f"cuda:{i}"]
+        if not candidates:
+            _logger.warning("Weight streaming: no compute GPU besides source %s", source)
+            return
+        compute = max(candidates, key=lambda i: torch.cuda.mem_get_info(i)[0])
+
+        try:
+            from core.weight_streaming import enable_weight_streaming
+            self.weight_streamer = enable_weight_streaming(
+                model,
+                device=f"cuda:{compute}",
+                source=source,
+                resident_layers=None if resident < 0 else resident,
+            )
+        except Exception as e:
+            _logger.warning("Weight streaming init failed: %s", e)
+            self.weight_streamer = None
+
     def _init_turbo_engine(self) -> None:
         """Initialize TurboEngine for compiled decode (~2x speedup).
 
@@ -916,6 +1016,9 @@ class InferencePipeline:
         if backend_type in ('vllm', 'ollama', 'llamacpp'):
             _logger.debug("TurboEngine skipped for %s backend", backend_type)
             return
+        if self.weight_streamer is not None:
+            _logger.debug("TurboEngine skipped under weight streaming")
+            return
 
         model = getattr(self.backend, 'model', None)
         tokenizer = getattr(self.backend, 'tokenizer', None)
@@ -956,6 +1059,8 @@ class InferencePipeline:
         backend_type = getattr(self.backend, 'backend_type', 'huggingface')
         if backend_type in ('vllm', 'ollama', 'llamacpp'):
             return  # these backends manage their own graphs
+        if self.weight_streamer is not None:
+            return  # streaming hooks rebind weights between replays
 
         model = getattr(self.backend, 'model', None)
         if model is None:
@@ -963,47 +1068,62 @@ class InferencePipeline:
 
         try:
             from core.cuda_graph_decode import CUDAGraphRunner
-            self.cuda_graph_runner = CUDAGraphRunner(
-                model=model,
-                max_cache_entries=(_flags.CUDA_GRAPH_CACHE if _flags else int(os.environ.get("VRM_CUDA_GRAPH_CACHE", "4"))),
-                warmup_steps=(_flags.CUDA_GRAPH_WARMUP if _flags else int(os.environ.get("VRM_CUDA_GRAPH_WARMUP", "3"))),
-            )
-            _logger.info("CUDA Graph runner initialized (opt-in, %d cache slots)",
-                         self.cuda_graph_runner.max_cache_entries)
+            buckets = (_flags.CUDA_GRAPH_BUCKETS if _flags else tuple(
+                int(b) for b in os.environ.get("VRM_CUDA_GRAPH_BUCKETS", "1,2,4,8,16,32,64").split(",")
+                if b.strip()))
+
+            def make_runner():
+                return CUDAGraphRunner(
+                    model=model,
+                    max_cache_entries=(_flags.CUDA_GRAPH_CACHE if _flags else int(os.environ.get("VRM_CUDA_GRAPH_CACHE", "4"))),
+                    warmup_steps=(_flags.CUDA_GRAPH_WARMUP if _flags else int(os.environ.get("VRM_CUDA_GRAPH_WARMUP", "3"))),
+                    max_seq_len=(_flags.TURBO_MAX_SEQ if _flags else int(os.environ.get("VRM_TURBO_MAX_SEQ", "2048"))),
+                    buckets=buckets,
+                )
+
+            self.cuda_graph_runner = make_runner()
+            _logger.info("CUDA Graph runner initialized (opt-in, %d cache slots, buckets=%s)",
+                         self.cuda_graph_runner.max_cache_entries, buckets)
+
+            # The continuous batcher gets its own runner: its graphs read a
+            # slot-based StaticKVCache, not the single-sequence decode state
+            batcher = self.continuous_batcher
+            if batcher is not None and batcher.draft_model is None:
+                batcher.cuda_graph_runner = make_runner()
         except Exception as e:
             _logger.warning("CUDA Graph runner init failed: %s", e)
             self.cuda_graph_runner = None
 
-    def _migrate_blocks(self, source_gpu: int, target_gpu: int) -> int:
+    def _migrate_blocks(self, source_gpu: int, target_gpu: int,
+                        block_indices: Optional[List[int]] = None) -> int:
         """Migrate model blocks from a failed GPU to a healthy one.
 
-        Called by GPUFaultManager when a GPU is isolated.
+        Called by GPUFaultManager when a GPU is isolated, and by online
+        re-placement with ``block_indices`` to move only some blocks.
+        Module blocks (what ``split_model`` returns) are moved with
+        ``.to()``; tensor-like blocks go through the TransferManager.
         Returns the number of blocks successfully migrated.
         """
         migrated = 0
-        if not self.transfer_manager:
-            return migrated
-
         for idx, block in enumerate(self.blocks):
-            block_gpu = getattr(block, 'gpu_id', None)
-            if block_gpu is None and isinstance(block, dict):
-                block_gpu = block.get('gpu_id')
-            if block_gpu != source_gpu:
+            if block_indices is not None and idx not in block_indices:
+                continue
+            if self._block_gpu(block) != source_gpu:
                 continue
 
             try:
-                # Use TransferManager for the actual data transfer
-                if _TORCH and hasattr(block, 'data'):
+                if _TORCH and isinstance(block, torch.nn.Module):
+                    block.to(self._gpu_device(target_gpu))
+                elif _TORCH and hasattr(block, 'data'):
+                    # Use TransferManager for the actual data transfer
+                    if not self.transfer_manager:
+                        raise RuntimeError("no TransferManager")
                     self.transfer_manager.transfer(
                         tensor=block.data,
                         src_device=source_gpu,
                         dst_device=target_gpu,
                     )
-                # Update block assignment
-                if hasattr(block, 'gpu_id'):
-                    block.gpu_id = target_gpu
-                elif isinstance(block, dict):
-                    block['gpu_id'] = target_gpu
+                self._set_block_gpu(idx, target_gpu)
 
                 migrated += 1
                 _logger.info(
@@ -1018,16 +1138,35 @@ class InferencePipeline:
 
         # Update fault manager block registry
         if self.fault_manager and _FAULT_TOLERANCE:
-            new_blocks = [
-                idx for idx, b in enumerate(self.blocks)
-                if getattr(b, 'gpu_id', None) == target_gpu
-                or (isinstance(b, dict) and b.get('gpu_id') == target_gpu)
-            ]
-            self.fault_manager.register_blocks(target_gpu, new_blocks)
-            self.fault_manager.register_blocks(source_gpu, [])
+            for gpu in (target_gpu, source_gpu):
+                self.fault_manager.register_blocks(gpu, [
+                    idx for idx, b in enumerate(self.blocks) if self._block_gpu(b) == gpu
+                ])
 
         return migrated
 
+    @staticmethod
+    def _block_gpu(block: Any) -> Optional[int]:
+        gpu = getattr(block, 'gpu_id', None)
+        if gpu is None and isinstance(block, dict):
+            gpu = block.get('gpu_id')
+        return gpu
+
+    def _set_block_gpu(self, idx: int, gpu: int) -> None:
+        """Record block *idx* on *gpu* (block attribute and backend device map)."""
+        block = self.blocks[idx]
+        if isinstance(block, dict):
+            block['gpu_id'] = gpu
+        else:
+            block.gpu_id = gpu
+        devices = getattr(self.backend, 'block_devices', None)
+        if devices is not None and idx < len(devices):
+            devices[idx] = gpu
+
+    @staticmethod
+    def _gpu_device(gpu: int) -> str:
+        return f"cuda:{gpu}" if _TORCH and torch.cuda.is_available() else "cpu"
+
     def _on_gpu_failure(self, gpu_id: int, fault_type: "FaultType") -> None:
         """Callback when a GPU fails — trigger emergency rebalance."""
         _logger.error(
@@ -1146,7 +1285,12 @@ class InferencePipeline:
             "paged_kv_cache": self.paged_kv is not None,
             "fault_tolerance": self.fault_manager is not None,
             "tensor_parallel": self.tp_model is not None,
+            "online_placement": self.online_rebalancer is not None,
             "parallel_mode": "tp" if self.tp_model is not None else "pp",
+            "weight_streaming": (
+                self.weight_streamer.stats()
+                if self.weight_streamer else None
+            ),
             "degraded": self.degraded,
             "degraded_reason": self.degraded_reason,
             "max_new_tokens_scale": self._max_new_tokens_scale,
@@ -1365,11 +1509,13 @@ class InferencePipeline:
         """Start background GPU rebalancing loop.
 
         Periodically checks for overloaded GPUs and migrates blocks
-        to underutilized ones via the StreamManager.
+        to underutilized ones via the StreamManager, and — once
+        ``enable_online_placement`` was called — re-solves the placement
+        from live per-layer timings.
         """
         if self._rebalancing:
             return
-        if not self.stream_manager or not self.monitor:
+        if (not self.stream_manager or not self.monitor) and self.online_rebalancer is None:
             _logger.debug("Rebalancing requires stream_manager and monitor")
             return
 
@@ -1406,10 +1552,113 @@ class InferencePipeline:
                             _logger.info("Rebalance: block migrated from GPU %d", overloaded)
                         else:
                             _logger.debug("Rebalance: no eligible block to swap")
+                if self.online_rebalancer is not None:
+                    self.check_online_placement()
             except Exception as exc:
                 _logger.debug("Rebalance loop error: %s", exc)
             time.sleep(interval)
 
+    # ------------------------------------------------------------------
+    # Online re-placement
+    # ------------------------------------------------------------------
+
+    def enable_online_placement(
+        self,
+        layer_profiles: List[Any],
+        gpu_profiles: List[Any],
+        plan: Any,
+        layers: Optional[List[Any]] = None,
+        **rebalancer_kwargs,
+    ) -> Any:
+        """Re-place blocks at runtime from live per-layer timings.
+
+        ``layer_profiles`` / ``plan`` describe ``self.blocks`` (one profile
+        per block, in order) and the placement they run with. Forward
+        timings come from hooks on ``layers`` (defaults to the blocks when
+        they are modules) or from ``online_rebalancer.timer.record``.
+        Proposals are computed by the rebalancing loop and migrated with
+        ``_migrate_blocks`` when no request is in flight (``generate``,
+        ``infer``, or a continuous batcher with active requests).
+        Each block's GPU is seeded from ``plan``.
+        """
+        from core.online_placement import LayerTimer, OnlineRebalancer
+        if len(plan.assignments) != len(self.blocks):
+            raise ValueError(f"plan places {len(plan.assignments)} layers, "
+                             f"pipeline has {len(self.blocks)} blocks")
+        for idx, gpu in plan.assignments:
+            self._set_block_gpu(idx, gpu)
+        timer = LayerTimer()
+        modules = layers if layers is not None else [
+            b for b in self.blocks if hasattr(b, 'register_forward_hook')]
+        if modules and len(modules) == len(layer_profiles):
+            timer.attach(modules)
+        self.online_rebalancer = OnlineRebalancer(
+            layer_profiles, gpu_profiles, plan, timer=timer, **rebalancer_kwargs)
+        return self.online_rebalancer
+
+    def check_online_placement(self) -> bool:
+        """Queue a worthwhile re-placement and apply it if the pipeline is idle."""
+        if self.online_rebalancer is None:
+            return False
+        if self._pending_replacement is None:
+            self._pending_replacement = self.online_rebalancer.propose()
+        return self._apply_pending_replacement()
+
+    def _enter_request(self) -> None:
+        """Count a forward in flight; waits while blocks are being migrated."""
+        with self._request_gate:
+            while self._migrating:
+                self._request_gate.wait()
+            self._active_requests += 1
+
+    def _exit_request(self) -> None:
+        with self._request_gate:
+            self._active_requests -= 1
+        if self._pending_replacement is not None:
+            self._apply_pending_replacement()
+
+    def _batcher_busy(self, busy: bool) -> None:
+        """Continuous batcher callback: in flight from its first admitted
+        request until its batch drains (its KV caches live on the blocks'
+        devices, so blocks only move once it is idle)."""
+        if busy:
+            self._enter_request()
+        else:
+            self._exit_request()
+
+    def _apply_pending_replacement(self) -> bool:
+        """Migrate the queued re-placement between requests."""
+        with self._request_gate:
+            proposal = self._pending_replacement
+            if proposal is None or self._active_requests or self._migrating:
+                return False
+            self._migrating = True
+            self._pending_replacement = None
+        try:
+            by_route: Dict[tuple, List[int]] = {}
+            for block_idx, src, dst in proposal.moves:
+                by_route.setdefault((src, dst), []).append(block_idx)
+            migrated = sum(self._migrate_blocks(src, dst, block_indices=idxs)
+                           for (src, dst), idxs in by_route.items())
+            if migrated == len(proposal.moves):
+                self.online_rebalancer.commit(proposal)
+                _logger.info("Online re-placement applied: %d blocks moved "
+                             "(%.2f -> %.2f ms/request)", migrated,
+                             proposal.current_ms, proposal.new_ms)
+                return True
+            # Partial migration: continue from where the blocks actually are
+            plan = dataclasses.replace(
+                self.online_rebalancer.plan,
+                assignments=[(i, self._block_gpu(b)) for i, b in enumerate(self.blocks)])
+            self.online_rebalancer.commit(proposal, plan=plan)
+            _logger.warning("Online re-placement incomplete: %d/%d blocks moved",
+                            migrated, len(proposal.moves))
+            return False
+        finally:
+            with self._request_gate:
+                self._migrating = False
+                self._request_gate.notify_all()
+
     def _setup_gpu_hotplug(self) -> None:
         """Initialize GPU hot-plug monitoring with auto-rebalance."""
         try:
@@ -1571,13 +1820,27 @@ class InferencePipeline:
             model = self.backend.model if self.backend else None
             tokenizer = getattr(self.backend, 'tokenizer', None)
 
+            # Batched speculative decoding: each request drafts from its own
+            # KV-cached copy of the draft model
+            draft = None
+            if (_flags.BATCH_SPECULATIVE if _flags
+                    else os.environ.get("VRM_BATCH_SPECULATIVE", "0") == "1"):
+                from core.speculative_decoding import create_draft_callable
+                draft = create_draft_callable(
+                    self.backend,
+                    draft_model_name=(_flags.DRAFT_MODEL if _flags else os.environ.get("VRM_DRAFT_MODEL")),
+                    main_model_name=self.model_name,
+                )
+
             self.continuous_batcher = ContinuousBatcher(
                 model=model,
                 tokenizer=tokenizer,
                 max_batch_size=(_flags.MAX_BATCH_SIZE if _flags else int(os.environ.get("VRM_MAX_BATCH_SIZE", "32"))),
                 device=self._detect_device(),
                 paged_kv_manager=self.paged_kv,
+                draft_model_callable=draft,
             )
+            self.continuous_batcher.busy_callback = self._batcher_busy
             # Don't auto-start — only start on first submit or explicit call.
             # NOTE: auto-start via generate() was tested in V5 P1 but caused
             # 300s timeouts due to batcher incompatibility with transformers 5.x
@@ -1875,6 +2138,13 @@ class InferencePipeline:
             except Exception as e:
                 _logger.debug(f"Exception silencieuse dans l'exécution: {e}", exc_info=True)
 
+        if self.weight_streamer is not None:
+            try:
+                self.weight_streamer.close()
+            except Exception as e:
+                _logger.debug(f"Exception silencieuse dans l'exécution: {e}", exc_info=True)
+            self.weight_streamer = None
+
         # Shutdown VRAM lending pool
         if self.lending_pool:
             try:
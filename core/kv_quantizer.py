@@ -176,20 +176,22 @@ class BatchedCompressedRef(dict):
             self._resolve()
         return super().items()
 
-try:
-    from core.triton_kv_quant import TritonKVCompressOps, HAS_TORCH as _TKV_TORCH
-    if _TKV_TORCH:
-        _PYTORCH_GPU_OPS = TritonKVCompressOps
-except ImportError:
-    pass
-
-
 def _resolve_gpu_ops():
-    """Lazy resolution: try CUDA fused kernel first, fall back to PyTorch GPU ops."""
-    global _GPU_OPS, _GPU_OPS_RESOLVED
+    """Lazy resolution: try CUDA fused kernel first, fall back to PyTorch GPU ops.
+
+    Both candidates (and the Triton probe behind them) are imported here,
+    on the first compress, rather than when this module is imported.
+    """
+    global _GPU_OPS, _GPU_OPS_RESOLVED, _PYTORCH_GPU_OPS
     if _GPU_OPS_RESOLVED:
         return _GPU_OPS
     _GPU_OPS_RESOLVED = True
+    try:
+        from core.triton_kv_quant import TritonKVCompressOps, HAS_TORCH as _TKV_TORCH
+        if _TKV_TORCH:
+            _PYTORCH_GPU_OPS = TritonKVCompressOps
+    except ImportError:
+        pass
     try:
         from core.turboquant_cuda import CUDATurboQuantOps, has_cuda_turboquant
         if has_cuda_turboquant():
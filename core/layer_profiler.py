@@ -17,9 +17,12 @@ from __future__ import annotations
 
 import os
 import time
+import bisect
+import heapq
 import logging
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 _logger = logging.getLogger("vramancer.layer_profiler")
 
@@ -110,7 +113,10 @@ def detect_pcie_bandwidth() -> float:
     """Return cached inter-GPU PCIe bandwidth in GB/s."""
     global _CACHED_PCIE_BW
     if _CACHED_PCIE_BW is None:
-        _CACHED_PCIE_BW = _detect_pcie_bandwidth_gbps()
+        from core.placement_cache import get_placement_cache
+        cache = get_placement_cache()
+        _CACHED_PCIE_BW = cache.cached("pcie_bw", cache.fingerprint(),
+                                       _detect_pcie_bandwidth_gbps, float)
     return _CACHED_PCIE_BW
 
 # Lazy import to avoid circular dependency with model_splitter
@@ -173,6 +179,11 @@ class PlacementPlan:
     estimated_transfer_overhead_ms: float = 0.0
     gpu_utilization: Dict[int, float] = field(default_factory=dict)
     # Per-GPU estimated VRAM usage ratio
+    estimated_bottleneck_ms: float = 0.0
+    # Slowest pipeline stage (stage compute + incoming transfer)
+    objective: str = "latency"
+    gpu_memory_mb: Dict[int, float] = field(default_factory=dict)
+    # Per-device memory the plan places there (layers + per-layer KV), MB
 
 
 # ---------------------------------------------------------------
@@ -231,6 +242,19 @@ class LayerProfiler:
                 "mps" if backend == "mps" else "cpu"
             )
 
+        from core.placement_cache import (
+            decode_layer_profiles, get_placement_cache, model_fingerprint,
+        )
+        cache = get_placement_cache()
+        fp = cache.fingerprint(
+            model_fingerprint(model, dtype=self.dtype), device=str(device),
+            batch_size=self.batch_size, seq_length=self.seq_length,
+        )
+        return cache.cached("layer_profiles", fp,
+                            lambda: self._profile_layers(model, device),
+                            decode_layer_profiles)
+
+    def _profile_layers(self, model: Any, device: str) -> List[LayerProfile]:
         layers = _get_extract_layers()(model) if _get_extract_layers() else None
         if layers is None:
             # Try to get all children as layers
@@ -449,6 +473,24 @@ class LayerProfiler:
                                compute_throughput_gflops=100.0,
                                memory_bandwidth_gbps=400.0)]
 
+        # Benchmarks are cached per hardware fingerprint; free VRAM is not
+        from core.placement_cache import decode_gpu_profiles, get_placement_cache
+        cache = get_placement_cache()
+        profiles = cache.cached("gpu_profiles", cache.fingerprint(),
+                                self._benchmark_gpus, decode_gpu_profiles)
+        for gp in profiles:
+            if gp.backend == "cpu":
+                continue
+            try:
+                if torch.cuda.is_available() and gp.index < torch.cuda.device_count():
+                    # Driver view: includes other processes and lenders
+                    free_bytes, _ = torch.cuda.mem_get_info(gp.index)
+                    gp.free_vram_mb = free_bytes // (1024 * 1024)
+            except Exception:
+                gp.free_vram_mb = gp.total_vram_mb
+        return profiles
+
+    def _benchmark_gpus(self) -> List[GPUProfile]:
         devices = enumerate_devices()
         profiles = []
 
@@ -473,14 +515,6 @@ class LayerProfiler:
                 total_vram_mb=total_mem // (1024 * 1024) if total_mem else 0,
             )
 
-            # Measure free VRAM
-            try:
-                if torch.cuda.is_available() and idx < torch.cuda.device_count():
-                    allocated = torch.cuda.memory_allocated(idx)
-                    gp.free_vram_mb = (total_mem - allocated) // (1024 * 1024)
-            except Exception:
-                gp.free_vram_mb = gp.total_vram_mb
-
             # Benchmark compute throughput
             gp.compute_throughput_gflops = self._benchmark_gpu_gflops(idx)
             gp.memory_bandwidth_gbps = self._benchmark_gpu_bandwidth(idx)
@@ -609,139 +643,357 @@ class LayerProfiler:
 # Optimal placement solver
 # ---------------------------------------------------------------
 
+def _layer_cost_ms(lp: LayerProfile, gp: GPUProfile, speed: float) -> float:
+    """Latency of one layer on one device, scaled from the profiled latency."""
+    cost = lp.latency_ms / max(speed, 0.01)
+    if gp.backend == "nvme" and gp.memory_bandwidth_gbps > 0:
+        # NVMe tier: the layer's weights are read back on every forward
+        cost += lp.param_memory_mb / 1024 / gp.memory_bandwidth_gbps * 1000
+    return cost
+
+
+def _partition_tables(
+    layer_profiles: List[LayerProfile],
+    devices: List[GPUProfile],
+    transfer_bandwidth_gbps: float,
+    kv_reserve_mb: Union[float, Dict[int, float]],
+    kv_mb_per_layer: float,
+) -> Dict[str, Any]:
+    """Prefix sums shared by the contiguous-partition solvers.
+
+    ``cost[d][k]``: latency of layers ``0..k-1`` on device ``d``;
+    ``xfer[i]``: activation transfer into layer ``i`` from another device;
+    ``lo[d][k]``: first layer a segment ending at ``k`` can start at
+    without exceeding device ``d``'s memory (``k`` if layer ``k-1`` alone
+    does not fit).
+    """
+    n_layers = len(layer_profiles)
+    max_gflops = max(gp.compute_throughput_gflops for gp in devices) or 1.0
+    cost = []
+    for gp in devices:
+        speed = (gp.compute_throughput_gflops / max_gflops) if gp.compute_throughput_gflops > 0 else 0.1
+        row = [0.0]
+        for lp in layer_profiles:
+            row.append(row[-1] + _layer_cost_ms(lp, gp, speed))
+        cost.append(row)
+
+    xfer = [0.0] * (n_layers + 1)
+    if transfer_bandwidth_gbps > 0:
+        for i in range(1, n_layers):
+            act_bytes = layer_profiles[i - 1].activation_memory_mb * 1024 * 1024
+            xfer[i] = act_bytes * 8 / (transfer_bandwidth_gbps * 1e9) * 1000
+
+    mem = [0.0]
+    for lp in layer_profiles:
+        mem.append(mem[-1] + lp.total_memory_mb + kv_mb_per_layer)
+    lo = []
+    for gp in devices:
+        reserve = (kv_reserve_mb.get(gp.index, 0.0) if isinstance(kv_reserve_mb, dict)
+                   else kv_reserve_mb)
+        cap = float(gp.free_vram_mb) - reserve
+        row, i = [0] * (n_layers + 1), 0
+        for k in range(1, n_layers + 1):
+            while i < k and mem[k] - mem[i] > cap + 1e-9:
+                i += 1
+            row[k] = i
+        lo.append(row)
+    return {"cost": cost, "xfer": xfer, "lo": lo, "mem": mem}
+
+
+def _solve_min_latency(
+    tables: Dict[str, Any],
+    n_layers: int,
+    max_stage_ms: float = float("inf"),
+) -> Optional[List[Tuple[int, int, int]]]:
+    """Exact min-sum contiguous partition; segments ``(device, start, end)``.
+
+    ``best[mask][k]`` is the lowest latency of layers ``0..k-1`` split into
+    one segment per device of ``mask`` (any device order). Extending by
+    device ``d`` to end ``k`` is ``min_i best[mask][i] + xfer[i] - cost[d][i]``
+    over the starts ``i`` that are still admissible, plus ``cost[d][k]``.
+    A start stops being admissible once the segment outgrows the device
+    memory (``i < lo[d][k]``) or the stage time exceeds ``max_stage_ms``;
+    both are permanent as ``k`` grows, so a lazily-pruned heap gives the
+    window minimum and the solve is O(2^D * D * L log L).
+    """
+    cost, xfer, lo = tables["cost"], tables["xfer"], tables["lo"]
+    n_dev = len(cost)
+    INF = float("inf")
+    best: Dict[int, List[float]] = {0: [0.0] + [INF] * n_layers}
+    parent: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    for mask in range(1 << n_dev):
+        row = best.get(mask)
+        if row is None or all(v == INF for v in row[:n_layers]):
+            continue
+        for d in range(n_dev):
+            bit = 1 << d
+            if mask & bit:
+                continue
+            c, lo_d = cost[d], lo[d]
+            target = best.setdefault(mask | bit, [INF] * (n_layers + 1))
+            heap: List[Tuple[float, int]] = []
+            for k in range(1, n_layers + 1):
+                i = k - 1
+                if row[i] < INF:
+                    heapq.heappush(heap, (row[i] + xfer[i] - c[i], i))
+                floor = c[k] - max_stage_ms - 1e-9
+                while heap and (heap[0][1] < lo_d[k] or c[heap[0][1]] - xfer[heap[0][1]] < floor):
+                    heapq.heappop(heap)
+                if heap:
+                    total = heap[0][0] + c[k]
+                    if total < target[k] - 1e-12:
+                        target[k] = total
+                        parent[(mask | bit, k)] = (d, heap[0][1])
+
+    finals = [(row[n_layers], bin(mask).count("1"), mask) for mask, row in best.items()
+              if mask and row[n_layers] < INF]
+    if not finals:
+        return None
+    _, _, mask = min(finals)
+    segments, k = [], n_layers
+    while k > 0:
+        d, i = parent[(mask, k)]
+        segments.append((d, i, k))
+        mask ^= 1 << d
+        k = i
+    return segments[::-1]
+
+
+def _bottleneck_feasible(tables: Dict[str, Any], n_layers: int, limit: float) -> bool:
+    """Can every stage (compute + incoming transfer) stay within ``limit`` ms?
+
+    ``reach[mask]`` marks the prefixes coverable with one segment per
+    device of ``mask``. A start ``i`` on device ``d`` reaches every end up
+    to ``expiry[d][i]`` (stage time) inside the memory window, so each
+    transition is a sliding-window maximum of ``expiry``.
+    """
+    cost, xfer, lo = tables["cost"], tables["xfer"], tables["lo"]
+    n_dev = len(cost)
+    expiry = [[bisect.bisect_right(c, c[i] - xfer[i] + limit + 1e-9) - 1
+               for i in range(n_layers + 1)] for c in cost]
+    reach: Dict[int, List[bool]] = {0: [True] + [False] * n_layers}
+    for mask in range(1 << n_dev):
+        row = reach.get(mask)
+        if row is None or not any(row[:n_layers]):
+            continue
+        for d in range(n_dev):
+            bit = 1 << d
+            if mask & bit:
+                continue
+            exp_d, lo_d = expiry[d], lo[d]
+            target = reach.setdefault(mask | bit, [False] * (n_layers + 1))
+            window: deque = deque()
+            for k in range(1, n_layers + 1):
+                i = k - 1
+                if row[i]:
+                    while window and exp_d[window[-1]] <= exp_d[i]:
+                        window.pop()
+                    window.append(i)
+                while window and window[0] < lo_d[k]:
+                    window.popleft()
+                if window and exp_d[window[0]] >= k:
+                    target[k] = True
+            if target[n_layers]:
+                return True
+    return False
+
+
+def _min_bottleneck(tables: Dict[str, Any], n_layers: int) -> Optional[float]:
+    """Smallest achievable max stage time: binary search over stage times."""
+    cost, xfer, lo = tables["cost"], tables["xfer"], tables["lo"]
+    candidates = sorted({c[k] - c[i] + xfer[i]
+                         for c, lo_d in zip(cost, lo)
+                         for k in range(1, n_layers + 1)
+                         for i in range(lo_d[k], k)})
+    if not candidates or not _bottleneck_feasible(tables, n_layers, candidates[-1]):
+        return None
+    lo_i, hi_i = 0, len(candidates) - 1
+    while lo_i < hi_i:
+        mid = (lo_i + hi_i) // 2
+        if _bottleneck_feasible(tables, n_layers, candidates[mid]):
+            hi_i = mid
+        else:
+            lo_i = mid + 1
+    return candidates[lo_i]
+
+
+def _plan_from_segments(
+    segments: List[Tuple[int, int, int]],
+    tables: Dict[str, Any],
+    layer_profiles: List[LayerProfile],
+    devices: List[GPUProfile],
+    objective: str = "latency",
+) -> PlacementPlan:
+    cost, xfer, mem = tables["cost"], tables["xfer"], tables["mem"]
+    assignments: List[Tuple[int, int]] = []
+    compute = transfer = bottleneck = 0.0
+    mem_used: Dict[int, float] = {gp.index: 0.0 for gp in devices}
+    placed: Dict[int, float] = {gp.index: 0.0 for gp in devices}
+    for d, start, end in segments:
+        gp = devices[d]
+        assignments.extend((i, gp.index) for i in range(start, end))
+        stage = cost[d][end] - cost[d][start]
+        compute += stage
+        transfer += xfer[start]
+        bottleneck = max(bottleneck, stage + xfer[start])
+        mem_used[gp.index] += sum(layer_profiles[i].total_memory_mb for i in range(start, end))
+        placed[gp.index] += mem[end] - mem[start]
+    return PlacementPlan(
+        assignments=assignments,
+        estimated_latency_ms=compute + transfer,
+        estimated_transfer_overhead_ms=transfer,
+        gpu_utilization={gp.index: min(mem_used[gp.index] / (gp.total_vram_mb or 1), 1.0)
+                         for gp in devices},
+        estimated_bottleneck_ms=bottleneck,
+        objective=objective,
+        gpu_memory_mb=placed,
+    )
+
+
+def evaluate_placement(
+    assignments: List[Tuple[int, int]],
+    layer_profiles: List[LayerProfile],
+    gpu_profiles: List[GPUProfile],
+    transfer_bandwidth_gbps: float,
+    objective: str = "latency",
+) -> PlacementPlan:
+    """Score an existing assignment with the solver's cost model.
+
+    Used to compare the running placement with a re-solved one when the
+    profiles change (``core.online_placement``). Each run of consecutive
+    layers on one device counts as a stage.
+    """
+    if not assignments:
+        return PlacementPlan(objective=objective)
+    pos = {gp.index: d for d, gp in enumerate(gpu_profiles)}
+    unknown = {g for _, g in assignments} - set(pos)
+    if unknown:
+        raise ValueError(f"assignments use devices {sorted(unknown, key=str)} "
+                         f"that have no GPU profile")
+    tables = _partition_tables(layer_profiles, list(gpu_profiles), transfer_bandwidth_gbps, 0.0, 0.0)
+    segments: List[Tuple[int, int, int]] = []
+    start = 0
+    for i in range(1, len(assignments) + 1):
+        if i == len(assignments) or assignments[i][1] != assignments[start][1]:
+            segments.append((pos[assignments[start][1]], start, i))
+            start = i
+    return _plan_from_segments(segments, tables, layer_profiles, list(gpu_profiles), objective)
+
+
+PLACEMENT_OBJECTIVES = ("latency", "throughput", "combined")
+
+_SERVING_MODE_OBJECTIVES = {
+    "interactive": "latency", "latency": "latency", "single": "latency",
+    "pipeline": "throughput", "throughput": "throughput", "batch": "throughput",
+    "offline": "throughput",
+    "continuous": "combined", "mixed": "combined", "combined": "combined",
+}
+
+
+def placement_objective_for(serving_mode: Optional[str] = None) -> str:
+    """Placement objective for a serving mode.
+
+    ``interactive`` (batch-1 latency) -> ``latency``; ``pipeline`` /
+    ``batch`` (many requests in flight) -> ``throughput``; ``continuous``
+    (continuous batching, latency still matters) -> ``combined``.
+    Defaults to ``VRM_SERVING_MODE``, then ``latency``. Objective names
+    are accepted as modes.
+    """
+    mode = (serving_mode or os.environ.get("VRM_SERVING_MODE", "") or "interactive").strip().lower()
+    if mode not in _SERVING_MODE_OBJECTIVES:
+        raise ValueError(f"Unknown serving mode {mode!r}; "
+                         f"expected one of {sorted(_SERVING_MODE_OBJECTIVES)}")
+    return _SERVING_MODE_OBJECTIVES[mode]
+
+
 def compute_optimal_placement(
     layer_profiles: List[LayerProfile],
     gpu_profiles: List[GPUProfile],
     transfer_bandwidth_gbps: float = 0.0,
+    kv_reserve_mb: Union[float, Dict[int, float]] = 0.0,
+    kv_mb_per_layer: float = 0.0,
+    offload_tiers: Optional[List[GPUProfile]] = None,
+    objective: str = "latency",
+    bottleneck_slack: float = 0.1,
 ) -> PlacementPlan:
-    """Compute optimal layer-to-GPU assignment using dynamic programming.
+    """Compute the optimal layer-to-GPU assignment under memory limits.
 
-    Minimizes total inference latency = sum(layer latency) + transfer overhead.
-    Transfer overhead occurs at GPU boundaries (layers on different GPUs need
-    activation transfer between them).
+    Layers run in model order, so a placement is a contiguous partition:
+    each device receives one run of consecutive layers (or none), in any
+    device order. The solver is exact for that problem under each
+    objective:
+
+      - ``"latency"``: minimize total latency = sum(layer latency on its
+        device) + activation transfers at device boundaries (batch-1)
+      - ``"throughput"``: minimize the slowest pipeline stage (stage
+        compute + incoming transfer), which bounds requests/s when
+        several requests are in flight; ties broken by latency
+      - ``"combined"``: lowest latency among placements whose bottleneck
+        is within ``bottleneck_slack`` of the optimum
 
     The DP considers:
-      - Layer compute cost (latency_ms)
-      - Layer memory footprint (total_memory_mb)
-      - GPU compute throughput (to scale latency)
-      - GPU free VRAM (hard constraint)
+      - Layer compute cost (latency_ms, scaled by GPU throughput)
+      - Layer memory footprint (total_memory_mb) + per-layer KV cache
+      - GPU free VRAM minus a KV reservation (hard constraint)
       - Transfer cost at GPU boundaries
+      - Optional slower tiers (CPU RAM / NVMe) used only when they pay off
+        or when the GPUs are full
+
+    If no partition fits, the unconstrained latency optimum is returned
+    after a greedy VRAM repair (``_enforce_vram_constraints``).
 
     Args:
         layer_profiles: Profiled layers, in model order.
         gpu_profiles: Available GPU profiles.
         transfer_bandwidth_gbps: Inter-GPU bandwidth (measured or estimated).
             If 0 (default), auto-detects via nvidia-smi/pynvml.
+        kv_reserve_mb: VRAM kept free per device for the KV cache, either
+            one value for all devices or ``{gpu_index: mb}``.
+        kv_mb_per_layer: KV cache memory each placed layer needs on its
+            device (e.g. ``2 * kv_heads * head_dim * max_tokens * bytes``).
+        offload_tiers: Extra ``GPUProfile`` entries for host RAM
+            (``backend="cpu"``) or disk (``backend="nvme"``; weights are
+            streamed at ``memory_bandwidth_gbps`` each forward), with
+            ``free_vram_mb`` as their capacity. By convention CPU uses
+            index -1 and NVMe -2.
+        objective: One of ``PLACEMENT_OBJECTIVES`` (see
+            ``placement_objective_for`` to derive it from a serving mode).
+        bottleneck_slack: Allowed relative bottleneck increase for
+            ``"combined"``.
 
     Returns:
         PlacementPlan with optimal assignments.
     """
+    if objective not in PLACEMENT_OBJECTIVES:
+        raise ValueError(f"Unknown placement objective {objective!r}; "
+                         f"expected one of {PLACEMENT_OBJECTIVES}")
     if transfer_bandwidth_gbps <= 0:
         transfer_bandwidth_gbps = detect_pcie_bandwidth()
     n_layers = len(layer_profiles)
-    n_gpus = len(gpu_profiles)
-
-    if n_layers == 0 or n_gpus == 0:
-        return PlacementPlan()
-
-    if n_gpus == 1:
-        return PlacementPlan(
-            assignments=[(i, gpu_profiles[0].index) for i in range(n_layers)],
-            estimated_latency_ms=sum(lp.latency_ms for lp in layer_profiles),
-            gpu_utilization={gpu_profiles[0].index: 1.0},
-        )
-
-    # Compute relative speed factors
-    # Normalize compute throughput: fastest GPU = 1.0
-    max_gflops = max(gp.compute_throughput_gflops for gp in gpu_profiles) or 1.0
-    speed_factor = {
-        gp.index: (gp.compute_throughput_gflops / max_gflops) if gp.compute_throughput_gflops > 0 else 0.1
-        for gp in gpu_profiles
-    }
-
-    # Transfer cost between layers on different GPUs (ms)
-    # activation_size * 8 / bandwidth = time in seconds
-    def transfer_cost_ms(layer_idx: int) -> float:
-        act_mb = layer_profiles[layer_idx].activation_memory_mb
-        act_bytes = act_mb * 1024 * 1024
-        if transfer_bandwidth_gbps <= 0:
-            return 0.0
-        return (act_bytes * 8 / (transfer_bandwidth_gbps * 1e9)) * 1000  # ms
-
-    # DP: dp[i][g] = minimum latency to process layers 0..i with layer i on GPU g
-    INF = float("inf")
-    dp = [[INF] * n_gpus for _ in range(n_layers)]
-    parent = [[-1] * n_gpus for _ in range(n_layers)]  # for backtracking
-
-    # VRAM available per GPU (track cumulatively)
-    vram_avail = {gp.index: float(gp.free_vram_mb) for gp in gpu_profiles}
-
-    # VRAM used per GPU per DP state: track via greedy approximation
-    # (full DP with VRAM tracking is NP-hard; we use greedy + DP heuristic)
-
-    # Initialize: first layer on each GPU
-    for g_idx, gp in enumerate(gpu_profiles):
-        lp = layer_profiles[0]
-        if lp.total_memory_mb <= vram_avail[gp.index]:
-            adjusted_latency = lp.latency_ms / max(speed_factor[gp.index], 0.01)
-            dp[0][g_idx] = adjusted_latency
-
-    # Fill DP table
-    for i in range(1, n_layers):
-        lp = layer_profiles[i]
-        for g_idx, gp in enumerate(gpu_profiles):
-            # Cost of running layer i on GPU g
-            layer_cost = lp.latency_ms / max(speed_factor[gp.index], 0.01)
-
-            for prev_g in range(n_gpus):
-                if dp[i - 1][prev_g] >= INF:
-                    continue
-
-                # Transfer cost if GPU changes
-                xfer = 0.0
-                if prev_g != g_idx:
-                    xfer = transfer_cost_ms(i - 1)
-
-                total = dp[i - 1][prev_g] + layer_cost + xfer
-                if total < dp[i][g_idx]:
-                    dp[i][g_idx] = total
-                    parent[i][g_idx] = prev_g
-
-    # Backtrack to find optimal assignment
-    best_last_gpu = min(range(n_gpus), key=lambda g: dp[n_layers - 1][g])
-    best_latency = dp[n_layers - 1][best_last_gpu]
-
-    assignments = [(0, 0)] * n_layers
-    g = best_last_gpu
-    for i in range(n_layers - 1, -1, -1):
-        assignments[i] = (i, gpu_profiles[g].index)
-        g = parent[i][g] if parent[i][g] >= 0 else g
-
-    # Calculate transfer overhead and GPU utilization
-    transfer_total = 0.0
-    gpu_mem_used: Dict[int, float] = {gp.index: 0.0 for gp in gpu_profiles}
-    for i, (layer_idx, gpu_idx) in enumerate(assignments):
-        lp = layer_profiles[layer_idx]
-        gpu_mem_used[gpu_idx] = gpu_mem_used.get(gpu_idx, 0.0) + lp.total_memory_mb
-        if i > 0 and assignments[i - 1][1] != gpu_idx:
-            transfer_total += transfer_cost_ms(i - 1)
-
-    gpu_util = {}
-    for gp in gpu_profiles:
-        total = gp.total_vram_mb or 1
-        gpu_util[gp.index] = min(gpu_mem_used.get(gp.index, 0.0) / total, 1.0)
-
-    # VRAM overflow check: if a GPU is overloaded, redistribute greedily
-    plan = PlacementPlan(
-        assignments=assignments,
-        estimated_latency_ms=best_latency,
-        estimated_transfer_overhead_ms=transfer_total,
-        gpu_utilization=gpu_util,
-    )
-
-    plan = _enforce_vram_constraints(plan, layer_profiles, gpu_profiles)
-
-    return plan
+    devices = list(gpu_profiles) + list(offload_tiers or [])
+
+    if n_layers == 0 or not devices:
+        return PlacementPlan(objective=objective)
+
+    tables = _partition_tables(layer_profiles, devices, transfer_bandwidth_gbps,
+                               kv_reserve_mb, kv_mb_per_layer)
+    max_stage = float("inf")
+    if objective != "latency":
+        bottleneck = _min_bottleneck(tables, n_layers)
+        if bottleneck is not None:
+            slack = bottleneck_slack if objective == "combined" else 0.0
+            max_stage = bottleneck * (1.0 + slack)
+    segments = _solve_min_latency(tables, n_layers, max_stage)
+    if segments is not None:
+        return _plan_from_segments(segments, tables, layer_profiles, devices, objective)
+
+    _logger.warning("No placement fits in device memory; "
+                    "falling back to the unconstrained optimum")
+    tables["lo"] = [[0] * (n_layers + 1) for _ in devices]
+    segments = _solve_min_latency(tables, n_layers)
+    plan = _plan_from_segments(segments, tables, layer_profiles, devices, objective)
+    return _enforce_vram_constraints(plan, layer_profiles, devices)
 
 
 def _enforce_vram_constraints(
@@ -804,6 +1056,7 @@ def _enforce_vram_constraints(
                 overflow_mb -= lp.total_memory_mb
 
     plan.assignments = new_assignments
+    plan.gpu_memory_mb = gpu_used
     return plan
 
 
@@ -812,6 +1065,9 @@ __all__ = [
     "LayerProfile",
     "GPUProfile",
     "PlacementPlan",
+    "PLACEMENT_OBJECTIVES",
     "compute_optimal_placement",
+    "evaluate_placement",
+    "placement_objective_for",
     "detect_pcie_bandwidth",
 ]
@@ -54,6 +54,7 @@ LENDING_RECLAIMS = Counter("vramancer_lending_reclaims_total", "VRAM reclaims fr
 LENDING_ACTIVE_LEASES = Gauge("vramancer_lending_active_leases", "Active VRAM lending leases")
 LENDING_BYTES_LENT = Gauge("vramancer_lending_bytes_lent_total", "Total bytes currently lent across GPUs")
 LENDING_POOL_CAPACITY_GB = Gauge("vramancer_lending_pool_capacity_gb", "Total lendable VRAM in pool (GB)")
+LENDING_FRAGMENTATION = Gauge("vramancer_lending_fragmentation_ratio", "External fragmentation of the lending buffer (1 - largest_free/free)", ["gpu"])
 
 # Continuous Batcher metrics
 BATCHER_BATCH_SIZE = Histogram("vramancer_batcher_batch_size", "Requests per batch")
@@ -65,6 +66,10 @@ PAGED_KV_USED_PAGES = Gauge("vramancer_paged_kv_used_pages", "Used KV cache page
 PAGED_KV_FREE_PAGES = Gauge("vramancer_paged_kv_free_pages", "Free KV cache pages", ["device"])
 PAGED_KV_BORROWED_PAGES = Gauge("vramancer_paged_kv_borrowed_pages", "Borrowed overflow pages from lending pool")
 
+# Host staging arena metrics
+HOST_ARENA_BYTES_PINNED = Gauge("vramancer_host_arena_bytes_pinned", "Page-locked bytes held by the host staging arena")
+HOST_ARENA_REUSE_RATE = Gauge("vramancer_host_arena_reuse_rate", "Fraction of host staging leases served from the free lists")
+
 # Circuit breaker metrics (per breaker name)
 # state: 0=CLOSED, 1=HALF_OPEN, 2=OPEN
 CIRCUIT_BREAKER_STATE = Gauge(
@@ -109,12 +114,13 @@ def metrics_server_start(port: int | None = None):
 # Register gauges for lifecycle tracking
 for _g in [GPU_MEMORY_USED, TASKS_PER_RESOURCE, DEVICE_INFO, BLOCK_HOTNESS,
            TASK_PCT, FASTPATH_IF_LATENCY, PAGED_KV_USED_PAGES,
-           PAGED_KV_FREE_PAGES, CIRCUIT_BREAKER_STATE]:
+           PAGED_KV_FREE_PAGES, CIRCUIT_BREAKER_STATE, LENDING_FRAGMENTATION]:
     _register_gauge(_g, labeled=True)
 
 for _g in [TASKS_RUNNING, LENDING_ACTIVE_LEASES, LENDING_BYTES_LENT,
            LENDING_POOL_CAPACITY_GB, BATCHER_QUEUE_DEPTH, BATCHER_THROUGHPUT,
-           HA_JOURNAL_SIZE, PAGED_KV_BORROWED_PAGES]:
+           HA_JOURNAL_SIZE, PAGED_KV_BORROWED_PAGES, HOST_ARENA_BYTES_PINNED,
+           HOST_ARENA_REUSE_RATE]:
     _register_gauge(_g, labeled=False)
 
 
@@ -177,6 +183,7 @@ __all__ = [
     "LENDING_ACTIVE_LEASES",
     "LENDING_BYTES_LENT",
     "LENDING_POOL_CAPACITY_GB",
+    "LENDING_FRAGMENTATION",
     "BATCHER_BATCH_SIZE",
     "BATCHER_QUEUE_DEPTH",
     "BATCHER_THROUGHPUT",
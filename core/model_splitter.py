@@ -58,6 +58,7 @@ try:
     from core.layer_profiler import (
         LayerProfiler,
         compute_optimal_placement,
+        placement_objective_for,
     )
     _PROFILER_AVAILABLE = True
 except ImportError:
@@ -323,15 +324,29 @@ def split_model_into_blocks(model_name: str, num_gpus: int,
 
 def _split_by_profiler(model: Any, layers: list, num_gpus: int) -> List[Any]:
     """Split using LayerProfiler + DP-optimal placement."""
-    profiler = LayerProfiler()
+    from core.placement_cache import (
+        decode_plan, get_placement_cache, model_fingerprint, plan_fits_free_vram,
+    )
+    cache = get_placement_cache()
 
-    _logger.info("Profiling %d layers for optimal placement...", len(layers))
-    layer_profiles = profiler.profile_model(model)
+    objective = placement_objective_for()
+    profiler = LayerProfiler()
 
+    # GPU benchmarks are cached separately; free VRAM is measured every time
     _logger.info("Benchmarking %d GPUs...", num_gpus)
     gpu_profiles = profiler.profile_gpus()[:num_gpus]
 
-    plan = compute_optimal_placement(layer_profiles, gpu_profiles)
+    plan_fp = cache.fingerprint(model_fingerprint(model), num_gpus=num_gpus, objective=objective)
+    cached = cache.get("plan", plan_fp)
+    plan = decode_plan(cached) if cached is not None else None
+    if plan is not None and not plan_fits_free_vram(plan, gpu_profiles):
+        _logger.info("Cached placement plan no longer fits free VRAM, re-solving")
+        plan = None
+    if plan is None:
+        _logger.info("Profiling %d layers for optimal placement...", len(layers))
+        layer_profiles = profiler.profile_model(model)
+        plan = compute_optimal_placement(layer_profiles, gpu_profiles, objective=objective)
+        cache.put("plan", plan_fp, plan)
 
     _logger.info(
         "Optimal placement: estimated latency=%.1fms, transfer overhead=%.1fms",
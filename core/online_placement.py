@@ -0,0 +1,344 @@
+"""Online re-placement from live per-layer timings.
+
+Placement is solved once from offline micro-benchmarks
+(``LayerProfiler._profile_single_layer``, ``_benchmark_gpu_gflops``).
+At serving time the real per-layer cost drifts: thermal throttling, a
+co-tenant process, or a lender GPU getting busy or reclaiming VRAM
+(``VRAMLendingPool``). ``InferencePipeline.start_rebalancing`` only
+reacted to VRAM overload.
+
+This module closes the loop:
+
+  - ``LayerTimer`` keeps an EWMA of the forward latency of every
+    (layer, device) pair, fed by forward hooks (CUDA events resolved
+    lazily, no synchronisation on the hot path) or by ``record()``
+  - ``OnlineRebalancer`` turns the timings into a per-device slowdown
+    (measured / predicted), re-solves ``compute_optimal_placement`` with
+    the slowed-down profiles and the current free VRAM, and proposes a
+    migration only when the predicted gain over ``horizon_requests``
+    requests exceeds the cost of moving the weights
+  - the pipeline applies the proposal between requests through
+    ``InferencePipeline._migrate_blocks``
+"""
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("online_placement")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.online_placement")
+
+from core.layer_profiler import (
+    GPUProfile,
+    LayerProfile,
+    PlacementPlan,
+    _partition_tables,
+    compute_optimal_placement,
+    evaluate_placement,
+)
+
+
+CPU_DEVICE = -1
+
+
+def _device_key(module: Any) -> int:
+    """GPU index of a module's weights, ``CPU_DEVICE`` for host memory."""
+    try:
+        dev = next(module.parameters()).device
+    except (StopIteration, AttributeError):
+        return CPU_DEVICE
+    return dev.index if dev.type == "cuda" and dev.index is not None else CPU_DEVICE
+
+
+# ---------------------------------------------------------------------------
+# Per-layer timings
+# ---------------------------------------------------------------------------
+
+class LayerTimer:
+    """EWMA of forward latency (ms) per (layer, device).
+
+    ``sample_every`` times one forward in N per layer; CUDA timings use
+    event pairs that are read back once they have completed, so the
+    decode loop never waits on the GPU for bookkeeping. Open timings are
+    keyed by (thread, layer), so concurrent forwards (``generate`` and the
+    continuous batcher) do not overwrite each other's start events.
+    """
+
+    def __init__(self, alpha: float = 0.2, sample_every: int = 1):
+        self.alpha = alpha
+        self.sample_every = max(1, sample_every)
+        self._ewma: Dict[Tuple[int, int], float] = {}
+        self._count: Dict[Tuple[int, int], int] = {}
+        self._calls: Dict[int, int] = {}
+        self._open: Dict[Tuple[int, int], Tuple[int, Any]] = {}
+        self._pending: List[Tuple[int, int, Any, Any]] = []
+        self._handles: List[Any] = []
+        self._lock = threading.Lock()
+
+    # -- recording --------------------------------------------------------
+
+    def record(self, layer: int, device: int, ms: float) -> None:
+        key = (layer, device)
+        with self._lock:
+            prev = self._ewma.get(key)
+            self._ewma[key] = ms if prev is None else prev + self.alpha * (ms - prev)
+            self._count[key] = self._count.get(key, 0) + 1
+
+    def attach(self, layers: Sequence[Any], layer_ids: Optional[Sequence[int]] = None) -> None:
+        """Time ``layers`` (nn.Modules) with forward hooks; ids default to positions."""
+        ids = list(layer_ids) if layer_ids is not None else list(range(len(layers)))
+        for layer_id, module in zip(ids, layers):
+            self._handles.append(module.register_forward_pre_hook(self._make_pre(layer_id)))
+            self._handles.append(module.register_forward_hook(self._make_post(layer_id)))
+
+    def detach(self) -> None:
+        for h in self._handles:
+            h.remove()
+        self._handles.clear()
+
+    def _make_pre(self, layer_id: int):
+        def pre(module, args):
+            n = self._calls.get(layer_id, 0)
+            self._calls[layer_id] = n + 1
+            if n % self.sample_every:
+                return
+            device = _device_key(module)
+            key = (threading.get_ident(), layer_id)
+            if device != CPU_DEVICE and _TORCH and torch.cuda.is_available():
+                start = torch.cuda.Event(enable_timing=True)
+                start.record()
+                self._open[key] = (device, start)
+            else:
+                self._open[key] = (device, time.perf_counter())
+        return pre
+
+    def _make_post(self, layer_id: int):
+        def post(module, args, output):
+            opened = self._open.pop((threading.get_ident(), layer_id), None)
+            if opened is None:
+                return
+            device, start = opened
+            if isinstance(start, float):
+                self.record(layer_id, device, (time.perf_counter() - start) * 1e3)
+            else:
+                end = torch.cuda.Event(enable_timing=True)
+                end.record()
+                with self._lock:
+                    self._pending.append((layer_id, device, start, end))
+        return post
+
+    def flush(self) -> None:
+        """Fold completed CUDA event pairs into the EWMAs."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        keep = []
+        for layer_id, device, start, end in pending:
+            if end.query():
+                self.record(layer_id, device, start.elapsed_time(end))
+            else:
+                keep.append((layer_id, device, start, end))
+        with self._lock:
+            self._pending = keep + self._pending
+
+    # -- reading ------------------------------------------------------------
+
+    def get(self, layer: int, device: int) -> Optional[float]:
+        return self._ewma.get((layer, device))
+
+    def samples(self, layer: int, device: int) -> int:
+        return self._count.get((layer, device), 0)
+
+    def snapshot(self) -> Dict[Tuple[int, int], float]:
+        self.flush()
+        with self._lock:
+            return dict(self._ewma)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ewma.clear()
+            self._count.clear()
+            self._pending.clear()
+
+
+# ---------------------------------------------------------------------------
+# Rebalancer
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Replacement:
+    """A proposed move from the running placement to a re-solved one."""
+    plan: PlacementPlan
+    moves: List[Tuple[int, int, int]]            # (layer, source gpu, target gpu)
+    current_ms: float
+    new_ms: float
+    migration_ms: float
+    slowdowns: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def gain_ms(self) -> float:
+        return self.current_ms - self.new_ms
+
+
+class OnlineRebalancer:
+    """Re-solve the placement from live timings and propose migrations.
+
+    ``layer_profiles`` / ``gpu_profiles`` are the offline profiles the
+    running ``plan`` was computed from; the layer indices are the units
+    the pipeline migrates (its blocks). A migration is proposed when
+
+        gain_per_request * horizon_requests > migration_ms
+
+    and the gain is at least ``min_gain`` of the current cost, where the
+    per-request cost is the latency (``latency`` / ``combined``) or the
+    bottleneck stage (``throughput``), and ``migration_ms`` is the time to
+    copy the moved layers' weights at ``migration_bandwidth_gbps``.
+    """
+
+    def __init__(
+        self,
+        layer_profiles: List[LayerProfile],
+        gpu_profiles: List[GPUProfile],
+        plan: PlacementPlan,
+        timer: Optional[LayerTimer] = None,
+        transfer_bandwidth_gbps: float = 16.0,
+        objective: Optional[str] = None,
+        migration_bandwidth_gbps: Optional[float] = None,
+        horizon_requests: int = 100,
+        min_gain: float = 0.05,
+        min_samples: int = 3,
+        cooldown_s: float = 30.0,
+    ):
+        self.layer_profiles = list(layer_profiles)
+        self.gpu_profiles = list(gpu_profiles)
+        self.plan = plan
+        self.timer = timer or LayerTimer()
+        self.transfer_bandwidth_gbps = transfer_bandwidth_gbps
+        self.objective = objective or plan.objective
+        self.migration_bandwidth_gbps = migration_bandwidth_gbps or transfer_bandwidth_gbps
+        self.horizon_requests = horizon_requests
+        self.min_gain = min_gain
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self._free_vram: Dict[int, float] = {}
+        self._last_migration = float("-inf")
+        self.last_proposal: Optional[Replacement] = None
+        tables = _partition_tables(self.layer_profiles, self.gpu_profiles,
+                                   transfer_bandwidth_gbps, 0.0, 0.0)
+        self._predicted = {
+            (i, gp.index): tables["cost"][d][i + 1] - tables["cost"][d][i]
+            for d, gp in enumerate(self.gpu_profiles)
+            for i in range(len(self.layer_profiles))
+        }
+
+    def update_free_vram(self, gpu: int, free_mb: float) -> None:
+        """VRAM of ``gpu`` now available to the placed layers (e.g. after a
+        lending-pool reclaim). A running placement that no longer fits is
+        re-placed regardless of the gain threshold."""
+        self._free_vram[gpu] = free_mb
+
+    def slowdowns(self) -> Dict[int, float]:
+        """Measured / predicted layer time per device (1.0 = as profiled)."""
+        measured: Dict[int, float] = {}
+        predicted: Dict[int, float] = {}
+        for (layer, device), ms in self.timer.snapshot().items():
+            if (layer, device) not in self._predicted:
+                continue
+            if self.timer.samples(layer, device) < self.min_samples:
+                continue
+            measured[device] = measured.get(device, 0.0) + ms
+            predicted[device] = predicted.get(device, 0.0) + self._predicted[(layer, device)]
+        return {gp.index: (measured[gp.index] / predicted[gp.index]
+                           if predicted.get(gp.index) else 1.0)
+                for gp in self.gpu_profiles}
+
+    def live_profiles(self) -> Tuple[List[LayerProfile], List[GPUProfile]]:
+        """Profiles with throughput divided by the slowdown and current free VRAM.
+
+        Layer latencies are rescaled so the solver's normalisation (fastest
+        GPU = profiled latency) keeps absolute milliseconds.
+        """
+        slow = self.slowdowns()
+        gpus = [dataclasses.replace(
+                    gp,
+                    compute_throughput_gflops=gp.compute_throughput_gflops / max(slow[gp.index], 1e-6),
+                    free_vram_mb=int(self._free_vram.get(gp.index, gp.free_vram_mb)))
+                for gp in self.gpu_profiles]
+        base_max = max(gp.compute_throughput_gflops for gp in self.gpu_profiles) or 1.0
+        live_max = max(gp.compute_throughput_gflops for gp in gpus) or 1.0
+        scale = base_max / live_max
+        layers = [dataclasses.replace(lp, latency_ms=lp.latency_ms * scale)
+                  for lp in self.layer_profiles]
+        return layers, gpus
+
+    def _cost(self, plan: PlacementPlan) -> float:
+        if self.objective == "throughput":
+            return plan.estimated_bottleneck_ms
+        return plan.estimated_latency_ms
+
+    def propose(self, now: Optional[float] = None) -> Optional[Replacement]:
+        """A worthwhile ``Replacement``, or None (also stored in ``last_proposal``)."""
+        now = time.monotonic() if now is None else now
+        self.last_proposal = None
+        if now - self._last_migration < self.cooldown_s:
+            return None
+        layers, gpus = self.live_profiles()
+        new_plan = compute_optimal_placement(layers, gpus, self.transfer_bandwidth_gbps,
+                                             objective=self.objective)
+        current = evaluate_placement(self.plan.assignments, layers, gpus,
+                                     self.transfer_bandwidth_gbps, self.objective)
+        used: Dict[int, float] = {}
+        for i, g in self.plan.assignments:
+            used[g] = used.get(g, 0.0) + layers[i].total_memory_mb
+        over_capacity = any(used.get(gp.index, 0.0) > gp.free_vram_mb + 1e-6 for gp in gpus)
+        old = dict(self.plan.assignments)
+        moves = [(i, old[i], g) for i, g in new_plan.assignments if old.get(i) != g]
+        if not moves:
+            return None
+        moved_mb = sum((self.layer_profiles[i].param_memory_mb
+                        or self.layer_profiles[i].total_memory_mb) for i, _, _ in moves)
+        migration_ms = moved_mb / 1024 / self.migration_bandwidth_gbps * 1000
+        proposal = Replacement(plan=new_plan, moves=moves, current_ms=self._cost(current),
+                               new_ms=self._cost(new_plan), migration_ms=migration_ms,
+                               slowdowns=self.slowdowns())
+        worthwhile = (proposal.gain_ms >= self.min_gain * proposal.current_ms
+                      and proposal.gain_ms * self.horizon_requests > migration_ms)
+        if not (worthwhile or over_capacity):
+            return None
+        log.info("Re-placement proposed: %d layer moves, %.2f -> %.2f ms/request "
+                 "(migration %.1f ms, slowdowns %s)", len(moves), proposal.current_ms,
+                 proposal.new_ms, migration_ms,
+                 {g: round(s, 2) for g, s in proposal.slowdowns.items()})
+        self.last_proposal = proposal
+        return proposal
+
+    def commit(self, proposal: Replacement, now: Optional[float] = None,
+               plan: Optional[PlacementPlan] = None) -> None:
+        """Adopt ``proposal`` as the running placement after it was migrated.
+
+        ``plan`` is the placement actually reached when the migration was
+        only partial. The cooldown starts either way, so a failed move is
+        not re-proposed and re-migrated on every check.
+        """
+        self.plan = plan if plan is not None else proposal.plan
+        self._last_migration = time.monotonic() if now is None else now
+
+
+__all__ = [
+    "LayerTimer",
+    "OnlineRebalancer",
+    "Replacement",
+]
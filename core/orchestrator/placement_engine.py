@@ -40,6 +40,7 @@ try:
         GPUProfile,
         PlacementPlan,
         compute_optimal_placement,
+        placement_objective_for,
     )
     _PROFILER_AVAILABLE = True
 except ImportError:
@@ -147,6 +148,8 @@ class PlacementEngine:
         model: Any,
         num_gpus: int = 0,
         transfer_bandwidth_gbps: float = 0.0,
+        serving_mode: Optional[str] = None,
+        objective: Optional[str] = None,
     ) -> Any:
         """Compute optimal layer-to-GPU placement for a full model.
 
@@ -157,6 +160,10 @@ class PlacementEngine:
             model: Loaded nn.Module (HuggingFace or custom).
             num_gpus: Number of GPUs (0 = auto-detect).
             transfer_bandwidth_gbps: Inter-GPU bandwidth (0 = auto-detect).
+            serving_mode: "interactive" (batch-1 latency), "pipeline"/"batch"
+                (throughput) or "continuous" (combined); defaults to
+                VRM_SERVING_MODE. See ``placement_objective_for``.
+            objective: Explicit placement objective, overrides serving_mode.
 
         Returns:
             PlacementPlan with (layer_index, gpu_index) assignments.
@@ -165,6 +172,27 @@ class PlacementEngine:
             _logger.warning("LayerProfiler not available, falling back to VRAM-based")
             return self._vram_fallback_plan(model, num_gpus)
 
+        objective = objective or placement_objective_for(serving_mode)
+
+        # Reuse the plan computed for this model on this hardware
+        from core.placement_cache import (
+            decode_plan, get_placement_cache, model_fingerprint, plan_fits_free_vram,
+        )
+        cache = get_placement_cache()
+        plan_fp = cache.fingerprint(model_fingerprint(model), num_gpus=num_gpus,
+                                    transfer_bandwidth_gbps=transfer_bandwidth_gbps,
+                                    objective=objective)
+        cached = cache.get("plan", plan_fp)
+        if cached is not None:
+            # Free VRAM is live: the plan may have been solved with more of it
+            self._gpu_profiles = self._profiler.profile_gpus()
+            plan = decode_plan(cached)
+            if plan_fits_free_vram(plan, self._gpu_profiles[:num_gpus] if num_gpus > 0
+                                   else self._gpu_profiles):
+                _logger.info(f"Placement plan loaded from cache ({len(plan.assignments)} layers)")
+                return plan
+            _logger.info("Cached placement plan no longer fits free VRAM, re-solving")
+
         # Profile layers
         _logger.info("Profiling model layers...")
         layer_profiles = self._profiler.profile_model(model)
@@ -185,15 +213,17 @@ class PlacementEngine:
         # Compute optimal placement via DP
         _logger.info(
             f"Computing optimal placement: {len(layer_profiles)} layers "
-            f"across {len(gpu_profiles)} GPUs"
+            f"across {len(gpu_profiles)} GPUs (objective={objective})"
         )
         plan = compute_optimal_placement(
-            layer_profiles, gpu_profiles, transfer_bandwidth_gbps
+            layer_profiles, gpu_profiles, transfer_bandwidth_gbps, objective=objective
         )
+        cache.put("plan", plan_fp, plan)
 
         _logger.info(
             f"Optimal plan: latency={plan.estimated_latency_ms:.1f}ms "
             f"(transfer overhead={plan.estimated_transfer_overhead_ms:.1f}ms), "
+            f"bottleneck stage={plan.estimated_bottleneck_ms:.1f}ms, "
             f"GPU util={plan.gpu_utilization}"
         )
 
@@ -103,6 +103,12 @@ class PagedKVConfig:
     compression_bits: int = 3             # bits per polar angle (3 → ~3.5 bits/dim)
     qjl_dim: Optional[int] = None         # QJL projection dim (default head_dim//2)
     sparse_v_ratio: float = 1.0           # Sparse V: fraction of values to decompress (0.1 = top 10%)
+    overflow_slab_pages: int = 8          # overflow pages borrowed per lending lease
+    async_eviction: bool = False          # reclaim pages in a background thread
+    evict_low_watermark: float = 0.05     # wake the reclaimer below this free fraction
+    evict_high_watermark: float = 0.10    # ...and refill up to this free fraction
+    evict_batch_max: int = 32             # max pages reclaimed per cycle
+    evict_wait_timeout_s: float = 5.0     # append_token stall before sync eviction
 
     @property
     def page_size_bytes(self) -> int:
@@ -120,12 +126,19 @@ class PagedKVConfig:
         kv_comp = os.environ.get("VRM_KV_COMPRESSION", "").lower() or None
         comp_bits = int(os.environ.get("VRM_KV_COMPRESSION_BITS", "3"))
         sparse_v = float(os.environ.get("VRM_SPARSE_V_RATIO", "1.0"))
+        slab_pages = max(1, int(os.environ.get("VRM_KV_SLAB_PAGES", "8")))
+        evict_kw = {
+            "async_eviction": os.environ.get("VRM_KV_ASYNC_EVICT", "0").lower() in ("1", "true", "yes"),
+            "evict_low_watermark": float(os.environ.get("VRM_KV_EVICT_LOW_WM", "0.05")),
+            "evict_high_watermark": float(os.environ.get("VRM_KV_EVICT_HIGH_WM", "0.10")),
+        }
 
         config = getattr(model, 'config', None)
         if config is None:
             return cls(max_pages=max_pages, device=device,
                        kv_compression=kv_comp, compression_bits=comp_bits,
-                       sparse_v_ratio=sparse_v)
+                       sparse_v_ratio=sparse_v, overflow_slab_pages=slab_pages,
+                       **evict_kw)
 
         num_layers = getattr(config, 'num_hidden_layers', 12)
         num_heads = getattr(config, 'num_attention_heads', 12)
@@ -142,9 +155,32 @@ class PagedKVConfig:
             kv_compression=kv_comp,
             compression_bits=comp_bits,
             sparse_v_ratio=sparse_v,
+            overflow_slab_pages=slab_pages,
+            **evict_kw,
         )
 
 
+def watermark_reclaim_count(
+    free_pages: int,
+    total_pages: int,
+    low: float,
+    high: float,
+    batch_max: int = 32,
+) -> int:
+    """Pages the background reclaimer should evict this cycle.
+
+    Nothing while ``free_pages`` is at or above the low watermark; below it,
+    enough to refill to the high watermark, capped at ``batch_max`` so one
+    cycle never holds a long victim list. Watermarks are fractions of
+    ``total_pages`` and always round up to at least one page.
+    """
+    low_pages = max(1, math.ceil(low * total_pages))
+    high_pages = max(low_pages, math.ceil(high * total_pages))
+    if free_pages >= low_pages:
+        return 0
+    return max(0, min(high_pages - free_pages, batch_max))
+
+
 # ---------------------------------------------------------------------------
 # Physical page
 # ---------------------------------------------------------------------------
@@ -171,6 +207,25 @@ class PhysicalPage:
     borrowed_tensor: Any = None
 
 
+@dataclass
+class OverflowSlab:
+    """A lending lease carved into ``len(page_ids)`` overflow pages.
+
+    Borrowing one lease per page meant lender scoring, lease bookkeeping and
+    (with ``VRM_KV_LEND=1``) a lender-side allocation on every overflow
+    page. A slab amortises that over N pages; the lease is returned to the
+    lender only once every page of the slab is free again.
+    """
+
+    lease: Any
+    page_ids: List[int] = field(default_factory=list)
+    free_ids: List[int] = field(default_factory=list)
+
+    @property
+    def in_use(self) -> int:
+        return len(self.page_ids) - len(self.free_ids)
+
+
 # ---------------------------------------------------------------------------
 # Page table (per-request virtual→physical mapping)
 # ---------------------------------------------------------------------------
@@ -196,12 +251,21 @@ class PagedKVCacheManager:
       - Pages allocated only when tokens are actually generated
       - Copy-on-write for beam search (share prefix, copy on diverge)
       - Prefix caching: identical prefixes reuse the same physical pages
-      - LRU eviction when pool is exhausted
+      - LRU eviction when pool is exhausted, either inline or from a
+        background reclaimer that keeps a watermark of free pages ready
+        (``config.async_eviction``). Live requests are preempted whole
+        (see ``was_preempted``), never left with a partial page table,
+        and only when an allocation is waiting on a free page
     """
 
+    # Reclaimer poll interval when no allocation wakes it up
+    _EVICT_POLL_S = 0.05
+
     def __init__(self, config: Optional[PagedKVConfig] = None):
         self.config = config or PagedKVConfig()
         self._lock = threading.Lock()
+        # Signalled (under _lock) whenever reclaimed pages become allocatable
+        self._free_cond = threading.Condition(self._lock)
 
         # Physical page pool
         self._pages: List[PhysicalPage] = [
@@ -233,6 +297,9 @@ class PagedKVCacheManager:
         # VRAMLendingPool integration for overflow
         self._lending_pool = None
         self._lending_leases: Dict[str, Any] = {}  # lease_id -> lease
+        self._overflow_slabs: Dict[str, OverflowSlab] = {}  # lease_id -> slab
+        self._spare_page_ids: List[int] = []  # pages of released slabs, reused by the next
+        self._slab_releases = 0
         self._transfer_manager = None  # V6.D: injected for cross-GPU KV transfers
 
         # KV cache compression (per-head compressor + compressed sidecar)
@@ -246,6 +313,18 @@ class PagedKVCacheManager:
         # Parity engrams — store XOR parity for evicted pages (single-fault recovery)
         self._parity_engrams: Dict[int, str] = {}  # page_id -> engram_id
 
+        # Background reclaimer (config.async_eviction)
+        self._evicting: Set[int] = set()       # detached victims being offloaded
+        self._alloc_waiters = 0                 # allocations blocked on a free page
+        self._preempted: Dict[str, int] = {}   # request_id -> tokens dropped
+        self._offload_streams: Dict[str, Any] = {}  # device -> side CUDA stream
+        self._evictor: Optional[threading.Thread] = None
+        self._evict_wakeup = threading.Event()
+        self._evict_stop = threading.Event()
+        self._async_evictions = 0
+        self._alloc_stalls = 0
+        self._alloc_stall_s = 0.0
+
         # Build device list
         if not self.config.devices:
             self.config.devices = [self.config.device]
@@ -258,6 +337,9 @@ class PagedKVCacheManager:
         if self.config.enable_lending:
             self._init_lending_pool()
 
+        if self.config.async_eviction:
+            self.start_eviction_worker()
+
         total_pages = sum(
             self.config.pages_per_device.get(d, self.config.max_pages)
             for d in self.config.devices
@@ -410,6 +492,7 @@ class PagedKVCacheManager:
                 return self._page_tables[request_id]
 
             entry = PageTableEntry(request_id=request_id)
+            self._preempted.pop(request_id, None)
 
             # Allocate pages for initial tokens
             pages_needed = math.ceil(num_tokens / self.config.page_size) if num_tokens > 0 else 0
@@ -446,10 +529,17 @@ class PagedKVCacheManager:
             if page_index >= len(entry.pages):
                 page_id = self._alloc_page()
                 if page_id is None:
-                    # Try eviction
-                    page_id = self._evict_lru()
+                    # Pool truly empty: wait for the reclaimer, or evict inline
+                    if self.eviction_worker_running:
+                        page_id = self._wait_for_free_page(request_id)
+                    else:
+                        page_id = self._evict_lru(request_id)
                     if page_id is None:
                         return None
+                    if self._page_tables.get(request_id) is not entry:
+                        # Preempted by the reclaimer while waiting
+                        self._free_victims([self._pages[page_id]])
+                        return None
                 entry.pages.append(page_id)
 
             physical_page = entry.pages[page_index]
@@ -461,6 +551,7 @@ class PagedKVCacheManager:
     def free(self, request_id: str) -> int:
         """Free all pages for a request. Returns number of pages freed."""
         with self._lock:
+            self._preempted.pop(request_id, None)
             entry = self._page_tables.pop(request_id, None)
             if entry is None:
                 return 0
@@ -470,6 +561,11 @@ class PagedKVCacheManager:
                 page = self._pages[page_id]
                 page.ref_count -= 1
                 if page.ref_count <= 0:
+                    # Slab pages go back to their slab, not the local free list
+                    if self._return_slab_page(page):
+                        freed += 1
+                        self._total_frees += 1
+                        continue
                     # V6.D Phase 1: release lending lease for borrowed pages
                     if page.is_borrowed and page.lease_id and self._lending_pool:
                         try:
@@ -488,6 +584,12 @@ class PagedKVCacheManager:
                     freed += 1
                     self._total_frees += 1
 
+            if self._free_pages and self._overflow_slabs:
+                self._release_idle_slabs()
+
+            free_cond = getattr(self, "_free_cond", None)
+            if freed and free_cond is not None:
+                free_cond.notify_all()
             return freed
 
     def fork(self, src_request_id: str, dst_request_id: str) -> Optional[PageTableEntry]:
@@ -620,6 +722,60 @@ class PagedKVCacheManager:
             except Exception:
                 _logger.debug("KV compression enqueue failed", exc_info=True)
 
+    def write_kv_range(
+        self,
+        request_id: str,
+        layer_idx: int,
+        start: int,
+        key: Any,
+        value: Any,
+    ) -> int:
+        """Write a contiguous run of tokens ``[start, start + n)`` for one layer.
+
+        key/value: [num_kv_heads, n, head_dim] on any device (copied to the
+        page's pool). Pages are allocated on demand and ``num_tokens`` is
+        raised to cover the run, so a prefill split across devices (context
+        parallelism) can hand each chunk over without first gathering the
+        whole sequence. Returns the number of tokens written. If the pool
+        runs out, the run is cut short and ``num_tokens`` only covers the
+        pages that were allocated.
+        """
+        if self._gpu_pool is None:
+            return 0
+        n = key.shape[1]
+        page_size = self.config.page_size
+        entry = self.allocate(request_id)          # existing entry or a new empty one
+        with self._lock:
+            while len(entry.pages) * page_size < start + n:
+                page_id = self._alloc_page()
+                if page_id is None:
+                    page_id = self._evict_lru(request_id)
+                    if page_id is None:
+                        break
+                entry.pages.append(page_id)
+            capacity = len(entry.pages) * page_size
+            if capacity < start + n:
+                _logger.warning("Page pool exhausted for request %s: %d of %d tokens fit",
+                                request_id, max(0, capacity - start), n)
+            entry.num_tokens = max(entry.num_tokens, min(start + n, capacity))
+            pages = list(entry.pages)
+
+        written = 0
+        pos = start
+        while pos < start + n:
+            page_index, slot = divmod(pos, page_size)
+            if page_index >= len(pages):
+                break
+            page_id = pages[page_index]
+            take = min(page_size - slot, start + n - pos)
+            pool = self._gpu_pools.get(self._page_device_map.get(page_id, ""), self._gpu_pool)
+            src = slice(pos - start, pos - start + take)
+            pool[page_id, layer_idx, 0, :, slot:slot + take, :] = key[:, src, :].to(pool.device)
+            pool[page_id, layer_idx, 1, :, slot:slot + take, :] = value[:, src, :].to(pool.device)
+            written += take
+            pos += take
+        return written
+
     def flush_compression(self) -> None:
         """Batch-compress all pending KV writes in a single kernel launch.
 
@@ -756,7 +912,7 @@ class PagedKVCacheManager:
             while len(entry.pages) < pages_needed:
                 page_id = self._alloc_page()
                 if page_id is None:
-                    page_id = self._evict_lru()
+                    page_id = self._evict_lru(request_id)
                     if page_id is None:
                         break
                 entry.pages.append(page_id)
@@ -925,143 +1081,357 @@ class PagedKVCacheManager:
             self._pages[page_id].ref_count = 1
             self._pages[page_id].last_access = time.time()
             self._total_allocations += 1
+            if getattr(self, "_evictor", None) is not None and self._reclaim_target() > 0:
+                self._evict_wakeup.set()
             return page_id
 
         # Pool exhausted — try to borrow from lending pool
         return self._borrow_overflow_page()
 
     def _borrow_overflow_page(self) -> Optional[int]:
-        """Borrow a page from VRAMLendingPool when local pool is exhausted."""
+        """Borrow a page from VRAMLendingPool when local pool is exhausted.
+
+        Pages are carved from slabs of ``config.overflow_slab_pages`` pages
+        per lease: a free page in an existing slab is handed out without
+        touching the lending pool; only when every slab is full is a new
+        lease borrowed.
+        """
         if self._lending_pool is None:
             return None
 
+        slabs = self._overflow_slabs
+        for slab in slabs.values():
+            if slab.free_ids:
+                page_id = slab.free_ids.pop()
+                return self._carve_slab_page(slab, page_id)
+
         try:
             # Determine which GPU to borrow from (not self)
             primary_idx = int(self.config.device.split(":")[-1]) if ":" in self.config.device else 0
+            slab_pages = max(1, int(getattr(self.config, "overflow_slab_pages", 1)))
 
             lease = self._lending_pool.borrow(
                 borrower_gpu=primary_idx,
-                size_bytes=self.config.page_size_bytes,
+                size_bytes=self.config.page_size_bytes * slab_pages,
                 purpose="kv_cache_overflow",
                 priority=1,
             )
             if lease is None:
                 return None
 
-            # Create a new overflow page
-            overflow_id = len(self._pages)
-            page = PhysicalPage(
-                page_id=overflow_id,
-                ref_count=1,
-                allocated=True,
-                last_access=time.time(),
-                device=f"cuda:{lease.owner_gpu}",
-                is_borrowed=True,
-                lease_id=lease.lease_id,
-            )
-            self._pages.append(page)
+            # Register the slab's pages (ids of released slabs first); all
+            # but the first stay free
+            slab = OverflowSlab(lease=lease)
+            for _ in range(slab_pages):
+                if self._spare_page_ids:
+                    page = self._pages[self._spare_page_ids.pop()]
+                    page.device = f"cuda:{lease.owner_gpu}"
+                    page.data = None
+                else:
+                    page = PhysicalPage(page_id=len(self._pages),
+                                        device=f"cuda:{lease.owner_gpu}")
+                    self._pages.append(page)
+                page.is_borrowed = True
+                page.lease_id = lease.lease_id
+                slab.page_ids.append(page.page_id)
+            slab.free_ids = slab.page_ids[:0:-1]
+            slabs[lease.lease_id] = slab
             self._lending_leases[lease.lease_id] = lease
             self._overflow_borrows += 1
-            self._total_allocations += 1
-
-            # V6.D Phase 2: eagerly allocate an empty buffer on lender GPU
-            # (gated by VRM_KV_LEND=1, default off). The actual KV bytes are NOT
-            # migrated here — that requires Phase 3 (cross-GPU attention staging).
-            if os.getenv("VRM_KV_LEND", "0") == "1":
-                try:
-                    # Infer shape from page geometry: [num_layers, 2, num_kv_heads, page_size, head_dim]
-                    shape = (
-                        self.config.num_layers,
-                        2,
-                        self.config.num_kv_heads,
-                        self.config.page_size,
-                        self.config.head_dim,
-                    )
-                    dtype = self.config.dtype if hasattr(self.config, "dtype") else None
-                    borrowed_tensor = self._lending_pool.allocate_on_lease(lease, shape=shape, dtype=dtype)
-                    if borrowed_tensor is not None:
-                        page.borrowed_tensor = borrowed_tensor
-                        _logger.info(
-                            "V6.D: allocated empty buffer on lender GPU %d for borrowed page %d (lease %s)",
-                            lease.owner_gpu, overflow_id, lease.lease_id,
-                        )
-                except Exception:
-                    _logger.debug("V6.D Phase 2 buffer allocation failed", exc_info=True)
 
             _logger.debug(
-                "Overflow page %d borrowed from GPU %d (lease %s)",
-                overflow_id, lease.owner_gpu, lease.lease_id,
+                "Overflow slab of %d pages %s borrowed from GPU %d (lease %s)",
+                slab_pages, slab.page_ids, lease.owner_gpu, lease.lease_id,
             )
-            return overflow_id
+            return self._carve_slab_page(slab, slab.page_ids[0])
 
         except Exception as e:
             _logger.debug("Overflow borrow failed: %s", e)
             return None
 
-    def _evict_lru(self) -> Optional[int]:
-        """Evict the least-recently-used page (ref_count=1, oldest).
+    def _carve_slab_page(self, slab: OverflowSlab, page_id: int) -> int:
+        """Hand out one page of a borrowed slab."""
+        page = self._pages[page_id]
+        page.allocated = True
+        page.ref_count = 1
+        page.last_access = time.time()
+        page.is_borrowed = True
+        page.lease_id = slab.lease.lease_id
+        self._total_allocations += 1
+
+        # V6.D Phase 2: allocate an empty buffer on lender GPU for this page
+        # (gated by VRM_KV_LEND=1, default off). The actual KV bytes are NOT
+        # migrated here — that requires Phase 3 (cross-GPU attention staging).
+        # Done once per slab page: the buffer is kept while the slab lives.
+        if page.borrowed_tensor is None and os.getenv("VRM_KV_LEND", "0") == "1":
+            try:
+                # Infer shape from page geometry: [num_layers, 2, num_kv_heads, page_size, head_dim]
+                shape = (
+                    self.config.num_layers,
+                    2,
+                    self.config.num_kv_heads,
+                    self.config.page_size,
+                    self.config.head_dim,
+                )
+                dtype = self.config.dtype if hasattr(self.config, "dtype") else None
+                index = slab.page_ids.index(page_id)
+                kwargs = {"shape": shape, "dtype": dtype}
+                if index:
+                    kwargs["byte_offset"] = index * self.config.page_size_bytes
+                borrowed_tensor = self._lending_pool.allocate_on_lease(slab.lease, **kwargs)
+                if borrowed_tensor is not None:
+                    page.borrowed_tensor = borrowed_tensor
+                    _logger.info(
+                        "V6.D: allocated empty buffer on lender GPU %d for borrowed page %d (lease %s)",
+                        slab.lease.owner_gpu, page_id, slab.lease.lease_id,
+                    )
+            except Exception:
+                _logger.debug("V6.D Phase 2 buffer allocation failed", exc_info=True)
+
+        return page_id
+
+    def _return_slab_page(self, page: PhysicalPage) -> bool:
+        """Give a freed borrowed page back to its slab.
+
+        Once all of a slab's pages are free its lease goes back to the
+        lender, except for one idle slab kept while the local pool is
+        exhausted: alternating alloc/free at the limit then reuses it
+        instead of borrowing and releasing a lease every cycle
+        (``_release_idle_slabs`` returns it when local pages free up).
+        Returns False for pages that do not belong to a slab.
+        """
+        slabs = self._overflow_slabs
+        if not page.is_borrowed or page.lease_id not in slabs:
+            return False
+        slab = slabs[page.lease_id]
+
+        page.allocated = False
+        page.ref_count = 0
+        if page.page_id not in slab.free_ids:
+            slab.free_ids.append(page.page_id)
+        if slab.in_use > 0:
+            return True
+        if not self._free_pages and not any(
+                s.in_use == 0 for s in slabs.values() if s is not slab):
+            return True
+        self._release_slab(slab)
+        return True
+
+    def _release_slab(self, slab: OverflowSlab) -> None:
+        """Return an idle slab's lease; its page ids are kept for reuse."""
+        lease_id = slab.lease.lease_id
+        try:
+            if self._lending_pool:
+                self._lending_pool.release(lease_id)
+        except Exception:
+            _logger.debug("Slab lease release failed (%s)", lease_id, exc_info=True)
+        self._lending_leases.pop(lease_id, None)
+        del self._overflow_slabs[lease_id]
+        for pid in slab.page_ids:
+            p = self._pages[pid]
+            p.is_borrowed = False
+            p.lease_id = None
+            p.borrowed_tensor = None
+        self._spare_page_ids.extend(slab.page_ids)
+        self._slab_releases += 1
+
+    def _release_idle_slabs(self) -> None:
+        """Return every fully idle slab (the local pool has room again)."""
+        for slab in [s for s in self._overflow_slabs.values() if s.in_use == 0]:
+            self._release_slab(slab)
+
+    def _evict_lru(self, exclude: Optional[str] = None) -> Optional[int]:
+        """Free a page by preempting the least-recently-used request.
         
         VTP INTEGRATION (L1 -> L2/L4/L7 WebGPU):
         Instead of completely destroying the page, we instruct the VTP C++ backend
         to offload the KV tensor to the lowest acceptable tier (e.g. Host RAM or WebGPU).
+
+        Inline path, run under ``self._lock`` by ``append_token`` when no
+        background reclaimer is running (see ``reclaim_cycle``). *exclude*
+        is the request being grown, which is never preempted.
+        """
+        groups = self._select_victims(1, exclude)
+        if not groups:
+            return None
+        victims, offload = self._detach_victims(groups)
+        for victim in offload:
+            self._offload_page(victim.page_id)
+        self._free_victims(victims)
+        return self._alloc_page()
+
+    def _select_victims(
+        self, n: int, exclude: Optional[str] = None, preempt: bool = True,
+    ) -> List[Tuple[Optional[str], List[PhysicalPage]]]:
+        """Victims covering at least *n* pages, as ``(request_id, pages)``.
+
+        Taking single pages out of a live request left ``num_tokens``
+        pointing past its page list, so a live request is only ever
+        preempted whole. Groups holding borrowed pages come first, then
+        allocated pages that no page table references (``request_id``
+        None), then the least recently used requests. Requests sharing a page (fork, prefix
+        cache) or already being offloaded are skipped, and with
+        ``preempt=False`` no live request is chosen at all.
         """
-        candidates = [
-            p for p in self._pages
+        evicting = self._evicting
+        referenced: Set[int] = set()
+        requests = []
+        for request_id, entry in self._page_tables.items():
+            referenced.update(entry.pages)
+            if not preempt or request_id == exclude or not entry.pages:
+                continue
+            pages = [self._pages[pid] for pid in entry.pages]
+            if any(p.ref_count > 1 or p.page_id in evicting for p in pages):
+                continue
+            requests.append((request_id, pages))
+        orphans = [
+            (None, [p]) for p in self._pages
             if p.allocated and p.ref_count <= 1
+            and p.page_id not in referenced and p.page_id not in evicting
         ]
-        if not candidates:
-            return None
+        # Borrowed pages first (return to owner), then unreferenced pages,
+        # then least recently used
+        groups = sorted(orphans + requests, key=lambda g: (
+            not any(p.is_borrowed for p in g[1]), g[0] is not None,
+            max(p.last_access for p in g[1])))
+
+        chosen, covered = [], 0
+        for group in groups:
+            if covered >= n:
+                break
+            chosen.append(group)
+            covered += len(group[1])
+        return chosen
+
+    def _detach_victims(
+        self, groups: List[Tuple[Optional[str], List[PhysicalPage]]],
+    ) -> Tuple[List[PhysicalPage], List[PhysicalPage]]:
+        """Drop the victims' page tables and prefix-cache entries.
+
+        A preempted request disappears from ``_page_tables`` (its next
+        ``append_token`` returns None) and is reported by
+        ``was_preempted`` until it is freed or allocated again. Its KV is
+        recomputed, never restored, so only unreferenced pages are worth
+        offloading. Returns ``(victims, pages to offload)``.
+        """
+        victims, offload = [], []
+        for request_id, pages in groups:
+            if request_id is not None:
+                entry = self._page_tables.pop(request_id)
+                self._preempted[request_id] = entry.num_tokens
+            else:
+                offload.extend(pages)
+            victims.extend(pages)
+        ids = {p.page_id for p in victims}
+        for k in [k for k, v in self._prefix_cache.items() if v in ids]:
+            del self._prefix_cache[k]
+        return victims, offload
+
+    def _free_victims(self, victims: List[PhysicalPage]) -> None:
+        """Return offloaded victims to their slab or the free list."""
+        for victim in victims:
+            victim.ref_count = 0
+            self._total_frees += 1
+            # Slab pages go back to their slab, not the local free list
+            if self._return_slab_page(victim):
+                continue
+            self._release_victim_lease(victim)
+            victim.allocated = False
+            self._free_pages.append(victim.page_id)
+
+    def was_preempted(self, request_id: str) -> bool:
+        """True if eviction dropped *request_id*'s KV (recompute it)."""
+        with self._lock:
+            return request_id in self._preempted
+
+    def _release_victim_lease(self, victim: PhysicalPage) -> None:
+        """Release the lending lease of a non-slab borrowed victim."""
+        if victim.is_borrowed and victim.lease_id:
+            try:
+                if self._lending_pool:
+                    self._lending_pool.release(victim.lease_id)
+                self._lending_leases.pop(victim.lease_id, None)
+            except Exception:
+                _logger.debug("Lending lease release failed", exc_info=True)
+            victim.is_borrowed = False
+            victim.lease_id = None
 
-        # Prefer evicting borrowed pages first (return to owner)
-        borrowed = [p for p in candidates if p.is_borrowed]
-        if borrowed:
-            victim = min(borrowed, key=lambda p: p.last_access)
-        else:
-            victim = min(candidates, key=lambda p: p.last_access)
+    def _page_to_host(self, page_id: int) -> Any:
+        """Copy a page of ``_gpu_pool`` into an arena-backed host tensor.
 
+        The buffer comes from the shared pinned host arena and goes back to
+        it when the host copy is dropped. The copy is issued on a per-device
+        side stream, so only that stream is synchronised — decode kernels on
+        the default stream keep running. One host copy serves both the
+        parity encode and the L3 offload. Returns None when there is no
+        tensor pool.
+        """
+        if not _TORCH or getattr(self, "_gpu_pool", None) is None:
+            return None
+        from core.host_arena import get_host_arena
+        src = self._gpu_pool[page_id]
+        if not src.is_cuda:
+            return get_host_arena().copy_to_host(src)
+
+        streams = self._offload_streams
+        key = str(src.device)
+        if key not in streams:
+            streams[key] = torch.cuda.Stream(device=src.device)
+        stream = streams[key]
+        stream.wait_stream(torch.cuda.current_stream(src.device))
+        return get_host_arena().copy_to_host(src, stream=stream)
+
+    def _offload_page(self, page_id: int) -> None:
+        """Compress, parity-encode and offload one victim page to L3.
+
+        Safe to call without ``self._lock`` once the page is detached: it
+        only reads the page and writes per-page sidecar entries.
+        """
         # KV compress before eviction if not already compressed
         # Compressed form survives eviction for ~4.6x memory saving
-        if self._kv_compressor is not None and victim.page_id not in self._compressed_pages:
-            self.compress_page_bulk(victim.page_id)
+        if self._kv_compressor is not None and page_id not in self._compressed_pages:
+            self.compress_page_bulk(page_id)
+
+        page_tensor = None
+        try:
+            page_tensor = self._page_to_host(page_id)
+        except Exception:
+            _logger.debug("GPU page read failed", exc_info=True)
 
         # Parity: encode evicted page with XOR erasure coding before eviction
         # Allows single-fault recovery if the page needs to be restored
         if _PARITY and _parity_kv is not None:
             try:
                 page_data = None
-                if hasattr(self, '_gpu_pool') and self._gpu_pool is not None:
-                    try:
-                        page_data = self._gpu_pool[victim.page_id].cpu().contiguous().numpy().tobytes()
-                    except Exception:
-                        _logger.debug("GPU page read failed", exc_info=True)
-                elif victim.page_id in self._compressed_pages:
+                if page_tensor is not None:
+                    # uint8 view of the host copy — encode() reads it in place
+                    page_data = page_tensor.reshape(-1).view(torch.uint8).numpy()
+                elif page_id in self._compressed_pages:
                     # Use compressed form if available
                     import json
-                    page_data = json.dumps(self._compressed_pages[victim.page_id]).encode("utf-8")
+                    page_data = json.dumps(self._compressed_pages[page_id]).encode("utf-8")
 
-                if page_data and len(page_data) > 0:
-                    engram_id = f"kv_page_{victim.page_id}"
+                if page_data is not None and len(page_data) > 0:
+                    engram_id = f"kv_page_{page_id}"
                     _parity_kv.store_engram(engram_id, page_data, num_shards=3)
-                    self._parity_engrams[victim.page_id] = engram_id
+                    self._parity_engrams[page_id] = engram_id
                     _logger.debug(
                         "Parity engram stored for page %d (%d bytes, 3 shards)",
-                        victim.page_id, len(page_data),
+                        page_id, len(page_data),
                     )
             except Exception as e:
-                _logger.debug("Parity encode failed for page %d: %s", victim.page_id, e)
+                _logger.debug("Parity encode failed for page %d: %s", page_id, e)
 
         # 1. KV PAGE OFFLOAD via HierarchicalMemoryManager (GPU -> CPU RAM)
-        # We hook into HierarchicalMemoryManager to move the tensor.
-        if hasattr(self, '_gpu_pool') and self._gpu_pool is not None:
-            block_id = f"kv_page_{victim.page_id}"
+        # The page is already in pinned host memory, so the L1 -> L3
+        # migration keeps it as-is instead of copying it again.
+        if page_tensor is not None:
+            block_id = f"kv_page_{page_id}"
             
             # Offload to CPU RAM (L3)
             target_tier: str = "L3"
             
             try:
-                # Extract actual tensor slice representing the page
-                page_tensor = self._gpu_pool[victim.page_id].clone()
-                
                 from core.memory_block import MemoryBlock
                 mb = MemoryBlock(block_id, size_mb=page_tensor.nelement() * page_tensor.element_size() / (1024*1024))
                 
@@ -1071,36 +1441,136 @@ class PagedKVCacheManager:
                 # Command actual physical migration via VTP / HMM
                 hm_manager.migrate(mb, target_tier, page_tensor)
                 
-                _logger.info(f"KV page {victim.page_id} evicted to {target_tier} via HierarchicalMemoryManager")
+                _logger.info(f"KV page {page_id} evicted to {target_tier} via HierarchicalMemoryManager")
             except Exception as e:
                 _logger.error(f"[VTP] Offload error: {e}")
 
-        # Remove from any request's page table
-        for entry in self._page_tables.values():
-            if victim.page_id in entry.pages:
-                entry.pages.remove(victim.page_id)
-                break
+    # ------------------------------------------------------------------
+    # Background reclaimer
+    # ------------------------------------------------------------------
 
-        # Remove from prefix cache
-        to_remove = [k for k, v in self._prefix_cache.items() if v == victim.page_id]
-        for k in to_remove:
-            del self._prefix_cache[k]
+    @property
+    def eviction_worker_running(self) -> bool:
+        evictor = getattr(self, "_evictor", None)
+        return evictor is not None and evictor.is_alive()
 
-        # Release lending lease if borrowed
-        if victim.is_borrowed and victim.lease_id:
+    def start_eviction_worker(self) -> None:
+        """Start the background reclaimer thread (idempotent)."""
+        if self.eviction_worker_running:
+            return
+        self._evict_stop.clear()
+        self._evictor = threading.Thread(
+            target=self._eviction_loop, daemon=True, name="PagedKV_Reclaim",
+        )
+        self._evictor.start()
+        _logger.info(
+            "PagedKV: async eviction on (low=%.0f%%, high=%.0f%%)",
+            self.config.evict_low_watermark * 100,
+            self.config.evict_high_watermark * 100,
+        )
+
+    def stop_eviction_worker(self, timeout: float = 2.0) -> None:
+        """Stop the reclaimer; later exhaustion falls back to inline eviction."""
+        evictor = getattr(self, "_evictor", None)
+        if evictor is None:
+            return
+        self._evict_stop.set()
+        self._evict_wakeup.set()
+        evictor.join(timeout)
+        self._evictor = None
+        with self._free_cond:
+            self._free_cond.notify_all()
+
+    def _eviction_loop(self) -> None:
+        while not self._evict_stop.is_set():
+            self._evict_wakeup.wait(self._EVICT_POLL_S)
+            self._evict_wakeup.clear()
+            if self._evict_stop.is_set():
+                break
             try:
-                if self._lending_pool:
-                    self._lending_pool.release(victim.lease_id)
-                self._lending_leases.pop(victim.lease_id, None)
+                while self.reclaim_cycle() > 0 and not self._evict_stop.is_set():
+                    pass
             except Exception:
-                _logger.debug("Lending lease release failed", exc_info=True)
-            victim.is_borrowed = False
-            victim.lease_id = None
+                _logger.debug("PagedKV reclaim cycle failed", exc_info=True)
+
+    def _free_page_count(self) -> int:
+        """Pages allocatable without new eviction (local + idle slab pages)."""
+        slabs = self._overflow_slabs
+        return len(self._free_pages) + sum(len(s.free_ids) for s in slabs.values())
+
+    def _reclaim_target(self) -> int:
+        cfg = self.config
+        return watermark_reclaim_count(
+            self._free_page_count(), cfg.max_pages,
+            cfg.evict_low_watermark, cfg.evict_high_watermark, cfg.evict_batch_max,
+        )
 
-        victim.allocated = False
-        victim.ref_count = 0
-        self._total_frees += 1
-        return victim.page_id
+    def reclaim_cycle(self) -> int:
+        """Run one watermark-driven reclaim pass. Returns pages reclaimed.
+
+        Victims (see ``_select_victims``) are picked and detached under
+        ``self._lock``. Unreferenced pages are offloaded (compression,
+        pinned D2H copy, parity, L3 migration) with the lock released,
+        then returned to the free list and waiters notified. Live requests
+        are only preempted while an allocation is waiting, and their pages
+        are freed straight away.
+        """
+        with self._lock:
+            groups = self._select_victims(self._reclaim_target(),
+                                          preempt=self._alloc_waiters > 0)
+            victims, offload = self._detach_victims(groups)
+            if not victims:
+                # Let stalled allocators re-check instead of waiting it out
+                self._free_cond.notify_all()
+                return 0
+            ids = {p.page_id for p in offload}
+            dropped = [v for v in victims if v.page_id not in ids]
+            if dropped:
+                self._free_victims(dropped)
+                self._async_evictions += len(dropped)
+                self._free_cond.notify_all()
+            for victim in offload:
+                self._evicting.add(victim.page_id)
+
+        try:
+            for victim in offload:
+                self._offload_page(victim.page_id)
+        finally:
+            if offload:
+                with self._lock:
+                    for victim in offload:
+                        self._evicting.discard(victim.page_id)
+                    self._free_victims(offload)
+                    self._async_evictions += len(offload)
+                    self._free_cond.notify_all()
+        return len(victims)
+
+    def _wait_for_free_page(self, exclude: Optional[str] = None) -> Optional[int]:
+        """Block (with ``self._lock`` held) until the reclaimer frees a page.
+
+        Gives up when nothing is left to reclaim, and falls back to inline
+        eviction after ``config.evict_wait_timeout_s``.
+        """
+        t0 = time.perf_counter()
+        deadline = t0 + self.config.evict_wait_timeout_s
+        self._alloc_stalls += 1
+        self._alloc_waiters += 1
+        try:
+            while True:
+                self._evict_wakeup.set()
+                page_id = self._alloc_page()
+                if page_id is not None:
+                    return page_id
+                if not self._evicting and not self._select_victims(1, exclude):
+                    return None
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self.eviction_worker_running:
+                    _logger.warning("PagedKV: reclaimer stalled, evicting inline")
+                    return self._evict_lru(exclude)
+                self._free_cond.wait(min(remaining, self._EVICT_POLL_S))
+        finally:
+            self._alloc_waiters -= 1
+            self._alloc_stall_s += time.perf_counter() - t0
 
     def recover_page(self, page_id: int, simulate_shard_loss: int = -1) -> Optional[bytes]:
         """Recover an evicted page from its parity engram.
@@ -1159,6 +1629,15 @@ class PagedKVCacheManager:
             "free_pages": len(self._free_pages),
             "borrowed_pages": borrowed_pages,
             "overflow_borrows": self._overflow_borrows,
+            "overflow_slabs": len(self._overflow_slabs),
+            "overflow_slab_pages": self.config.overflow_slab_pages,
+            "slab_releases": self._slab_releases,
+            "async_eviction": self.eviction_worker_running,
+            "evict_in_flight": len(getattr(self, "_evicting", ())),
+            "async_evictions": getattr(self, "_async_evictions", 0),
+            "preempted_requests": len(getattr(self, "_preempted", ())),
+            "alloc_stalls": getattr(self, "_alloc_stalls", 0),
+            "alloc_stall_ms": getattr(self, "_alloc_stall_s", 0.0) * 1e3,
             "utilization": used / max(len(self._pages), 1),
             "peak_usage": self._peak_usage,
             "total_allocations": self._total_allocations,
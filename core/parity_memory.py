@@ -11,7 +11,8 @@ use ``experimental.aitp_fec.FastFEC`` which implements real GF(2^8)
 Cauchy Reed-Solomon (up to ``parity_shards`` simultaneous losses).
 
 Uses Rust native (vramancer_rust) or C++ (swarm_core) SIMD-accelerated
-XOR when available, falls back to pure Python.
+XOR when available, then a NumPy path that XORs 8 bytes at a time through
+``uint64`` views, and finally pure Python.
 
 Formerly named ``holographic_memory.py`` — renamed for honesty.
 """
@@ -21,10 +22,22 @@ import time
 import logging
 from typing import List, Tuple, Dict, Any, Optional
 
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
 logger = logging.getLogger("vramancer.parity_memory")
 
 _MINIMAL = os.environ.get("VRM_MINIMAL_TEST", "")
 
+_BACKENDS = ("native", "numpy", "python")
+
+# Window for the NumPy path: large blobs are XORed slice by slice straight
+# from the source buffer, so no padded or temporary copy of a whole shard
+# is ever materialised to build the parity.
+_STREAM_CHUNK = 4 * 1024 * 1024
+
 # ── Prometheus metrics (lazy) ──────────────────────────────────────────
 _PARITY_ENCODES = None
 _PARITY_HEALS = None
@@ -53,73 +66,148 @@ def _init_parity_metrics():
         logger.debug("Parity memory metric registration failed", exc_info=True)
 
 
+def _load_native():
+    """Return the first importable SIMD XOR extension, or None."""
+    try:
+        import vramancer_rust as _native
+        logger.info("Parity: using Rust native XOR (SIMD)")
+        return _native
+    except ImportError:
+        pass
+    try:
+        import swarm_core as _native
+        logger.info("Parity: using C++ native XOR (SIMD)")
+        return _native
+    except ImportError:
+        return None
+
+
+def _xor_into(acc: "np.ndarray", src) -> None:
+    """XOR the bytes-like *src* into the uint8 array *acc* in place.
+
+    ``len(src)`` may be shorter than ``acc`` (implicit zero padding). The
+    8-byte-aligned body of each window goes through ``uint64`` views; the
+    remaining 0-7 bytes are XORed as uint8.
+    """
+    view = memoryview(src).cast("B")
+    n = view.nbytes
+    for start in range(0, n, _STREAM_CHUNK):
+        end = min(start + _STREAM_CHUNK, n)
+        a = acc[start:end]
+        b = np.frombuffer(view[start:end], dtype=np.uint8)
+        body = (end - start) & ~7
+        if body:
+            a64 = a[:body].view(np.uint64)
+            np.bitwise_xor(a64, b[:body].view(np.uint64), out=a64)
+        if body < end - start:
+            tail = a[body:]
+            np.bitwise_xor(tail, b[body:], out=tail)
+
+
 class ParityKVManager:
     """XOR parity erasure coding for distributed tensor shards.
 
     Provides single-fault-tolerance: can recover from exactly 1 lost
     shard out of N. For stronger guarantees, use ``FastFEC`` which
     provides Reed-Solomon with configurable redundancy.
+
+    Args:
+        backend: Force the XOR implementation (``"native"``, ``"numpy"``
+            or ``"python"``). Default picks the fastest available; native
+            extensions are not probed under ``VRM_MINIMAL_TEST``.
     """
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         self.active_engrams: Dict[str, Dict[str, Any]] = {}
         self.native_core = None
         self._use_native = False
 
         _init_parity_metrics()
 
-        if _MINIMAL:
-            return
+        if backend is not None and backend not in _BACKENDS:
+            raise ValueError(
+                f"Unknown parity backend {backend!r} (expected one of {_BACKENDS})"
+            )
 
-        try:
-            import vramancer_rust as _native
-            self.native_core = _native
-            self._use_native = True
-            logger.info("Parity: using Rust native XOR (SIMD)")
-        except ImportError:
-            try:
-                import swarm_core as _native
-                self.native_core = _native
-                self._use_native = True
-                logger.info("Parity: using C++ native XOR (SIMD)")
-            except ImportError:
-                logger.debug("Parity: using Python fallback XOR")
+        if backend == "native" or (backend is None and not _MINIMAL):
+            self.native_core = _load_native()
+            self._use_native = self.native_core is not None
+            if backend == "native" and not self._use_native:
+                raise RuntimeError("Native XOR backend requested but not installed")
+
+        if self._use_native:
+            self.backend = "native"
+        elif backend == "numpy" and np is None:
+            raise RuntimeError("NumPy XOR backend requested but numpy is not installed")
+        elif backend == "python" or np is None:
+            self.backend = "python"
+        else:
+            self.backend = "numpy"
+        logger.debug("Parity: XOR backend = %s", self.backend)
 
     def _xor_bytes(self, b1: bytes, b2: bytes) -> bytes:
         """XOR two equal-length byte strings."""
+        if self.backend == "numpy":
+            acc = np.frombuffer(b1, dtype=np.uint8).copy()
+            _xor_into(acc, b2)
+            return acc.tobytes()
         return bytes(a ^ b for a, b in zip(b1, b2))
 
+    def _xor_accumulate(self, acc: bytearray, shards) -> None:
+        """XOR each bytes-like shard into *acc* in place.
+
+        Shards shorter than *acc* are treated as zero past their end.
+        """
+        if self.backend == "numpy":
+            arr = np.frombuffer(acc, dtype=np.uint8)
+            for shard in shards:
+                _xor_into(arr, shard)
+            return
+        for shard in shards:
+            for i, b in enumerate(memoryview(shard).cast("B")):
+                acc[i] ^= b
+
     def encode(
         self, tensor_blob: bytes, num_shards: int,
     ) -> Tuple[List[bytes], bytes]:
-        """Split tensor into *num_shards* data shards + 1 XOR parity shard."""
-        shard_size = len(tensor_blob) // num_shards
-        shards = []
-
-        for i in range(num_shards):
-            start = i * shard_size
-            end = start + shard_size if i < num_shards - 1 else len(tensor_blob)
-            shards.append(tensor_blob[start:end])
-
-        # Pad to equal length for XOR
-        max_len = max(len(s) for s in shards)
-        padded_shards = [s.ljust(max_len, b'\x00') for s in shards]
+        """Split tensor into *num_shards* data shards + 1 XOR parity shard.
+
+        *tensor_blob* may be any C-contiguous bytes-like object (``bytes``,
+        ``memoryview``, a uint8 NumPy array), which lets callers hand over
+        a host tensor without a ``tobytes()`` copy first. The data shards
+        are returned as ``memoryview`` slices of it (no copy); the trailing
+        shard(s) may be shorter than the parity, and their missing tail
+        counts as zero in both ``encode`` and ``heal``.
+        """
+        view = memoryview(tensor_blob).cast("B")
+        total = view.nbytes
+        # Ceil split: only the trailing shard(s) come up short, so the
+        # zero padding lands after the data and heal()'s concatenation
+        # always starts with the original blob.
+        shard_size = -(-total // num_shards)
+        shards = [
+            view[i * shard_size:(i + 1) * shard_size]
+            for i in range(num_shards)
+        ]
+
+        max_len = len(shards[0])
 
         # Generate parity
         if self._use_native and self.native_core is not None:
+            # The native extensions take equal-length bytes: only the short
+            # tail shard(s) get padded
             _gen = getattr(self.native_core, "generate_xor_parity", None) or \
                 self.native_core.generate_holographic_parity
-            parity = _gen(padded_shards)
+            parity = _gen([bytes(s).ljust(max_len, b'\x00') for s in shards])
         else:
-            parity = bytearray(max_len)
-            for shard in padded_shards:
-                parity = self._xor_bytes(parity, shard)
-            parity = bytes(parity)
+            acc = bytearray(max_len)
+            self._xor_accumulate(acc, shards)
+            parity = bytes(acc)
 
         if _PARITY_ENCODES:
             _PARITY_ENCODES.inc()
 
-        return padded_shards, parity
+        return shards, parity
 
     # Backward-compat alias
     encode_hologram = encode
@@ -149,7 +237,7 @@ class ParityKVManager:
 
         if self._use_native and self.native_core is not None:
             valid_shards = [
-                s for i, s in enumerate(shards)
+                bytes(s).ljust(len(parity), b'\x00') for i, s in enumerate(shards)
                 if i != missing_index and s is not None
             ]
             _repair = getattr(self.native_core, "repair_xor_shard", None) or \
@@ -158,14 +246,11 @@ class ParityKVManager:
                 valid_shards, parity,
             )
         else:
-            reconstructed_shard = bytearray(len(parity))
-            for i, shard in enumerate(shards):
-                if i != missing_index and shard is not None:
-                    reconstructed_shard = self._xor_bytes(
-                        reconstructed_shard, shard,
-                    )
-            reconstructed_shard = self._xor_bytes(reconstructed_shard, parity)
-            reconstructed_shard = bytes(reconstructed_shard)
+            acc = bytearray(parity)
+            self._xor_accumulate(acc, (
+                s for i, s in enumerate(shards) if i != missing_index and s is not None
+            ))
+            reconstructed_shard = bytes(acc)
 
         shards[missing_index] = reconstructed_shard
 
@@ -181,11 +266,12 @@ class ParityKVManager:
         self, engram_id: str, tensor_blob: bytes, num_shards: int,
     ) -> Dict[str, Any]:
         """Encode and store a tensor with parity for later healing."""
-        padded_shards, parity = self.encode(tensor_blob, num_shards)
+        shards, parity = self.encode(tensor_blob, num_shards)
         self.active_engrams[engram_id] = {
-            "shards": padded_shards,
+            # Own copies: the caller may reuse its buffer
+            "shards": [bytes(s) for s in shards],
             "parity": parity,
-            "original_size": len(tensor_blob),
+            "original_size": memoryview(tensor_blob).nbytes,
             "num_shards": num_shards,
             "created_at": time.time(),
         }
@@ -207,6 +293,7 @@ class ParityKVManager:
         return {
             "active_engrams": len(self.active_engrams),
             "native": self._use_native,
+            "backend": self.backend,
         }
 
 
@@ -0,0 +1,314 @@
+"""On-disk cache of startup profiling and placement results.
+
+Every load used to re-run the layer profiler, the GPU matmul/bandwidth
+micro-benchmarks, PCIe link detection and P2P probes before serving a
+token, although the answers only change when the box or the model does.
+``PlacementCache`` stores them as JSON files keyed by fingerprints:
+
+  - hardware: GPU names, memory sizes, compute capabilities, PCI bus ids,
+    driver / CUDA / HIP versions, torch version and the P2P override
+    (``gpu_profiles``, ``pcie_bw``, ``p2p``)
+  - model: hash of the model config (or parameter shapes when there is
+    no config), dtype and quantization mode, on top of the hardware
+    fingerprint (``layer_profiles``, ``plan``)
+
+Each entry stores its full fingerprint; an entry whose fingerprint does
+not match the current one (or was written by another cache version) is
+deleted and recomputed. Free VRAM is not part of any fingerprint: a plan
+solved while more memory was free is re-checked against the live
+``free_vram_mb`` of the GPU profiles (``plan_fits_free_vram``) and
+re-solved when it no longer fits. ``refresh=True`` (``vramancer split --refresh``,
+``VRM_PLACEMENT_REFRESH=1``) ignores existing entries and overwrites them.
+
+Location: ``VRM_PLACEMENT_CACHE_DIR``, else ``$VRM_DATA_DIR/placement_cache``
+(default ``~/.vramancer``). ``VRM_PLACEMENT_CACHE=0`` disables the cache;
+it is also off under ``VRM_MINIMAL_TEST`` unless explicitly enabled.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import platform
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("placement_cache")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.placement_cache")
+
+CACHE_VERSION = 1
+
+
+def _digest(obj: Any) -> str:
+    blob = json.dumps(obj, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _driver_version() -> Optional[str]:
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+        v = pynvml.nvmlSystemGetDriverVersion()
+        return v.decode() if isinstance(v, bytes) else str(v)
+    except Exception:
+        return None
+
+
+def hardware_fingerprint() -> Dict[str, Any]:
+    """Identity of the devices and software stack the measurements ran on."""
+    fp: Dict[str, Any] = {
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "p2p_override": os.environ.get("VRM_TRANSFER_P2P", ""),
+        "gpus": [],
+    }
+    try:
+        import torch
+    except ImportError:
+        return fp
+    fp["torch"] = torch.__version__
+    fp["cuda"] = torch.version.cuda
+    fp["hip"] = getattr(torch.version, "hip", None)
+    try:
+        n = torch.cuda.device_count() if torch.cuda.is_available() else 0
+    except Exception:
+        n = 0
+    for i in range(n):
+        try:
+            p = torch.cuda.get_device_properties(i)
+            fp["gpus"].append({
+                "name": p.name,
+                "total_memory": int(p.total_memory),
+                "cc": f"{p.major}.{p.minor}",
+                "sm": p.multi_processor_count,
+                "bus": f"{getattr(p, 'pci_domain_id', 0)}:{getattr(p, 'pci_bus_id', 0)}:"
+                       f"{getattr(p, 'pci_device_id', 0)}",
+            })
+        except Exception:
+            fp["gpus"].append({"index": i})
+    if n:
+        fp["driver"] = _driver_version()
+    return fp
+
+
+def model_fingerprint(model: Any, dtype: Any = None,
+                      quantization: Optional[str] = None) -> Dict[str, Any]:
+    """Identity of a model: config hash, dtype and quantization mode.
+
+    ``model`` may be an ``nn.Module``, a transformers config, a dict or a
+    model name (a name alone is weaker — prefer passing the config).
+    """
+    cfg = getattr(model, "config", model)
+    if hasattr(cfg, "to_dict"):
+        body: Any = cfg.to_dict()
+        for volatile in ("_name_or_path", "transformers_version", "_commit_hash"):
+            body.pop(volatile, None)
+        kind = "config"
+    elif isinstance(cfg, dict):
+        body, kind = cfg, "config"
+    elif isinstance(model, str):
+        body, kind = model, "name"
+    elif hasattr(model, "named_parameters"):
+        body = [(n, list(p.shape), str(p.dtype)) for n, p in model.named_parameters()]
+        kind = "params"
+    else:
+        body, kind = type(model).__name__, "type"
+    if dtype is None and hasattr(model, "parameters"):
+        try:
+            dtype = next(model.parameters()).dtype
+        except Exception:
+            dtype = None
+    if quantization is None:
+        quantization = os.environ.get("VRM_QUANTIZATION", "")
+    return {"kind": kind, "hash": _digest(body), "dtype": str(dtype) if dtype else None,
+            "quantization": quantization or None}
+
+
+def _to_jsonable(obj: Any) -> Any:
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (list, tuple)):
+        return [_to_jsonable(o) for o in obj]
+    return obj
+
+
+class PlacementCache:
+    """Fingerprint-keyed JSON store for profiles and placement plans."""
+
+    def __init__(self, directory: Optional[str] = None, enabled: bool = True,
+                 refresh: bool = False,
+                 hw_fingerprint: Optional[Callable[[], Dict[str, Any]]] = None):
+        if directory is None:
+            directory = os.environ.get("VRM_PLACEMENT_CACHE_DIR") or os.path.join(
+                os.environ.get("VRM_DATA_DIR", os.path.expanduser("~/.vramancer")),
+                "placement_cache")
+        self.directory = directory
+        self.enabled = enabled
+        self.refresh = refresh
+        self._hw_fn = hw_fingerprint or hardware_fingerprint
+        self._hw: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidated": 0, "writes": 0}
+
+    @property
+    def hardware(self) -> Dict[str, Any]:
+        if self._hw is None:
+            self._hw = self._hw_fn()
+        return self._hw
+
+    def fingerprint(self, model: Optional[Dict[str, Any]] = None,
+                    **extra: Any) -> Dict[str, Any]:
+        fp: Dict[str, Any] = {"hw": self.hardware}
+        if model is not None:
+            fp["model"] = model
+        if extra:
+            fp["extra"] = extra
+        return fp
+
+    def _path(self, kind: str, fp: Dict[str, Any]) -> str:
+        # The file name ignores the hardware part: a new GPU or driver maps
+        # to the same file, which is then detected as stale and replaced.
+        key = {k: v for k, v in fp.items() if k != "hw"}
+        return os.path.join(self.directory, f"{kind}-{_digest(key)[:20]}.json")
+
+    def get(self, kind: str, fp: Dict[str, Any]) -> Optional[Any]:
+        """Cached value of ``kind`` for ``fp``, or None (miss / stale / refresh)."""
+        if not self.enabled or self.refresh:
+            return None
+        path = self._path(kind, fp)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return None
+        except (OSError, ValueError):
+            entry = None
+        if (not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION
+                or entry.get("fingerprint") != json.loads(json.dumps(fp, default=str))):
+            log.info(f"Placement cache: {kind} entry is stale, recomputing")
+            self.stats["invalidated"] += 1
+            self._remove(path)
+            return None
+        self.stats["hits"] += 1
+        return entry["data"]
+
+    def put(self, kind: str, fp: Dict[str, Any], data: Any) -> None:
+        if not self.enabled:
+            return
+        path = self._path(kind, fp)
+        entry = {"version": CACHE_VERSION, "kind": kind, "created": time.time(),
+                 "fingerprint": fp, "data": _to_jsonable(data)}
+        with self._lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump(entry, f, default=str)
+                os.replace(tmp, path)
+                self.stats["writes"] += 1
+            except OSError as e:
+                log.debug(f"Placement cache write failed: {e}")
+
+    def cached(self, kind: str, fp: Dict[str, Any], compute: Callable[[], Any],
+               decode: Callable[[Any], Any] = lambda d: d) -> Any:
+        """``decode(get())`` on a hit, else ``compute()`` stored and returned."""
+        data = self.get(kind, fp)
+        if data is not None:
+            try:
+                return decode(data)
+            except Exception as e:
+                log.debug(f"Placement cache: undecodable {kind} entry ({e})")
+                self._remove(self._path(kind, fp))
+        value = compute()
+        self.put(kind, fp, value)
+        return value
+
+    def clear(self) -> int:
+        """Delete every cache file; returns how many were removed."""
+        n = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.directory, name))
+                n += 1
+        return n
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# --- dataclass decoders ----------------------------------------------------
+
+def decode_layer_profiles(data: List[Dict[str, Any]]) -> List[Any]:
+    from core.layer_profiler import LayerProfile
+    return [LayerProfile(**d) for d in data]
+
+
+def decode_gpu_profiles(data: List[Dict[str, Any]]) -> List[Any]:
+    from core.layer_profiler import GPUProfile
+    return [GPUProfile(**d) for d in data]
+
+
+def decode_plan(data: Dict[str, Any]) -> Any:
+    from core.layer_profiler import PlacementPlan
+    d = dict(data)
+    d["assignments"] = [tuple(a) for a in d.get("assignments", [])]
+    d["gpu_utilization"] = {int(k): v for k, v in d.get("gpu_utilization", {}).items()}
+    d["gpu_memory_mb"] = {int(k): v for k, v in d.get("gpu_memory_mb", {}).items()}
+    return PlacementPlan(**d)
+
+
+def plan_fits_free_vram(plan: Any, gpu_profiles: List[Any]) -> bool:
+    """True if each GPU still has the free VRAM ``plan`` places on it.
+
+    Host RAM / NVMe tiers (negative indices) are not checked. A plan
+    without per-GPU memory (written before it was recorded) never fits.
+    """
+    placed = getattr(plan, "gpu_memory_mb", None) or {}
+    if not placed:
+        return not plan.assignments
+    free = {gp.index: float(gp.free_vram_mb) for gp in gpu_profiles}
+    for idx, mb in placed.items():
+        if idx >= 0 and mb > free.get(idx, 0.0) + 1e-6:
+            return False
+    return True
+
+
+_CACHE: Optional[PlacementCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_placement_cache() -> PlacementCache:
+    """Process-wide cache configured from the environment."""
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                flag = os.environ.get("VRM_PLACEMENT_CACHE", "")
+                enabled = flag != "0" and (flag == "1" or not os.environ.get("VRM_MINIMAL_TEST"))
+                refresh = os.environ.get("VRM_PLACEMENT_REFRESH", "") == "1"
+                _CACHE = PlacementCache(enabled=enabled, refresh=refresh)
+    return _CACHE
+
+
+__all__ = [
+    "PlacementCache",
+    "get_placement_cache",
+    "hardware_fingerprint",
+    "model_fingerprint",
+    "plan_fits_free_vram",
+]
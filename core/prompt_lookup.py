@@ -0,0 +1,182 @@
+"""
+Prompt-lookup drafting
+======================
+
+Model-free drafter for speculative decoding. Code edits, RAG answers and
+summaries copy long spans of the prompt, so the best guess for the next
+tokens is often "whatever followed the current suffix last time it
+appeared". ``VRM_PROMPT_LOOKUP`` only reached this through HF
+``prompt_lookup_num_tokens``. That path rescans the whole context for an
+n-gram on every step, and it is not available to
+``SwarmSpeculativeDecoder``, ``SpeculativeTurboEngine`` or the continuous
+batcher.
+
+  - ``SuffixAutomaton`` indexes prompt + generated tokens incrementally
+    (amortised O(1) per token). It tracks the longest suffix of the text
+    that also occurs earlier. That suffix can be of any length, not just
+    a fixed n-gram size.
+  - ``propose(n)`` copies the tokens that followed the earliest earlier
+    occurrence of that suffix, in O(n).
+  - ``PromptLookupDrafter`` is a ``draft_model_callable(ids, n)``. It only
+    feeds the tokens appended since its last call, and ``for_request()``
+    gives each batched request its own index. It returns zero to ``n``
+    tokens with no probabilities, so verification treats them as
+    deterministic drafts and the output stays exact.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+try:
+    import torch
+    _HAS_TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _HAS_TORCH = False
+
+
+class SuffixAutomaton:
+    """Online suffix automaton over a token sequence.
+
+    Besides the usual ``next`` / ``link`` / ``len`` arrays, every state
+    keeps ``end``, the end position of the first occurrence of its
+    substrings. The match state is advanced against the automaton *before*
+    each new token is added. The matched suffix therefore always has an
+    earlier occurrence that is followed by at least one token.
+    """
+
+    def __init__(self, tokens: Sequence[int] = ()):
+        self.tokens: List[int] = []
+        self._next: List[Dict[int, int]] = [{}]
+        self._link: List[int] = [-1]
+        self._len: List[int] = [0]
+        self._end: List[int] = [-1]
+        self._last = 0
+        self._state = 0
+        self._match = 0
+        self.extend(tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def match_len(self) -> int:
+        """Length of the longest suffix that occurred earlier in the text."""
+        return self._match
+
+    def _new_state(self, length: int, end: int, link: int = -1,
+                   nxt: Dict[int, int] = None) -> int:
+        self._next.append(dict(nxt) if nxt else {})
+        self._link.append(link)
+        self._len.append(length)
+        self._end.append(end)
+        return len(self._len) - 1
+
+    def append(self, token: int) -> None:
+        """Add one token to the text and update the longest earlier match."""
+        nxt, link, size = self._next, self._link, self._len
+
+        # Longest suffix that occurs in the text *before* this token
+        s, m = self._state, self._match
+        while s and token not in nxt[s]:
+            s = link[s]
+            m = size[s]
+        if token in nxt[s]:
+            s, m = nxt[s][token], m + 1
+        else:
+            s, m = 0, 0
+
+        pos = len(self.tokens)
+        self.tokens.append(token)
+        cur = self._new_state(size[self._last] + 1, pos)
+        p = self._last
+        while p != -1 and token not in nxt[p]:
+            nxt[p][token] = cur
+            p = link[p]
+        if p == -1:
+            link[cur] = 0
+        else:
+            q = nxt[p][token]
+            if size[p] + 1 == size[q]:
+                link[cur] = q
+            else:
+                clone = self._new_state(size[p] + 1, self._end[q], link[q], nxt[q])
+                while p != -1 and nxt[p].get(token) == q:
+                    nxt[p][token] = clone
+                    p = link[p]
+                link[q] = link[cur] = clone
+        self._last = cur
+
+        # A split may have moved the shorter strings of ``s`` to a clone
+        while s and size[link[s]] >= m:
+            s = link[s]
+        self._state, self._match = s, m
+
+    def extend(self, tokens: Sequence[int]) -> None:
+        for token in tokens:
+            self.append(int(token))
+
+    def propose(self, num_tokens: int, min_match: int = 1) -> List[int]:
+        """Tokens that followed the earliest earlier occurrence of the
+        longest matched suffix. The result is empty if that suffix is
+        shorter than *min_match*."""
+        if num_tokens <= 0 or self._match < max(1, min_match):
+            return []
+        start = self._end[self._state] + 1
+        return self.tokens[start:start + num_tokens]
+
+
+class PromptLookupDrafter:
+    """``draft_model_callable`` that copies continuations from the context.
+
+    The index follows the ``ids`` it is called with. If they extend the
+    indexed text, only the new tail is added. Otherwise, for example on a
+    new prompt, the index is rebuilt. The extension check compares the
+    first and last indexed tokens, not the whole prefix, so each call stays
+    O(new tokens + n).
+    """
+
+    def __init__(self, max_draft: int = 10, min_match: int = 2):
+        self.max_draft = max_draft
+        self.min_match = min_match
+        self.index = SuffixAutomaton()
+        self.calls = 0
+        self.hits = 0
+
+    def for_request(self) -> "PromptLookupDrafter":
+        """Fresh drafter with the same settings (one index per request)."""
+        return PromptLookupDrafter(self.max_draft, self.min_match)
+
+    def reset(self) -> None:
+        self.index = SuffixAutomaton()
+
+    def sync(self, ids: Sequence[int]) -> None:
+        """Index *ids*, reusing the current index if they extend it."""
+        known = self.index.tokens
+        n = len(known)
+        if n and (len(ids) < n or int(ids[n - 1]) != known[-1] or int(ids[0]) != known[0]):
+            self.reset()
+            n = 0
+        tail = ids[n:]
+        self.index.extend(tail.tolist() if hasattr(tail, "tolist") else tail)
+
+    def __call__(self, input_ids: Any, num_tokens: int) -> "torch.Tensor":
+        row = input_ids[0] if getattr(input_ids, "dim", lambda: 1)() > 1 else input_ids
+        self.sync(row)
+        self.calls += 1
+        tokens = self.index.propose(min(num_tokens, self.max_draft), self.min_match)
+        if tokens:
+            self.hits += 1
+        return torch.tensor([tokens], dtype=torch.long,
+                            device=getattr(input_ids, "device", None))
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "hit_rate": self.hits / max(1, self.calls),
+            "indexed_tokens": len(self.index),
+        }
+
+
+__all__ = ["SuffixAutomaton", "PromptLookupDrafter"]
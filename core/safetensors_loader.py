@@ -0,0 +1,281 @@
+"""Zero-copy safetensors loader with layer-range selection.
+
+``cross_node.load_partial_model`` used to build the full model through
+``from_pretrained`` and park the unused layers on disk, so a worker that
+serves a quarter of a 70B model still paid for reading (and briefly
+holding) much more than its share. This loader works on the checkpoint
+files directly:
+
+  - reads ``model.safetensors.index.json`` (or a single
+    ``model.safetensors``) and each shard's JSON header
+  - selects only the tensors of the assigned layer range (plus embeddings
+    on the first stage and final norm / LM head on the last; with tied
+    weights and no stored LM head the last stage also takes the embeddings)
+  - memory-maps each shard copy-on-write and wraps the selected byte
+    ranges with ``torch.frombuffer`` — on CPU with the checkpoint dtype
+    no bytes are copied and pages fault in on first use
+  - for other devices or dtypes, materialises each tensor straight into a
+    preallocated target buffer, one shard per worker thread
+
+``build_partial_model`` assembles a transformers model on the meta
+device, assigns the loaded tensors and rebuilds non-persistent buffers
+(rotary tables); layers outside the range stay on meta and cost nothing.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("st_loader")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.safetensors_loader")
+
+INDEX_FILE = "model.safetensors.index.json"
+SINGLE_FILE = "model.safetensors"
+
+_LAYER_RE = re.compile(r"(?:^|\.)(?:layers|h|blocks)\.(\d+)\.")
+_EMBED_RE = re.compile(r"(?:embed|wte|wpe)")
+
+if _TORCH:
+    _DTYPES = {
+        "F64": torch.float64, "F32": torch.float32, "F16": torch.float16,
+        "BF16": torch.bfloat16, "I64": torch.int64, "I32": torch.int32,
+        "I16": torch.int16, "I8": torch.int8, "U8": torch.uint8,
+        "BOOL": torch.bool,
+    }
+    if hasattr(torch, "float8_e4m3fn"):
+        _DTYPES["F8_E4M3"] = torch.float8_e4m3fn
+        _DTYPES["F8_E5M2"] = torch.float8_e5m2
+else:
+    _DTYPES = {}
+
+
+def read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """Parse a shard header -> (``{name: {dtype, shape, data_offsets}}``, data start)."""
+    with open(path, "rb") as f:
+        (n,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(n))
+    header.pop("__metadata__", None)
+    return header, 8 + n
+
+
+def layer_index(name: str) -> Optional[int]:
+    """Transformer block index of a parameter name, None for non-layer tensors."""
+    m = _LAYER_RE.search(name)
+    return int(m.group(1)) if m else None
+
+
+def has_safetensors(model_dir: str) -> bool:
+    return (os.path.isfile(os.path.join(model_dir, INDEX_FILE))
+            or os.path.isfile(os.path.join(model_dir, SINGLE_FILE)))
+
+
+class SafetensorsLoader:
+    """Layer-range aware reader for a (sharded) safetensors checkpoint."""
+
+    def __init__(self, model_dir: str, workers: Optional[int] = None):
+        self.model_dir = model_dir
+        index = os.path.join(model_dir, INDEX_FILE)
+        if os.path.isfile(index):
+            with open(index) as f:
+                self.weight_map: Dict[str, str] = json.load(f)["weight_map"]
+        elif os.path.isfile(os.path.join(model_dir, SINGLE_FILE)):
+            header, _ = read_header(os.path.join(model_dir, SINGLE_FILE))
+            self.weight_map = {k: SINGLE_FILE for k in header}
+        else:
+            raise FileNotFoundError(f"No safetensors checkpoint in {model_dir}")
+        self.shards = sorted(set(self.weight_map.values()))
+        if workers is None:
+            workers = int(os.environ.get("VRM_LOAD_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+        self.workers = max(1, int(workers))
+        self.stats: Dict[str, Any] = {}
+
+    @property
+    def num_layers(self) -> int:
+        idx = [layer_index(k) for k in self.weight_map]
+        return max((i for i in idx if i is not None), default=-1) + 1
+
+    @property
+    def has_lm_head(self) -> bool:
+        return any(n.startswith("lm_head.") for n in self.weight_map)
+
+    def tensor_names(self, layer_range: Optional[Tuple[int, int]] = None,
+                     keep_non_layer: Optional[bool] = None,
+                     tied: bool = False) -> List[str]:
+        """Names to load for ``[start, end)``.
+
+        ``keep_non_layer=None`` keeps embeddings when ``start == 0`` and the
+        other non-layer tensors (final norm, LM head) when ``end`` reaches
+        the last layer. With ``tied`` word embeddings and no stored LM
+        head, the last stage keeps the embeddings too (its LM head).
+        """
+        if layer_range is None:
+            return list(self.weight_map)
+        start, end = layer_range
+        last = end >= self.num_layers
+        embed_last = last and tied and not self.has_lm_head
+        out = []
+        for name in self.weight_map:
+            i = layer_index(name)
+            if i is not None:
+                keep = start <= i < end
+            elif keep_non_layer is not None:
+                keep = keep_non_layer
+            else:
+                keep = (start == 0 or embed_last) if _EMBED_RE.search(name) else last
+            if keep:
+                out.append(name)
+        return out
+
+    def load(self, layer_range: Optional[Tuple[int, int]] = None, device: Any = "cpu",
+             dtype: Any = None, keep_non_layer: Optional[bool] = None,
+             names: Optional[Iterable[str]] = None, tied: bool = False) -> Dict[str, Any]:
+        """Load the selected tensors; one shard per worker thread."""
+        if not _TORCH:
+            raise RuntimeError("SafetensorsLoader.load requires torch")
+        wanted = list(names) if names is not None else self.tensor_names(
+            layer_range, keep_non_layer, tied=tied)
+        by_shard: Dict[str, List[str]] = {}
+        for name in wanted:
+            by_shard.setdefault(self.weight_map[name], []).append(name)
+        device = torch.device(device)
+
+        t0 = time.perf_counter()
+        out: Dict[str, Any] = {}
+        nbytes = 0
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(1, len(by_shard)))) as pool:
+            futs = [pool.submit(self._load_shard, shard, names_, device, dtype)
+                    for shard, names_ in by_shard.items()]
+            for fut in futs:
+                part, n = fut.result()
+                out.update(part)
+                nbytes += n
+        self.stats = {
+            "tensors": len(out), "bytes": nbytes, "shards_read": len(by_shard),
+            "shards_total": len(self.shards), "workers": self.workers,
+            "seconds": round(time.perf_counter() - t0, 4),
+            "zero_copy": device.type == "cpu" and dtype is None,
+        }
+        return out
+
+    def _load_shard(self, shard: str, names: List[str], device: Any,
+                    dtype: Any) -> Tuple[Dict[str, Any], int]:
+        path = os.path.join(self.model_dir, shard)
+        header, base = read_header(path)
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            page = mmap.PAGESIZE
+            for name in names:
+                b, e = header[name]["data_offsets"]
+                lo = (base + b) // page * page
+                try:
+                    mm.madvise(mmap.MADV_WILLNEED, lo, base + e - lo)
+                except (OSError, ValueError):
+                    break
+        out: Dict[str, Any] = {}
+        total = 0
+        for name in names:
+            meta = header[name]
+            src_dtype = _DTYPES[meta["dtype"]]
+            shape = tuple(meta["shape"])
+            b, e = meta["data_offsets"]
+            total += e - b
+            if e == b:
+                view = torch.empty(shape, dtype=src_dtype)
+            else:
+                itemsize = src_dtype.itemsize if hasattr(src_dtype, "itemsize") else \
+                    torch.empty((), dtype=src_dtype).element_size()
+                view = torch.frombuffer(mm, dtype=src_dtype, count=(e - b) // itemsize,
+                                        offset=base + b).view(shape)
+            want = dtype if dtype is not None and view.is_floating_point() else src_dtype
+            if device.type == "cpu" and want == src_dtype:
+                out[name] = view
+            else:
+                dst = torch.empty(shape, dtype=want, device=device)
+                dst.copy_(view)
+                out[name] = dst
+        return out, total
+
+
+def _rebuild_meta_buffers(model: Any, device: Any, skip_prefixes: Tuple[str, ...]) -> None:
+    """Re-create modules whose (non-persistent) buffers were left on meta."""
+    for name, mod in list(model.named_modules()):
+        if not name or (name + ".").startswith(skip_prefixes):
+            continue
+        own = list(mod.buffers(recurse=False))
+        if not own or not any(b.is_meta for b in own):
+            continue
+        if any(p.is_meta for p in mod.parameters(recurse=False)):
+            continue
+        try:
+            with torch.device(device):
+                try:
+                    fresh = type(mod)(config=model.config)
+                except TypeError:
+                    fresh = type(mod)(model.config)
+        except Exception as e:
+            log.debug(f"Cannot rebuild buffers of {name}: {e}")
+            continue
+        parent_name, _, attr = name.rpartition(".")
+        parent = model.get_submodule(parent_name) if parent_name else model
+        setattr(parent, attr, fresh)
+
+
+def build_partial_model(model_dir: str, start_layer: int, end_layer: int,
+                        device: Any = "cpu", dtype: Any = None,
+                        workers: Optional[int] = None) -> Tuple[Any, Dict[str, Any]]:
+    """transformers model with only ``[start_layer, end_layer)`` materialised.
+
+    Returns ``(model, loader stats)``. Layers outside the range (and
+    non-layer tensors the range does not need) remain on the meta device.
+    """
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    config = AutoConfig.from_pretrained(model_dir)
+    with torch.device("meta"):
+        model = AutoModelForCausalLM.from_config(config)
+    loader = SafetensorsLoader(model_dir, workers=workers)
+    num_layers = getattr(config, "num_hidden_layers", None) or loader.num_layers
+    end_layer = min(end_layer, num_layers)
+    tied = bool(getattr(config, "tie_word_embeddings", False))
+    state = loader.load((start_layer, end_layer), device=device, dtype=dtype, tied=tied)
+    model.load_state_dict(state, strict=False, assign=True)
+    if tied:
+        try:
+            model.tie_weights()
+        except Exception:
+            log.debug("tie_weights failed on partial model", exc_info=True)
+
+    prefix = next((n[:_LAYER_RE.search(n).start(1)] for n in loader.weight_map
+                   if layer_index(n) is not None), "")
+    skip = tuple(f"{prefix}{i}." for i in range(num_layers)
+                 if not start_layer <= i < end_layer) if prefix else ()
+    _rebuild_meta_buffers(model, device, skip)
+    model.eval()
+    return model, dict(loader.stats, layers=(start_layer, end_layer), num_layers=num_layers)
+
+
+__all__ = [
+    "SafetensorsLoader",
+    "build_partial_model",
+    "has_safetensors",
+    "layer_index",
+    "read_header",
+]
@@ -7,17 +7,36 @@ generates N tokens ahead, the full verifier validates them in one
 forward pass. Correctly guessed tokens are free; wrong ones get
 corrected at position K and re-drafted.
 
-Supports:
-  - Greedy (temperature=0) and stochastic (temperature>0) verification
-  - Auto-creation of a draft model from the same backend (scaled down)
-  - Prometheus metrics export
-  - Batch size 1 (per-request)
+Stochastic verification used to accept a draft when the verifier's top-1
+agreed or gave it more than 0.5 probability, which changes the output
+distribution. Every round also re-ran both models over the whole
+sequence. Now:
+
+  - Standard speculative sampling: accept draft x with probability
+    min(1, p(x)/q(x)), otherwise resample from norm(max(0, p - q)). The
+    output distribution is exactly the verifier's. Drafters that return
+    only tokens are treated as deterministic (q one-hot).
+  - KV-cache reuse with rollback (``CachedCausalLM`` / ``CachedDrafter``).
+    Each round feeds only the uncached suffix, and rejected positions are
+    cropped from the cache.
+  - Token-tree drafts (``tree_widths``): per-depth branches (top-k when
+    greedy, i.i.d. draft samples otherwise) are verified in one pass under
+    a tree attention mask. Siblings are tried in turn, and every rejection
+    updates p to the residual, so the result is still an exact sample of
+    the verifier.
+  - Greedy decoding (temperature=0) is the same algorithm with p one-hot.
+  - Auto-creation of a draft model from the same backend (scaled down),
+    or the model-free prompt-lookup drafter (``core.prompt_lookup``).
+  - Prometheus metrics export.
+  - Batch size 1 (per-request).
 """
 
 import os
 import time
 import logging
-from typing import Any, Callable, Optional
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 _MINIMAL = os.environ.get("VRM_MINIMAL_TEST", "")
 
@@ -105,11 +124,21 @@ def create_draft_callable(
     If not provided, tries to auto-detect a suitable small draft model
     from ``_DRAFT_MODEL_MAP`` based on *main_model_name*.
 
+    Without an explicit draft model, ``VRM_PROMPT_LOOKUP=N`` selects the
+    model-free :class:`core.prompt_lookup.PromptLookupDrafter` (up to N
+    tokens copied from the context per round).
+
     Self-drafting (reusing the main model) is NOT used — it provides
     no speedup since the draft phase runs the full model N times.
 
     Returns ``None`` when no suitable drafter can be built.
     """
+    lookup = int(os.environ.get("VRM_PROMPT_LOOKUP", "0") or 0)
+    if lookup > 0 and not draft_model_name and _HAS_TORCH:
+        from core.prompt_lookup import PromptLookupDrafter
+        logger.info("Using prompt-lookup drafter (max %d tokens)", lookup)
+        return PromptLookupDrafter(max_draft=lookup)
+
     if _MINIMAL or not _HAS_TORCH:
         return None
 
@@ -142,29 +171,395 @@ def _load_external_draft_model(
             model_name, torch_dtype=torch.float16,
         ).to(device).eval()
         logger.info(f"Loaded external draft model: {model_name} on {device}")
-
-        def _external_draft(input_ids: "torch.Tensor", num_tokens: int) -> "torch.Tensor":
-            ids = input_ids.to(device)
-            tokens = []
-            for _ in range(num_tokens):
-                with torch.no_grad():
-                    out = draft(ids)
-                    logits = out.logits if hasattr(out, "logits") else out[0]
-                    next_id = logits[:, -1, :].argmax(dim=-1, keepdim=True)
-                    tokens.append(next_id)
-                    ids = torch.cat([ids, next_id], dim=-1)
-            return torch.cat(tokens, dim=-1).to(input_ids.device)
-
-        return _external_draft
+        return CachedDrafter(draft)
     except Exception as exc:
         logger.warning(f"Cannot load draft model {model_name}: {exc}")
         return None
 
 
+# ── Speculative sampling ──────────────────────────────────────────────
+
+def _uniform(generator: Optional["torch.Generator"] = None) -> float:
+    return float(torch.rand((), generator=generator))
+
+
+def _sample_probs(probs: "torch.Tensor",
+                  generator: Optional["torch.Generator"] = None) -> int:
+    return int(torch.multinomial(probs, 1, generator=generator))
+
+
+def target_probs(logits: "torch.Tensor", temperature: float) -> "torch.Tensor":
+    """Verifier distribution p over the last dim: softmax at *temperature*,
+    or one-hot on the argmax when greedy."""
+    logits = logits.float()
+    if temperature <= 0.0:
+        return torch.nn.functional.one_hot(
+            logits.argmax(dim=-1), logits.shape[-1]).float()
+    return torch.softmax(logits / temperature, dim=-1)
+
+
+def _residual(p: "torch.Tensor", q: Optional["torch.Tensor"], token: int) -> "torch.Tensor":
+    """norm(max(0, p - q)), the distribution to resample from after a rejection.
+
+    ``q=None`` means the draft was deterministic (q one-hot on *token*).
+    """
+    if q is None:
+        r = p.clone()
+        r[token] = 0.0
+    else:
+        r = (p - q).clamp_min(0.0)
+    total = float(r.sum())
+    return r / total if total > 0.0 else p
+
+
+def speculative_accept(
+    draft_tokens: Sequence[int],
+    probs: "torch.Tensor",
+    draft_probs: Optional["torch.Tensor"] = None,
+    generator: Optional["torch.Generator"] = None,
+) -> Tuple[int, int]:
+    """Verify a chain of drafts by speculative sampling.
+
+    *probs* is the verifier distribution ``[γ + 1, V]``. Row ``i`` scores
+    draft ``i``, and the last row gives the bonus token. *draft_probs*
+    ``[γ, V]`` is the distribution each draft was sampled from, or
+    ``None`` for a deterministic drafter.
+
+    Returns ``(n_accepted, next_token)``. ``next_token`` is the resampled
+    correction after a rejection, or the bonus token when every draft is
+    accepted. Either way the emitted tokens are an exact sample of p.
+    """
+    for i, token in enumerate(draft_tokens):
+        p = probs[i]
+        q = draft_probs[i] if draft_probs is not None else None
+        q_x = float(q[token]) if q is not None else 1.0
+        if q_x > 0.0 and _uniform(generator) * q_x < float(p[token]):
+            continue
+        return i, _sample_probs(_residual(p, q, token), generator)
+    return len(draft_tokens), _sample_probs(probs[len(draft_tokens)], generator)
+
+
+@dataclass
+class DraftTree:
+    """Token tree drafted after the last committed token (the root).
+
+    ``parents[i]`` is the index of node ``i``'s parent, or ``-1`` for the
+    root. Parents always precede their children. Siblings are either top-k
+    branches ordered by draft rank, or, when ``draft_probs[parent]`` is
+    set, i.i.d. samples from that draft distribution.
+    """
+
+    tokens: List[int] = field(default_factory=list)
+    parents: List[int] = field(default_factory=list)
+    draft_probs: Dict[int, "torch.Tensor"] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def add(self, token: int, parent: int = -1) -> int:
+        self.tokens.append(int(token))
+        self.parents.append(int(parent))
+        return len(self.tokens) - 1
+
+    def depths(self) -> List[int]:
+        """Depth of every node (root children are at depth 1)."""
+        depth: List[int] = []
+        for parent in self.parents:
+            depth.append(1 if parent < 0 else depth[parent] + 1)
+        return depth
+
+    def children(self) -> Dict[int, List[int]]:
+        kids: Dict[int, List[int]] = {-1: []}
+        for i, parent in enumerate(self.parents):
+            kids.setdefault(i, [])
+            kids[parent].append(i)
+        return kids
+
+    def attention_mask(self, prefix_len: int) -> "torch.Tensor":
+        """Boolean ``[1 + n, prefix_len + 1 + n]`` mask over ``[root] + nodes``.
+
+        Each row sees the cached prefix, the root, its ancestors and itself.
+        """
+        n = len(self.tokens)
+        allow = torch.zeros(1 + n, prefix_len + 1 + n, dtype=torch.bool)
+        allow[:, :prefix_len + 1] = True
+        for i in range(n):
+            j = i
+            while j >= 0:
+                allow[1 + i, prefix_len + 1 + j] = True
+                j = self.parents[j]
+        return allow
+
+
+def tree_accept(
+    tree: DraftTree,
+    probs: "torch.Tensor",
+    generator: Optional["torch.Generator"] = None,
+) -> Tuple[List[int], int]:
+    """Verify a token tree by recursive rejection sampling.
+
+    *probs* is ``[1 + n, V]``: row 0 is the verifier distribution after the
+    root and row ``i + 1`` the one after node ``i``. Siblings are tried in
+    order. A top-k child is a deterministic draft, so it is accepted with
+    probability p(x) and a rejection zeroes x in p. A sampled child is
+    accepted with min(1, p(x)/q(x)) and a rejection moves p to
+    norm(max(0, p - q)). Either way the emitted tokens are an exact
+    sample of the verifier.
+
+    Returns ``(path, next_token)``. ``path`` lists the accepted node indices
+    from the root down.
+    """
+    kids = tree.children()
+    node, path = -1, []
+    p = probs[0]
+    while True:
+        q = tree.draft_probs.get(node)
+        for child in kids[node]:
+            token = tree.tokens[child]
+            q_x = float(q[token]) if q is not None else 1.0
+            if q_x > 0.0 and _uniform(generator) * q_x < float(p[token]):
+                node = child
+                path.append(child)
+                p = probs[child + 1]
+                break
+            p = _residual(p, q, token)
+        else:
+            return path, _sample_probs(p, generator)
+
+
+def adapt_gamma(
+    window: List[Tuple[int, int]],
+    accepted: int,
+    drafted: int,
+    gamma: int,
+    gamma_min: int,
+    gamma_max: int,
+    window_size: int = 10,
+) -> int:
+    """Record a round's ``(accepted, drafted)`` in *window* (in place) and
+    return the next draft length.
+
+    High acceptance (>80%) → increase gamma (speculatively guess more)
+    Low acceptance  (<30%) → decrease gamma (waste less compute)
+    At least 3 rounds of history are needed before gamma moves.
+    """
+    window.append((accepted, drafted))
+    if len(window) > window_size:
+        del window[:len(window) - window_size]
+    if len(window) < 3:
+        return gamma
+
+    rate = sum(a for a, _ in window) / max(1, sum(d for _, d in window))
+    if rate > 0.80:
+        return min(gamma + 1, gamma_max)
+    if rate < 0.30:
+        return max(gamma - 1, gamma_min)
+    return gamma
+
+
+# ── KV-cached models ─────────────────────────────────────────────────
+
+class CachedCausalLM:
+    """HF causal LM with a KV cache that follows the caller's sequence.
+
+    Calling it with ``[1, T]`` ids reuses the cached common prefix. It crops
+    any cached positions past the point where the ids diverge (rollback),
+    runs only the uncached suffix and returns logits for those positions.
+    Once the cache holds everything but the last few tokens, this is a
+    drop-in ``swarm_verify_callable``: the decoder only reads the last
+    γ + 1 rows.
+    """
+
+    def __init__(self, model: Any):
+        self.model = model
+        try:
+            self.device = next(model.parameters()).device
+        except (AttributeError, StopIteration):
+            self.device = torch.device("cpu")
+        self.cache = None
+        self._tokens: List[int] = []
+        self._tree: Optional[DraftTree] = None
+        self.tokens_processed = 0
+        self.forward_calls = 0
+
+    @property
+    def seq_len(self) -> int:
+        return len(self._tokens)
+
+    def reset(self) -> None:
+        self.cache = None
+        self._tokens = []
+        self._tree = None
+
+    def rollback(self, length: int) -> None:
+        """Keep only the first *length* cached positions."""
+        length = max(0, min(length, len(self._tokens)))
+        if self.cache is not None:
+            extra = self.cache.get_seq_length() - length
+            if extra > 0:
+                self.cache.crop(-extra)
+        self._tokens = self._tokens[:length]
+
+    def _forward(self, ids: List[int], position_ids=None, attention_mask=None):
+        out = self.model(
+            input_ids=torch.tensor([ids], dtype=torch.long, device=self.device),
+            past_key_values=self.cache, use_cache=True,
+            position_ids=position_ids, attention_mask=attention_mask,
+        )
+        self.cache = out.past_key_values
+        self.tokens_processed += len(ids)
+        self.forward_calls += 1
+        return out.logits if hasattr(out, "logits") else out[0]
+
+    def _sync(self, ids: List[int], keep_last: int) -> None:
+        """Bring the cache to ``ids[:-keep_last]``, reusing the common prefix."""
+        limit = len(ids) - keep_last
+        common = 0
+        for a, b in zip(self._tokens[:limit], ids[:limit]):
+            if a != b:
+                break
+            common += 1
+        self.rollback(common)
+        if common < limit:
+            self._forward(ids[common:limit])
+            self._tokens = ids[:limit]
+
+    @torch.no_grad()
+    def __call__(self, input_ids: "torch.Tensor") -> "torch.Tensor":
+        ids = input_ids[0].tolist()
+        common = 0
+        for a, b in zip(self._tokens, ids[:-1]):
+            if a != b:
+                break
+            common += 1
+        self.rollback(common)
+        logits = self._forward(ids[common:])
+        self._tokens = ids
+        return logits
+
+    @torch.no_grad()
+    def verify_tree(self, input_ids: "torch.Tensor", tree: DraftTree) -> "torch.Tensor":
+        """Logits ``[1, 1 + n, V]`` for the root (last id) and every tree node.
+
+        Runs in one forward pass. The tree stays in the cache past
+        :attr:`seq_len` until :meth:`keep_path` or the next call discards it.
+        """
+        ids = input_ids[0].tolist()
+        self._sync(ids, keep_last=1)
+        prefix = len(ids) - 1
+        positions = torch.tensor([[prefix] + [prefix + d for d in tree.depths()]],
+                                 device=self.device)
+        allow = tree.attention_mask(prefix).to(self.device)
+        dtype = getattr(self.model, "dtype", torch.float32)
+        mask = torch.zeros(allow.shape, dtype=dtype, device=self.device)
+        mask.masked_fill_(~allow, torch.finfo(dtype).min)
+        logits = self._forward(ids[-1:] + tree.tokens, position_ids=positions,
+                               attention_mask=mask[None, None])
+        self._tokens = ids
+        self._tree = tree
+        return logits
+
+    def keep_path(self, path: Sequence[int]) -> None:
+        """Compact the cache to the committed prefix plus the accepted tree path."""
+        base = len(self._tokens)
+        tree = self._tree
+        keep = torch.tensor(list(range(base)) + [base + i for i in path],
+                            device=self.device)
+        cache = self.cache
+        if hasattr(cache, "layers"):
+            for layer in cache.layers:
+                layer.keys = layer.keys.index_select(-2, keep)
+                layer.values = layer.values.index_select(-2, keep)
+        elif hasattr(cache, "key_cache"):
+            # Older DynamicCache: per-layer key/value lists
+            for i in range(len(cache.key_cache)):
+                cache.key_cache[i] = cache.key_cache[i].index_select(-2, keep)
+                cache.value_cache[i] = cache.value_cache[i].index_select(-2, keep)
+        else:
+            raise TypeError(f"keep_path cannot compact a {type(cache).__name__} "
+                            f"(need DynamicCache layers or key_cache/value_cache)")
+        self._tokens = self._tokens + [tree.tokens[i] for i in path]
+
+
+class CachedDrafter:
+    """``draft_model_callable`` backed by a :class:`CachedCausalLM`.
+
+    With ``temperature > 0``, drafts are sampled and their distributions
+    are returned, as ``(tokens, probs)``, for exact rejection sampling. With
+    greedy drafting only the tokens are returned. :meth:`draft_tree` builds
+    the same kind of tree: top-k branches when greedy, i.i.d. samples per
+    node otherwise.
+    """
+
+    def __init__(self, model: Any, temperature: float = 0.0):
+        self.lm = model if isinstance(model, CachedCausalLM) else CachedCausalLM(model)
+        self.temperature = temperature
+        self._lock = threading.Lock()
+
+    def for_request(self) -> "CachedDrafter":
+        """A drafter on the same weights with its own KV cache."""
+        return CachedDrafter(self.lm.model, self.temperature)
+
+    def rollback(self, length: int) -> None:
+        with self._lock:
+            self.lm.rollback(length)
+
+    @torch.no_grad()
+    def __call__(self, input_ids: "torch.Tensor", num_tokens: int):
+        with self._lock:
+            ids = input_ids.to(self.lm.device)
+            tokens, dists = [], []
+            for _ in range(num_tokens):
+                logits = self.lm(ids)[0, -1].float()
+                if self.temperature > 0.0:
+                    q = torch.softmax(logits / self.temperature, dim=-1)
+                    token = torch.multinomial(q, 1)
+                    dists.append(q)
+                else:
+                    token = logits.argmax(dim=-1, keepdim=True)
+                tokens.append(token)
+                ids = torch.cat([ids, token.view(1, 1)], dim=-1)
+            out = torch.cat(tokens).view(1, -1).to(input_ids.device)
+            if dists:
+                return out, torch.stack(dists)[None].to(input_ids.device)
+            return out
+
+    @torch.no_grad()
+    def draft_tree(self, input_ids: "torch.Tensor", widths: Sequence[int]) -> DraftTree:
+        """Give every depth-d node ``widths[d]`` children: the most likely ones
+        when greedy, otherwise samples from the draft distribution."""
+        with self._lock:
+            tree = DraftTree()
+            frontier = [-1]
+            ids = input_ids.to(self.lm.device)
+            for width in widths:
+                logits = self.lm.verify_tree(ids, tree)[0].float()
+                nxt = []
+                for node in frontier:
+                    if self.temperature > 0.0:
+                        q = torch.softmax(logits[node + 1] / self.temperature, dim=-1)
+                        children = torch.multinomial(q, width, replacement=True).tolist()
+                        tree.draft_probs[node] = q
+                    else:
+                        children = logits[node + 1].topk(width).indices.tolist()
+                    nxt.extend(tree.add(tok, node) for tok in children)
+                frontier = nxt
+            return tree
+
+
 # ── Main decoder ──────────────────────────────────────────────────────
 
 class SwarmSpeculativeDecoder:
-    """Speculative decoding engine for VRAMancer inference pipeline."""
+    """Speculative decoding engine for VRAMancer inference pipeline.
+
+    ``draft_model_callable(ids, n)`` returns ``n`` draft tokens, or
+    ``(tokens, probs)`` when it samples. ``swarm_verify_callable(ids)``
+    returns logits whose last γ + 1 rows score the drafts. Both may be
+    KV-cached (``rollback(length)`` is called after every round). With
+    ``tree_widths`` the drafter must provide ``draft_tree`` and the
+    verifier ``verify_tree`` / ``keep_path`` (see :class:`CachedDrafter`,
+    :class:`CachedCausalLM`).
+    """
 
     def __init__(
         self,
@@ -175,6 +570,8 @@ class SwarmSpeculativeDecoder:
         adaptive: bool = True,
         gamma_min: int = 2,
         gamma_max: int = 12,
+        tree_widths: Optional[Sequence[int]] = None,
+        generator: Optional["torch.Generator"] = None,
     ):
         self.draft_model = draft_model_callable
         self.swarm_verify = swarm_verify_callable
@@ -182,6 +579,13 @@ class SwarmSpeculativeDecoder:
         self.temperature = temperature
         self.log = logger
 
+        self.tree_widths = tuple(tree_widths) if tree_widths else None
+        if self.tree_widths and not (hasattr(draft_model_callable, "draft_tree")
+                                     and hasattr(swarm_verify_callable, "verify_tree")):
+            raise ValueError("tree drafting needs a drafter with draft_tree() and a "
+                             "verifier with verify_tree() (CachedDrafter / CachedCausalLM)")
+        self.generator = generator
+
         # Adaptive K: adjust gamma based on rolling acceptance rate
         self.adaptive = adaptive
         self.gamma_min = max(1, gamma_min)
@@ -191,6 +595,7 @@ class SwarmSpeculativeDecoder:
 
         self.total_drafted = 0
         self.total_accepted = 0
+        self.total_rounds = 0
         self.latency_saved_ms = 0.0
 
         _init_spec_metrics()
@@ -204,34 +609,56 @@ class SwarmSpeculativeDecoder:
         return torch.multinomial(probs, num_samples=1).squeeze(-1)
 
     def _adapt_gamma(self, accepted: int, drafted: int) -> None:
-        """Adjust gamma based on rolling acceptance rate.
-
-        High acceptance (>80%) → increase gamma (speculatively guess more)
-        Low acceptance  (<30%) → decrease gamma (waste less compute)
-        """
+        """Adjust gamma based on rolling acceptance rate (see :func:`adapt_gamma`)."""
         if not self.adaptive:
             return
 
-        self._acceptance_window.append((accepted, drafted))
-        if len(self._acceptance_window) > self._window_size:
-            self._acceptance_window.pop(0)
-
-        if len(self._acceptance_window) < 3:
-            return  # need at least 3 rounds of data
-
-        total_a = sum(a for a, _ in self._acceptance_window)
-        total_d = sum(d for _, d in self._acceptance_window)
-        rate = total_a / max(1, total_d)
-
         old_gamma = self.gamma
-        if rate > 0.80:
-            self.gamma = min(self.gamma + 1, self.gamma_max)
-        elif rate < 0.30:
-            self.gamma = max(self.gamma - 1, self.gamma_min)
-
+        self.gamma = adapt_gamma(self._acceptance_window, accepted, drafted, self.gamma,
+                                 self.gamma_min, self.gamma_max, self._window_size)
         if self.gamma != old_gamma:
-            self.log.debug("[Speculative] Adaptive K: %d → %d (rate=%.0f%%)",
-                           old_gamma, self.gamma, rate * 100)
+            self.log.debug("[Speculative] Adaptive K: %d → %d", old_gamma, self.gamma)
+
+    def _chain_round(self, generated_ids: "torch.Tensor", gamma: int) -> Tuple[List[int], int]:
+        """Draft γ tokens, verify them in one pass; return (accepted, drafted)."""
+        out = self.draft_model(generated_ids, gamma)
+        draft_tokens, draft_probs = out if isinstance(out, tuple) else (out, None)
+        draft_tokens = draft_tokens.to(generated_ids.device)
+        gamma = draft_tokens.shape[-1]
+        speculated_ids = torch.cat([generated_ids, draft_tokens], dim=-1)
+        target_logits = self.swarm_verify(speculated_ids)
+        probs = target_probs(target_logits[0, -gamma - 1:], self.temperature)
+        if draft_probs is not None:
+            draft_probs = draft_probs.reshape(gamma, -1).float().to(probs.device)
+            # A drafter with a smaller vocab pads with zeros
+            if draft_probs.shape[-1] < probs.shape[-1]:
+                draft_probs = torch.nn.functional.pad(
+                    draft_probs, (0, probs.shape[-1] - draft_probs.shape[-1]))
+        accepted, next_token = speculative_accept(
+            draft_tokens[0].tolist(), probs, draft_probs, self.generator)
+        return draft_tokens[0, :accepted].tolist() + [next_token], gamma
+
+    def _tree_round(self, generated_ids: "torch.Tensor") -> Tuple[List[int], int]:
+        """Draft a token tree, verify it in one pass; return (accepted, drafted)."""
+        tree = self.draft_model.draft_tree(generated_ids, self.tree_widths)
+        logits = self.swarm_verify.verify_tree(generated_ids, tree)
+        path, next_token = tree_accept(
+            tree, target_probs(logits[0], self.temperature), self.generator)
+        if hasattr(self.swarm_verify, "keep_path"):
+            self.swarm_verify.keep_path(path)
+        return [tree.tokens[i] for i in path] + [next_token], len(tree)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "drafted": self.total_drafted,
+            "accepted": self.total_accepted,
+            "rounds": self.total_rounds,
+            "acceptance_rate": self.total_accepted / max(1, self.total_drafted),
+            "mean_accepted_length": self.total_accepted / max(1, self.total_rounds),
+            "tokens_per_round": (self.total_accepted + self.total_rounds)
+                                / max(1, self.total_rounds),
+        }
 
     @torch.no_grad()
     def generate(self, input_ids: "torch.Tensor", max_new_tokens: int) -> "torch.Tensor":
@@ -240,91 +667,61 @@ class SwarmSpeculativeDecoder:
         generated_ids = input_ids.clone()
         tokens_yielded = 0
 
-        self.log.info(f"[Speculative] gamma={self.gamma}, temp={self.temperature}")
+        self.log.info(f"[Speculative] gamma={self.gamma}, temp={self.temperature}, "
+                      f"tree={self.tree_widths}")
 
         while tokens_yielded < max_new_tokens:
-            # 1. Draft — fast local model predicts gamma tokens
-            draft_tokens = self.draft_model(generated_ids, self.gamma)
-
-            # The speculated sequence
-            speculated_ids = torch.cat([generated_ids, draft_tokens], dim=-1)
-
-            # 2. Verify — heavy model scores all draft tokens in one pass
             swarm_start = time.perf_counter()
-            target_logits = self.swarm_verify(speculated_ids)
-
-            # 3. Accept/reject — compare draft vs verifier
-            accepted_count = 0
-            verify_logits = target_logits[:, -self.gamma - 1:-1, :]
-
-            if self.temperature <= 0.0:
-                # Greedy: exact match
-                target_tokens = verify_logits.argmax(dim=-1)
-                for i in range(self.gamma):
-                    if draft_tokens[0, i] == target_tokens[0, i]:
-                        accepted_count += 1
-                    else:
-                        break
+            # 1-3. Draft, verify in one pass, accept by speculative sampling.
+            # The last token is the correction (or bonus) and is always kept.
+            if self.tree_widths:
+                new_tokens, drafted = self._tree_round(generated_ids)
             else:
-                # Stochastic: acceptance probability = min(1, q(x)/p(x))
-                for i in range(self.gamma):
-                    draft_id = draft_tokens[0, i].item()
-                    v_logits = verify_logits[0, i]
-                    q_prob = torch.softmax(v_logits / self.temperature, dim=-1)
-                    # Accept with probability proportional to verifier confidence
-                    q_val = q_prob[draft_id].item()
-                    # Simple threshold: accept if verifier top-1 agrees
-                    top_id = v_logits.argmax(dim=-1).item()
-                    if draft_id == top_id or q_val > 0.5:
-                        accepted_count += 1
-                    else:
-                        break
-
-            # Accept matched tokens
-            if accepted_count > 0:
-                generated_ids = torch.cat(
-                    [generated_ids, draft_tokens[:, :accepted_count]], dim=-1
-                )
+                new_tokens, drafted = self._chain_round(
+                    generated_ids, min(self.gamma, max_new_tokens - tokens_yielded))
+            accepted_count = len(new_tokens) - 1
+            generated_ids = torch.cat([generated_ids, torch.tensor(
+                [new_tokens], dtype=generated_ids.dtype, device=generated_ids.device)], dim=-1)
 
-            # 4. Correction — always get at least one guaranteed token
-            correction_pos = -(self.gamma - accepted_count + 1)
-            correction_logits = target_logits[:, correction_pos, :]
-            correction_token = self._sample_token(correction_logits).unsqueeze(0)
-            if correction_token.dim() == 1:
-                correction_token = correction_token.unsqueeze(0)
-            generated_ids = torch.cat([generated_ids, correction_token], dim=-1)
+            # 4. Roll the caches back to the committed prefix. The newest
+            # token is fed at the start of the next round.
+            for model in (self.draft_model, self.swarm_verify):
+                rollback = getattr(model, "rollback", None)
+                if rollback is not None:
+                    rollback(generated_ids.shape[1] - 1)
 
-            tokens_to_add = accepted_count + 1
-            tokens_yielded += tokens_to_add
+            tokens_yielded += len(new_tokens)
 
             # Telemetry
-            self.total_drafted += self.gamma
+            self.total_drafted += drafted
             self.total_accepted += accepted_count
+            self.total_rounds += 1
 
             # Adaptive K — adjust gamma for next round
-            self._adapt_gamma(accepted_count, self.gamma)
+            if not self.tree_widths:
+                self._adapt_gamma(accepted_count, drafted)
 
             swarm_elapsed = time.perf_counter() - swarm_start
             naive_time = swarm_elapsed * (accepted_count + 1)
             self.latency_saved_ms += max(0, naive_time - swarm_elapsed) * 1000
 
             if _SPEC_DRAFTED:
-                _SPEC_DRAFTED.inc(self.gamma)
+                _SPEC_DRAFTED.inc(drafted)
             if _SPEC_ACCEPTED:
                 _SPEC_ACCEPTED.inc(accepted_count)
             if _SPEC_ROUNDS:
                 _SPEC_ROUNDS.inc()
 
             self.log.debug(
-                f"[Speculative] Drafted {self.gamma} | "
+                f"[Speculative] Drafted {drafted} | "
                 f"Accepted {accepted_count} | Corrected 1 "
-                f"({accepted_count / self.gamma * 100:.0f}%)"
+                f"({accepted_count / max(1, drafted) * 100:.0f}%)"
             )
 
         rate = self.total_accepted / max(1, self.total_drafted) * 100
         self.log.info(
             f"[Speculative] Done: {self.total_accepted}/{self.total_drafted} "
-            f"accepted ({rate:.1f}%), saved {self.latency_saved_ms:.0f}ms"
+            f"accepted ({rate:.1f}%), saved {self.latency_saved_ms:.0f}ms "
+            f"in {(time.perf_counter() - start_time) * 1000:.0f}ms"
         )
         return generated_ids
-
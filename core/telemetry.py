@@ -29,8 +29,17 @@ import struct, time, hashlib
 from typing import Iterable, Dict, Any, Iterator
 
 _logger = logging.getLogger("vramancer.telemetry")
-_logger.warning("STUB: telemetry — binary format has no consumer, "
-                "prefer mDNS discovery (Grade D)")
+_warned = False
+
+
+def _warn_stub() -> None:
+    # Emitted on first use of the binary format, not at import: the
+    # supervision API imports this module on every startup.
+    global _warned
+    if not _warned:
+        _warned = True
+        _logger.warning("STUB: telemetry — binary format has no consumer, "
+                        "prefer mDNS discovery (Grade D)")
 
 VERSION = 1
 HEADER_FMT = ">B I H H H H I"  # taille fixe 1+4+2+2+2+2+4 = 17 octets
@@ -43,6 +52,7 @@ def fnv1a_32(data: bytes) -> int:
     return h
 
 def encode_packet(node: Dict[str, Any]) -> bytes:
+    _warn_stub()
     ts = int(time.time())
     cpu = int((node.get("cpu_load_pct") or 0) * 100)  # en centi-%
     free = int(node.get("free_cores") or 0)
@@ -57,6 +67,7 @@ def encode_stream(nodes: Iterable[Dict[str, Any]]) -> bytes:
     return b"".join(encode_packet(n) for n in nodes)
 
 def decode_stream(data: bytes) -> Iterator[Dict[str, Any]]:
+    _warn_stub()
     i = 0
     L = len(data)
     while i < L:
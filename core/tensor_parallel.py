@@ -10,6 +10,23 @@ Supports:
   - GPT-2 (merged c_attn Conv1D)
   - GQA (grouped-query attention)
 
+Shard work runs on one thread per device (``VRM_TP_CONCURRENT``), so
+each GPU's kernels are launched without waiting for the previous shard.
+Row-parallel output projections are split into ``VRM_TP_OVERLAP_CHUNKS``
+column blocks so the all-reduce of block ``c`` runs while the shards
+compute block ``c + 1``. With NCCL the collective is queued on a
+dedicated communication stream per device, which waits on the compute
+stream only for the block it reduces. Without NCCL (CPU, mixed vendors)
+it runs on a communication thread as a ring reduce-scatter + all-gather
+whose device-to-device hops are staged through the pinned host arena,
+instead of summing every shard on the host.
+
+Generation keeps a per-shard KV cache (``TPKVCache``): each device holds
+K/V only for its own KV-head shard, the prompt is prefilled once and each
+decode step runs a single token at position ``cache.seq_len``. Before,
+every step re-ran the whole sequence (O(n^2)) and lost to a single GPU
+after a few hundred tokens.
+
 Usage::
 
     from core.tensor_parallel import apply_tensor_parallel
@@ -17,6 +34,8 @@ Usage::
     model = AutoModelForCausalLM.from_pretrained("meta-llama/Llama-2-7b-hf")
     tp_model = apply_tensor_parallel(model, devices=["cuda:0", "cuda:1"])
     # tp_model.forward() runs both GPUs in parallel with all-reduce
+    out = tp_model.generate(input_ids, max_new_tokens=64,
+                            do_sample=True, temperature=0.7, top_p=0.9)
 """
 
 from __future__ import annotations
@@ -24,7 +43,9 @@ from __future__ import annotations
 import os
 import math
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 _logger = logging.getLogger("vramancer.tensor_parallel")
 
@@ -64,20 +85,61 @@ def _apply_rotary_pos_emb(x: Any, cos: Any, sin: Any) -> Any:
     return (x * cos) + (rotated * sin)
 
 
+def _ring_transfer(src: Any, device: Any) -> Any:
+    """One ring hop: ``src`` as a tensor on ``device``.
+
+    GPU -> other device goes through a pooled (pinned) host buffer, which
+    returns to the arena once the hop's result has been consumed.
+    """
+    if src.device == torch.device(device):
+        return src
+    if src.device.type != "cuda":
+        return src.to(device)
+    from core.host_arena import get_host_arena
+    staged = get_host_arena().copy_to_host(src)
+    return staged if torch.device(device).type == "cpu" else staged.to(device)
+
+
+def _ring_all_reduce(tensors: List[Any]) -> None:
+    """In-place ring all-reduce (reduce-scatter then all-gather).
+
+    Each tensor is cut into ``N`` chunks. In reduce-scatter step ``s`` shard
+    ``i`` sends chunk ``(i - s) % N`` to shard ``i + 1``, which accumulates
+    it; after ``N - 1`` steps shard ``i`` owns the full sum of chunk
+    ``(i + 1) % N``. All-gather then circulates the owned chunks. Within a
+    step every shard touches a different chunk, so the in-place updates do
+    not race. Each shard moves ``2 (N - 1) / N`` of the tensor instead of
+    the whole tensor going through the host ``N`` times.
+    """
+    n = len(tensors)
+    if n < 2:
+        return
+    with torch.no_grad():
+        chunks = [t.view(-1).tensor_split(n) for t in tensors]
+        for step in range(n - 1):
+            for i in range(n):
+                c, dst = (i - step) % n, (i + 1) % n
+                chunks[dst][c].add_(_ring_transfer(chunks[i][c], tensors[dst].device))
+        for step in range(n - 1):
+            for i in range(n):
+                c, dst = (i + 1 - step) % n, (i + 1) % n
+                chunks[dst][c].copy_(_ring_transfer(chunks[i][c], tensors[dst].device))
+
+
 def _nccl_all_reduce(tensors: List[Any]) -> None:
-    """In-place NCCL all-reduce sum (single-process, multi-GPU)."""
-    try:
-        torch.cuda.nccl.all_reduce(tensors)
-    except Exception:
-        # Fallback: manual staging via CPU (inference-only, no gradient).
-        # sum() would create a compute graph that breaks backprop,
-        # but TP is inference-only in VRAMancer so detach is safe.
-        with torch.no_grad():
-            total = torch.zeros_like(tensors[0], device="cpu")
-            for t in tensors:
-                total += t.detach().to("cpu")
-            for t in tensors:
-                t.copy_(total.to(t.device))
+    """In-place all-reduce sum (single-process, multi-GPU).
+
+    NCCL when every tensor is on a CUDA device, else (or if NCCL fails)
+    the ring fallback. TP is inference-only in VRAMancer, so the fallback
+    works on detached data.
+    """
+    if all(t.is_cuda for t in tensors):
+        try:
+            torch.cuda.nccl.all_reduce(tensors)
+            return
+        except Exception:
+            _logger.debug("NCCL all-reduce failed, using ring fallback", exc_info=True)
+    _ring_all_reduce([t.detach() for t in tensors])
 
 
 def _all_reduce_sum(tensors: List[Any]) -> Any:
@@ -86,6 +148,154 @@ def _all_reduce_sum(tensors: List[Any]) -> Any:
     return tensors[0]
 
 
+# ---------------------------------------------------------------------------
+# Concurrent shard execution
+# ---------------------------------------------------------------------------
+
+_OVERLAP_MIN_TOKENS = 16
+
+_POOL_LOCK = threading.Lock()
+_SHARD_POOLS: Dict[int, ThreadPoolExecutor] = {}
+_COMM_POOL: Optional[ThreadPoolExecutor] = None
+_COMM_STREAMS: Dict[str, Any] = {}
+_NCCL_OK: Dict[Tuple[str, ...], bool] = {}
+
+
+def _shard_pool(n: int) -> ThreadPoolExecutor:
+    with _POOL_LOCK:
+        pool = _SHARD_POOLS.get(n)
+        if pool is None:
+            pool = _SHARD_POOLS[n] = ThreadPoolExecutor(
+                max_workers=n, thread_name_prefix="vrm-tp-shard")
+        return pool
+
+
+def _comm_pool() -> ThreadPoolExecutor:
+    """Single thread: collectives are issued in order, like an NCCL stream."""
+    global _COMM_POOL
+    with _POOL_LOCK:
+        if _COMM_POOL is None:
+            _COMM_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vrm-tp-comm")
+        return _COMM_POOL
+
+
+def _comm_stream(dev: Any) -> Any:
+    """Dedicated CUDA stream for collectives on ``dev``."""
+    key = str(torch.device(dev))
+    with _POOL_LOCK:
+        stream = _COMM_STREAMS.get(key)
+        if stream is None:
+            stream = _COMM_STREAMS[key] = torch.cuda.Stream(device=dev)
+        return stream
+
+
+def _stream_all_reduce(partials: List[Any]) -> None:
+    """Queue an NCCL all-reduce of ``partials`` on the comm streams.
+
+    Each comm stream first waits for the work already queued on its
+    device's compute stream (the block that produced the partial), so the
+    collective overlaps whatever the compute streams run next. Nothing
+    blocks the host.
+    """
+    streams = []
+    for t in partials:
+        stream = _comm_stream(t.device)
+        stream.wait_stream(torch.cuda.current_stream(t.device))
+        t.record_stream(stream)
+        streams.append(stream)
+    torch.cuda.nccl.all_reduce(partials, streams=streams)
+
+
+def _use_comm_streams(devices: List[str]) -> bool:
+    """True if ``devices`` are CUDA devices NCCL can reduce across."""
+    key = tuple(str(d) for d in devices)
+    ok = _NCCL_OK.get(key)
+    if ok is None:
+        ok = all(d.startswith("cuda") for d in key)
+        if ok:
+            try:
+                ok = bool(torch.cuda.nccl.is_available([torch.empty(1, device=d) for d in key]))
+            except Exception:
+                ok = False
+        _NCCL_OK[key] = ok
+    return ok
+
+
+def _run_on_device(dev: str, fn: Callable[[], Any]) -> Any:
+    if str(dev).startswith("cuda"):
+        with torch.cuda.device(dev):
+            return fn()
+    return fn()
+
+
+def _run_shards(devices: List[str], fn: Callable[[int], Any], concurrent: bool) -> List[Any]:
+    """``[fn(0), ..., fn(N-1)]``, one thread per device when ``concurrent``.
+
+    Each device keeps its own (default) stream, so a thread per device is
+    enough for the GPUs to run their shards at the same time.
+    """
+    if not concurrent or len(devices) < 2:
+        return [fn(i) for i in range(len(devices))]
+    pool = _shard_pool(len(devices))
+    futs = [pool.submit(_run_on_device, dev, lambda i=i: fn(i)) for i, dev in enumerate(devices)]
+    return [f.result() for f in futs]
+
+
+def _tp_concurrent_default() -> bool:
+    return os.environ.get("VRM_TP_CONCURRENT", "1") != "0"
+
+
+def _tp_overlap_default(devices: List[str]) -> int:
+    """``VRM_TP_OVERLAP_CHUNKS``; auto = 2 on GPUs, 1 (no split) on CPU."""
+    n = int(os.environ.get("VRM_TP_OVERLAP_CHUNKS", "0") or 0)
+    if n > 0:
+        return n
+    return 2 if all(str(d).startswith("cuda") for d in devices) else 1
+
+
+def _row_parallel_reduce(inputs: List[Any], linears: Any, devices: List[str],
+                         concurrent: bool, chunks: int) -> Any:
+    """Row-parallel projection of per-shard ``inputs`` + all-reduce.
+
+    With ``chunks > 1`` the output features are produced in blocks; each
+    block's all-reduce is queued on the per-device comm streams (NCCL) or
+    the communication thread while the shards compute the next block
+    (only for ``>= _OVERLAP_MIN_TOKENS`` tokens). Returns the summed
+    output on the first device.
+    """
+    out_features = linears[0].weight.shape[0]
+    chunks = max(1, min(int(chunks), out_features))
+    if inputs[0].numel() // max(1, inputs[0].shape[-1]) < _OVERLAP_MIN_TOKENS:
+        chunks = 1          # decode: per-block dispatch costs more than it hides
+    if chunks == 1:
+        partials = _run_shards(devices, lambda i: linears[i](inputs[i]), concurrent)
+        _nccl_all_reduce(partials)
+        return partials[0]
+
+    step = -(-out_features // chunks)
+    streams = _use_comm_streams(devices)
+    queued = False
+    pending: List[Any] = []
+    for a in range(0, out_features, step):
+        rows = (a, min(a + step, out_features))
+        partials = _run_shards(devices, lambda i: linears[i](inputs[i], rows=rows), concurrent)
+        if streams:
+            try:
+                _stream_all_reduce(partials)
+                pending.append(partials[0])
+                queued = True
+                continue
+            except Exception:
+                _logger.debug("NCCL stream all-reduce failed, using comm thread", exc_info=True)
+                streams = False
+        pending.append(_comm_pool().submit(_all_reduce_sum, partials))
+    if queued:
+        # The concatenation reads the reduced blocks on the compute stream
+        dev0 = pending[0].device
+        torch.cuda.current_stream(dev0).wait_stream(_comm_stream(dev0))
+    return torch.cat([p.result() if isinstance(p, Future) else p for p in pending], dim=-1)
+
+
 # ---------------------------------------------------------------------------
 # Weight sharding helpers
 # ---------------------------------------------------------------------------
@@ -153,6 +363,67 @@ def _get_layers(model: Any) -> Tuple[Any, List[Any], str]:
     raise ValueError(f"Cannot extract layers from {type(model).__name__}")
 
 
+# ---------------------------------------------------------------------------
+# Per-shard KV cache
+# ---------------------------------------------------------------------------
+
+class TPKVCache:
+    """KV cache for ``TPModel``: one K/V buffer per (layer, shard).
+
+    Buffers live on the shard's device and hold only that shard's KV heads
+    (``[batch, kv_heads_per_shard, capacity, head_dim]``), before GQA
+    expansion. They are allocated on first write and grow by doubling.
+    Every layer writes its new tokens at ``seq_len``; ``TPModel.forward``
+    calls ``advance`` once all layers have run. ``crop`` rolls back.
+    """
+
+    def __init__(self, num_layers: int, num_shards: int, capacity: int = 256):
+        self.num_layers = num_layers
+        self.num_shards = num_shards
+        self.capacity = max(1, int(capacity))
+        self.seq_len = 0
+        self._k: List[List[Any]] = [[None] * num_shards for _ in range(num_layers)]
+        self._v: List[List[Any]] = [[None] * num_shards for _ in range(num_layers)]
+
+    def update(self, layer: int, shard: int, k: Any, v: Any) -> Tuple[Any, Any]:
+        """Write ``k``/``v`` (``[b, h, n, d]``) at ``seq_len``; return K/V up to the new end."""
+        n = k.shape[2]
+        end = self.seq_len + n
+        buf_k = self._k[layer][shard]
+        if buf_k is None or buf_k.shape[2] < end:
+            cap = max(end, self.capacity, 2 * (buf_k.shape[2] if buf_k is not None else 0))
+            new_k = k.new_empty(k.shape[0], k.shape[1], cap, k.shape[3])
+            new_v = v.new_empty(v.shape[0], v.shape[1], cap, v.shape[3])
+            if buf_k is not None and self.seq_len:
+                new_k[:, :, :self.seq_len] = buf_k[:, :, :self.seq_len]
+                new_v[:, :, :self.seq_len] = self._v[layer][shard][:, :, :self.seq_len]
+            self._k[layer][shard], self._v[layer][shard] = new_k, new_v
+        buf_k, buf_v = self._k[layer][shard], self._v[layer][shard]
+        buf_k[:, :, self.seq_len:end] = k
+        buf_v[:, :, self.seq_len:end] = v
+        return buf_k[:, :, :end], buf_v[:, :, :end]
+
+    def advance(self, n: int) -> None:
+        self.seq_len += n
+
+    def crop(self, length: int) -> None:
+        """Drop cached positions ``>= length`` (buffers are kept)."""
+        self.seq_len = max(0, min(self.seq_len, int(length)))
+
+    def reset(self) -> None:
+        self.seq_len = 0
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Allocated cache bytes per device."""
+        out: Dict[str, int] = {}
+        for bufs in (self._k, self._v):
+            for layer in bufs:
+                for t in layer:
+                    if t is not None:
+                        out[str(t.device)] = out.get(str(t.device), 0) + t.numel() * t.element_size()
+        return out
+
+
 # ---------------------------------------------------------------------------
 # TP layer wrappers
 # ---------------------------------------------------------------------------
@@ -165,8 +436,12 @@ class TPLinear(nn.Module):
         self.weight = nn.Parameter(weight.to(device), requires_grad=False)
         self.bias = nn.Parameter(bias.to(device), requires_grad=False) if bias is not None else None
 
-    def forward(self, x: Any) -> Any:
-        return nn.functional.linear(x, self.weight, self.bias)
+    def forward(self, x: Any, rows: Optional[Tuple[int, int]] = None) -> Any:
+        if rows is None:
+            return nn.functional.linear(x, self.weight, self.bias)
+        a, b = rows
+        bias = self.bias[a:b] if self.bias is not None else None
+        return nn.functional.linear(x, self.weight[a:b], bias)
 
 
 class TPAttention(nn.Module):
@@ -194,6 +469,8 @@ class TPAttention(nn.Module):
         self.num_kv_heads = num_kv_heads
         self.heads_per_shard = num_heads // self.tp
         self.kv_heads_per_shard = max(1, num_kv_heads // self.tp)
+        self.concurrent = _tp_concurrent_default()
+        self.overlap_chunks = _tp_overlap_default(devices)
 
         if arch == "gpt2":
             self._init_gpt2(original_attn)
@@ -265,11 +542,18 @@ class TPAttention(nn.Module):
         self.v_shards = nn.ModuleList([TPLinear(v_shards[i], v_b_shards[i], self.devices[i]) for i in range(self.tp)])
         self.o_shards = nn.ModuleList([TPLinear(o_shards[i], o_b_shards[i], self.devices[i]) for i in range(self.tp)])
 
-    def forward(self, hidden_states: Any, **kwargs) -> Any:
-        """Parallel attention across all GPUs + all-reduce."""
+    def forward(self, hidden_states: Any, kv_cache: Optional[TPKVCache] = None,
+                layer_idx: int = 0, **kwargs) -> Any:
+        """Parallel attention across all GPUs + all-reduce.
+
+        With ``kv_cache`` the new K/V are appended to this shard's cache and
+        the queries (positions ``seq_len ..``) attend to everything cached.
+        """
         position_embeddings = kwargs.get("position_embeddings")
-        partials = []
-        for i, dev in enumerate(self.devices):
+        past = kv_cache.seq_len if kv_cache is not None else 0
+
+        def shard(i: int) -> Any:
+            dev = self.devices[i]
             h = hidden_states.to(dev, non_blocking=True)
             q = self.q_shards[i](h)
             k = self.k_shards[i](h)
@@ -290,6 +574,9 @@ class TPAttention(nn.Module):
                 q = _apply_rotary_pos_emb(q, cos, sin)
                 k = _apply_rotary_pos_emb(k, cos, sin)
 
+            if kv_cache is not None:
+                k, v = kv_cache.update(layer_idx, i, k, v)
+
             # GQA expand — handle non-divisible head counts
             if kv_heads < self.heads_per_shard:
                 if self.heads_per_shard % kv_heads == 0:
@@ -302,17 +589,21 @@ class TPAttention(nn.Module):
                     k = k.repeat_interleave(repeat, dim=1)[:, :self.heads_per_shard]
                     v = v.repeat_interleave(repeat, dim=1)[:, :self.heads_per_shard]
 
-            # Scaled dot-product attention
-            attn_out = torch.nn.functional.scaled_dot_product_attention(q, k, v, is_causal=(seq_len > 1))
-            attn_out = attn_out.transpose(1, 2).reshape(bsz, seq_len, -1)
+            # Scaled dot-product attention. A single new token sees the whole
+            # cache; a multi-token chunk after a prefix needs an offset mask.
+            if past and seq_len > 1:
+                q_pos = torch.arange(past, past + seq_len, device=q.device).unsqueeze(1)
+                mask = torch.arange(past + seq_len, device=q.device).unsqueeze(0) <= q_pos
+                attn_out = torch.nn.functional.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+            else:
+                attn_out = torch.nn.functional.scaled_dot_product_attention(
+                    q, k, v, is_causal=(seq_len > 1))
+            return attn_out.transpose(1, 2).reshape(bsz, seq_len, -1)
 
-            # Row-parallel output projection
-            out = self.o_shards[i](attn_out)
-            partials.append(out)
-
-        # All-reduce sum across GPUs
-        _nccl_all_reduce(partials)
-        return partials[0]
+        attn_outs = _run_shards(self.devices, shard, self.concurrent)
+        # Row-parallel output projection + all-reduce across GPUs
+        return _row_parallel_reduce(attn_outs, self.o_shards, self.devices,
+                                    self.concurrent, self.overlap_chunks)
 
 
 class TPMLP(nn.Module):
@@ -323,6 +614,8 @@ class TPMLP(nn.Module):
         self.devices = devices
         self.tp = len(devices)
         self.arch = arch
+        self.concurrent = _tp_concurrent_default()
+        self.overlap_chunks = _tp_overlap_default(devices)
 
         if arch == "gpt2":
             self._init_gpt2(original_mlp)
@@ -367,22 +660,19 @@ class TPMLP(nn.Module):
         self.act = torch.nn.functional.gelu
 
     def forward(self, hidden_states: Any) -> Any:
-        partials = []
-        for i, dev in enumerate(self.devices):
-            h = hidden_states.to(dev, non_blocking=True)
+        def shard(i: int) -> Any:
+            h = hidden_states.to(self.devices[i], non_blocking=True)
             if self.up_shards is not None:
                 # Llama-style: SiLU(gate(x)) * up(x)
                 gate_out = self.act(self.gate_shards[i](h))
                 up_out = self.up_shards[i](h)
-                intermediate = gate_out * up_out
-            else:
-                # GPT-2-style: GELU(fc(x))
-                intermediate = self.act(self.gate_shards[i](h))
-            out = self.down_shards[i](intermediate)
-            partials.append(out)
+                return gate_out * up_out
+            # GPT-2-style: GELU(fc(x))
+            return self.act(self.gate_shards[i](h))
 
-        _nccl_all_reduce(partials)
-        return partials[0]
+        intermediates = _run_shards(self.devices, shard, self.concurrent)
+        return _row_parallel_reduce(intermediates, self.down_shards, self.devices,
+                                    self.concurrent, self.overlap_chunks)
 
 
 class TPTransformerBlock(nn.Module):
@@ -430,7 +720,7 @@ class TPTransformerBlock(nn.Module):
         # Forward position info to attention (critical for Llama/Qwen RoPE)
         attn_kwargs = {}
         for k in ("position_ids", "position_embeddings", "attention_mask",
-                   "past_key_value", "cache_position"):
+                   "kv_cache", "layer_idx", "cache_position"):
             if k in kwargs:
                 attn_kwargs[k] = kwargs[k]
         h = self.tp_attn(h, **attn_kwargs)
@@ -505,6 +795,20 @@ class TPModel(nn.Module):
 
         _logger.info("TP model ready: %d TP layers across %s", len(self.tp_layers), devices)
 
+    def set_execution(self, concurrent: Optional[bool] = None,
+                      overlap_chunks: Optional[int] = None) -> None:
+        """Override ``VRM_TP_CONCURRENT`` / ``VRM_TP_OVERLAP_CHUNKS`` for every layer."""
+        for mod in self.modules():
+            if isinstance(mod, (TPAttention, TPMLP)):
+                if concurrent is not None:
+                    mod.concurrent = bool(concurrent)
+                if overlap_chunks is not None:
+                    mod.overlap_chunks = max(1, int(overlap_chunks))
+
+    def new_cache(self, capacity: int = 256) -> TPKVCache:
+        """Empty per-shard KV cache sized for this model."""
+        return TPKVCache(len(self.tp_layers), len(self.devices), capacity)
+
     def forward(
         self,
         input_ids: Any,
@@ -513,23 +817,31 @@ class TPModel(nn.Module):
         past_key_values: Any = None,
         **kwargs,
     ) -> Any:
+        """Logits for ``input_ids``.
+
+        ``past_key_values`` may be a ``TPKVCache``: the tokens are then
+        placed after the cached ones (positions start at ``cache.seq_len``)
+        and their K/V are appended to it.
+        """
         device = self.primary
         input_ids = input_ids.to(device)
         seq_len = input_ids.shape[1]
+        cache = past_key_values if isinstance(past_key_values, TPKVCache) else None
+        offset = cache.seq_len if cache is not None else 0
 
         # Embedding
         h = self.embed(input_ids)
         if self.pos_embed is not None:
             # GPT-2: absolute position embeddings
             if position_ids is None:
-                position_ids = torch.arange(seq_len, device=device).unsqueeze(0)
+                position_ids = torch.arange(offset, offset + seq_len, device=device).unsqueeze(0)
             h = h + self.pos_embed(position_ids.to(device))
 
         # Compute rotary position embeddings for Llama/Qwen/Mistral
         position_embeddings = None
         if self.rotary_emb is not None:
             if position_ids is None:
-                position_ids = torch.arange(seq_len, device=device).unsqueeze(0)
+                position_ids = torch.arange(offset, offset + seq_len, device=device).unsqueeze(0)
             position_embeddings = self.rotary_emb(h, position_ids.to(device))
 
         # Build kwargs to pass through to each layer
@@ -540,10 +852,14 @@ class TPModel(nn.Module):
             layer_kwargs["position_embeddings"] = position_embeddings
         if attention_mask is not None:
             layer_kwargs["attention_mask"] = attention_mask.to(device)
+        if cache is not None:
+            layer_kwargs["kv_cache"] = cache
 
         # Transformer layers
-        for layer in self.tp_layers:
-            h = layer(h, **layer_kwargs)
+        for idx, layer in enumerate(self.tp_layers):
+            h = layer(h, layer_idx=idx, **layer_kwargs)
+        if cache is not None:
+            cache.advance(seq_len)
 
         # Final norm + LM head
         h = self.final_norm(h)
@@ -551,26 +867,61 @@ class TPModel(nn.Module):
 
         return logits
 
-    def generate_greedy(self, input_ids: Any, max_new_tokens: int = 128) -> Any:
-        """Simple greedy generation loop for TP model."""
+    def generate(
+        self,
+        input_ids: Any,
+        max_new_tokens: int = 128,
+        do_sample: bool = False,
+        temperature: float = 1.0,
+        top_k: int = 0,
+        top_p: float = 1.0,
+        use_cache: bool = True,
+        eos_token_id: Any = None,
+    ) -> Any:
+        """Generate up to ``max_new_tokens`` tokens.
+
+        The prompt is prefilled once into a ``TPKVCache`` and each step feeds
+        only the last token (``use_cache=False`` re-runs the full sequence,
+        kept for comparison). Sampling goes through
+        ``core.triton_sampling.fused_sample`` (temperature / top-k / top-p);
+        ``do_sample=False`` is greedy.
+        """
+        from core.triton_sampling import fused_sample
+
         device = self.primary
         generated = input_ids.to(device)
-        seq_len = generated.shape[1]
+        if eos_token_id is None:
+            eos_token_id = getattr(self.config, "eos_token_id", None)
+        eos = set(eos_token_id) if isinstance(eos_token_id, (list, tuple)) else (
+            {eos_token_id} if eos_token_id is not None else set())
+        cache = self.new_cache(capacity=generated.shape[1] + max_new_tokens) if use_cache else None
+        step_input = generated
 
-        for step in range(max_new_tokens):
-            # Pass full sequence with correct position_ids
-            pos_ids = torch.arange(generated.shape[1], device=device).unsqueeze(0)
-            logits = self.forward(generated, position_ids=pos_ids)
-            next_token = logits[:, -1, :].argmax(dim=-1, keepdim=True)
-            generated = torch.cat([generated, next_token], dim=1)
-
-            # Check EOS
-            eos_id = getattr(self.config, "eos_token_id", None)
-            if eos_id is not None and next_token.item() == eos_id:
-                break
+        with torch.no_grad():
+            for _ in range(max_new_tokens):
+                if cache is not None:
+                    logits = self.forward(step_input, past_key_values=cache)
+                else:
+                    pos_ids = torch.arange(generated.shape[1], device=device).unsqueeze(0)
+                    logits = self.forward(generated, position_ids=pos_ids)
+                next_token = fused_sample(
+                    logits[:, -1, :].float(), temperature=temperature,
+                    top_k=top_k, top_p=top_p, greedy=not do_sample,
+                )
+                generated = torch.cat([generated, next_token], dim=1)
+                step_input = next_token
+
+                # Check EOS
+                if eos and all(t in eos for t in next_token.view(-1).tolist()):
+                    break
 
         return generated
 
+    def generate_greedy(self, input_ids: Any, max_new_tokens: int = 128,
+                        use_cache: bool = True) -> Any:
+        """Greedy generation (see ``generate``)."""
+        return self.generate(input_ids, max_new_tokens=max_new_tokens, use_cache=use_cache)
+
 
 def apply_tensor_parallel(model: Any, devices: List[str] = None) -> TPModel:
     """Convert a HuggingFace CausalLM model to tensor-parallel.
@@ -606,6 +957,7 @@ def apply_tensor_parallel(model: Any, devices: List[str] = None) -> TPModel:
 
 __all__ = [
     "apply_tensor_parallel",
+    "TPKVCache",
     "TPModel",
     "TPTransformerBlock",
     "TPAttention",
@@ -737,29 +737,38 @@ class TransferManager:
         """
         src_tensor = tensor.cuda(source_gpu) if not tensor.is_cuda else tensor
 
-        cpu_tensor = torch.empty(
-            src_tensor.shape,
-            dtype=src_tensor.dtype,
-            pin_memory=True,  # Page-locked for DMA
-        )
-
-        if stream is not None:
-            with torch.cuda.stream(stream):
-                cpu_tensor.copy_(src_tensor, non_blocking=True)
-            stream.synchronize()
-        else:
-            src_stream = torch.cuda.Stream(device=source_gpu)
-            with torch.cuda.stream(src_stream):
-                cpu_tensor.copy_(src_tensor, non_blocking=True)
-            src_stream.synchronize()
+        # Page-locked staging buffer leased from the shared host arena
+        from core.host_arena import get_host_arena
+        lease = get_host_arena().acquire(src_tensor.numel() * src_tensor.element_size())
+        cpu_tensor = lease.view(tuple(src_tensor.shape), src_tensor.dtype)
 
-        # Step 2: Pinned CPU -> target GPU (async)
-        dst_stream = torch.cuda.Stream(device=target_gpu)
-        with torch.cuda.stream(dst_stream):
-            dst_tensor = cpu_tensor.to(f"cuda:{target_gpu}", non_blocking=True)
+        try:
+            if stream is not None:
+                with torch.cuda.stream(stream):
+                    cpu_tensor.copy_(src_tensor, non_blocking=True)
+                stream.synchronize()
+            else:
+                src_stream = torch.cuda.Stream(device=source_gpu)
+                with torch.cuda.stream(src_stream):
+                    cpu_tensor.copy_(src_tensor, non_blocking=True)
+                src_stream.synchronize()
+
+            # Step 2: Pinned CPU -> target GPU (async)
+            dst_stream = torch.cuda.Stream(device=target_gpu)
+            with torch.cuda.stream(dst_stream):
+                dst_tensor = cpu_tensor.to(f"cuda:{target_gpu}", non_blocking=True)
+        except Exception:
+            lease.release()
+            raise
 
         if not self.async_transfers:
             dst_stream.synchronize()
+            lease.release()
+        else:
+            # The upload may still be reading the buffer: reuse waits on it
+            done = torch.cuda.Event()
+            done.record(dst_stream)
+            lease.release(done)
 
         return TransportMethod.CPU_STAGED, dst_tensor
 
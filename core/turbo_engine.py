@@ -121,6 +121,14 @@ class StaticKVCache:
     - Pre-allocates [n_layers, batch, n_kv_heads, max_seq, head_dim]
     - Uses scatter via cache_position index (single integer tensor)
     - Never mutates Python-level structures during decode
+
+    Continuous batching (bucketed CUDA graph decode): rows are request
+    slots kept as a contiguous prefix (``acquire`` / ``release``). All rows
+    write at one shared cursor (``write_pos``, a device tensor). ``valid``
+    records which positions each row has actually written, so requests
+    that join late, are right-aligned to the cursor, or leave gaps are
+    masked correctly. ``view(bucket)`` is the HF-compatible cache over the
+    first ``bucket`` rows, and is what a bucket's graph captures.
     """
 
     def __init__(
@@ -153,6 +161,14 @@ class StaticKVCache:
         # Current sequence length (on device for graph safety)
         self._seq_len = 0
 
+        # Slot bookkeeping for continuous batching
+        self.dtype = dtype
+        self.active = 0
+        self.cursor = 0
+        self.write_pos = torch.zeros(1, dtype=torch.long, device=device)
+        self.valid = torch.zeros(batch_size, max_seq_len, dtype=torch.long, device=device)
+        self._views: Dict[int, "_StaticKVView"] = {}
+
     def update(
         self,
         layer_idx: int,
@@ -190,6 +206,109 @@ class StaticKVCache:
     def seq_len(self, v):
         self._seq_len = v
 
+    # ── Continuous-batching slots ─────────────────────────────────────
+
+    def acquire(self) -> int:
+        """Claim the next free row."""
+        if self.active >= self.batch_size:
+            raise RuntimeError(f"StaticKVCache: all {self.batch_size} slots in use")
+        self.active += 1
+        return self.active - 1
+
+    def release(self, slot: int) -> int:
+        """Free *slot*. The last active row moves into it to keep the prefix
+        contiguous. Returns that row's old index (== *slot* if none moved)."""
+        last = self.active - 1
+        if slot != last:
+            for cache in (self.key_cache, self.value_cache):
+                for layer in cache:
+                    layer[slot].copy_(layer[last])
+            self.valid[slot].copy_(self.valid[last])
+        self.valid[last].zero_()
+        self.active -= 1
+        return last
+
+    def load(self, slot: int, layers: List[Tuple["torch.Tensor", "torch.Tensor"]]) -> None:
+        """Copy a request's prefilled ``(key, value)`` per layer into *slot*,
+        ending at the cursor (which jumps forward if the prompt is longer)."""
+        length = layers[0][0].shape[2]
+        if length > self.cursor:
+            self.cursor = length
+        if self.cursor >= self.max_seq_len:
+            self.compact()
+        start = self.cursor - length
+        for i, (k, v) in enumerate(layers):
+            self.key_cache[i][slot, :, start:self.cursor] = k[0]
+            self.value_cache[i][slot, :, start:self.cursor] = v[0]
+        self.valid[slot].zero_()
+        self.valid[slot, start:self.cursor] = 1
+
+    def export(self, slot: int) -> List[Tuple["torch.Tensor", "torch.Tensor"]]:
+        """The ``(key, value)`` per layer written by *slot*, gaps removed."""
+        idx = self.valid[slot].nonzero().squeeze(-1)
+        return [(k[slot:slot + 1, :, idx], v[slot:slot + 1, :, idx])
+                for k, v in zip(self.key_cache, self.value_cache)]
+
+    def compact(self) -> None:
+        """Shift all rows left past the columns no active row uses."""
+        used = self.valid[:self.active].any(0).nonzero()
+        shift = int(used[0]) if used.numel() else self.cursor
+        if shift == 0:
+            raise RuntimeError(f"StaticKVCache: max_seq_len {self.max_seq_len} reached")
+        keep = self.cursor - shift
+        for cache in (self.key_cache, self.value_cache):
+            for layer in cache:
+                layer[:, :, :keep] = layer[:, :, shift:self.cursor].clone()
+        self.valid[:, :keep] = self.valid[:, shift:self.cursor].clone()
+        self.valid[:, keep:] = 0
+        self.cursor = keep
+
+    def begin_step(self, rows: int) -> "torch.Tensor":
+        """Point ``write_pos`` at the cursor for a decode step over the
+        first *rows* rows and return their ``[rows, max_seq_len]`` mask."""
+        if self.cursor >= self.max_seq_len:
+            self.compact()
+        self.write_pos.fill_(self.cursor)
+        self.valid[:rows, self.cursor] = 1
+        return self.valid[:rows]
+
+    def end_step(self) -> None:
+        self.cursor += 1
+
+    def view(self, rows: int) -> "_StaticKVView":
+        """HF-compatible cache over the first *rows* rows (cached per size)."""
+        if rows not in self._views:
+            self._views[rows] = _StaticKVView(self, rows)
+        return self._views[rows]
+
+
+class _StaticKVView:
+    """``past_key_values`` over the first *rows* rows of a StaticKVCache.
+
+    ``update`` writes the new token at ``write_pos`` with ``index_copy_``
+    and returns the full fixed-size buffers, so a captured graph only
+    reads and writes fixed addresses. Pair it with an additive 4D mask
+    (``core.cuda_graph_decode.additive_mask``).
+    """
+
+    is_compileable = True
+
+    def __init__(self, cache: StaticKVCache, rows: int):
+        self.cache = cache
+        self.rows = rows
+        self.dtype = cache.dtype
+        self._keys = [k[:rows] for k in cache.key_cache]
+        self._values = [v[:rows] for v in cache.value_cache]
+
+    def update(self, key_states, value_states, layer_idx: int, *args, **kwargs):
+        k, v = self._keys[layer_idx], self._values[layer_idx]
+        k.index_copy_(2, self.cache.write_pos, key_states.to(k.dtype))
+        v.index_copy_(2, self.cache.write_pos, value_states.to(v.dtype))
+        return k, v
+
+    def get_seq_length(self, layer_idx: int = 0) -> int:
+        return self.cache.cursor
+
 
 class TurboForward(nn.Module):
     """A minimal forward pass that calls the HF model internals directly.
@@ -1008,6 +1127,11 @@ class SpeculativeTurboEngine:
     - Accepted tokens are "free", rejected token is corrected from verifier logits
 
     Expected speedup: 2-3x when acceptance rate is 60-80%.
+
+    Instead of a draft model, a model-free ``draft_model_callable(ids, n)``
+    (e.g. :class:`core.prompt_lookup.PromptLookupDrafter`) can supply the
+    drafts. Pass ``draft_model=None`` in that case. It may return fewer
+    than ``n`` tokens, and a round with no drafts is a plain decode step.
     """
 
     def __init__(
@@ -1020,9 +1144,12 @@ class SpeculativeTurboEngine:
         max_seq_len: int = 2048,
         compile_main: bool = True,
         compile_draft: bool = True,
+        draft_model_callable=None,
     ):
         if not _HAS_TORCH:
             raise RuntimeError("torch required for SpeculativeTurboEngine")
+        if draft_model is None and draft_model_callable is None:
+            raise ValueError("SpeculativeTurboEngine needs a draft_model or a draft_model_callable")
 
         self.device = torch.device(device)
         self.gamma = gamma
@@ -1056,12 +1183,13 @@ class SpeculativeTurboEngine:
                 except Exception as e:
                     logger.warning("SpeculativeTurbo: main compile failed: %s", e)
 
-        # Build draft model TurboForward
-        self.draft_fwd = TurboForward(draft_model)
+        # Build draft model TurboForward (unless drafts come from a callable)
+        self.draft_callable = draft_model_callable if draft_model is None else None
+        self.draft_fwd = TurboForward(draft_model) if draft_model is not None else None
         self.draft_model = draft_model
         self._draft_past = None
 
-        if compile_draft:
+        if compile_draft and self.draft_fwd is not None:
             inner_fwd = self.draft_fwd.inner.forward
             already_compiled = hasattr(inner_fwd, '_torchdynamo_orig_callable') or \
                 hasattr(inner_fwd, '__wrapped__') or \
@@ -1165,7 +1293,9 @@ class SpeculativeTurboEngine:
 
         # ── Prefill both models ──
         main_logits, self._main_past = self.main_fwd(input_ids, None)
-        draft_logits, self._draft_past = self.draft_fwd(input_ids, None)
+        if self.draft_fwd is not None:
+            draft_logits, self._draft_past = self.draft_fwd(input_ids, None)
+        prompt_ids = input_ids[0].tolist()
 
         # First token from main model
         if not do_sample:
@@ -1192,29 +1322,39 @@ class SpeculativeTurboEngine:
             gamma = min(self.gamma, remaining)
 
             # 1. Draft: generate gamma tokens with the draft model
-            # First, feed next_token to draft model to update its cache
-            d_logits, self._draft_past = self.draft_fwd(
-                next_token.view(1, 1), self._draft_past
-            )
-            # Now draft model cache has: prompt + all accepted tokens + next_token
-            # d_logits predicts the token after next_token
-            draft_token_ids = []
-            if not do_sample:
-                dt = d_logits.argmax(dim=-1, keepdim=True)
+            if self.draft_fwd is None:
+                # Model-free drafter sees the committed sequence (it
+                # ends with next_token) and may propose fewer tokens
+                out = self.draft_callable(
+                    torch.tensor([prompt_ids + generated_tokens], device=self.device), gamma
+                )
+                drafts = out[0] if isinstance(out, tuple) else out
+                draft_token_ids = [int(t) for t in torch.as_tensor(drafts).reshape(-1)[:gamma].tolist()]
+                gamma = len(draft_token_ids)
             else:
-                dt = self._sample(d_logits, temperature, top_k, top_p)
-            draft_token_ids.append(dt.item())
-
-            for _ in range(gamma - 1):
+                # First, feed next_token to draft model to update its cache
                 d_logits, self._draft_past = self.draft_fwd(
-                    dt.view(1, 1), self._draft_past
+                    next_token.view(1, 1), self._draft_past
                 )
+                # Now draft model cache has: prompt + all accepted tokens + next_token
+                # d_logits predicts the token after next_token
+                draft_token_ids = []
                 if not do_sample:
                     dt = d_logits.argmax(dim=-1, keepdim=True)
                 else:
                     dt = self._sample(d_logits, temperature, top_k, top_p)
                 draft_token_ids.append(dt.item())
 
+                for _ in range(gamma - 1):
+                    d_logits, self._draft_past = self.draft_fwd(
+                        dt.view(1, 1), self._draft_past
+                    )
+                    if not do_sample:
+                        dt = d_logits.argmax(dim=-1, keepdim=True)
+                    else:
+                        dt = self._sample(d_logits, temperature, top_k, top_p)
+                    draft_token_ids.append(dt.item())
+
             # 2. Verify: pass [next_token, d0, ..., d_{gamma-1}] to main model
             # Main model KV cache has prompt + previously accepted tokens
             # (NOT including next_token — that's the key!)
@@ -1327,8 +1467,9 @@ class SpeculativeTurboEngine:
             # Draft cache currently has: prompt + accepted_before + next_token + all gamma drafts
             # We need it to have: prompt + tokens_generated - 1 positions
             # (everything except the new next_token which will be fed at start of next loop)
-            draft_keep = prompt_len + tokens_generated - 1
-            self._draft_past = self._truncate_past(self._draft_past, draft_keep)
+            if self.draft_fwd is not None:
+                draft_keep = prompt_len + tokens_generated - 1
+                self._draft_past = self._truncate_past(self._draft_past, draft_keep)
 
             # Ensure next_token is a proper tensor for the next iteration
             if not isinstance(next_token, torch.Tensor):
@@ -93,27 +93,42 @@ else:  # mode normal mais on protège chaque import lourd + fallback tokenizer p
         return _BASIC_SINGLETON
 
     if not FORCE_BASIC:
-        try:
-            from transformers import AutoTokenizer  # type: ignore
-            from transformers.utils import is_tokenizers_available  # type: ignore
-            def get_tokenizer(model_name: str):  # noqa
-                if os.environ.get('VRM_FORCE_BASIC_TOKENIZER') in {'1','true','TRUE'}:
-                    return _basic()
-                try:
-                    return AutoTokenizer.from_pretrained(model_name, use_fast=True)
-                except Exception as e:  # pragma: no cover - fallback slow ou basic
-                    if os.environ.get('USE_SLOW_TOKENIZER') in {'1','true','TRUE'}:
-                        logging.info(f"[Tokenizer] Fast indisponible ({e}) -> slow")
-                        try:
-                            return AutoTokenizer.from_pretrained(model_name, use_fast=False)
-                        except Exception:
-                            logging.debug("Slow tokenizer failed, using basic", exc_info=True)
-                            return _basic()
-                    return _basic()
-        except Exception:
-            logging.debug("AutoTokenizer import failed, using basic", exc_info=True)
-            FORCE_BASIC = True
-    if FORCE_BASIC:
+        # transformers is imported on first use only: it costs seconds and
+        # most importers of this module (CLI status, monitor, profiler) only
+        # need device detection.
+        def _auto_tokenizer():
+            try:
+                from transformers import AutoTokenizer  # type: ignore
+                return AutoTokenizer
+            except Exception:
+                logging.debug("AutoTokenizer import failed, using basic", exc_info=True)
+                return None
+
+        def is_tokenizers_available():  # noqa
+            try:
+                from transformers.utils import is_tokenizers_available as _avail  # type: ignore
+                return _avail()
+            except Exception:
+                return False
+
+        def get_tokenizer(model_name: str):  # noqa
+            if os.environ.get('VRM_FORCE_BASIC_TOKENIZER') in {'1','true','TRUE'}:
+                return _basic()
+            AutoTokenizer = _auto_tokenizer()
+            if AutoTokenizer is None:
+                return _basic()
+            try:
+                return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+            except Exception as e:  # pragma: no cover - fallback slow ou basic
+                if os.environ.get('USE_SLOW_TOKENIZER') in {'1','true','TRUE'}:
+                    logging.info(f"[Tokenizer] Fast indisponible ({e}) -> slow")
+                    try:
+                        return AutoTokenizer.from_pretrained(model_name, use_fast=False)
+                    except Exception:
+                        logging.debug("Slow tokenizer failed, using basic", exc_info=True)
+                        return _basic()
+                return _basic()
+    else:
         def get_tokenizer(model_name: str):  # pragma: no cover - trivial
             return _basic()
         def is_tokenizers_available():  # pragma: no cover
@@ -0,0 +1,471 @@
+"""Layer-weight streaming — keep N decoder layers resident, stream the rest.
+
+Promotes the double-buffered tiering experiments
+(``benchmarks/tiering_v0_1_doublebuffer.py``,
+``benchmarks/poc_tiering_offload_gpu1.py``) to a pipeline mode. The
+compute device holds:
+
+  - the non-layer modules (embeddings, final norm, lm_head),
+  - the first ``N`` decoder layers (resident),
+  - two staging slots, each sized to the largest streamed layer.
+
+Streamed layers keep their master weights on the host (pinned) or on a
+secondary device. Layers run in model order: while layer ``k`` computes
+out of one slot, layer ``k+1`` is copied into the other. The first
+streamed layer is prefetched as soon as the previous pass finishes its
+last streamed layer, so its copy hides behind lm_head, sampling and the
+resident layers of the next step.
+
+Copies go through a copy engine:
+  - ``CudaCopyEngine``: side stream + events; the compute stream waits on
+    the event, the host never blocks.
+  - ``SimulatedCopyEngine``: one worker thread (a single DMA engine) with
+    configurable latency/bandwidth, so the scheduler runs on CPU in tests
+    and benchmarks.
+
+Usage:
+    streamer = enable_weight_streaming(model, device="cuda:0")
+    model.generate(...)
+    streamer.stats()
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from core.logger import LoggerAdapter
+    _logger = LoggerAdapter("weight_streaming")
+except Exception:
+    _logger = logging.getLogger("vramancer.weight_streaming")  # type: ignore
+
+try:
+    import torch
+    import torch.nn as nn
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    nn = None  # type: ignore
+    _TORCH = False
+
+STAGING_SLOTS = 2
+_SLOT_ALIGN = 256  # bytes; keeps every dtype view of a slot aligned
+# Activations + KV cache headroom kept free when sizing N automatically
+_DEFAULT_RESERVE_FRACTION = 0.15
+
+# Decoder-layer containers, checked in order
+_LAYER_PATHS = (
+    "model.layers",            # Llama / Mistral / Qwen
+    "model.decoder.layers",    # OPT
+    "transformer.h",           # GPT-2 / Falcon
+    "gpt_neox.layers",         # GPT-NeoX / Pythia
+    "layers",
+)
+
+
+def _align(n: int) -> int:
+    return (n + _SLOT_ALIGN - 1) // _SLOT_ALIGN * _SLOT_ALIGN
+
+
+def module_bytes(module: Any) -> int:
+    """Parameter bytes of ``module`` (buffers excluded)."""
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+def plan_resident_layers(layer_bytes: Sequence[int], budget_bytes: int,
+                         staging_slots: int = STAGING_SLOTS) -> int:
+    """Largest ``N`` such that the first ``N`` layers plus staging fit.
+
+    The staging slots are sized to the largest *streamed* layer, so the
+    cost of keeping one more layer resident can shrink the slots too.
+    Returns 0 when not even the staging slots fit — the caller decides
+    whether to proceed.
+    """
+    n = len(layer_bytes)
+    suffix_max = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix_max[i] = max(suffix_max[i + 1], int(layer_bytes[i]))
+    prefix = [0] * (n + 1)
+    for i, b in enumerate(layer_bytes):
+        prefix[i + 1] = prefix[i] + int(b)
+    for k in range(n, -1, -1):
+        slots = min(staging_slots, n - k)
+        if prefix[k] + slots * suffix_max[k] <= budget_bytes:
+            return k
+    return 0
+
+
+def find_decoder_layers(model: Any) -> Optional[List[Any]]:
+    """Return the ordered decoder layers of an HF-style model, or None."""
+    for path in _LAYER_PATHS:
+        obj = model
+        for attr in path.split("."):
+            obj = getattr(obj, attr, None)
+            if obj is None:
+                break
+        if obj is not None and nn is not None and isinstance(obj, nn.ModuleList):
+            return list(obj)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Copy engines
+# ---------------------------------------------------------------------------
+
+class SimulatedCopyEngine:
+    """Host-side copy engine with simulated transfer cost.
+
+    Copies run on a single worker thread, like one DMA engine: they
+    overlap with whatever the caller does next but not with each other.
+    Each submission costs ``latency_s`` plus ``bytes / bandwidth``.
+    """
+
+    def __init__(self, latency_s: float = 0.0,
+                 bandwidth_gbps: Optional[float] = None):
+        self.latency_s = float(latency_s)
+        self.bandwidth_gbps = bandwidth_gbps
+        self._pool = ThreadPoolExecutor(max_workers=1,
+                                        thread_name_prefix="vrm-wstream")
+
+    def submit(self, pairs: List[Tuple[Any, Any]]) -> Future:
+        nbytes = sum(src.numel() * src.element_size() for _, src in pairs)
+        delay = self.latency_s
+        if self.bandwidth_gbps:
+            delay += nbytes / (self.bandwidth_gbps * 1e9)
+
+        def _copy():
+            t0 = time.perf_counter()
+            for dst, src in pairs:
+                dst.copy_(src)
+            remaining = delay - (time.perf_counter() - t0)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        return self._pool.submit(_copy)
+
+    def wait(self, ticket: Future) -> None:
+        ticket.result()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class CudaCopyEngine:
+    """Side-stream copy engine for a CUDA compute device.
+
+    ``submit`` orders the copy after work already queued on the compute
+    stream (the slot being overwritten may still be read by it) and
+    records an event; ``wait`` makes the compute stream wait on that event
+    without synchronising the host.
+    """
+
+    def __init__(self, device: Any):
+        self.device = torch.device(device)
+        self.stream = torch.cuda.Stream(device=self.device)
+
+    def submit(self, pairs: List[Tuple[Any, Any]]) -> Any:
+        self.stream.wait_stream(torch.cuda.current_stream(self.device))
+        with torch.cuda.stream(self.stream):
+            for dst, src in pairs:
+                dst.copy_(src, non_blocking=True)
+            event = torch.cuda.Event()
+            event.record(self.stream)
+        return event
+
+    def wait(self, ticket: Any) -> None:
+        torch.cuda.current_stream(self.device).wait_event(ticket)
+
+    def close(self) -> None:
+        self.stream.synchronize()
+
+
+def default_copy_engine(device: Any) -> Any:
+    dev = torch.device(device)
+    if dev.type == "cuda":
+        return CudaCopyEngine(dev)
+    return SimulatedCopyEngine()
+
+
+# ---------------------------------------------------------------------------
+# Streamer
+# ---------------------------------------------------------------------------
+
+class WeightStreamer:
+    """Double-buffered weight streaming for one compute device.
+
+    Inference only: slots are overwritten as soon as the next layer needs
+    them, so activations saved for backward would see stale weights.
+
+    Parameters
+    ----------
+    layers : sequence of nn.Module
+        Decoder layers in execution order.
+    device : str or torch.device
+        Compute device. Resident layers and staging slots live here.
+    resident_layers : int
+        Number of leading layers kept on ``device``; the rest are streamed.
+    source : str or torch.device
+        Where streamed masters live (``"cpu"`` or a secondary device).
+    copy_engine : optional
+        Object with ``submit(pairs) -> ticket`` / ``wait(ticket)`` /
+        ``close()``. Defaults to ``CudaCopyEngine`` on CUDA devices.
+    pin_memory : bool
+        Pin host masters (only when ``source`` is CPU and CUDA is present).
+    """
+
+    def __init__(self, layers: Sequence[Any], device: Any, resident_layers: int,
+                 source: Any = "cpu", copy_engine: Any = None,
+                 pin_memory: bool = True):
+        if not _TORCH:
+            raise RuntimeError("weight streaming requires torch")
+        self.layers = list(layers)
+        self.device = torch.device(device)
+        self.source = torch.device(source)
+        self.resident_layers = max(0, min(int(resident_layers), len(self.layers)))
+        self._streamed = list(range(self.resident_layers, len(self.layers)))
+        self._pos = {idx: pos for pos, idx in enumerate(self._streamed)}
+        self._engine = copy_engine or default_copy_engine(self.device)
+        self._lock = threading.Lock()
+
+        pin = (pin_memory and self.source.type == "cpu"
+               and torch.cuda.is_available())
+        self.resident_bytes = 0
+        for layer in self.layers[:self.resident_layers]:
+            layer.to(self.device)
+            self.resident_bytes += module_bytes(layer)
+
+        # layer index -> [(param, master, byte offset, nbytes)]
+        self._plans: Dict[int, List[Tuple[Any, Any, int, int]]] = {}
+        self.slot_bytes = 0
+        self.streamed_bytes = 0
+        for idx in self._streamed:
+            layer = self.layers[idx]
+            _move_buffers(layer, self.device)
+            entries = []
+            offset = 0
+            for p in layer.parameters():
+                master = p.data.to(self.source).contiguous()
+                if pin:
+                    master = master.pin_memory()
+                p.data = master
+                nbytes = master.numel() * master.element_size()
+                entries.append((p, master, offset, nbytes))
+                offset = _align(offset + nbytes)
+                self.streamed_bytes += nbytes
+            self._plans[idx] = entries
+            self.slot_bytes = max(self.slot_bytes, offset)
+
+        n_slots = min(STAGING_SLOTS, len(self._streamed))
+        self._slots = [torch.empty(self.slot_bytes, dtype=torch.uint8, device=self.device)
+                       for _ in range(n_slots)]
+        self._views: Dict[Tuple[int, int], List[Any]] = {}
+        self._slot_owner: List[Optional[int]] = [None] * n_slots
+        self._tickets: List[Any] = [None] * n_slots
+        self._active_slot: Optional[int] = None
+
+        self.prefetches = 0
+        self.sync_fetches = 0
+        self.slot_hits = 0
+        self.bytes_copied = 0
+        self.stall_s = 0.0
+        self.passes = 0
+
+        self._hooks: List[Any] = []
+        if self._streamed:
+            self._hooks.append(self.layers[0].register_forward_pre_hook(self._on_pass_start))
+            for idx in self._streamed:
+                layer = self.layers[idx]
+                self._hooks.append(layer.register_forward_pre_hook(self._make_pre_hook(idx)))
+                self._hooks.append(layer.register_forward_hook(self._make_post_hook(idx)))
+
+        _logger.info(
+            "Weight streaming on %s: %d resident / %d streamed layers from %s "
+            "(resident %.1f MB, slots %d x %.1f MB)",
+            self.device, self.resident_layers, len(self._streamed), self.source,
+            self.resident_bytes / 1e6, n_slots, self.slot_bytes / 1e6,
+        )
+
+    @property
+    def streamed_layers(self) -> int:
+        return len(self._streamed)
+
+    # -- slot management ---------------------------------------------------
+
+    def _slot_views(self, slot: int, idx: int) -> List[Any]:
+        key = (slot, idx)
+        views = self._views.get(key)
+        if views is None:
+            buf = self._slots[slot]
+            views = [buf[off:off + n].view(master.dtype).view(master.shape)
+                     for _, master, off, n in self._plans[idx]]
+            self._views[key] = views
+        return views
+
+    def _prefetch(self, idx: int, needed_now: bool = False) -> int:
+        """Ensure ``idx`` is in (or on its way into) a slot; return the slot."""
+        if idx in self._slot_owner:
+            if needed_now:
+                self.slot_hits += 1
+            return self._slot_owner.index(idx)
+        free = [s for s in range(len(self._slots)) if s != self._active_slot]
+        # Prefer an empty slot, then the one not about to be used
+        slot = next((s for s in free if self._slot_owner[s] is None), free[0])
+        pairs = [(view, master) for view, (_, master, _, _)
+                 in zip(self._slot_views(slot, idx), self._plans[idx])]
+        self._slot_owner[slot] = idx
+        self._tickets[slot] = self._engine.submit(pairs)
+        self.bytes_copied += sum(n for *_, n in self._plans[idx])
+        if needed_now:
+            self.sync_fetches += 1
+        else:
+            self.prefetches += 1
+        return slot
+
+    # -- hooks -------------------------------------------------------------
+
+    def _on_pass_start(self, module, args):
+        with self._lock:
+            self.passes += 1
+            self._active_slot = None
+            self._prefetch(self._streamed[0])
+
+    def _make_pre_hook(self, idx: int):
+        def pre(module, args):
+            with self._lock:
+                slot = self._prefetch(idx, needed_now=True)
+                ticket = self._tickets[slot]
+            t0 = time.perf_counter()
+            self._engine.wait(ticket)
+            stall = time.perf_counter() - t0
+            with self._lock:
+                self.stall_s += stall
+                for (p, *_), view in zip(self._plans[idx], self._slot_views(slot, idx)):
+                    p.data = view
+                self._active_slot = slot
+                # Overlap: copy the next streamed layer (wrapping to the
+                # first one for the next pass) while this one computes.
+                pos = self._pos[idx]
+                nxt = self._streamed[(pos + 1) % len(self._streamed)]
+                if nxt != idx:
+                    self._prefetch(nxt)
+        return pre
+
+    def _make_post_hook(self, idx: int):
+        def post(module, args, output):
+            with self._lock:
+                for p, master, _, _ in self._plans[idx]:
+                    p.data = master
+                self._active_slot = None
+        return post
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "device": str(self.device),
+                "source": str(self.source),
+                "resident_layers": self.resident_layers,
+                "streamed_layers": len(self._streamed),
+                "resident_mb": round(self.resident_bytes / 1e6, 1),
+                "streamed_mb": round(self.streamed_bytes / 1e6, 1),
+                "slot_mb": round(self.slot_bytes / 1e6, 1),
+                "passes": self.passes,
+                "prefetches": self.prefetches,
+                "sync_fetches": self.sync_fetches,
+                "slot_hits": self.slot_hits,
+                "bytes_copied": self.bytes_copied,
+                "stall_ms": round(self.stall_s * 1e3, 3),
+            }
+
+    def close(self) -> None:
+        """Remove hooks and leave streamed params bound to their masters."""
+        for h in self._hooks:
+            h.remove()
+        self._hooks.clear()
+        for entries in self._plans.values():
+            for p, master, _, _ in entries:
+                p.data = master
+        try:
+            self._engine.close()
+        except Exception as e:
+            _logger.debug("copy engine close failed: %s", e)
+        self._slots = []
+        self._views.clear()
+
+
+def _move_buffers(module: Any, device: Any) -> None:
+    for sub in module.modules():
+        for name, buf in sub._buffers.items():
+            if buf is not None:
+                sub._buffers[name] = buf.to(device)
+
+
+def enable_weight_streaming(model: Any, device: Any = None, source: Any = "cpu",
+                            resident_layers: Optional[int] = None,
+                            reserve_bytes: Optional[int] = None,
+                            copy_engine: Any = None,
+                            pin_memory: bool = True) -> WeightStreamer:
+    """Place ``model`` for weight streaming on ``device``.
+
+    Non-layer modules go to ``device``; decoder layers are split into a
+    resident prefix and a streamed tail. When ``resident_layers`` is None
+    it is sized from the device's free memory minus ``reserve_bytes``
+    (default: 15% of the device's total memory). CPU devices keep every
+    layer resident unless ``resident_layers`` is given.
+    """
+    if not _TORCH:
+        raise RuntimeError("weight streaming requires torch")
+    layers = find_decoder_layers(model)
+    if not layers:
+        raise ValueError(f"Cannot find decoder layers in {type(model).__name__}")
+    if device is None:
+        device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    device = torch.device(device)
+
+    layer_modules = {id(m) for layer in layers for m in layer.modules()}
+    layer_params = {id(p) for layer in layers for p in layer.parameters()}
+    for p in model.parameters():
+        if id(p) not in layer_params:
+            p.data = p.data.to(device)
+    for m in model.modules():
+        if id(m) not in layer_modules:
+            for name, buf in m._buffers.items():
+                if buf is not None:
+                    m._buffers[name] = buf.to(device)
+
+    layer_bytes = [module_bytes(layer) for layer in layers]
+    if resident_layers is None or resident_layers < 0:
+        if device.type == "cuda":
+            free, total = torch.cuda.mem_get_info(device)
+            if reserve_bytes is None:
+                reserve_bytes = int(total * _DEFAULT_RESERVE_FRACTION)
+            budget = free - reserve_bytes
+            resident_layers = plan_resident_layers(layer_bytes, budget)
+            if resident_layers == 0 and STAGING_SLOTS * max(layer_bytes) > budget:
+                _logger.warning(
+                    "Weight streaming: %.1f MB budget on %s cannot hold %d staging "
+                    "slots of %.1f MB — expect OOM",
+                    budget / 1e6, device, STAGING_SLOTS, max(layer_bytes) / 1e6,
+                )
+        else:
+            resident_layers = len(layers)
+
+    return WeightStreamer(layers, device, resident_layers, source=source,
+                          copy_engine=copy_engine, pin_memory=pin_memory)
+
+
+__all__ = [
+    "STAGING_SLOTS",
+    "CudaCopyEngine",
+    "SimulatedCopyEngine",
+    "WeightStreamer",
+    "default_copy_engine",
+    "enable_weight_streaming",
+    "find_decoder_layers",
+    "module_bytes",
+    "plan_resident_layers",
+]
@@ -16,6 +16,9 @@ from __future__ import annotations
 import os
 import time
 import json
+import heapq
+import itertools
+import math
 import threading
 from pathlib import Path
 from typing import Any, Literal, List, Optional
@@ -125,6 +128,7 @@ class FastNVMeTransfer:
     @staticmethod
     def _try_odirect_write(filepath: Path, data: bytes) -> bool:
         """Write with O_DIRECT for NVMe — bypasses page cache."""
+        fd = -1
         try:
             import os as _os
             fd = _os.open(
@@ -133,7 +137,6 @@ class FastNVMeTransfer:
                 0o644,
             )
             if not getattr(_os, "O_DIRECT", 0):
-                _os.close(fd)
                 return False
             # O_DIRECT requires 512-byte aligned buffer + size
             import ctypes
@@ -142,10 +145,14 @@ class FastNVMeTransfer:
             buf = (ctypes.c_char * padded_size)()
             ctypes.memmove(buf, data, len(data))
             written = _os.write(fd, buf)
-            _os.close(fd)
             return written > 0
         except Exception:
             return False
+        finally:
+            # Also on EINVAL (unaligned buffer / fs without O_DIRECT): this
+            # used to leak one fd per spilled block.
+            if fd >= 0:
+                os.close(fd)
 
     # ------------------------------------------------------------------
     # Load
@@ -210,6 +217,7 @@ class FastNVMeTransfer:
         """
         if not cls._io_uring_available():
             return None
+        fd = -1
         try:
             import torch, ctypes, ctypes.util, os as _os, platform as _plat
 
@@ -227,7 +235,6 @@ class FastNVMeTransfer:
             # Open file with O_DIRECT
             fd = _os.open(str(filepath), _os.O_RDONLY | getattr(_os, "O_DIRECT", 0))
             if not getattr(_os, "O_DIRECT", 0):
-                _os.close(fd)
                 return None
 
             # Aligned read buffer (4096 alignment for O_DIRECT)
@@ -253,7 +260,6 @@ class FastNVMeTransfer:
                     len(chunk),
                 )
                 total_read += len(chunk)
-            _os.close(fd)
 
             # Create tensor from the buffer
             raw_bytes = bytes(aligned_buf)[:nbytes]
@@ -261,6 +267,9 @@ class FastNVMeTransfer:
             return tensor
         except Exception:
             return None
+        finally:
+            if fd >= 0:
+                os.close(fd)
 
     @classmethod
     def _load_linux_memmap(cls, filepath: Path, shape: tuple, dtype) -> Any:
@@ -388,7 +397,8 @@ class HierarchicalMemoryManager:
     L2→L3 / L3→L5 : migration physique réelle (tensor.cpu(), NVMe spill)
     """
     def __init__(self, nvme_dir: str = ".hm_cache", max_nvme_mb: int = 2048,
-                 decay_half_life_s: float = 60.0, lending_pool=None):
+                 decay_half_life_s: float = 60.0, lending_pool=None,
+                 l3_budget_mb: float | None = None):
         self.log = LoggerAdapter("hmem.v2")
         self.nvme_dir = Path(nvme_dir)
         
@@ -407,11 +417,33 @@ class HierarchicalMemoryManager:
         self._tensor_registry: dict[str, Any] = {}
         # Lease registry: block_id -> VRAMLease (for L2 lending)
         self._lease_registry: dict[str, Any] = {}
-        # Hotness hybride
+        # Hotness hybride — score at last touch + timestamp, decayed lazily
         self._hot_scores: dict[str, float] = {}
         self._last_touch: dict[str, float] = {}
         self._decay_half_life = decay_half_life_s
-        self._prefetch_queue: List[str] = []
+        # Per-tier coldness index: min-heap of (log-score key, seq, block_id).
+        # The key is log(score) + λ·t, which orders blocks exactly like the
+        # decayed score at any common instant, so it never needs refreshing.
+        # Superseded entries (touch / tier change) are skipped via _index_seq.
+        self._index_lock = threading.Lock()
+        self._tier_heap: dict[str, list] = {}
+        self._tier_live: dict[str, int] = {}
+        self._index_seq: dict[str, int] = {}
+        self._index_tier: dict[str, str] = {}
+        self._hot_key: dict[str, float] = {}
+        self._seq = itertools.count()
+        self._t0 = time.time()
+        # Bounded prefetch worker pool (created on first schedule_prefetch)
+        self._prefetcher = None
+        # Byte-accounted L3 (host RAM) budget, kept current by _index()
+        self._l3_bytes = 0
+        self._l3_accounted: dict[str, int] = {}
+        self._init_l3_budget(l3_budget_mb)
+        self._pressure_event = threading.Event()
+        self._spill_lock = threading.Lock()
+        # L5 segment store (created on first tensor spill)
+        self._spill_store = None
+        self._spill_store_failed = False
 
         # VRAMLendingPool integration (L1↔L2 cooperative lending)
         self._lending_pool = lending_pool
@@ -450,34 +482,138 @@ class HierarchicalMemoryManager:
             self.log.debug(f"VRAMLendingPool unavailable: {e}")
             self._lending_pool = None
     
+    # --- L3 (host RAM) budget ---
+    def _init_l3_budget(self, l3_budget_mb: float | None) -> None:
+        """Budget from arg > ``VRM_L3_BUDGET_MB`` > half of physical RAM."""
+        if l3_budget_mb is None:
+            l3_budget_mb = float(os.environ.get("VRM_L3_BUDGET_MB", "0") or 0)
+        budget = int(l3_budget_mb * 1024 * 1024)
+        if budget <= 0:
+            try:
+                import psutil
+                budget = psutil.virtual_memory().total // 2
+            except Exception:
+                budget = 0  # unknown: never spill on budget
+        self._l3_budget = budget
+        self._l3_high = int(budget * float(os.environ.get("VRM_L3_HIGH_WM", "0.90")))
+        self._l3_low = int(budget * float(os.environ.get("VRM_L3_LOW_WM", "0.75")))
+        self._psi_path = "/proc/pressure/memory"
+        self._psi_threshold = float(os.environ.get("VRM_PSI_THRESHOLD", "0") or 0)
+        self._psi_poll_s = float(os.environ.get("VRM_PSI_POLL_S", "1.0"))
+        self._l3_stats = {"spills": 0, "spilled_bytes": 0, "high_wm_events": 0, "psi_events": 0}
+
+    def _block_bytes(self, block_id: str) -> int:
+        t = self._tensor_registry.get(block_id)
+        if t is not None and hasattr(t, "element_size"):
+            return t.numel() * t.element_size()
+        meta = self.registry.get(block_id) or {}
+        return int(meta.get("size_mb", 0) * 1024 * 1024)
+
+    def _read_psi(self) -> float | None:
+        """``some avg10`` of the memory PSI file, in percent (None if unavailable)."""
+        try:
+            with open(self._psi_path) as f:
+                for line in f:
+                    if line.startswith("some"):
+                        for field in line.split()[1:]:
+                            key, _, val = field.partition("=")
+                            if key == "avg10":
+                                return float(val)
+        except (OSError, ValueError):
+            return None
+        return None
+
+    def _l3_victims(self) -> list[tuple[str, float, Any]]:
+        """Coldest L3 blocks covering the excess over the low watermark.
+
+        Returns ``(block_id, size_mb, tensor)``; the caller holds ``self._lock``
+        so the registry entries cannot change while they are chosen.
+        """
+        excess = self._l3_bytes - self._l3_low
+        k = 8
+        while excess > 0:
+            ids = self._coldest(('L3',), k)
+            out, covered = [], 0
+            for bid in ids:
+                meta = self.registry.get(bid)
+                if meta is None:
+                    continue
+                out.append((bid, meta.get('size_mb', 0), self._tensor_registry.get(bid)))
+                covered += self._l3_accounted.get(bid, 0)
+                if covered >= excess:
+                    return out
+            if len(ids) < k:
+                return out
+            k *= 2
+        return []
+
+    def _spill_l3_excess(self) -> int:
+        """Spill the coldest L3 blocks until L3 is back under the low watermark.
+
+        Victims are chosen under ``self._lock``; the NVMe writes run with it
+        released. Stops as soon as the target is met, so exactly enough
+        bytes leave host RAM. Returns the number of bytes spilled.
+        """
+        spilled = 0
+        with self._spill_lock:
+            progress = True
+            while self._l3_budget and progress:
+                with self._lock:
+                    victims = self._l3_victims()
+                progress = False
+                for bid, size_mb, tensor in victims:
+                    if self._l3_bytes <= self._l3_low:
+                        break
+                    if self.get_tier(bid) != 'L3':
+                        continue                 # moved since it was chosen
+                    before = self._l3_bytes
+                    dummy_block = MemoryBlock(id=bid, size_mb=size_mb)
+                    if tensor is not None:
+                        self.spill_to_nvme(dummy_block, tensor)
+                    else:
+                        self.migrate(dummy_block, 'L5')
+                    if self.get_tier(bid) == 'L3':
+                        self.log.warning(f"L3 spill of {bid[:8]} failed, balancer backs off")
+                        progress = False
+                        break
+                    progress = True
+                    freed = before - self._l3_bytes
+                    spilled += freed
+                    self._l3_stats["spilled_bytes"] += freed
+                    self._l3_stats["spills"] += 1
+                    self.log.debug(f"❄️ Evicted Block {bid[:8]} to NVMe (L5)")
+        return spilled
+
     def _cpu_nvme_balancer_loop(self):
-        """Monitors system RAM and proactively evicts cold L3 (pinned RAM) blocks to NVMe (L5) to prevent OOM."""
-        import psutil
+        """Spill cold L3 (host RAM) blocks to NVMe (L5) when L3 crosses its high watermark.
+
+        Event-driven: ``_index`` sets ``_pressure_event`` the moment the L3
+        byte count goes over the high watermark. With ``VRM_PSI_THRESHOLD``
+        set, the loop also wakes every ``VRM_PSI_POLL_S`` to read Linux PSI
+        (``/proc/pressure/memory``) and spills down to the low watermark as
+        soon as host memory stalls exceed the threshold.
+        """
         while self._balancing:
+            timeout = self._psi_poll_s if self._psi_threshold > 0 else None
+            fired = self._pressure_event.wait(timeout)
+            self._pressure_event.clear()
+            if not self._balancing:
+                break
             try:
-                vm = psutil.virtual_memory()
-                # If RAM usage exceeds 85%, start aggressive NVMe spilling
-                if vm.percent > 85.0:
-                    self.log.warning(f"⚠️ [Balancer] Host RAM at {vm.percent}%. Triggering L3 (CPU) -> L5 (NVMe) eviction...")
-                    with self._lock:
-                        # Find coldest L3 (pinned CPU RAM) blocks
-                        l4_blocks = [bid for bid, data in self.registry.items() if data.get('tier') == 'L3']
-                        if not l4_blocks:
-                            pass
-                        # Sort by hot score (ascending) and last touch
-                        l4_blocks.sort(key=lambda bid: (self._hot_scores.get(bid, 0), self._last_touch.get(bid, 0)))
-                        
-                        target_evicts = max(1, len(l4_blocks) // 4) # Evict 25%
-                        for bid in l4_blocks[:target_evicts]:
-                            dummy_block = MemoryBlock(id=bid, size_mb=self.registry[bid].get('size_mb', 0))
-                            tensor = self._tensor_registry.get(bid)
-                            if tensor is not None:
-                                self.spill_to_nvme(dummy_block, tensor)
-                                self._tensor_registry[bid] = None # Remove from L4 referencing
-                                self.log.info(f"❄️ Evicted Block {bid} to NVMe (L5)")
+                if not fired:
+                    psi = self._read_psi()
+                    if psi is None or psi < self._psi_threshold:
+                        continue
+                    self._l3_stats["psi_events"] += 1
+                    self.log.warning(f"⚠️ [Balancer] Memory PSI some avg10={psi}%. Spilling L3 -> L5")
+                self._spill_l3_excess()
             except Exception as e:
                 self.log.error(f"CPU-NVMe Balancing loop error: {e}")
-            time.sleep(10.0)
+
+    def stop_balancer(self) -> None:
+        """Stop the L3 balancer thread."""
+        self._balancing = False
+        self._pressure_event.set()
 
     def _init_vtp(self):
         """Initialise le VRAMancer Transport Protocol (vtp_core.cpp) s'il est compilé."""
@@ -488,32 +624,57 @@ class HierarchicalMemoryManager:
         except ImportError:
             self.log.warning("C++ extension 'vtp_core' unavailable, using pure-Python fallback")
 
-    def schedule_prefetch(self, block_ids: list[str], target_tier: Tier = "L1"):
-        """Schedule un prefetch anticipé utilisant le fast path C++ si possible."""
-        for bid in block_ids:
-            if bid not in self._prefetch_queue:
-                self._prefetch_queue.append(bid)
-        
-        # Lancer le worker si dispo (simplifié)
-        import threading as _thr
-        _thr.Thread(target=self._process_prefetch, args=(target_tier,), daemon=True).start()
-
-    def _process_prefetch(self, target_tier: Tier):
-        """Worker thread pour le pré-chargement."""
-        while self._prefetch_queue:
-            bid = self._prefetch_queue.pop(0)
-            if bid in self.registry:
-                current_tier = self.registry[bid]["tier"]
-                if current_tier != target_tier:
-                    # Simulation: si on a VTP, VTP s'en occupe en zero-copy C++
-                    if self._vtp_backend:
-                        pass # self._vtp_backend.fast_p2p_transfer()
-                    else:
-                        # Fallback
-                        block = self.registry[bid]["block"]
-                        tensor = self._tensor_registry.get(bid)
-                        if tensor is not None:
-                            self.migrate(block, target_tier, tensor)
+    def schedule_prefetch(self, block_ids: list[str], target_tier: Tier = "L1",
+                          due_at: float | list[float] | None = None):
+        """Queue blocks for prefetch to ``target_tier`` on the bounded worker pool.
+
+        ``due_at`` is the predicted use time (``time.monotonic()`` seconds),
+        one value for all blocks or one per block; the earliest deadline is
+        fetched first. By default blocks are due ``_PREFETCH_LEAD_TIME_US``
+        from now, in list order. Duplicates collapse onto one queue entry.
+        """
+        pool = self._get_prefetcher()
+        now = time.monotonic()
+        for i, bid in enumerate(block_ids):
+            if isinstance(due_at, (list, tuple)):
+                due = due_at[i]
+            elif due_at is not None:
+                due = due_at
+            else:
+                due = now + _PREFETCH_LEAD_TIME_US / 1e6 + i * 1e-6
+            meta = self.registry.get(bid)
+            nbytes = int(meta.get("size_mb", 0) * 1024 * 1024) if meta else 0
+            pool.submit(bid, target_tier, due, nbytes)
+
+    def _get_prefetcher(self):
+        if self._prefetcher is None:
+            with self._lock:
+                if self._prefetcher is None:
+                    from experimental.prefetch_pool import PrefetchPool, parse_bandwidth
+                    self._prefetcher = PrefetchPool(
+                        self._prefetch_one,
+                        workers=int(os.environ.get("VRM_PREFETCH_WORKERS", "2")),
+                        bandwidth=parse_bandwidth(os.environ.get("VRM_PREFETCH_BW_MBPS", "")),
+                        source_tier=self.get_tier,
+                    )
+        return self._prefetcher
+
+    def _prefetch_one(self, block_id: str, target_tier: Tier) -> bool:
+        """Pool worker body: bring ``block_id`` to ``target_tier`` (NVMe via reload)."""
+        meta = self.registry.get(block_id)
+        if meta is None or meta["tier"] == target_tier:
+            return False
+        block = MemoryBlock(id=block_id, size_mb=meta.get("size_mb", 0))
+        if meta["tier"] == "L5":
+            tensor = self.load_from_nvme(block)  # -> L3
+            if tensor is None:
+                return False
+            if target_tier == "L3":
+                return True
+        else:
+            tensor = self._tensor_registry.get(block_id)
+        self.migrate(block, target_tier, tensor)
+        return True
 
     def register_block(self, block: MemoryBlock, tier: Tier, tensor: Any = None):
         with self._lock:
@@ -527,8 +688,107 @@ class HierarchicalMemoryManager:
             }
             if tensor is not None:
                 self._tensor_registry[block.id] = tensor
+        self._index(block.id, tier)
         self.log.debug(f"Register {block.id[:8]} @ {tier}")
 
+    def _set_tier(self, block_id: str, tier: Tier) -> None:
+        """Record a tier change and move the block to that tier's index."""
+        prev = self.registry[block_id].get("tier")
+        if self._prefetcher is not None and prev and prev != tier \
+                and not self._is_promotion(prev, tier):
+            self._prefetcher.on_evict(block_id)
+        self.registry[block_id]["tier"] = tier
+        self.registry[block_id]["ts"] = time.time()
+        self._index(block_id, tier)
+
+    # --- Coldness index (per tier) ---
+    def _decay_rate(self) -> float:
+        return math.log(2) / self._decay_half_life if self._decay_half_life > 0 else 0.0
+
+    def _index(self, block_id: str, tier: str) -> None:
+        """(Re)insert ``block_id`` in ``tier``'s heap with its current key. O(log n)."""
+        with self._index_lock:
+            old = self._index_tier.get(block_id)
+            if old is not None:
+                self._tier_live[old] -= 1
+            if old == "L3":
+                self._l3_bytes -= self._l3_accounted.pop(block_id, 0)
+            if tier == "L3":
+                nbytes = self._block_bytes(block_id)
+                self._l3_accounted[block_id] = nbytes
+                self._l3_bytes += nbytes
+                if self._l3_budget and self._l3_bytes > self._l3_high \
+                        and not self._pressure_event.is_set():
+                    self._l3_stats["high_wm_events"] += 1
+                    self._pressure_event.set()
+            self._index_tier[block_id] = tier
+            self._tier_live[tier] = self._tier_live.get(tier, 0) + 1
+            seq = next(self._seq)
+            self._index_seq[block_id] = seq
+            heap = self._tier_heap.setdefault(tier, [])
+            heapq.heappush(heap, (self._hot_key.get(block_id, -math.inf), seq, block_id))
+            if len(heap) > 2 * self._tier_live[tier] + 64:
+                self._compact(tier)
+
+    def _compact(self, tier: str) -> None:
+        """Drop superseded entries from ``tier``'s heap (caller holds _index_lock)."""
+        live = [e for e in self._tier_heap[tier] if self._index_seq.get(e[2]) == e[1]]
+        heapq.heapify(live)
+        self._tier_heap[tier] = live
+
+    def _rebuild_index(self) -> None:
+        """Re-derive keys and heaps from registry/scores (after load_state)."""
+        lam = self._decay_rate()
+        with self._index_lock:
+            self._tier_heap, self._tier_live = {}, {}
+            self._index_seq, self._index_tier, self._hot_key = {}, {}, {}
+            self._l3_bytes, self._l3_accounted = 0, {}
+            for bid, score in self._hot_scores.items():
+                if score > 0:
+                    t = self._last_touch.get(bid, self._t0)
+                    self._hot_key[bid] = math.log(score) + lam * (t - self._t0)
+        for bid, meta in list(self.registry.items()):
+            self._index(bid, meta["tier"])
+
+    def _coldest(self, tiers, k: int) -> list[str]:
+        """Return up to ``k`` coldest block ids across ``tiers``. O(k log n).
+
+        Non-destructive: the selected entries are pushed back, a subsequent
+        migrate/spill supersedes them.
+        """
+        out: list[str] = []
+        taken: list[tuple[str, tuple]] = []
+        with self._index_lock:
+            while len(out) < k:
+                best = None
+                for t in tiers:
+                    heap = self._tier_heap.get(t)
+                    while heap and self._index_seq.get(heap[0][2]) != heap[0][1]:
+                        heapq.heappop(heap)
+                    if heap and (best is None or heap[0] < self._tier_heap[best][0]):
+                        best = t
+                if best is None:
+                    break
+                entry = heapq.heappop(self._tier_heap[best])
+                taken.append((best, entry))
+                out.append(entry[2])
+            for t, entry in taken:
+                heapq.heappush(self._tier_heap[t], entry)
+        return out
+
+    def tier_count(self, tier: Tier) -> int:
+        """Number of registered blocks currently in ``tier``. O(1)."""
+        return self._tier_live.get(tier, 0)
+
+    def hotness(self, block_id: str, now: float | None = None) -> float:
+        """Decayed hotness score of ``block_id`` at ``now`` (default: current time)."""
+        score = self._hot_scores.get(block_id, 0.0)
+        if score <= 0 or self._decay_half_life <= 0:
+            return score
+        now = time.time() if now is None else now
+        dt = max(0.0, now - self._last_touch.get(block_id, now))
+        return score * 0.5 ** (dt / self._decay_half_life)
+
     def get_tier(self, block_id: str) -> Tier | None:
         with self._lock:
             info = self.registry.get(block_id)
@@ -549,8 +809,7 @@ class HierarchicalMemoryManager:
         prev = self.get_tier(block.id)
         if prev == target:
             return tensor
-        self.registry[block.id]["tier"] = target
-        self.registry[block.id]["ts"] = time.time()
+        self._set_tier(block.id, target)
 
         # Auto-lookup tensor from registry if not provided
         if tensor is None:
@@ -666,9 +925,13 @@ class HierarchicalMemoryManager:
     def _move_gpu_to_cpu(self, tensor: Any) -> Any:
         """Move tensor from GPU VRAM to CPU RAM."""
         try:
-            import torch
+            if getattr(tensor, 'is_cuda', False):
+                # Pooled pinned buffer for fast re-upload; returned to the
+                # arena when this host copy is dropped
+                from core.host_arena import get_host_arena
+                return get_host_arena().copy_to_host(tensor)
             if hasattr(tensor, 'cpu'):
-                return tensor.cpu().pin_memory()  # Pinned for fast re-upload
+                return tensor.cpu()
         except Exception as _gpu_cpu_err:
             self.log.debug("_move_gpu_to_cpu failed, returning tensor as-is: %s", _gpu_cpu_err)
         return tensor
@@ -711,11 +974,13 @@ class HierarchicalMemoryManager:
                 self.log.debug(f"Lease release failed: {e}")
 
     def _is_promotion(self, prev: Tier, target: Tier) -> bool:
-        order = ["L6","L5","L4","L3","L2","L1"]  # plus lent → plus rapide
+        order = ["L7","L6","L5","L4","L3","L2","L1"]  # plus lent → plus rapide
         return order.index(target) > order.index(prev)
 
     # --- Accès (pour promotion) ---
     def touch(self, block: MemoryBlock):
+        if self._prefetcher is not None:
+            self._prefetcher.on_access(block.id)
         if block.id in self.registry:
             meta = self.registry[block.id]
             meta["access"] += 1
@@ -732,6 +997,8 @@ class HierarchicalMemoryManager:
             score = prev_score * decay_factor + 1.0  # ajout d'un événement d'accès
             self._hot_scores[block.id] = score
             self._last_touch[block.id] = now
+            self._hot_key[block.id] = math.log(score) + self._decay_rate() * (now - self._t0)
+            self._index(block.id, meta["tier"])
             # Mettre à jour Gauge (lazy import pour éviter cycle)
             try:
                 from core.metrics import BLOCK_HOTNESS
@@ -760,12 +1027,46 @@ class HierarchicalMemoryManager:
             meta["access"] = 0
 
     # --- NVMe spill (L5) --- Direct binary I/O (GIL-bypassed via Rust if available)
+    def _get_spill_store(self):
+        """Lazily open the L5 segment store (``VRM_NVME_SPILL_STORE=0`` disables it)."""
+        if self._spill_store is None and not getattr(self, "_spill_store_failed", False) \
+                and os.environ.get("VRM_NVME_SPILL_STORE", "1") == "1":
+            try:
+                from experimental.spill_store import SegmentSpillStore
+                seg_mb = int(os.environ.get("VRM_NVME_SEGMENT_MB", "256"))
+                self._spill_store = SegmentSpillStore(
+                    self.nvme_dir / "segments", segment_bytes=seg_mb * 1024 * 1024,
+                )
+            except Exception as e:
+                self.log.warning(f"Segment spill store unavailable, per-file spill: {e}")
+                self._spill_store_failed = True
+        return getattr(self, "_spill_store", None)
+
     def spill_to_nvme(self, block: MemoryBlock, payload: Any):
         # Release any lending lease before spilling to NVMe
         self._release_block_lease(block.id)
         import torch
         if torch.is_tensor(payload):
-            path = self.nvme_dir / f"{block.id}.cxl"
+            prev_tier = self.registry[block.id].get("tier") or "L1"
+            store = self._get_spill_store()
+            if store is not None:
+                try:
+                    entry = store.put(block.id, payload)
+                    self.registry[block.id].setdefault("meta", {}).update({
+                        "storage_type": "segment",
+                        "shape": entry.shape,
+                        "dtype_str": entry.dtype,
+                        "device": "cpu",
+                    })
+                    self._set_tier(block.id, "L5")
+                    self._tensor_registry.pop(block.id, None)  # Data on disk — free memory
+                    self.log.debug(f"Spill {block.id[:8]} -> NVMe segment {entry.segment} ({entry.length/1e6:.1f}MB)")
+                    MEMORY_DEMOTIONS.labels(prev_tier, 'L5').inc()
+                    return
+                except Exception as e:
+                    self.log.warning(f"Segment spill failed, per-file fallback: {e}")
+
+            path = self.nvme_dir / f"{block.id}.bin"
             # Assure que le tenseur est contigu en memoire CPU
             cpu_tensor = payload.cpu().contiguous()
             num_bytes = cpu_tensor.numel() * cpu_tensor.element_size()
@@ -782,8 +1083,7 @@ class HierarchicalMemoryManager:
             try:
                 import vramancer_rust
                 vramancer_rust.cxl_direct_memory_dump(str(path), ptr, num_bytes)
-                self.registry[block.id]["tier"] = "L5"
-                self.registry[block.id]["ts"] = time.time()
+                self._set_tier(block.id, "L5")
                 self._tensor_registry.pop(block.id, None)  # Data on disk — free memory
                 self.log.debug(f"⚡ [Direct I/O] Spill {block.id[:8]} -> NVMe ({num_bytes/1e6:.1f}MB) GIL-bypassed")
                 MEMORY_DEMOTIONS.labels(self.get_tier(block.id) or 'L1', 'L5').inc()
@@ -793,8 +1093,7 @@ class HierarchicalMemoryManager:
                 
             try:
                 FastNVMeTransfer.save_tensor(path, payload)
-                self.registry[block.id]["tier"] = "L5"
-                self.registry[block.id]["ts"] = time.time()
+                self._set_tier(block.id, "L5")
                 self._tensor_registry.pop(block.id, None)  # Data on disk — free memory
                 self.log.debug(f"⚡ [FastNVMe] Spill {block.id[:8]} -> NVMe")
                 return
@@ -805,18 +1104,29 @@ class HierarchicalMemoryManager:
         path = self.nvme_dir / f"{block.id}.json"
         with path.open("w") as f:
             json.dump(payload, f, default=str)
-        self.registry[block.id]["tier"] = "L5"
-        self.registry[block.id]["ts"] = time.time()
+        self._set_tier(block.id, "L5")
         self._tensor_registry.pop(block.id, None)  # Data on disk — free memory
         self.log.debug(f"Spill bloc {block.id[:8]} vers NVMe (JSON)")
 
     def load_from_nvme(self, block: MemoryBlock) -> Any | None:
         meta = self.registry.get(block.id, {}).get("meta", {})
+        if meta.get("storage_type") == "segment":
+            store = getattr(self, "_spill_store", None)
+            tensor = store.get(block.id) if store is not None else None
+            if tensor is None:
+                return None
+            store.delete(block.id)  # Back in RAM — the extent becomes dead space
+            meta["storage_type"] = None
+            self._set_tier(block.id, "L3")
+            self._tensor_registry[block.id] = tensor
+            self.log.debug(f"Reload {block.id[:8]} from NVMe segment")
+            MEMORY_PROMOTIONS.labels('L5', 'L3').inc()
+            return tensor
         if meta.get("storage_type") in ("raw_binary", "cxl_raw"):
             import torch
             path = self.nvme_dir / f"{block.id}.bin"
             if not path.exists():
-                # Backward compat: try old .cxl extension
+                # Backward compat: spills before the .bin rename used .cxl
                 path = self.nvme_dir / f"{block.id}.cxl"
                 if not path.exists():
                     return None
@@ -837,8 +1147,7 @@ class HierarchicalMemoryManager:
             try:
                 import vramancer_rust
                 vramancer_rust.cxl_direct_memory_load(str(path), ptr, num_bytes)
-                self.registry[block.id]["tier"] = "L3"
-                self.registry[block.id]["ts"] = time.time()
+                self._set_tier(block.id, "L3")
                 self._tensor_registry[block.id] = tensor  # Track loaded tensor
                 self.log.debug(f"⚡ [Direct I/O] Reload {block.id[:8]} from NVMe ({num_bytes/1e6:.1f}MB) GIL-bypassed")
                 MEMORY_PROMOTIONS.labels('L5', 'L3').inc()
@@ -851,8 +1160,7 @@ class HierarchicalMemoryManager:
                 tracer = get_tracer()
                 with tracer.start_as_current_span("memory.nvme_fast_load"):
                     tensor = FastNVMeTransfer.load_tensor(path, meta["shape"], meta["dtype_str"])
-                    self.registry[block.id]["tier"] = "L3"
-                    self.registry[block.id]["ts"] = time.time()
+                    self._set_tier(block.id, "L3")
                     self._tensor_registry[block.id] = tensor  # Track loaded tensor
                     self.log.debug(f"⚡ [FastNVMe] Reload {block.id[:8]} from NVMe")
                     return tensor
@@ -868,8 +1176,7 @@ class HierarchicalMemoryManager:
             return None
         with path.open("r") as f:
             data = json.load(f)
-        self.registry[block.id]["tier"] = "L3"
-        self.registry[block.id]["ts"] = time.time()
+        self._set_tier(block.id, "L3")
         self._tensor_registry[block.id] = data  # Track loaded data
         self.log.debug(f"Reload bloc {block.id[:8]} depuis NVMe")
         MEMORY_PROMOTIONS.labels('L5', 'L3').inc()
@@ -888,14 +1195,14 @@ class HierarchicalMemoryManager:
 
     # --- Eviction planner (lot B) ---
     def update_all_scores(self, current_time: float):
-        """Update all hotness scores using exponential decay."""
-        decay_constant = 0.69314718056 / self._decay_half_life if self._decay_half_life > 0 else 0
-        import math
-        for bid, meta in self.registry.items():
-            count = meta["access"]
-            last_t = self._last_touch.get(bid, current_time)
-            dt = max(0.0, current_time - last_t)
-            self._hot_scores[bid] = count * math.exp(-decay_constant * dt)
+        """Materialise every decayed hotness score at ``current_time``. O(n).
+
+        Not needed for eviction (the per-tier index orders blocks with the
+        lazily decayed key); kept for callers that read ``_hot_scores``.
+        """
+        for bid in list(self._hot_scores):
+            self._hot_scores[bid] = self.hotness(bid, current_time)
+            self._last_touch[bid] = current_time
 
     def eviction_cycle(self, target_free_pct: float = 10.0, vram_pressure: float | None = None):
         """Applique une politique d'éviction basée sur le hotness.
@@ -906,25 +1213,18 @@ class HierarchicalMemoryManager:
         """
         tracer = get_tracer()
         with tracer.start_as_current_span("memory.eviction_cycle"):
-            # Update all scores to current time before sorting
-            self.update_all_scores(time.time())
-            
-            l12 = [bid for bid, meta in self.registry.items() if meta['tier'] in {'L1','L2'}]
-            if not l12:
+            n = self.tier_count('L1') + self.tier_count('L2')
+            if not n:
                 return []
-            scores = []
-            for bid in l12:
-                scores.append((self._hot_scores.get(bid, 0.0), bid))
-            scores.sort(key=lambda x: x[0])  # froid → chaud
             # Ajuste le pourcentage si pression VRAM forte
             ratio = 0.2
             if vram_pressure and vram_pressure > 0.9:  # >90% utilisé
                 ratio = 0.4
             elif vram_pressure and vram_pressure > 0.8:
                 ratio = 0.3
-            k = max(1, int(len(scores)*ratio))
+            k = max(1, int(n*ratio))
             evicted = []
-            for _, bid in scores[:k]:
+            for bid in self._coldest(('L1', 'L2'), k):  # froid → chaud
                 tier = self.registry[bid]['tier']
                 dummy_block = MemoryBlock(id=bid, size_mb=self.registry[bid]['size_mb'])
                 if tier == 'L1':
@@ -956,6 +1256,10 @@ class HierarchicalMemoryManager:
             except Exception as _lending_stats_err:
                 self.log.debug("lending pool_capacity() failed: %s", _lending_stats_err)
         result["active_leases"] = len(self._lease_registry)
+        if self._prefetcher is not None:
+            result["prefetch"] = self._prefetcher.stats()
+        result["l3"] = {"bytes": self._l3_bytes, "budget": self._l3_budget,
+                        "high_wm": self._l3_high, "low_wm": self._l3_low, **self._l3_stats}
         return result
 
     def set_lending_pool(self, pool) -> None:
@@ -998,6 +1302,7 @@ class HierarchicalMemoryManager:
             self._hot_scores = data.get('hot', {})
             self._last_touch = data.get('last_touch', {})
             self._decay_half_life = data.get('decay_half_life', self._decay_half_life)
+            self._rebuild_index()
             return True
         except Exception as e:  # pragma: no cover
             self.log.warning(f"load_state fail: {e}")
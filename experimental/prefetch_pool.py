@@ -0,0 +1,261 @@
+"""Bounded prefetch worker pool for HierarchicalMemoryManager.
+
+``schedule_prefetch`` used to start one daemon thread per call, all popping
+from a shared list without a lock. This pool replaces that with:
+
+    PrefetchPool
+      ├── queue     — min-heap ordered by predicted use time (``due_at``),
+      │               deduplicated per block (re-submitting keeps the
+      │               earliest deadline); superseded entries are skipped
+      ├── workers   — fixed number of threads, started on first submit
+      ├── buckets   — per-source-tier token buckets (bytes/s) so prefetch
+      │               reads from e.g. NVMe cannot saturate the link that
+      │               demand fetches also use
+      └── outcomes  — hit (accessed after the prefetch landed), late
+                      (accessed while still queued or in flight), wasted
+                      (landed, then evicted before any access), cancelled,
+                      expired (landed blocks tracked beyond ``max_landed``,
+                      oldest first, are forgotten)
+
+``mover(block_id, target_tier)`` does the actual move and returns False
+when there was nothing to do (already there, unknown block).
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Mapping, Optional
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("prefetch")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.prefetch_pool")
+
+
+class TokenBucket:
+    """Byte-rate limiter with reservation semantics.
+
+    ``reserve(n)`` always succeeds and returns how long the caller must
+    wait before using the bytes; the balance may go negative, which makes
+    later callers wait their turn.
+    """
+
+    def __init__(self, rate_bps: float, burst_bytes: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate_bps)
+        self.burst = float(burst_bytes if burst_bytes is not None else rate_bps * 0.05)
+        self._clock = clock
+        self._tokens = self.burst
+        self._t = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes: float) -> float:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate)
+            self._t = now
+            self._tokens -= nbytes
+            return max(0.0, -self._tokens / self.rate)
+
+
+def parse_bandwidth(spec: str) -> Dict[str, float]:
+    """``"L5:2000,L3:8000"`` (MB/s per source tier) -> ``{tier: bytes/s}``.
+
+    A bare number applies to every tier (key ``"*"``).
+    """
+    out: Dict[str, float] = {}
+    for part in (p.strip() for p in spec.split(",")):
+        if not part:
+            continue
+        tier, _, mbps = part.rpartition(":")
+        try:
+            out[tier or "*"] = float(mbps) * 1e6
+        except ValueError:
+            log.warning(f"Ignoring bad prefetch bandwidth entry {part!r}")
+    return out
+
+
+class PrefetchPool:
+    """Fixed-size worker pool draining a deduplicating deadline queue."""
+
+    def __init__(self, mover: Callable[[str, str], bool], workers: int = 2,
+                 bandwidth: Optional[Mapping[str, float]] = None,
+                 source_tier: Optional[Callable[[str], Optional[str]]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 max_landed: int = 4096):
+        self._mover = mover
+        self._n_workers = max(1, int(workers))
+        self._source_tier = source_tier or (lambda bid: None)
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {t: TokenBucket(bps, clock=clock) for t, bps in (bandwidth or {}).items()}
+        self._cv = threading.Condition()
+        self._heap: list = []
+        self._pending: Dict[str, tuple] = {}     # block_id -> (due_at, seq, target, nbytes)
+        self._inflight: Dict[str, str] = {}      # block_id -> target
+        # block_id -> completion time, not yet accessed (oldest first)
+        self._landed: "OrderedDict[str, float]" = OrderedDict()
+        self._max_landed = max(1, int(max_landed))
+        self._seq = itertools.count()
+        self._threads: list = []
+        self._closed = False
+        self._stats = {"submitted": 0, "deduped": 0, "issued": 0, "completed": 0,
+                       "skipped": 0, "failed": 0, "hits": 0, "late": 0, "wasted": 0,
+                       "cancelled": 0, "expired": 0, "throttled_s": 0.0}
+
+    # --- producer side ---
+    def submit(self, block_id: str, target: str, due_at: Optional[float] = None,
+               nbytes: int = 0) -> bool:
+        """Queue ``block_id`` for ``target`` by ``due_at``.
+
+        A block already queued keeps a single entry with the earliest
+        deadline. Returns False when the request was absorbed (already
+        queued earlier, in flight, or landed and not yet accessed).
+        """
+        due_at = self._clock() if due_at is None else due_at
+        with self._cv:
+            if self._closed:
+                return False
+            self._stats["submitted"] += 1
+            if block_id in self._inflight or block_id in self._landed:
+                self._stats["deduped"] += 1
+                return False
+            cur = self._pending.get(block_id)
+            if cur is not None and cur[0] <= due_at and cur[2] == target:
+                self._stats["deduped"] += 1
+                return False
+            if cur is not None:
+                self._stats["deduped"] += 1
+            entry = (due_at, next(self._seq), target, int(nbytes))
+            self._pending[block_id] = entry
+            heapq.heappush(self._heap, (entry[0], entry[1], block_id))
+            self._ensure_workers()
+            self._cv.notify()
+            return True
+
+    def cancel(self, block_id: str) -> bool:
+        """Drop a queued prefetch (in-flight copies run to completion)."""
+        with self._cv:
+            if self._pending.pop(block_id, None) is None:
+                return False
+            self._stats["cancelled"] += 1
+            self._cv.notify_all()
+            return True
+
+    # --- outcome tracking (called by the memory manager) ---
+    def on_access(self, block_id: str) -> None:
+        with self._cv:
+            if self._landed.pop(block_id, None) is not None:
+                self._stats["hits"] += 1
+            elif block_id in self._pending or block_id in self._inflight:
+                # Demand fetch got there first; a queued copy is now pointless
+                self._stats["late"] += 1
+                self._pending.pop(block_id, None)
+                self._cv.notify_all()
+
+    def on_evict(self, block_id: str) -> None:
+        with self._cv:
+            if self._landed.pop(block_id, None) is not None:
+                self._stats["wasted"] += 1
+            if self._pending.pop(block_id, None) is not None:
+                self._stats["cancelled"] += 1
+                self._cv.notify_all()
+
+    # --- workers ---
+    def _ensure_workers(self) -> None:
+        while len(self._threads) < self._n_workers:
+            t = threading.Thread(target=self._worker, daemon=True,
+                                 name=f"HMM_Prefetch_{len(self._threads)}")
+            self._threads.append(t)
+            t.start()
+
+    def _next(self):
+        """Pop the earliest valid entry (caller holds the condition)."""
+        while self._heap:
+            due_at, seq, bid = heapq.heappop(self._heap)
+            entry = self._pending.get(bid)
+            if entry is not None and entry[1] == seq:
+                del self._pending[bid]
+                self._inflight[bid] = entry[2]
+                return bid, entry
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cv:
+                job = self._next()
+                while job is None and not self._closed:
+                    self._cv.wait()
+                    job = self._next()
+                if job is None:
+                    return
+            self._run(*job)
+
+    def _run(self, bid: str, entry: tuple) -> None:
+        _, _, target, nbytes = entry
+        src = self._source_tier(bid)
+        bucket = self._buckets.get(src) or self._buckets.get("*")
+        if bucket is not None and nbytes:
+            wait = bucket.reserve(nbytes)
+            if wait > 0:
+                self._sleep(wait)
+                with self._cv:
+                    self._stats["throttled_s"] += wait
+        with self._cv:
+            self._stats["issued"] += 1
+        try:
+            moved = self._mover(bid, target)
+            outcome = "completed" if moved is not False else "skipped"
+        except Exception as e:
+            log.debug(f"Prefetch of {bid[:8]} -> {target} failed: {e}")
+            outcome = "failed"
+        with self._cv:
+            self._inflight.pop(bid, None)
+            self._stats[outcome] += 1
+            if outcome == "completed":
+                self._landed[bid] = self._clock()
+                self._landed.move_to_end(bid)
+                while len(self._landed) > self._max_landed:
+                    self._landed.popitem(last=False)
+                    self._stats["expired"] += 1
+            self._cv.notify_all()
+
+    # --- lifecycle / reporting ---
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued or in flight."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            while self._pending or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cv.wait(remaining)
+        return True
+
+    def close(self) -> None:
+        with self._cv:
+            self._closed = True
+            self._stats["cancelled"] += len(self._pending)
+            self._pending.clear()
+            self._cv.notify_all()
+        for t in self._threads:
+            t.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            s = dict(self._stats)
+            s["queued"] = len(self._pending)
+            s["inflight"] = len(self._inflight)
+            s["landed"] = len(self._landed)
+            s["workers"] = len(self._threads)
+        s["throttled_s"] = round(s["throttled_s"], 6)
+        return s
+
+
+__all__ = ["PrefetchPool", "TokenBucket", "parse_bandwidth"]
@@ -0,0 +1,519 @@
+"""Log-structured NVMe spill store for HierarchicalMemoryManager (L5).
+
+``HierarchicalMemoryManager.spill_to_nvme`` used to write one file per
+block. With thousands of evicted KV pages, open/fsync/unlink and inode
+churn dominate the actual I/O. This store appends blocks to a few large
+preallocated segment files instead:
+
+    SegmentSpillStore
+      ├── directory — root/spill-<pid>-*/, private to the instance, flock'ed
+      ├── segments  — seg_000000.dat, ... (preallocated, 4 KB-aligned appends)
+      ├── index     — block_id -> SpillEntry(segment, offset, length, dtype, shape)
+      ├── readers   — one mmap per segment, tensors via torch.frombuffer
+      └── compactor — background thread rewriting live blocks out of
+                      segments whose dead-byte ratio crosses a threshold
+
+Overwrites and deletes only mark bytes dead; space comes back when a
+sealed segment is compacted (or immediately when it holds no live block).
+The index lives in memory: the store is a spill cache for the current
+process. Several stores (processes, or managers in one process) can share
+``root``: each writes into its own subdirectory and holds an exclusive
+``flock`` on its ``.lock`` file while open. On open, a store only removes
+sibling directories whose lock it can take, i.e. those left behind by a
+store that is gone. Without ``fcntl`` (Windows) nothing but the store's
+own files is ever removed.
+
+Batching: ``put_many`` coalesces a batch of appends into a single
+``os.pwritev`` syscall per segment, and ``get_many`` issues
+``posix_fadvise(WILLNEED)`` read-ahead for the whole batch before
+mapping. (No io_uring binding ships with the tree — see
+``FastNVMeTransfer._load_io_uring`` — so batching stays syscall-based.)
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from core.logger import LoggerAdapter
+    log = LoggerAdapter("spill")
+except Exception:
+    import logging
+    log = logging.getLogger("vramancer.spill_store")
+
+try:
+    import torch
+    _TORCH = True
+except ImportError:
+    torch = None  # type: ignore
+    _TORCH = False
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+# Appends start on a page boundary (O_DIRECT/readahead friendly)
+_ALIGN = 4096
+_INSTANCE_PREFIX = "spill-"
+_LOCK_NAME = ".lock"
+_IOV_MAX = 1024
+# Linux private mappings of a preallocated file see later pwrite() appends,
+# so a segment is mapped once; elsewhere it is remapped after each write.
+_REMAP_AFTER_WRITE = not sys.platform.startswith("linux")
+
+
+def _align_up(n: int, align: int = _ALIGN) -> int:
+    return (n + align - 1) // align * align
+
+
+def _dtype_from_str(dtype_str: str):
+    """``"torch.float16"`` -> ``torch.float16``."""
+    return getattr(torch, dtype_str.rsplit(".", 1)[-1])
+
+
+@dataclass
+class SpillEntry:
+    """Location of one spilled block inside a segment."""
+
+    segment: int
+    offset: int
+    length: int
+    dtype: str
+    shape: Tuple[int, ...]
+
+
+class _Segment:
+    """One preallocated segment file plus its lazily opened mmap."""
+
+    def __init__(self, seg_id: int, path: Path, capacity: int):
+        self.seg_id = seg_id
+        self.path = path
+        self.capacity = capacity
+        self.write_pos = 0
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.sealed = False
+        self._mm: Optional[mmap.mmap] = None
+        self.fd = os.open(str(path), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.posix_fallocate(self.fd, 0, capacity)
+        except (AttributeError, OSError):
+            os.ftruncate(self.fd, capacity)
+
+    @property
+    def free_bytes(self) -> int:
+        return self.capacity - self.write_pos
+
+    @property
+    def dead_ratio(self) -> float:
+        used = self.live_bytes + self.dead_bytes
+        return self.dead_bytes / used if used else 0.0
+
+    def mm(self) -> mmap.mmap:
+        # ACCESS_COPY: private writable mapping, so torch.frombuffer does not
+        # warn about read-only buffers and nothing is ever written back.
+        if self._mm is None:
+            self._mm = mmap.mmap(self.fd, self.capacity, access=mmap.ACCESS_COPY)
+        return self._mm
+
+    def drop_mmap(self) -> None:
+        """Forget the mapping (remapped on next read to see new appends)."""
+        if self._mm is None:
+            return
+        try:
+            self._mm.close()
+        except BufferError:
+            # Zero-copy tensors still reference it; the GC unmaps it later
+            pass
+        self._mm = None
+
+    def close(self, unlink: bool = False) -> None:
+        self.drop_mmap()
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        if unlink:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _reclaim_orphans(base: Path) -> None:
+    """Delete instance directories under *base* whose store is gone."""
+    if fcntl is None:
+        return
+    for d in base.glob(f"{_INSTANCE_PREFIX}*"):
+        try:
+            # No lock file yet: a store is still setting the directory up
+            fd = os.open(d / _LOCK_NAME, os.O_RDWR)
+        except OSError:
+            continue
+        try:
+            if _try_lock(fd):
+                shutil.rmtree(d, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
+class SegmentSpillStore:
+    """Append-only segment files + in-memory index for spilled tensors.
+
+    Args:
+        root: Directory shared by spill stores (created if missing). This
+            store's segments go to a private ``spill-<pid>-*`` subdirectory
+            of it, exposed as ``self.root``.
+        segment_bytes: Preallocated size of a regular segment. Blocks larger
+            than this get a dedicated segment sized to fit.
+        compact_threshold: Dead-byte ratio at which a sealed segment is
+            compacted.
+        background: Run compaction in a daemon thread. When False, call
+            ``compact()`` explicitly.
+        fsync: fsync the segment after every write (off by default — the
+            store is a cache, not durable storage).
+    """
+
+    def __init__(
+        self,
+        root: str | Path,
+        segment_bytes: int = 256 * 1024 * 1024,
+        compact_threshold: float = 0.5,
+        background: bool = True,
+        fsync: bool = False,
+    ):
+        if not _TORCH:
+            raise RuntimeError("SegmentSpillStore requires torch")
+        self.base = Path(root)
+        self.base.mkdir(parents=True, exist_ok=True)
+        _reclaim_orphans(self.base)
+        self.root = Path(tempfile.mkdtemp(prefix=f"{_INSTANCE_PREFIX}{os.getpid()}-",
+                                          dir=self.base))
+        self._lock_fd = os.open(self.root / _LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None and not _try_lock(self._lock_fd):
+            raise RuntimeError(f"Could not lock spill directory {self.root}")
+        self.segment_bytes = _align_up(max(_ALIGN, int(segment_bytes)))
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        self._index: Dict[str, SpillEntry] = {}
+        self._segments: Dict[int, _Segment] = {}
+        self._active: Optional[_Segment] = None
+        self._next_seg = 0
+
+        self._puts = 0
+        self._gets = 0
+        self._bytes_written = 0
+        self._bytes_read = 0
+        self._compactions = 0
+        self._bytes_compacted = 0
+
+        self._closed = False
+        self._compact_event = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        if background:
+            self._compactor = threading.Thread(
+                target=self._compact_loop, daemon=True, name="SpillCompactor",
+            )
+            self._compactor.start()
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+
+    def _new_segment(self, capacity: int) -> _Segment:
+        seg_id = self._next_seg
+        self._next_seg += 1
+        seg = _Segment(seg_id, self.root / f"seg_{seg_id:06d}.dat", capacity)
+        self._segments[seg_id] = seg
+        return seg
+
+    def _reserve(self, length: int) -> Tuple[_Segment, int]:
+        """Reserve ``length`` bytes; returns (segment, offset)."""
+        span = _align_up(max(length, 1))
+        if span > self.segment_bytes:
+            # Dedicated segment, sealed straight away
+            seg = self._new_segment(span)
+            seg.sealed = True
+        else:
+            seg = self._active
+            if seg is None or seg.free_bytes < span:
+                prev = seg
+                seg = self._active = self._new_segment(self.segment_bytes)
+                if prev is not None:
+                    prev.sealed = True
+                    self._maybe_release(prev)
+        offset = seg.write_pos
+        seg.write_pos += span
+        seg.live_bytes += length
+        return seg, offset
+
+    def _maybe_release(self, seg: _Segment) -> None:
+        """Unlink a sealed segment that no longer holds live bytes."""
+        if seg.sealed and seg.live_bytes == 0 and seg is not self._active:
+            self._segments.pop(seg.seg_id, None)
+            seg.close(unlink=True)
+        elif seg.sealed and seg.dead_ratio >= self.compact_threshold:
+            self._compact_event.set()
+
+    def _mark_dead(self, entry: SpillEntry) -> None:
+        seg = self._segments.get(entry.segment)
+        if seg is None:
+            return
+        seg.live_bytes -= entry.length
+        seg.dead_bytes += entry.length
+        self._maybe_release(seg)
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _as_bytes(tensor: Any):
+        t = tensor.detach().cpu().contiguous()
+        raw = t.reshape(-1).view(torch.uint8).numpy()
+        return t, raw
+
+    def put(self, block_id: str, tensor: Any) -> SpillEntry:
+        """Spill *tensor* under *block_id* (replacing any previous copy)."""
+        return self.put_many([(block_id, tensor)])[0]
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> List[SpillEntry]:
+        """Spill several tensors; contiguous appends share one pwritev."""
+        entries: List[SpillEntry] = []
+        with self._lock:
+            # (segment, start offset, [buffers]) runs of back-to-back appends
+            runs: List[Tuple[_Segment, int, List[Any]]] = []
+            for block_id, tensor in items:
+                t, raw = self._as_bytes(tensor)
+                length = raw.nbytes
+                seg, offset = self._reserve(length)
+                entry = SpillEntry(seg.seg_id, offset, length,
+                                   str(t.dtype), tuple(t.shape))
+                old = self._index.get(block_id)
+                self._index[block_id] = entry
+                if old is not None:
+                    self._mark_dead(old)
+                entries.append(entry)
+
+                pad = _align_up(max(length, 1)) - length
+                bufs = [raw] + ([bytes(pad)] if pad else [])
+                if runs and runs[-1][0] is seg and \
+                        runs[-1][1] + sum(memoryview(b).nbytes for b in runs[-1][2]) == offset:
+                    runs[-1][2].extend(bufs)
+                else:
+                    runs.append((seg, offset, bufs))
+
+            for seg, offset, bufs in runs:
+                self._write(seg, offset, bufs)
+            self._puts += len(entries)
+        return entries
+
+    def _write(self, seg: _Segment, offset: int, bufs: List[Any]) -> None:
+        pwritev = getattr(os, "pwritev", None)
+        for i in range(0, len(bufs), _IOV_MAX):
+            chunk = bufs[i:i + _IOV_MAX]
+            total = sum(memoryview(b).nbytes for b in chunk)
+            if pwritev is not None:
+                written = pwritev(seg.fd, chunk, offset)
+            else:
+                written = 0
+                for b in chunk:
+                    written += os.pwrite(seg.fd, b, offset + written)
+            if written != total:
+                raise OSError(f"short write to {seg.path}: {written}/{total}")
+            offset += total
+            self._bytes_written += total
+        if self.fsync:
+            os.fsync(seg.fd)
+        if _REMAP_AFTER_WRITE:
+            seg.drop_mmap()
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def get(self, block_id: str, copy: bool = True) -> Any:
+        """Return the tensor spilled under *block_id*, or None.
+
+        ``copy=False`` returns a zero-copy view on the segment mapping; it
+        stays valid until the block is deleted, overwritten or compacted.
+        """
+        with self._lock:
+            entry = self._index.get(block_id)
+            if entry is None:
+                return None
+            seg = self._segments[entry.segment]
+            dtype = _dtype_from_str(entry.dtype)
+            numel = 1
+            for s in entry.shape:
+                numel *= s
+            self._gets += 1
+            self._bytes_read += entry.length
+            if numel == 0:
+                return torch.empty(entry.shape, dtype=dtype)
+            view = torch.frombuffer(seg.mm(), dtype=dtype, count=numel,
+                                    offset=entry.offset).reshape(entry.shape)
+            return view.clone() if copy else view
+
+    def get_many(self, block_ids: Sequence[str], copy: bool = True) -> List[Any]:
+        """Batched ``get`` with read-ahead hints for every requested extent."""
+        fadvise = getattr(os, "posix_fadvise", None)
+        if fadvise is not None:
+            with self._lock:
+                for bid in block_ids:
+                    entry = self._index.get(bid)
+                    if entry is None:
+                        continue
+                    try:
+                        fadvise(self._segments[entry.segment].fd, entry.offset,
+                                entry.length, os.POSIX_FADV_WILLNEED)
+                    except OSError:
+                        break
+        return [self.get(bid, copy=copy) for bid in block_ids]
+
+    def __contains__(self, block_id: str) -> bool:
+        return block_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def entry(self, block_id: str) -> Optional[SpillEntry]:
+        return self._index.get(block_id)
+
+    # ------------------------------------------------------------------
+    # Delete / compaction
+    # ------------------------------------------------------------------
+
+    def delete(self, block_id: str) -> bool:
+        """Drop *block_id*; its bytes become dead space."""
+        with self._lock:
+            entry = self._index.pop(block_id, None)
+            if entry is None:
+                return False
+            self._mark_dead(entry)
+            return True
+
+    def compact(self, force: bool = False) -> int:
+        """Rewrite live blocks out of sealed segments past the threshold.
+
+        Returns the number of segments reclaimed. ``force`` compacts every
+        sealed segment holding dead bytes.
+        """
+        reclaimed = 0
+        with self._lock:
+            victims = [
+                s for s in self._segments.values()
+                if s.sealed and s is not self._active and s.dead_bytes > 0
+                and (force or s.dead_ratio >= self.compact_threshold)
+            ]
+            for seg in victims:
+                live = [(bid, e) for bid, e in self._index.items()
+                        if e.segment == seg.seg_id]
+                for bid, e in live:
+                    tensor = self.get(bid, copy=True)
+                    self._gets -= 1
+                    self._bytes_read -= e.length
+                    self.put(bid, tensor)
+                    self._puts -= 1
+                    self._bytes_compacted += e.length
+                # put() marked every old extent dead -> segment released
+                if seg.seg_id in self._segments:
+                    self._segments.pop(seg.seg_id)
+                    seg.close(unlink=True)
+                reclaimed += 1
+            self._compactions += reclaimed
+        if reclaimed:
+            log.debug("Spill store compacted %d segment(s)", reclaimed)
+        return reclaimed
+
+    def _compact_loop(self) -> None:
+        while not self._closed:
+            self._compact_event.wait(1.0)
+            self._compact_event.clear()
+            if self._closed:
+                break
+            try:
+                self.compact()
+            except Exception:
+                log.debug("Background spill compaction failed", exc_info=True)
+
+    # ------------------------------------------------------------------
+    # Housekeeping
+    # ------------------------------------------------------------------
+
+    def sync(self) -> None:
+        """fsync every segment."""
+        with self._lock:
+            for seg in self._segments.values():
+                os.fsync(seg.fd)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            segs = list(self._segments.values())
+            return {
+                "blocks": len(self._index),
+                "segments": len(segs),
+                "capacity_bytes": sum(s.capacity for s in segs),
+                "live_bytes": sum(s.live_bytes for s in segs),
+                "dead_bytes": sum(s.dead_bytes for s in segs),
+                "puts": self._puts,
+                "gets": self._gets,
+                "bytes_written": self._bytes_written,
+                "bytes_read": self._bytes_read,
+                "compactions": self._compactions,
+                "bytes_compacted": self._bytes_compacted,
+            }
+
+    def close(self, remove: bool = True) -> None:
+        """Stop the compactor and close (by default delete) all segments.
+
+        ``remove=False`` keeps the directory, but releases its lock, so the
+        next store opened on the same root reclaims it.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._compact_event.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=2.0)
+        with self._lock:
+            for seg in self._segments.values():
+                seg.close(unlink=remove)
+            self._segments.clear()
+            self._index.clear()
+            self._active = None
+            if remove:
+                try:
+                    (self.root / _LOCK_NAME).unlink()
+                    self.root.rmdir()
+                except OSError:
+                    log.debug("Could not remove spill directory %s", self.root)
+            os.close(self._lock_fd)
+
+    def __del__(self):  # pragma: no cover - best effort
+        try:
+            if not self._closed:
+                self.close()
+        except Exception:
+            pass
+
+
+__all__ = ["SegmentSpillStore", "SpillEntry"]
@@ -36,6 +36,7 @@ No other LLM inference framework implements this:
 
 from __future__ import annotations
 
+import bisect
 import os
 import time
 import threading
@@ -56,6 +57,7 @@ try:
         GPU_MEMORY_USED,
         MEMORY_PROMOTIONS,
         MEMORY_EVICTIONS,
+        LENDING_FRAGMENTATION,
     )
     _METRICS = True
 except Exception:
@@ -98,7 +100,7 @@ class VRAMLease:
     owner_gpu: int = 0            # GPU that owns the physical memory
     borrower_gpu: int = 0         # GPU that is using the memory
     size_bytes: int = 0           # Allocated region size
-    offset: int = 0               # Offset within the lending buffer
+    offset: int = 0               # Offset within the lending buffer (-1 = outside it)
     state: LeaseState = LeaseState.ACTIVE
     created_at: float = field(default_factory=time.time)
     expires_at: float = 0.0       # 0 = no expiry (until reclaimed)
@@ -207,6 +209,166 @@ class LendingPolicy:
     # Lending buffer pre-allocation size (ratio of free VRAM at init)
     buffer_prealloc_ratio: float = 0.50
 
+    # Lease extents in the lending buffer are rounded up to this many bytes
+    buffer_alignment: int = 256
+
+    # How long a lender choice is reused for the same borrower before the
+    # full scoring pass runs again (0 = score on every borrow)
+    lender_cache_ttl_s: float = 2.0
+
+    # Compact the lending arena when a borrow does not fit but enough
+    # total free bytes exist (relocates live leases, see LendingArena)
+    compact_on_fragmentation: bool = False
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# Lending buffer allocator
+# ═══════════════════════════════════════════════════════════════════════════
+
+class LendingArena:
+    """Best-fit free-list allocator over a GPU's lending buffer.
+
+    Replaces the former bump allocator (``max(offset + size)`` over active
+    leases), which never reused holes left by released leases: under KV
+    overflow churn the buffer looked exhausted long before it was.
+
+    Free extents are kept sorted by offset so that ``free()`` coalesces
+    with both neighbours in O(log n) lookup + O(1) merge. ``alloc()`` picks
+    the smallest hole that fits (best-fit), which keeps large holes intact
+    for large leases.
+
+    Not thread-safe on its own — ``VRAMLendingPool`` calls it under its lock.
+    """
+
+    def __init__(self, capacity: int, alignment: int = 256):
+        self.capacity = max(0, int(capacity))
+        self.alignment = max(1, int(alignment))
+        # Parallel sorted lists: free extent offsets and their sizes
+        self._free_offsets: List[int] = [0] if self.capacity else []
+        self._free_sizes: List[int] = [self.capacity] if self.capacity else []
+        # offset -> aligned size of live allocations
+        self._allocated: Dict[int, int] = {}
+        self._allocated_bytes = 0
+        self._high_water = 0
+        self._failed_allocs = 0
+        self._compactions = 0
+
+    def _align(self, size_bytes: int) -> int:
+        a = self.alignment
+        return ((int(size_bytes) + a - 1) // a) * a
+
+    def alloc(self, size_bytes: int) -> Optional[int]:
+        """Reserve ``size_bytes`` and return its offset, or None if no hole fits."""
+        size = self._align(size_bytes)
+        if size <= 0:
+            size = self.alignment
+        best = -1
+        best_size = 0
+        for i, hole in enumerate(self._free_sizes):
+            if hole >= size and (best < 0 or hole < best_size):
+                best, best_size = i, hole
+                if hole == size:
+                    break
+        if best < 0:
+            self._failed_allocs += 1
+            return None
+
+        offset = self._free_offsets[best]
+        if best_size == size:
+            del self._free_offsets[best]
+            del self._free_sizes[best]
+        else:
+            self._free_offsets[best] = offset + size
+            self._free_sizes[best] = best_size - size
+
+        self._allocated[offset] = size
+        self._allocated_bytes += size
+        self._high_water = max(self._high_water, offset + size)
+        return offset
+
+    def free(self, offset: int) -> bool:
+        """Return an extent to the free list, merging adjacent holes."""
+        size = self._allocated.pop(offset, None)
+        if size is None:
+            return False
+        self._allocated_bytes -= size
+
+        i = bisect.bisect_left(self._free_offsets, offset)
+        # Merge with the following hole
+        if i < len(self._free_offsets) and offset + size == self._free_offsets[i]:
+            size += self._free_sizes[i]
+            del self._free_offsets[i]
+            del self._free_sizes[i]
+        # Merge with the preceding hole
+        if i > 0 and self._free_offsets[i - 1] + self._free_sizes[i - 1] == offset:
+            self._free_sizes[i - 1] += size
+        else:
+            self._free_offsets.insert(i, offset)
+            self._free_sizes.insert(i, size)
+        return True
+
+    def compact(self) -> Dict[int, int]:
+        """Slide every live extent down to close all holes.
+
+        Returns the relocation map ``{old_offset: new_offset}`` for extents
+        that moved; the caller is responsible for moving the bytes.
+        """
+        moves: Dict[int, int] = {}
+        cursor = 0
+        new_allocated: Dict[int, int] = {}
+        for offset in sorted(self._allocated):
+            size = self._allocated[offset]
+            if offset != cursor:
+                moves[offset] = cursor
+            new_allocated[cursor] = size
+            cursor += size
+        self._allocated = new_allocated
+        tail = self.capacity - cursor
+        self._free_offsets = [cursor] if tail > 0 else []
+        self._free_sizes = [tail] if tail > 0 else []
+        self._compactions += 1
+        return moves
+
+    @property
+    def free_bytes(self) -> int:
+        return self.capacity - self._allocated_bytes
+
+    @property
+    def largest_free_block(self) -> int:
+        return max(self._free_sizes) if self._free_sizes else 0
+
+    def fits_after_compaction(self, size_bytes: int) -> bool:
+        return self._align(size_bytes) <= self.free_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Fragmentation metrics for this arena.
+
+        ``fragmentation`` is external fragmentation:
+        ``1 - largest_free_block / free_bytes`` (0 = one contiguous hole).
+        """
+        free = self.free_bytes
+        largest = self.largest_free_block
+        return {
+            "capacity_bytes": self.capacity,
+            "allocated_bytes": self._allocated_bytes,
+            "free_bytes": free,
+            "largest_free_block": largest,
+            "free_blocks": len(self._free_sizes),
+            "live_allocations": len(self._allocated),
+            "fragmentation": (1.0 - largest / free) if free > 0 else 0.0,
+            "high_water_bytes": self._high_water,
+            "failed_allocs": self._failed_allocs,
+            "compactions": self._compactions,
+        }
+
+
+def _shares_storage(ref: Any, buf: Any) -> bool:
+    """True if tensor *ref* is a view into *buf*'s memory."""
+    try:
+        return ref.untyped_storage().data_ptr() == buf.untyped_storage().data_ptr()
+    except Exception:
+        return False
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Core: VRAMLendingPool
@@ -251,12 +413,20 @@ class VRAMLendingPool:
         # GPU budgets
         self._budgets: Dict[int, GPUBudget] = {}
 
+        # Per-GPU free-list allocators over the lending buffers
+        self._arenas: Dict[int, LendingArena] = {}
+
+        # borrower_gpu -> (lender_gpu, expires_at); see _select_lender
+        self._lender_cache: Dict[int, Tuple[int, float]] = {}
+        self._rebar_cache: Dict[int, bool] = {}
+
         # Active leases
         self._leases: Dict[str, VRAMLease] = {}
 
         # Callbacks for preemption notifications
         self._on_reclaim_callbacks: List[Callable[[VRAMLease], None]] = []
         self._on_lend_callbacks: List[Callable[[VRAMLease], None]] = []
+        self._on_relocate_callbacks: List[Callable[[VRAMLease, int], None]] = []
 
         # Background monitor thread
         self._monitor_thread: Optional[threading.Thread] = None
@@ -313,11 +483,27 @@ class VRAMLendingPool:
                 vendor=vendor or self._detect_vendor(gpu_id, device_name),
             )
             self._budgets[gpu_id] = budget
+            self._lender_cache.clear()
 
             # Pre-allocate lending buffer on this GPU
             if _TORCH and not _MINIMAL and total_bytes > 0:
                 self._preallocate_lending_buffer(budget)
 
+            # Arena over the lending buffer. Without a physical buffer
+            # (minimal mode, alloc failure) offsets are purely logical and
+            # the arena spans the GPU's total VRAM.
+            live = any(
+                l.owner_gpu == gpu_id and l.is_active for l in self._leases.values()
+            )
+            if gpu_id not in self._arenas or not live:
+                capacity = (
+                    budget.lending_buffer.numel()
+                    if budget.lending_buffer is not None else int(total_bytes)
+                )
+                self._arenas[gpu_id] = LendingArena(
+                    capacity, alignment=self.policy.buffer_alignment,
+                )
+
             log.info(
                 "GPU %d registered: %s, total=%.1f GB, model=%.1f GB, "
                 "lendable=%.1f GB, PCIe %d, vendor=%s",
@@ -456,6 +642,7 @@ class VRAMLendingPool:
                     MEMORY_PROMOTIONS.labels("lending", f"gpu{lender_gpu}->gpu{borrower_gpu}").inc()
                 except Exception:
                     pass  # intentional: Prometheus metric call must never crash hot path
+            self._publish_fragmentation(lender_gpu)
 
             log.info(
                 "Lease %s: GPU %d lends %.1f MB to GPU %d (purpose=%s, "
@@ -490,6 +677,10 @@ class VRAMLendingPool:
              - Current utilization (lower = better)
              - Temperature (cooler = better, if available)
           3. Return the highest-scoring GPU
+
+        The winner is cached per borrower for ``policy.lender_cache_ttl_s``
+        and reused while it can still take the request, so back-to-back
+        borrows (KV overflow under decode) skip the scoring pass.
         """
         if preferred is not None:
             budget = self._budgets.get(preferred)
@@ -498,6 +689,14 @@ class VRAMLendingPool:
                     and budget.utilization < self.policy.stop_lending_threshold):
                 return preferred
 
+        now = time.monotonic()
+        cached = self._lender_cache.get(borrower_gpu)
+        if cached is not None and cached[1] > now:
+            budget = self._budgets.get(cached[0])
+            if (budget and budget.lendable_bytes >= size_bytes
+                    and budget.utilization < self.policy.stop_lending_threshold):
+                return cached[0]
+
         best_gpu = None
         best_score = -1.0
 
@@ -533,38 +732,136 @@ class VRAMLendingPool:
                     and budget.vendor != borrower_budget.vendor):
                 score *= (1.0 - self.policy.cross_vendor_penalty)
                 # Bonus for ReBAR-capable cross-vendor GPUs (faster transfers)
-                try:
-                    from experimental.cross_vendor_bridge import detect_rebar
-                    rebar_lender, _ = detect_rebar(gpu_id)
-                    rebar_borrower, _ = detect_rebar(borrower_gpu)
-                    if rebar_lender or rebar_borrower:
-                        score *= 1.10  # +10% bonus for ReBAR availability
-                except ImportError:
-                    pass
+                if self._has_rebar(gpu_id) or self._has_rebar(borrower_gpu):
+                    score *= 1.10  # +10% bonus for ReBAR availability
 
             if score > best_score:
                 best_score = score
                 best_gpu = gpu_id
 
+        if best_gpu is not None and self.policy.lender_cache_ttl_s > 0:
+            self._lender_cache[borrower_gpu] = (
+                best_gpu, now + self.policy.lender_cache_ttl_s,
+            )
         return best_gpu
 
+    def _has_rebar(self, gpu_id: int) -> bool:
+        """ReBAR probe, memoized — BAR sizes do not change at runtime."""
+        cached = self._rebar_cache.get(gpu_id)
+        if cached is None:
+            try:
+                from experimental.cross_vendor_bridge import detect_rebar
+                cached = bool(detect_rebar(gpu_id)[0])
+            except ImportError:
+                cached = False
+            self._rebar_cache[gpu_id] = cached
+        return cached
+
     def _find_buffer_offset(self, gpu_id: int, size_bytes: int) -> int:
         """Find a free offset within the GPU's lending buffer.
 
-        Simple bump allocator — leases are packed sequentially.
-        Fragmentation is acceptable because leases are short-lived.
+        Best-fit over the arena's free list; holes left by released leases
+        are reused. If nothing fits but the arena has enough free bytes in
+        total and ``policy.compact_on_fragmentation`` is set, the arena is
+        compacted first. Returns -1 when the lease cannot be placed in the
+        buffer — ``allocate_on_lease`` then allocates directly on the lender.
+        """
+        arena = self._arenas.get(gpu_id)
+        if arena is None:
+            return -1
+
+        offset = arena.alloc(size_bytes)
+        if (offset is None
+                and self.policy.compact_on_fragmentation
+                and arena.fits_after_compaction(size_bytes)):
+            self._compact_locked(gpu_id)
+            offset = arena.alloc(size_bytes)
+
+        if offset is None:
+            log.debug("Lending arena GPU %d: no hole for %d bytes (free=%d, "
+                      "largest=%d)", gpu_id, size_bytes, arena.free_bytes,
+                      arena.largest_free_block)
+            return -1
+        return offset
+
+    def _compact_locked(self, gpu_id: int) -> int:
+        """Compact one GPU's arena, moving live lease bytes. Caller holds lock.
+
+        Leases whose ``tensor_ref`` is a view into the lending buffer (same
+        storage) get their bytes copied to the new extent and ``tensor_ref``
+        re-bound; other tensors are left alone;
+        ``on_relocate`` callbacks are fired so borrowers holding their own
+        views can refresh them. Returns the number of leases moved.
         """
-        # Sum offsets of existing leases on this GPU
-        existing = [
-            l for l in self._leases.values()
-            if l.owner_gpu == gpu_id and l.state == LeaseState.ACTIVE
-        ]
-        if not existing:
+        arena = self._arenas.get(gpu_id)
+        if arena is None:
+            return 0
+        moves = arena.compact()
+        if not moves:
             return 0
 
-        # Find the next free offset after all existing leases
-        max_end = max(l.offset + l.size_bytes for l in existing)
-        return max_end
+        buf = self._budgets[gpu_id].lending_buffer if gpu_id in self._budgets else None
+        by_offset = {
+            l.offset: l for l in self._leases.values()
+            if l.owner_gpu == gpu_id and l.is_active and l.offset >= 0
+        }
+        # Ascending order: every extent moves down into space that is
+        # already vacated, so earlier copies never clobber later sources.
+        for old in sorted(moves):
+            new = moves[old]
+            lease = by_offset.get(old)
+            if lease is None:
+                continue
+            ref = lease.tensor_ref
+            # Only views into the lending buffer move with the extent; a
+            # separately allocated tensor (materialize_lease) keeps its memory
+            if buf is not None and ref is not None and _shares_storage(ref, buf):
+                try:
+                    n = ref.numel() * ref.element_size()
+                    buf[new:new + n].copy_(buf[old:old + n].clone())
+                    lease.tensor_ref = buf[new:new + n].view(ref.dtype).reshape(ref.shape)
+                except Exception as e:
+                    log.warning("Compaction copy failed for lease %s: %s",
+                                lease.lease_id, e)
+            lease.offset = new
+            for cb in self._on_relocate_callbacks:
+                try:
+                    cb(lease, old)
+                except Exception:
+                    pass  # intentional: user-provided callback isolated from pool internals
+
+        log.info("Lending arena GPU %d compacted: %d leases relocated",
+                 gpu_id, len(moves))
+        return len(moves)
+
+    def compact(self, gpu_id: Optional[int] = None) -> int:
+        """Compact the lending arena of one GPU (or all). Returns leases moved.
+
+        Only safe between inference steps: views into the lending buffer
+        obtained before the call are stale afterwards.
+        """
+        with self._lock:
+            ids = [gpu_id] if gpu_id is not None else list(self._arenas)
+            return sum(self._compact_locked(g) for g in ids)
+
+    def fragmentation_stats(self, gpu_id: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+        """Per-GPU arena metrics (free bytes, largest hole, fragmentation …)."""
+        with self._lock:
+            ids = [gpu_id] if gpu_id is not None else list(self._arenas)
+            return {g: self._arenas[g].stats() for g in ids if g in self._arenas}
+
+    def _publish_fragmentation(self, gpu_id: int) -> None:
+        if not _METRICS:
+            return
+        arena = self._arenas.get(gpu_id)
+        if arena is None:
+            return
+        try:
+            LENDING_FRAGMENTATION.labels(f"gpu{gpu_id}").set(
+                arena.stats()["fragmentation"]
+            )
+        except Exception:
+            pass  # intentional: Prometheus metric call must never crash hot path
 
     # ------------------------------------------------------------------
     # Allocate tensor on borrowed VRAM
@@ -575,6 +872,7 @@ class VRAMLendingPool:
         lease: VRAMLease,
         shape: Tuple[int, ...],
         dtype: Any = None,
+        byte_offset: int = 0,
     ) -> Any:
         """Allocate a tensor on borrowed VRAM.
 
@@ -585,6 +883,9 @@ class VRAMLendingPool:
             lease: Active lease to allocate within
             shape: Tensor shape
             dtype: Tensor dtype (default: float16)
+            byte_offset: Start of the tensor within the lease. Lets a
+                borrower carve several tensors out of one lease (KV overflow
+                slabs); ``lease.tensor_ref`` then covers the whole lease.
 
         Returns:
             torch.Tensor on the lender's GPU, or None if allocation fails
@@ -599,6 +900,8 @@ class VRAMLendingPool:
 
         if dtype is None:
             dtype = torch.float16
+        elif isinstance(dtype, str):
+            dtype = getattr(torch, dtype)
 
         try:
             budget = self._budgets.get(lease.owner_gpu)
@@ -610,9 +913,9 @@ class VRAMLendingPool:
                 elem_size = torch.tensor([], dtype=dtype).element_size()
                 byte_size = numel * elem_size
 
-                if byte_size <= lease.size_bytes:
+                if byte_offset + byte_size <= lease.size_bytes and lease.offset >= 0:
                     # View into the lending buffer
-                    start = lease.offset
+                    start = lease.offset + byte_offset
                     end = start + byte_size
                     if end <= budget.lending_buffer.numel():
                         buf_slice = budget.lending_buffer[start:end]
@@ -620,7 +923,12 @@ class VRAMLendingPool:
                             dtype
                         ).reshape(shape)
                         tensor.zero_()
-                        lease.tensor_ref = tensor
+                        if byte_offset:
+                            lease.tensor_ref = budget.lending_buffer[
+                                lease.offset:lease.offset + lease.size_bytes
+                            ]
+                        else:
+                            lease.tensor_ref = tensor
                         return tensor
 
             # Fallback: direct allocation on lender GPU
@@ -628,7 +936,10 @@ class VRAMLendingPool:
                 shape, dtype=dtype,
                 device=f"cuda:{lease.owner_gpu}",
             )
-            lease.tensor_ref = tensor
+            if byte_offset:
+                lease.metadata.setdefault("carved_tensors", {})[byte_offset] = tensor
+            else:
+                lease.tensor_ref = tensor
             return tensor
 
         except Exception as e:
@@ -915,6 +1226,11 @@ class VRAMLendingPool:
             if not owner_leases:
                 return 0
 
+            # Owner is under pressure: stop steering borrowers to it
+            self._lender_cache = {
+                b: c for b, c in self._lender_cache.items() if c[0] != owner_gpu
+            }
+
             # Sort by priority (reclaim low-priority first)
             owner_leases.sort(key=lambda l: (l.priority, -l.age_s))
 
@@ -1039,6 +1355,11 @@ class VRAMLendingPool:
 
         if owner_budget:
             owner_budget.lent_bytes = max(0, owner_budget.lent_bytes - lease.size_bytes)
+
+        arena = self._arenas.get(lease.owner_gpu)
+        if arena is not None and lease.offset >= 0:
+            arena.free(lease.offset)
+            self._publish_fragmentation(lease.owner_gpu)
         if borrower_budget:
             borrower_budget.borrowed_bytes = max(
                 0, borrower_budget.borrowed_bytes - lease.size_bytes
@@ -1226,6 +1547,9 @@ class VRAMLendingPool:
                     "utilization": budget.utilization,
                     "pcie_gen": budget.pcie_gen,
                 }
+                arena = self._arenas.get(gpu_id)
+                if arena is not None:
+                    s["per_gpu"][gpu_id]["arena"] = arena.stats()
             return s
 
     def suggest_placement_budget(
@@ -1324,6 +1648,10 @@ class VRAMLendingPool:
         """Register a callback for new lease events."""
         self._on_lend_callbacks.append(callback)
 
+    def on_relocate(self, callback: Callable[[VRAMLease, int], None]) -> None:
+        """Register a callback ``cb(lease, old_offset)`` fired by compaction."""
+        self._on_relocate_callbacks.append(callback)
+
     def close(self) -> None:
         """Shutdown the lending pool. Reclaim all leases."""
         self.stop_monitoring()
@@ -1387,6 +1715,7 @@ __all__ = [
     "VRAMLease",
     "GPUBudget",
     "LendingPolicy",
+    "LendingArena",
     "LeaseState",
     "ReclaimUrgency",
     "get_lending_pool",
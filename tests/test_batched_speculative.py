@@ -0,0 +1,178 @@
+"""Tests for batched speculative decoding in core.continuous_batcher."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+PROMPTS = ["1 2 3 4 5", "6 7 8", "9 10 11 12 13 14 15"]
+
+
+class _Tok:
+    """Whitespace-separated ids; batched calls are left-padded."""
+
+    eos_token_id = None
+    pad_token_id = 0
+
+    def __call__(self, text, return_tensors=None, padding=False):
+        if isinstance(text, list):
+            rows = [[int(t) for t in x.split()] for x in text]
+            width = max(len(r) for r in rows)
+            return {
+                "input_ids": torch.tensor([[0] * (width - len(r)) + r for r in rows]),
+                "attention_mask": torch.tensor([[0] * (width - len(r)) + [1] * len(r)
+                                                for r in rows]),
+            }
+        return {"input_ids": torch.tensor([[int(t) for t in text.split()]])}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(int(i)) for i in ids)
+
+
+@pytest.fixture(scope="module")
+def models():
+    cfg = transformers.LlamaConfig(hidden_size=32, intermediate_size=64,
+                                   num_hidden_layers=2, num_attention_heads=4,
+                                   num_key_value_heads=2, vocab_size=24)
+    torch.manual_seed(0)
+    target = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+    draft = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+    with torch.no_grad():
+        for pt, pd in zip(target.parameters(), draft.parameters()):
+            pd.copy_(pt + 0.1 * pt.std() * torch.randn_like(pt))
+    return target, draft
+
+
+def _greedy(model, prompt, n):
+    ids = torch.tensor([[int(t) for t in prompt.split()]])
+    with torch.no_grad():
+        for _ in range(n):
+            ids = torch.cat([ids, model(ids).logits[:, -1].argmax(-1, keepdim=True)], dim=-1)
+    return " ".join(str(t) for t in ids[0].tolist())
+
+
+def _run(model, prompts, max_new, **kwargs):
+    from core.continuous_batcher import ContinuousBatcher
+    batcher = ContinuousBatcher(model, _Tok(), device="cpu", **kwargs)
+    futures = [batcher.submit(p, max_new_tokens=n) for p, n in zip(prompts, max_new)]
+    batcher.start()                      # all admitted together → batched prefill
+    try:
+        return [f.result(timeout=120) for f in futures], batcher
+    finally:
+        batcher.stop()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Greedy equivalence
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestBatchedSpeculative:
+
+    def test_plain_batched_prefill_matches_reference(self, models):
+        target, _ = models
+        outs, _ = _run(target, PROMPTS, [6, 6, 6])
+        assert outs == [_greedy(target, p, 6) for p in PROMPTS]
+
+    def test_draft_model_matches_reference(self, models):
+        from core.speculative_decoding import CachedDrafter
+        target, draft = models
+        max_new = [9, 5, 12]
+        outs, batcher = _run(target, PROMPTS, max_new,
+                             draft_model_callable=CachedDrafter(draft), spec_gamma=3)
+        assert outs == [_greedy(target, p, n) for p, n in zip(PROMPTS, max_new)]
+        spec = batcher.stats()["speculative"]
+        assert spec["accepted"] > 0
+        # One verifier pass serves all requests and emits several tokens each
+        assert spec["verify_passes"] < max(max_new) - 1
+
+    def test_variable_and_empty_drafts(self, models):
+        target, _ = models
+        calls = []
+
+        def drafter(ids, n):
+            calls.append(n)
+            if ids.shape[1] % 2:         # no candidate (e.g. n-gram miss)
+                return torch.zeros(1, 0, dtype=torch.long)
+            return torch.tensor([[(int(ids[0, -1]) + k) % 24 for k in range(1, n)]])
+
+        outs, _ = _run(target, PROMPTS, [7, 7, 7], draft_model_callable=drafter,
+                       spec_gamma=4)
+        assert outs == [_greedy(target, p, 7) for p in PROMPTS]
+        assert calls
+
+    def test_gamma_adapts_per_request(self, models):
+        target, _ = models
+        refs = {p: [int(t) for t in _greedy(target, p, 40).split()] for p in PROMPTS[:2]}
+        good = refs[PROMPTS[0]]
+
+        def drafter(ids, n):
+            seq = ids[0].tolist()
+            if seq == good[:len(seq)]:                   # oracle for request 0
+                return torch.tensor([good[len(seq):len(seq) + n]])
+            return torch.full((1, n), 23)                # always wrong for request 1
+
+        from core.continuous_batcher import ContinuousBatcher
+        batcher = ContinuousBatcher(target, _Tok(), device="cpu",
+                                    draft_model_callable=drafter, spec_gamma=3,
+                                    spec_gamma_max=8)
+        futures = [batcher.submit(p, max_new_tokens=30) for p in PROMPTS[:2]]
+        batcher.start()
+        try:
+            outs = [f.result(timeout=120) for f in futures]
+        finally:
+            batcher.stop()
+        assert outs == [_greedy(target, p, 30) for p in PROMPTS[:2]]
+        gammas = {r.prompt: r.spec_gamma for r in batcher._completed}
+        assert gammas[PROMPTS[0]] > 3 > gammas[PROMPTS[1]]
+
+    def test_finished_request_leaves_batch_before_decode(self, models):
+        import threading
+        from concurrent.futures import Future
+        from core.continuous_batcher import (ContinuousBatcher, InferenceRequest,
+                                             RequestStatus)
+        release = threading.Event()
+
+        class _SlowTok(_Tok):
+            def decode(self, ids, skip_special_tokens=True):
+                release.wait(10)
+                return super().decode(ids, skip_special_tokens)
+
+        batcher = ContinuousBatcher(models[0], _SlowTok(), device="cpu")
+        req = InferenceRequest(prompt="1 2", max_new_tokens=1)
+        req.status = RequestStatus.ACTIVE
+        req.generated_ids = torch.tensor([[1, 2]])
+        req.kv_cache = object()
+        req.future = Future()
+        batcher._active = [req]
+        try:
+            batcher._emit_tokens(req, [3])
+            assert req.status is RequestStatus.FINISHING   # decode still pending
+            assert req.kv_cache is None and req.drafter is None
+            batcher._iteration_step_on([req])              # not stepped again
+            batcher._emit_tokens(req, [4])
+            assert req.generated_ids.tolist() == [[1, 2, 3]]
+            assert batcher._draft_for(req) == ([], None)
+            batcher._evict_completed()
+            assert batcher._active == [] and batcher._completed == [req]
+        finally:
+            release.set()
+        assert req.future.result(timeout=10) == "1 2 3"
+
+    def test_request_probs_filters(self, models):
+        from core.continuous_batcher import ContinuousBatcher, InferenceRequest
+        batcher = ContinuousBatcher(models[0], _Tok(), device="cpu")
+        logits = torch.tensor([[1.0, 3.0, 2.0, 0.0]])
+        greedy = batcher._request_probs(logits, InferenceRequest())
+        assert greedy.tolist() == [[0.0, 1.0, 0.0, 0.0]]
+        top2 = batcher._request_probs(logits, InferenceRequest(temperature=0.5, top_k=2))
+        assert top2[0, 0] == 0 and top2[0, 3] == 0
+        assert torch.allclose(top2[0, 1:3], torch.softmax(torch.tensor([6.0, 4.0]), -1))
+
+
+__all__ = ["TestBatchedSpeculative"]
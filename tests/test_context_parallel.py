@@ -0,0 +1,176 @@
+"""Tests for ring-attention context parallelism (core.context_parallel)."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+
+def _dense(q, k, v, causal=True):
+    rep = q.shape[1] // k.shape[1]
+    k, v = k.repeat_interleave(rep, dim=1), v.repeat_interleave(rep, dim=1)
+    return torch.nn.functional.scaled_dot_product_attention(q, k, v, is_causal=causal)
+
+
+def _tiny_llama(layers=2):
+    transformers = pytest.importorskip("transformers")
+    cfg = transformers.LlamaConfig(hidden_size=64, intermediate_size=96,
+                                   num_hidden_layers=layers, num_attention_heads=4,
+                                   num_key_value_heads=2, vocab_size=50,
+                                   max_position_embeddings=256)
+    torch.manual_seed(0)
+    return transformers.AutoModelForCausalLM.from_config(cfg).eval()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Ring attention vs dense attention
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestRingAttention:
+
+    @pytest.mark.parametrize("n_dev", [1, 2, 3, 4])
+    @pytest.mark.parametrize("causal", [True, False])
+    def test_matches_dense(self, n_dev, causal):
+        from core.context_parallel import ring_attention, split_sequence
+        g = torch.Generator().manual_seed(n_dev)
+        q = torch.randn(2, 4, 37, 8, generator=g, dtype=torch.float64)
+        k = torch.randn(2, 2, 37, 8, generator=g, dtype=torch.float64)
+        v = torch.randn(2, 2, 37, 8, generator=g, dtype=torch.float64)
+        ranges = split_sequence(37, n_dev)
+        outs = ring_attention([q[:, :, a:b] for a, b in ranges],
+                              [k[:, :, a:b] for a, b in ranges],
+                              [v[:, :, a:b] for a, b in ranges],
+                              ["cpu"] * n_dev, causal=causal)
+        assert torch.allclose(torch.cat(outs, dim=2), _dense(q, k, v, causal), atol=1e-5)
+
+    def test_sequential_mode_and_uneven_chunks(self):
+        from core.context_parallel import ring_attention
+        g = torch.Generator().manual_seed(1)
+        q, k, v = (torch.randn(1, 2, 20, 4, generator=g) for _ in range(3))
+        cuts = [(0, 3), (3, 15), (15, 20)]
+        outs = ring_attention([q[:, :, a:b] for a, b in cuts], [k[:, :, a:b] for a, b in cuts],
+                              [v[:, :, a:b] for a, b in cuts], ["cpu"] * 3, concurrent=False)
+        assert torch.allclose(torch.cat(outs, dim=2), _dense(q, k, v), atol=1e-5)
+
+    @pytest.mark.parametrize("tile", [1, 5, 16])
+    def test_tiled_blocks_match_dense(self, tile):
+        from core.context_parallel import _block_attention, ring_attention, split_sequence
+        g = torch.Generator().manual_seed(tile)
+        q = torch.randn(1, 4, 41, 8, generator=g, dtype=torch.float64)
+        k = torch.randn(1, 2, 41, 8, generator=g, dtype=torch.float64)
+        v = torch.randn(1, 2, 41, 8, generator=g, dtype=torch.float64)
+        ranges = split_sequence(41, 2)
+        outs = ring_attention([q[:, :, a:b] for a, b in ranges],
+                              [k[:, :, a:b] for a, b in ranges],
+                              [v[:, :, a:b] for a, b in ranges],
+                              ["cpu", "cpu"], tile=tile)
+        assert torch.allclose(torch.cat(outs, dim=2), _dense(q, k, v), atol=1e-5)
+        # The float32 scores never exceed one [b, heads, tile, tile] tile
+        kx = k.repeat_interleave(2, dim=1)
+        _, _, score_bytes = _block_attention(q, kx, kx, 0, 0, True, 0.5, tile)
+        assert score_bytes == 4 * tile * tile * 4
+
+    def test_split_sequence(self):
+        from core.context_parallel import split_sequence
+        assert split_sequence(10, 3) == [(0, 4), (4, 7), (7, 10)]
+        assert split_sequence(2, 4) == [(0, 1), (1, 2)]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Model prefill + hand-off to decode
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestContextParallelPrefill:
+
+    @pytest.mark.parametrize("n_dev", [2, 3])
+    def test_logits_match_hf(self, n_dev):
+        from core.context_parallel import context_parallel_prefill
+        model = _tiny_llama()
+        ids = torch.randint(0, 50, (1, 29))
+        with torch.no_grad():
+            ref = model(ids).logits
+        res = context_parallel_prefill(model, ids, ["cpu"] * n_dev)
+        last = res.offsets[-1]
+        assert torch.allclose(res.logits, ref[:, last:], atol=1e-4)
+        assert res.seq_len == 29
+
+    def test_decode_from_hf_cache(self):
+        from core.context_parallel import context_parallel_prefill
+        model = _tiny_llama()
+        ids = torch.randint(0, 50, (1, 24))
+        res = context_parallel_prefill(model, ids, ["cpu", "cpu"])
+        nxt = res.logits[:, -1:].argmax(-1)
+        with torch.no_grad():
+            out = model(nxt, past_key_values=res.to_hf_cache(), use_cache=True).logits
+            ref = model(torch.cat([ids, nxt], dim=1)).logits[:, -1:]
+        assert torch.allclose(out, ref, atol=1e-4)
+
+    def test_handoff_to_paged_cache(self):
+        from core.context_parallel import context_parallel_prefill
+        from core.paged_attention import PagedKVCacheManager, PagedKVConfig
+        model = _tiny_llama()
+        ids = torch.randint(0, 50, (1, 37))
+        res = context_parallel_prefill(model, ids, ["cpu"] * 3)
+        mgr = PagedKVCacheManager(PagedKVConfig(device="cpu", max_pages=16, dtype="float32",
+                                                num_layers=2, num_kv_heads=2, head_dim=16,
+                                                page_size=16, enable_lending=False))
+        if mgr._gpu_pool is None:
+            mgr._gpu_pool = torch.zeros(16, 2, 2, 2, 16, 16)
+        assert res.to_paged(mgr, "req") == 2 * 37
+        small = PagedKVCacheManager(PagedKVConfig(device="cpu", max_pages=2, dtype="float32",
+                                                  num_layers=2, num_kv_heads=2, head_dim=16,
+                                                  page_size=16, enable_lending=False))
+        small._gpu_pool = torch.zeros(2, 2, 2, 2, 16, 16)
+        with pytest.raises(RuntimeError):
+            res.to_paged(small, "req")                 # 37 tokens, 32 slots
+        assert small._page_tables["req"].num_tokens == 32
+        paged = mgr.to_hf_cache("req")
+        dense = res.to_hf_cache()
+        for layer in range(2):
+            assert torch.allclose(paged[layer][0], dense.layers[layer].keys)
+            assert torch.allclose(paged[layer][1], dense.layers[layer].values)
+
+    def test_rejects_unsupported_model(self):
+        from core.context_parallel import context_parallel_prefill
+        with pytest.raises(ValueError):
+            context_parallel_prefill(torch.nn.Linear(2, 2), torch.zeros(1, 4, dtype=torch.long),
+                                     ["cpu", "cpu"])
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Memory per device
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestMemoryReport:
+
+    def test_measured_peak_shrinks_with_devices(self):
+        from core.context_parallel import context_parallel_prefill
+        model = _tiny_llama(layers=1)
+        ids = torch.randint(0, 50, (1, 64))
+        one = context_parallel_prefill(model, ids, ["cpu"]).stats
+        four = context_parallel_prefill(model, ids, ["cpu"] * 4).stats
+        assert max(four["attn_peak_bytes"]) < one["attn_peak_bytes"][0] / 2
+        assert sum(four["kv_bytes"]) == one["kv_bytes"][0]
+        assert four["chunks"] == [16] * 4
+
+    def test_analytic_report(self):
+        from core.context_parallel import memory_report
+        rep = memory_report(131072, 8, num_layers=32, num_heads=32, num_kv_heads=8,
+                            head_dim=128, hidden_size=4096)
+        dense, ring = rep["dense_single_device"], rep["ring_per_device"]
+        assert ring["kv_mb"] * 8 == pytest.approx(dense["kv_mb"], rel=1e-3)
+        # Both sides tile their scores (flash-attention dense baseline)
+        assert ring["scores_mb"] == dense["scores_mb"] == 128.0
+        assert ring["total_mb"] < dense["total_mb"] / 6
+
+
+__all__ = [
+    "TestRingAttention",
+    "TestContextParallelPrefill",
+    "TestMemoryReport",
+]
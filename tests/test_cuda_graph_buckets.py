@@ -0,0 +1,244 @@
+"""Tests for bucketed CUDA-graph decode: bucket selection, padding, the
+slot-based StaticKVCache and the continuous batcher's graph decode step.
+
+Graph capture itself needs CUDA. Everything else runs on CPU with the
+runner forced on and a warmup longer than the test, so every step takes the
+padded eager path that a captured graph would replay.
+"""
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+PROMPTS = ["1 2 3 4 5", "6 7 8", "9 10 11 12 13 14 15"]
+
+
+class _Tok:
+    """Whitespace-separated ids; batched calls are left-padded."""
+
+    eos_token_id = None
+    pad_token_id = 0
+
+    def __call__(self, text, return_tensors=None, padding=False):
+        if isinstance(text, list):
+            rows = [[int(t) for t in x.split()] for x in text]
+            width = max(len(r) for r in rows)
+            return {
+                "input_ids": torch.tensor([[0] * (width - len(r)) + r for r in rows]),
+                "attention_mask": torch.tensor([[0] * (width - len(r)) + [1] * len(r)
+                                                for r in rows]),
+            }
+        return {"input_ids": torch.tensor([[int(t) for t in text.split()]])}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(int(i)) for i in ids)
+
+
+def _runner(model, **kwargs):
+    from core.cuda_graph_decode import CUDAGraphRunner
+    runner = CUDAGraphRunner(model, warmup_steps=10 ** 9, **kwargs)
+    runner.enabled = True
+    return runner
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Bucket selection and padding
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestBuckets:
+
+    def test_bucket_for(self):
+        from core.cuda_graph_decode import bucket_for
+        assert [bucket_for(n) for n in (1, 2, 3, 5, 33, 64)] == [1, 2, 4, 8, 64, 64]
+        assert bucket_for(65) is None
+        assert bucket_for(3, (8, 2)) == 8
+
+    def test_pad_adds_masked_dummy_rows(self):
+        from core.cuda_graph_decode import additive_mask, pad_to_bucket
+        ids = torch.tensor([[5], [6], [7]])
+        mask = torch.tensor([[1, 1, 0, 1], [0, 1, 1, 1], [1, 0, 0, 1]])
+        pos = torch.tensor([[3], [2], [1]])
+        p_ids, p_mask, p_pos = pad_to_bucket(4, ids, mask, pos, pad_token_id=9)
+        assert p_ids[:, 0].tolist() == [5, 6, 7, 9]
+        assert p_mask[3].tolist() == [1, 0, 0, 0] and torch.equal(p_mask[:3], mask)
+        assert p_pos[:, 0].tolist() == [3, 2, 1, 0]
+        bias = additive_mask(p_mask, torch.float32)
+        assert bias.shape == (4, 1, 1, 4)
+        assert bias[0, 0, 0].tolist() == [0.0, 0.0, torch.finfo(torch.float32).min, 0.0]
+        with pytest.raises(ValueError):
+            pad_to_bucket(2, ids)
+
+    def test_bucket_size_prefers_captured_when_full(self):
+        runner = _runner(MagicMock(), max_cache_entries=2, buckets=(1, 2, 4, 8))
+        assert runner.bucket_size(3) == 4
+        runner._graphs = {1: "g", 8: "g"}                # cache full
+        assert runner.bucket_size(3) == 8 and runner.bucket_size(1) == 1
+        runner._graphs = {1: "g", 2: "g"}
+        assert runner.bucket_size(3) == 4                # nothing captured fits: eager
+        assert runner.bucket_size(9) is None
+
+    def test_exact_sizes_without_buckets_or_cuda(self):
+        from core.cuda_graph_decode import CUDAGraphRunner
+        assert _runner(MagicMock(), buckets=None).bucket_size(3) == 3
+        assert CUDAGraphRunner(MagicMock(), enabled=False).bucket_size(3) == 3
+
+    def test_forward_pads_and_slices(self):
+        seen = []
+
+        def model(ids, **kwargs):
+            seen.append((ids.shape[0], kwargs["attention_mask"].shape))
+            out = MagicMock()
+            out.logits = torch.arange(ids.shape[0], dtype=torch.float32)[:, None, None]
+            return out
+
+        runner = _runner(model, buckets=(1, 4))
+        pkv = MagicMock(spec=["update", "dtype"], dtype=torch.float32)
+        logits = runner.forward(torch.ones(3, 1, dtype=torch.long),
+                                attention_mask=torch.ones(3, 6, dtype=torch.long),
+                                position_ids=torch.zeros(3, 1, dtype=torch.long),
+                                past_key_values=pkv)
+        assert logits.shape == (3, 1, 1)
+        # Padded to the bucket; the 2D mask became additive 4D for the custom cache
+        assert seen == [(4, (4, 1, 1, 6))]
+        assert runner._call_counts == {4: 1}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# StaticKVCache slots
+# ═══════════════════════════════════════════════════════════════════════
+
+def _layers(length, fill):
+    return [(torch.full((1, 1, length, 2), float(fill)),
+             torch.full((1, 1, length, 2), -float(fill)))]
+
+
+class TestStaticKVSlots:
+
+    def _cache(self, max_seq_len=8, rows=4):
+        from core.turbo_engine import StaticKVCache
+        return StaticKVCache(1, 1, 2, max_seq_len, torch.device("cpu"), torch.float32, rows)
+
+    def test_load_right_aligns_and_release_keeps_prefix(self):
+        cache = self._cache()
+        a, b = cache.acquire(), cache.acquire()
+        cache.load(a, _layers(2, 1))
+        cache.load(b, _layers(4, 2))                 # cursor jumps to 4
+        assert cache.cursor == 4
+        assert cache.valid[a].tolist()[:5] == [1, 1, 0, 0, 0]   # gap stays masked
+        assert cache.valid[b].tolist()[:5] == [1, 1, 1, 1, 0]
+        mask = cache.begin_step(2)
+        assert mask[:, 4].tolist() == [1, 1]
+        cache.end_step()
+        assert cache.release(a) == b                 # b moves into row a
+        assert cache.active == 1 and cache.export(a)[0][0].shape[2] == 5
+        assert float(cache.export(a)[0][0][0, 0, 0, 0]) == 2.0
+
+    def test_compact_shifts_unused_columns(self):
+        cache = self._cache(max_seq_len=6)
+        slot = cache.acquire()
+        cache.load(slot, _layers(3, 1))
+        cache.release(cache.acquire())               # a row that came and went
+        cache.cursor = 6                             # full
+        cache.valid[slot, :3] = 0
+        cache.valid[slot, 3:6] = 1
+        cache.key_cache[0][slot, :, 3:6] = 7.0
+        cache.begin_step(1)                          # compacts first
+        assert cache.cursor == 3 and cache.valid[slot].tolist() == [1, 1, 1, 1, 0, 0]
+        assert cache.key_cache[0][slot, 0, :3, 0].tolist() == [7.0, 7.0, 7.0]
+
+    def test_view_writes_at_cursor(self):
+        cache = self._cache()
+        view = cache.view(2)
+        assert cache.view(2) is view
+        cache.cursor = 3
+        cache.begin_step(2)
+        k, v = view.update(torch.ones(2, 1, 1, 2), torch.ones(2, 1, 1, 2), 0)
+        assert k.shape == (2, 1, 8, 2)
+        assert k[:, 0, :, 0].sum(-1).tolist() == [1.0, 1.0] and float(k[0, 0, 3, 0]) == 1.0
+        assert float(cache.key_cache[0][2].abs().sum()) == 0.0   # rows past the view untouched
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Continuous batcher
+# ═══════════════════════════════════════════════════════════════════════
+
+@pytest.fixture(scope="module")
+def model():
+    transformers = pytest.importorskip("transformers")
+    cfg = transformers.LlamaConfig(hidden_size=32, intermediate_size=64,
+                                   num_hidden_layers=2, num_attention_heads=4,
+                                   num_key_value_heads=2, vocab_size=24)
+    torch.manual_seed(0)
+    return transformers.AutoModelForCausalLM.from_config(cfg).eval()
+
+
+def _greedy(model, prompt, n):
+    ids = torch.tensor([[int(t) for t in prompt.split()]])
+    with torch.no_grad():
+        for _ in range(n):
+            ids = torch.cat([ids, model(ids).logits[:, -1].argmax(-1, keepdim=True)], dim=-1)
+    return " ".join(str(t) for t in ids[0].tolist())
+
+
+class TestGraphDecodeBatcher:
+
+    @pytest.mark.parametrize("max_seq_len", [32, 20])   # 20 forces compaction
+    def test_matches_reference(self, model, max_seq_len):
+        from core.continuous_batcher import ContinuousBatcher
+        runner = _runner(model, max_cache_entries=2, max_seq_len=max_seq_len,
+                         buckets=(1, 2, 4))
+        batcher = ContinuousBatcher(model, _Tok(), device="cpu", max_batch_size=3,
+                                    cuda_graph_runner=runner)
+        max_new = [9, 4, 12]
+        futures = [batcher.submit(p, max_new_tokens=n) for p, n in zip(PROMPTS, max_new)]
+        batcher.start()
+        try:
+            outs = [f.result(timeout=120) for f in futures]
+            late = batcher.submit("3 3 4", max_new_tokens=6).result(timeout=120)
+        finally:
+            batcher.stop()
+        assert outs == [_greedy(model, p, n) for p, n in zip(PROMPTS, max_new)]
+        assert late == _greedy(model, "3 3 4", 6)
+        assert batcher.cuda_graph_runner is runner
+        # Shrinking batches were padded up to buckets 4, 2, then 1
+        assert set(runner._call_counts) == {1, 2, 4}
+        assert runner.max_cache_entries == 3             # room for every bucket
+        assert batcher._static_kv.active == 0 and batcher._slot_owners == []
+        assert all(r.kv_cache is None and r.kv_slot is None for r in batcher._completed)
+
+    def test_runner_failure_falls_back_to_eager(self, model):
+        from core.continuous_batcher import ContinuousBatcher
+        runner = _runner(model, max_seq_len=32, buckets=(1, 2, 4))
+        forward, calls = runner.forward, []
+
+        def flaky(ids, **kwargs):
+            calls.append(ids.shape[0])
+            if len(calls) == 3:
+                raise RuntimeError("capture failed")
+            return forward(ids, **kwargs)
+
+        runner.forward = flaky
+        batcher = ContinuousBatcher(model, _Tok(), device="cpu", max_batch_size=3,
+                                    cuda_graph_runner=runner)
+        futures = [batcher.submit(p, max_new_tokens=8) for p in PROMPTS]
+        batcher.start()
+        try:
+            outs = [f.result(timeout=120) for f in futures]
+        finally:
+            batcher.stop()
+        assert outs == [_greedy(model, p, 8) for p in PROMPTS]
+        assert batcher.cuda_graph_runner is None and len(calls) == 3
+
+
+__all__ = [
+    "TestBuckets",
+    "TestStaticKVSlots",
+    "TestGraphDecodeBatcher",
+]
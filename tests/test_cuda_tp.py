@@ -207,6 +207,20 @@ class TestTensorParallel:
         assert torch.allclose(t0, torch.full_like(t0, 8.0))
         assert torch.allclose(t1, torch.full_like(t1, 8.0))
 
+    @skip_no_multi_gpu
+    @skip_minimal
+    def test_chunked_reduce_on_comm_streams(self):
+        """Chunked row-parallel all-reduce runs on the per-device comm streams."""
+        import core.tensor_parallel as tp
+        w = torch.randn(64, 32)
+        x = torch.randn(32, 32)
+        shards = [tp.TPLinear(w[:, :16], None, "cuda:0"), tp.TPLinear(w[:, 16:], None, "cuda:1")]
+        out = tp._row_parallel_reduce([x[:, :16].to("cuda:0"), x[:, 16:].to("cuda:1")],
+                                      shards, ["cuda:0", "cuda:1"], concurrent=True, chunks=4)
+        assert torch.allclose(out.cpu(), x @ w.t(), atol=1e-3)
+        assert tp._use_comm_streams(["cuda:0", "cuda:1"])
+        assert {"cuda:0", "cuda:1"} <= set(tp._COMM_STREAMS)
+
     @skip_no_torch
     def test_tp_linear(self):
         from core.tensor_parallel import TPLinear
@@ -0,0 +1,376 @@
+"""Tests for the routing-aware MoE expert cache (core.expert_cache)."""
+import json
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _calls(*batches):
+    return [dict(Counter(b)) for b in batches]
+
+
+def _shifting_trace(layers=2, steps=400, shift_at=200):
+    """Experts 0-3 hot before ``shift_at``, 10-13 after; one rare expert per call."""
+    trace = []
+    for step in range(steps):
+        hot = range(0, 4) if step < shift_at else range(10, 14)
+        for layer in range(layers):
+            ids = [hot[step % 4], hot[(step + 1) % 4], 20 + step % 40]
+            trace.append((layer, dict(Counter(ids))))
+    return trace
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Policies
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPolicies:
+
+    @pytest.mark.parametrize("name", ["lru", "lfu", "arc"])
+    def test_capacity_respected_and_hits_counted(self, name):
+        from core.expert_cache import make_policy
+        pol = make_policy(name, 2)
+        r1, r2, r3 = (pol.access(c) for c in _calls([1, 2], [1, 2], [3]))
+        assert sorted(r1.misses) == [1, 2] and not r1.hits
+        assert sorted(r2.hits) == [1, 2] and not r2.misses
+        assert r3.misses == [3] and len(r3.evicted) == 1
+        assert len(pol) == 2 and 3 in pol
+
+    @pytest.mark.parametrize("name", ["lru", "lfu", "arc"])
+    def test_experts_of_current_call_never_evict_each_other(self, name):
+        from core.expert_cache import make_policy
+        pol = make_policy(name, 3)
+        pol.access({1: 1, 2: 1, 3: 1})
+        res = pol.access({4: 1, 5: 1, 1: 1})
+        assert 1 not in res.evicted
+        assert {1, 4, 5} == pol.resident
+
+    @pytest.mark.parametrize("name", ["lru", "lfu", "arc"])
+    def test_overflow_is_bypassed(self, name):
+        from core.expert_cache import make_policy
+        pol = make_policy(name, 2)
+        res = pol.access({1: 1, 2: 1, 3: 1})
+        assert len(res.bypass) == 1
+        assert len(pol) == 2
+
+    def test_lfu_counts_routed_tokens(self):
+        from core.expert_cache import LFUDecayPolicy
+        pol = LFUDecayPolicy(2, half_life=1000)
+        pol.access({1: 50, 2: 1})
+        res = pol.access({3: 1})
+        assert res.evicted == [2]  # expert 1 carried 50 tokens
+
+    def test_lfu_decay_lets_new_hot_set_in(self):
+        from core.expert_cache import LFUDecayPolicy
+        pol = LFUDecayPolicy(2, half_life=4)
+        for _ in range(50):
+            pol.access({1: 8, 2: 8})
+        for _ in range(10):
+            pol.access({3: 8})
+            pol.access({4: 8})
+        assert pol.resident == {3, 4}
+
+    def test_lfu_without_decay_resists_one_off_scan(self):
+        from core.expert_cache import LFUDecayPolicy
+        pol = LFUDecayPolicy(3, half_life=1e9)
+        for _ in range(10):
+            pol.access({1: 1, 2: 1})
+        for e in range(10, 20):
+            pol.access({e: 1})
+        assert {1, 2} <= pol.resident
+
+    def test_arc_scan_does_not_flush_frequent_set(self):
+        from core.expert_cache import ARCPolicy
+        pol = ARCPolicy(4)
+        for _ in range(3):
+            pol.access({1: 1, 2: 1})
+        for e in range(10, 30):
+            pol.access({e: 1})
+        assert {1, 2} <= pol.resident
+
+    def test_arc_ghost_hit_adapts_target(self):
+        from core.expert_cache import ARCPolicy
+        pol = ARCPolicy(2)
+        for e in (1, 1, 2, 3):
+            pol.access({e: 1})
+        assert 2 in pol.b1  # recency list gave up its LRU entry
+        pol.access({2: 1})
+        assert pol.p > 0 and 2 in pol.t2
+
+    def test_static_never_admits(self):
+        from core.expert_cache import StaticPolicy
+        pol = StaticPolicy(2, hot=[5, 6])
+        res = pol.access({5: 1, 7: 1})
+        assert res.hits == [5] and res.bypass == [7]
+        assert pol.resident == {5, 6}
+
+    def test_unknown_policy(self):
+        from core.expert_cache import make_policy
+        with pytest.raises(ValueError):
+            make_policy("mru", 4)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Trace simulator
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestTraceReplay:
+
+    def test_load_trace_flattens_and_drops_padding(self, tmp_path):
+        from core.expert_cache import load_trace
+        p = tmp_path / "trace.jsonl"
+        p.write_text(
+            json.dumps({"layer": 0, "ids": [[1, 2], [2, -1]]}) + "\n\n"
+            + json.dumps({"layer": 3, "ids": [4]}) + "\n"
+        )
+        assert load_trace(str(p)) == [(0, {1: 1, 2: 2}), (3, {4: 1})]
+
+    def test_per_layer_breakdown(self):
+        from core.expert_cache import replay_trace
+        trace = [(0, {1: 1}), (1, {1: 1}), (0, {1: 1})]
+        r = replay_trace(trace, "lru", 2)
+        assert r["per_layer"][0]["hit_rate"] == 0.5
+        assert r["per_layer"][1]["hit_rate"] == 0.0
+        assert r["calls"] == 3 and r["staged_experts"] == 2
+
+    def test_online_policies_beat_stale_static_set(self):
+        from core.expert_cache import replay_trace, static_hot_sets
+        trace = _shifting_trace()
+        hot = static_hot_sets(trace[:100], 6)   # profiled before the shift
+        static = replay_trace(trace, "static", 6, hot_sets=hot)["hit_rate"]
+        arc = replay_trace(trace, "arc", 6)["hit_rate"]
+        lfu = replay_trace(trace, "lfu", 6, half_life=16)["hit_rate"]
+        assert arc > static + 0.2
+        assert lfu > static + 0.2
+
+    def test_lru_thrashes_on_one_off_experts(self):
+        from core.expert_cache import replay_trace
+        trace = _shifting_trace()
+        assert replay_trace(trace, "lru", 6)["hit_rate"] < replay_trace(trace, "arc", 6)["hit_rate"] - 0.2
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Slot cache on tensors
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestExpertSlotCache:
+
+    @pytest.fixture
+    def masters(self):
+        torch = pytest.importorskip("torch")
+        return {
+            "w13": torch.arange(16 * 6, dtype=torch.float32).reshape(16, 2, 3),
+            "w2": torch.arange(16 * 4, dtype=torch.float16).reshape(16, 4),
+        }
+
+    def test_prepare_remaps_to_filled_slots(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=4, device="cpu")
+        topk = torch.tensor([[3, 7], [7, 11]])
+        slots = cache.prepare(topk)
+        for e, s in zip(topk.reshape(-1).tolist(), slots.reshape(-1).tolist()):
+            assert torch.equal(cache.slots["w13"][s], masters["w13"][e])
+            assert torch.equal(cache.slots["w2"][s], masters["w2"][e])
+
+    def test_misses_staged_in_one_transfer(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=4, device="cpu")
+        cache.prepare(torch.tensor([[0, 1], [2, 3]]))
+        assert cache.stats()["transfers"] == 1
+        per_expert = 6 * 4 + 4 * 2
+        assert cache.stats()["bytes_staged"] == 4 * per_expert
+        cache.prepare(torch.tensor([[0, 1]]))
+        st = cache.stats()
+        assert st["transfers"] == 1 and st["hits"] == 2 and st["hit_rate"] == pytest.approx(2 / 6, abs=1e-3)
+
+    def test_eviction_reuses_slots(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=2, device="cpu", policy="lru")
+        cache.prepare(torch.tensor([0, 1]))
+        slots = cache.prepare(torch.tensor([5, 6]))
+        assert sorted(slots.tolist()) == [0, 1]
+        assert cache.slot_of[0].item() == -1
+        assert torch.equal(cache.slots["w13"][slots[0]], masters["w13"][5])
+
+    def test_padding_ids_pass_through(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=2, device="cpu")
+        out = cache.prepare(torch.tensor([4, -1]))
+        assert out[1].item() == -1
+
+    def test_fixed_rows_bypass_the_policy(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cold = [e for e in range(16) if e not in (0, 1)]
+        cache = ExpertSlotCache(
+            {k: v[2:] for k, v in masters.items()}, capacity=2, device="cpu",
+            fixed={k: v[:2] for k, v in masters.items()}, fixed_ids=[0, 1],
+            num_experts=16, master_rows={e: i for i, e in enumerate(cold)},
+        )
+        assert cache.slots["w13"].shape[0] == 4
+        topk = torch.tensor([[0, 9], [1, 12]])
+        slots = cache.prepare(topk)
+        assert slots[0, 0].item() == 0 and slots[1, 0].item() == 1
+        for e, s in zip(topk.reshape(-1).tolist(), slots.reshape(-1).tolist()):
+            assert torch.equal(cache.slots["w13"][s], masters["w13"][e])
+        assert cache.stats()["misses"] == 2 and 0 in cache and 9 in cache
+
+    def test_split_keeps_each_chunk_within_capacity(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=2, device="cpu")
+        assert cache.split(torch.tensor([[1, 2], [2, 1]])) == [(0, 2)]
+        assert cache.split(torch.tensor([[1, 2], [3, 4], [4, -1]])) == [(0, 1), (1, 3)]
+        with pytest.raises(RuntimeError):
+            cache.split(torch.tensor([[1, 2, 3]]))
+
+    def test_overflow_raises(self, masters):
+        torch = pytest.importorskip("torch")
+        from core.expert_cache import ExpertSlotCache
+        cache = ExpertSlotCache(masters, capacity=2, device="cpu")
+        with pytest.raises(RuntimeError):
+            cache.prepare(torch.tensor([1, 2, 3]))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# expert_pinning "cache" staging mode
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPinningCacheMode:
+
+    def _layer(self, torch, num_experts=8):
+        """Layer with hot experts 0-3 mirrored like ``_post_load_mirror_cold``."""
+        layer = torch.nn.Module()
+        layer.layer_id = 0
+        layer.top_k = 2
+        layer.w13_weight = torch.nn.Parameter(
+            torch.arange(num_experts * 4, dtype=torch.float32).reshape(num_experts, 2, 2),
+            requires_grad=False)
+        layer.w2_weight = torch.nn.Parameter(
+            torch.arange(num_experts * 2, dtype=torch.float32).reshape(num_experts, 2),
+            requires_grad=False)
+        full = {"w13": layer.w13_weight.detach().clone(), "w2": layer.w2_weight.detach().clone()}
+        cold_ids = list(range(4, num_experts))
+        state = {
+            "cold_ids": cold_ids,
+            "cold_remap": {e: i for i, e in enumerate(cold_ids)},
+            "w13_cold": full["w13"][4:].clone(),
+            "w2_cold": [r.clone() for r in full["w2"][4:]],   # lease-view style
+            "w13_scale_cold": None,
+            "w2_scale_cold": None,
+            "num_experts": num_experts,
+            "cache": None,
+            "cache_stats": None,
+            "prefetched": set(),
+            "prefetch_event": None,
+        }
+        return layer, state, full
+
+    @staticmethod
+    def _kernel(torch):
+        """Stand-in MoE kernel: gathers the w13 rows of the (remapped) ids."""
+        calls = []
+
+        def apply(method, layer, x, topk_weights, topk_ids, shared):
+            calls.append(topk_ids.clone())
+            return layer.w13_weight[topk_ids].reshape(topk_ids.shape[0], -1) + x
+        return apply, calls
+
+    def _install(self, monkeypatch, ep, layer, state, slots=2):
+        monkeypatch.setattr(ep, "_STAGING_MODE", "cache")
+        monkeypatch.setattr(ep, "_CACHE_POLICY", "lru")
+        monkeypatch.setattr(ep, "_CACHE_SLOTS", slots)
+        monkeypatch.setattr(ep, "_PREFETCH_STREAM", None)
+        monkeypatch.setattr(ep, "_STATS", dict(ep._STATS))
+        monkeypatch.setattr(ep, "_LAYER_STATE", {0: state})
+        ep._install_slot_cache(layer, state, [0, 1, 2, 3])
+
+    def test_cold_rows_dropped_and_ids_remapped(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.expert_pinning as ep
+
+        layer, state, full = self._layer(torch)
+        self._install(monkeypatch, ep, layer, state)
+        # 4 hot rows + 2 slots instead of 8 experts
+        assert layer.w13_weight.shape[0] == 6 and layer.w2_weight.shape[0] == 6
+        assert ep._slot_cache(layer) is state["cache"]
+
+        apply, calls = self._kernel(torch)
+        topk = torch.tensor([[0, 5], [6, 5]])
+        x = torch.zeros(2, 1)
+        out = ep._apply_cached(apply, None, layer, state["cache"], x, None, topk, None)
+        assert torch.equal(out, full["w13"][topk].reshape(2, -1))
+        assert int(calls[0].max()) < 6
+        assert torch.equal(layer.w2_weight[state["cache"].slot_of[6]], full["w2"][6])
+        assert ep._STATS["cold_experts_streamed"] == 2
+        assert ep._STATS["staged_batches"] == 1
+
+        ep._apply_cached(apply, None, layer, state["cache"], x[:1], None,
+                         torch.tensor([[5, 6]]), None)
+        stats = ep.get_runtime_stats()
+        assert stats["staged_batches"] == 1
+        assert stats["cold_cache_hits"] == 2
+        assert stats["cache_hit_rate_per_layer"] == {0: 0.5}
+
+    def test_batch_over_slot_count_runs_in_chunks(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.expert_pinning as ep
+
+        layer, state, full = self._layer(torch)
+        self._install(monkeypatch, ep, layer, state)
+        apply, calls = self._kernel(torch)
+        topk = torch.tensor([[4, 5], [0, 5], [6, 7], [7, 1]])
+        x = torch.arange(4, dtype=torch.float32).reshape(4, 1)
+        out = ep._apply_cached(apply, None, layer, state["cache"], x, torch.ones(4, 2),
+                               topk, None)
+        assert state["cache"].split(topk) == [(0, 2), (2, 4)]
+        assert len(calls) == 2
+        assert torch.equal(out, full["w13"][topk].reshape(4, -1) + x)
+
+    def test_prefetch_fills_next_layer_slots(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.expert_pinning as ep
+        from core.expert_prefetch import CooccurrencePredictor
+
+        l0, s0, _ = self._layer(torch)
+        l1, s1, full1 = self._layer(torch)
+        l1.layer_id = 1
+        s1["ref"] = (lambda obj: (lambda: obj))(l1)
+        self._install(monkeypatch, ep, l1, s1)
+        monkeypatch.setattr(ep, "_LAYER_STATE", {0: s0, 1: s1})
+        pred = CooccurrencePredictor(top_n=2)
+        pred.observe(0, {5: 1}, {6: 1, 7: 1})
+        monkeypatch.setattr(ep, "_PREDICTOR", pred)
+        monkeypatch.setattr(ep, "_PREFETCH_KIND", "cooc")
+        monkeypatch.setattr(ep, "_LAST_ROUTED", None)
+
+        ep._prefetch_next_layer(l0, torch.tensor([[0, 5]]))
+        cache = s1["cache"]
+        assert s1["prefetched"] == {6, 7} and 6 in cache and 7 in cache
+        assert l1.w13_weight.shape[0] == 6
+
+        apply, _ = self._kernel(torch)
+        out = ep._apply_cached(apply, None, l1, cache, torch.zeros(1, 1), None,
+                               torch.tensor([[6, 7]]), None)
+        assert torch.equal(out, full1["w13"][[6, 7]].reshape(1, -1))
+        stats = ep.get_runtime_stats()
+        assert stats["prefetch_useful"] == 2 and stats["cold_cache_hits"] == 2
+        assert stats["cold_experts_streamed"] == 0
+
+
+__all__ = [
+    "TestPolicies",
+    "TestTraceReplay",
+    "TestExpertSlotCache",
+    "TestPinningCacheMode",
+]
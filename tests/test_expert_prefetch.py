@@ -0,0 +1,251 @@
+"""Tests for cross-layer expert prediction and prefetch (core.expert_prefetch)."""
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _clustered_trace(layers=4, experts=32, steps=300, clusters=4, noise=0.0, seed=0):
+    """Each step picks a token cluster; every layer routes to that cluster's experts."""
+    rng = random.Random(seed)
+    table = {(c, l): rng.sample(range(experts), 2) for c in range(clusters) for l in range(layers)}
+    trace = []
+    for _ in range(steps):
+        c = rng.randrange(clusters)
+        for layer in range(layers):
+            ids = list(table[(c, layer)])
+            if rng.random() < noise:
+                ids[1] = rng.randrange(experts)
+            trace.append((layer, dict(Counter(ids))))
+    return trace
+
+
+class _Oracle:
+    """Predicts exactly what the next trace entry routes to."""
+
+    def __init__(self, trace):
+        self._next = {i: trace[i + 1][1] for i in range(len(trace) - 1)}
+        self._i = -1
+
+    def observe(self, layer, routed, next_routed):
+        pass
+
+    def predict(self, layer, routed, top_n=None):
+        self._i += 1
+        return list(self._next.get(self._i, {}))
+
+
+class _Never:
+    def observe(self, *a):
+        pass
+
+    def predict(self, *a):
+        return []
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Predictors
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestCooccurrencePredictor:
+
+    def test_learns_cross_layer_pairs(self):
+        from core.expert_prefetch import CooccurrencePredictor
+        pred = CooccurrencePredictor(top_n=2)
+        for _ in range(5):
+            pred.observe(0, {1: 1, 2: 1}, {7: 1, 8: 1})
+            pred.observe(0, {3: 1}, {9: 1})
+        assert set(pred.predict(0, {1: 3})) == {7, 8}
+        assert pred.predict(0, {3: 1}, top_n=1) == [9]
+
+    def test_token_share_weights_rows(self):
+        from core.expert_prefetch import CooccurrencePredictor
+        pred = CooccurrencePredictor(top_n=1)
+        pred.observe(0, {1: 1}, {7: 1})
+        pred.observe(0, {2: 1}, {8: 1})
+        assert pred.predict(0, {1: 10, 2: 1}) == [7]
+        assert pred.predict(0, {1: 1, 2: 10}) == [8]
+
+    def test_unknown_rows_fall_back_to_next_layer_prior(self):
+        from core.expert_prefetch import CooccurrencePredictor
+        pred = CooccurrencePredictor(top_n=2)
+        pred.observe(0, {1: 1}, {5: 1})
+        pred.observe(0, {2: 1}, {5: 1, 6: 1})
+        assert pred.predict(0, {42: 1}) == [5, 6]
+        assert pred.predict(3, {1: 1}) == []
+
+    def test_from_trace_only_pairs_adjacent_layers(self):
+        from core.expert_prefetch import CooccurrencePredictor
+        trace = [(0, {1: 1}), (1, {4: 1}), (3, {9: 1}), (0, {1: 1}), (1, {4: 1})]
+        pred = CooccurrencePredictor.from_trace(trace, top_n=1)
+        assert pred.predict(0, {1: 1}) == [4]
+        assert pred.predict(1, {4: 1}) == []
+
+
+class TestLinearProbePredictor:
+
+    def test_probe_learns_linear_routing(self):
+        torch = pytest.importorskip("torch")
+        from core.expert_prefetch import LinearProbePredictor
+        torch.manual_seed(0)
+        dim, experts = 16, 8
+        centers = torch.randn(4, dim) * 3
+        target = {c: [2 * c, 2 * c + 1] for c in range(4)}
+        probe = LinearProbePredictor(experts, top_n=2, lr=0.1)
+        for step in range(400):
+            c = step % 4
+            x = centers[c] + 0.1 * torch.randn(3, dim)
+            probe.observe(0, x, target[c])
+        for c in range(4):
+            x = centers[c] + 0.1 * torch.randn(2, dim)
+            assert set(probe.predict(0, x)) == set(target[c])
+
+    def test_unseen_layer_predicts_nothing(self):
+        torch = pytest.importorskip("torch")
+        from core.expert_prefetch import LinearProbePredictor
+        assert LinearProbePredictor(8).predict(5, torch.zeros(1, 4)) == []
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Trace replay
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestReplayPrefetch:
+
+    def test_correlated_trace_is_predicted_and_stall_drops(self):
+        from core.expert_prefetch import CooccurrencePredictor, replay_prefetch
+        trace = _clustered_trace(noise=0.05)
+        r = replay_prefetch(trace, CooccurrencePredictor(top_n=4), capacity=2,
+                            compute_ms=2.0, copy_ms=0.25)
+        assert r["recall"] > 0.8
+        assert r["precision"] > 0.3
+        assert r["stall_saved_pct"] > 60
+        assert r["prefetch_wasted"] == r["prefetch_issued"] - r["prefetch_useful"]
+
+    def test_oracle_hides_all_misses_when_compute_covers_copies(self):
+        from core.expert_cache import replay_trace
+        from core.expert_prefetch import replay_prefetch
+        trace = _clustered_trace(noise=0.3)
+        r = replay_prefetch(trace, _Oracle(trace), capacity=2, compute_ms=10.0)
+        # Layer 0 of each token has no previous layer to predict from
+        layer0 = replay_trace(trace, "arc", 2)["per_layer"][0]["misses"]
+        assert r["stall_ms_prefetch"] == pytest.approx(layer0 * 0.25)
+        assert r["recall"] == 1.0
+
+    def test_no_prediction_changes_nothing(self):
+        from core.expert_prefetch import replay_prefetch
+        trace = _clustered_trace()
+        r = replay_prefetch(trace, _Never(), capacity=2)
+        assert r["stall_ms_saved"] == 0
+        assert r["recall"] == 0.0 and r["prefetch_issued"] == 0
+
+    def test_prefetch_overflowing_compute_window_stalls(self):
+        from core.expert_prefetch import replay_prefetch
+        trace = _clustered_trace()
+        r = replay_prefetch(trace, _Oracle(trace), capacity=2, compute_ms=0.0, copy_ms=1.0)
+        # Copies cannot overlap anything: prefetch cost >= baseline
+        assert r["stall_ms_prefetch"] >= r["stall_ms_baseline"]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# expert_pinning integration (CPU tensors, no stream)
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPinningPrefetch:
+
+    def _layer_state(self, torch, layer_id, num_experts=8):
+        layer = torch.nn.Module()
+        layer.layer_id = layer_id
+        layer.w13_weight = torch.zeros(num_experts, 2, 2)
+        layer.w2_weight = torch.zeros(num_experts, 2)
+        cold_ids = list(range(4, 8))
+        hot_mask = torch.zeros(num_experts, dtype=torch.bool)
+        hot_mask[:4] = True
+        state = {
+            "cold_ids": cold_ids,
+            "cold_remap": {e: i for i, e in enumerate(cold_ids)},
+            "w13_cold": torch.arange(16, dtype=torch.float32).reshape(4, 2, 2) + 1 + layer_id,
+            "w2_cold": torch.arange(8, dtype=torch.float32).reshape(4, 2) + 1 + layer_id,
+            "w13_scale_cold": None,
+            "w2_scale_cold": None,
+            "hot_mask": hot_mask,
+            "num_experts": num_experts,
+            "resident_cold": set(cold_ids),
+            "cache": None,
+            "cache_stats": None,
+            "ref": (lambda obj: (lambda: obj))(layer),
+            "prefetched": set(),
+            "prefetch_event": None,
+        }
+        return layer, state
+
+    def test_next_layer_staged_ahead_and_skipped_on_demand(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.expert_pinning as ep
+        from core.expert_prefetch import CooccurrencePredictor
+
+        l0, s0 = self._layer_state(torch, 0)
+        l1, s1 = self._layer_state(torch, 1)
+        pred = CooccurrencePredictor(top_n=2)
+        pred.observe(0, {0: 1, 5: 1}, {6: 1, 7: 1})
+        monkeypatch.setattr(ep, "_STAGING_MODE", "stream_every")
+        monkeypatch.setattr(ep, "_PREFETCH_STREAM", None)
+        monkeypatch.setattr(ep, "_PREDICTOR", pred)
+        monkeypatch.setattr(ep, "_PREFETCH_KIND", "cooc")
+        monkeypatch.setattr(ep, "_LAST_ROUTED", None)
+        monkeypatch.setattr(ep, "_STATS", dict(ep._STATS))
+        monkeypatch.setattr(ep, "_LAYER_STATE", {0: s0, 1: s1})
+
+        ep._prefetch_next_layer(l0, torch.tensor([[0, 5]]))
+        assert s1["prefetched"] == {6, 7}
+        assert torch.equal(l1.w13_weight[6], s1["w13_cold"][2])
+        assert ep._STATS["prefetch_issued"] == 2
+
+        ep._stage_cold_for_call(l1, torch.tensor([[6, 4]]))
+        stats = ep.get_runtime_stats()
+        assert stats["prefetch_useful"] == 1
+        assert stats["prefetch_precision"] == 0.5
+        assert stats["cold_experts_streamed"] == 1  # only expert 4 on demand
+        assert s1["prefetched"] == set()
+
+    def test_predictor_learns_from_consecutive_layers(self, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.expert_pinning as ep
+        from core.expert_prefetch import CooccurrencePredictor
+
+        l0, s0 = self._layer_state(torch, 0)
+        l1, s1 = self._layer_state(torch, 1)
+        pred = CooccurrencePredictor(top_n=1)
+        monkeypatch.setattr(ep, "_PREFETCH_STREAM", None)
+        monkeypatch.setattr(ep, "_PREDICTOR", pred)
+        monkeypatch.setattr(ep, "_PREFETCH_KIND", "cooc")
+        monkeypatch.setattr(ep, "_LAST_ROUTED", None)
+        monkeypatch.setattr(ep, "_STATS", dict(ep._STATS))
+        monkeypatch.setattr(ep, "_LAYER_STATE", {0: s0, 1: s1})
+
+        ep._prefetch_next_layer(l0, torch.tensor([5]))
+        ep._prefetch_next_layer(l1, torch.tensor([7]))
+        assert pred.predict(0, {5: 1}) == [7]
+
+    def test_prefetch_disabled_outside_streaming_modes(self, monkeypatch):
+        import core.expert_pinning as ep
+        monkeypatch.setenv("VRM_EP_PREFETCH", "cooc")
+        monkeypatch.setattr(ep, "_STAGING_MODE", "warmup")
+        assert ep._make_predictor(8) is None
+        monkeypatch.setattr(ep, "_STAGING_MODE", "cache")
+        monkeypatch.setattr(ep, "_PREFETCH_KIND", "")
+        assert ep._make_predictor(8) is not None
+
+
+__all__ = [
+    "TestCooccurrencePredictor",
+    "TestLinearProbePredictor",
+    "TestReplayPrefetch",
+    "TestPinningPrefetch",
+]
@@ -0,0 +1,147 @@
+"""Tests for the lazily decayed hotness index of HierarchicalMemoryManager."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _Clock:
+    def __init__(self, t=1_000_000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import experimental.hierarchical_memory as hm
+    c = _Clock()
+    monkeypatch.setattr(hm.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def hmem(tmp_path, clock):
+    from experimental.hierarchical_memory import HierarchicalMemoryManager
+    return HierarchicalMemoryManager(nvme_dir=str(tmp_path / "nvme"), decay_half_life_s=60.0)
+
+
+def _blocks(hmem, n, tier="L1", prefix="b"):
+    from core.memory_block import MemoryBlock
+    out = []
+    for i in range(n):
+        b = MemoryBlock(id=f"{prefix}{i}", size_mb=1, gpu_id=0)
+        hmem.register_block(b, tier)
+        out.append(b)
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Lazy decay + per-tier index
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestHotnessIndex:
+
+    def test_old_burst_colder_than_recent_single_touch(self, hmem, clock):
+        a, b = _blocks(hmem, 2)
+        for _ in range(5):
+            hmem.touch(a)
+        clock.t += 300  # five half-lives
+        hmem.touch(b)
+        assert hmem.hotness(a.id) == pytest.approx(5 * 0.5 ** 5)
+        assert hmem.hotness(b.id) == pytest.approx(1.0)
+        assert hmem._coldest(("L1",), 1) == [a.id]
+
+    def test_order_matches_decayed_scores(self, hmem, clock):
+        import random
+        rng = random.Random(0)
+        blocks = _blocks(hmem, 50)
+        for _ in range(400):
+            clock.t += rng.random() * 10
+            hmem.touch(rng.choice(blocks))
+        now = clock.t + 5
+        ref = sorted(blocks, key=lambda b: hmem.hotness(b.id, now))
+        got = hmem._coldest(("L1",), 10)
+        assert [hmem.hotness(bid, now) for bid in got] == pytest.approx(
+            [hmem.hotness(b.id, now) for b in ref[:10]])
+
+    def test_untouched_blocks_are_coldest(self, hmem):
+        hot, cold = _blocks(hmem, 2)
+        hmem.touch(hot)
+        assert hmem._coldest(("L1",), 2) == [cold.id, hot.id]
+
+    def test_selection_is_non_destructive(self, hmem):
+        _blocks(hmem, 5)
+        assert hmem._coldest(("L1",), 3) == hmem._coldest(("L1",), 3)
+
+    def test_coldest_merges_tiers(self, hmem):
+        l1 = _blocks(hmem, 3, "L1", "x")
+        l2 = _blocks(hmem, 3, "L2", "y")
+        for b in l1:
+            hmem.touch(b)
+        assert set(hmem._coldest(("L1", "L2"), 3)) == {b.id for b in l2}
+
+    def test_migration_moves_block_between_tier_indexes(self, hmem):
+        a, b = _blocks(hmem, 2)
+        hmem.migrate(a, "L3")
+        assert hmem.tier_count("L1") == 1 and hmem.tier_count("L3") == 1
+        assert hmem._coldest(("L1",), 5) == [b.id]
+        assert hmem._coldest(("L3",), 5) == [a.id]
+
+    def test_repeated_touches_keep_heap_bounded(self, hmem):
+        blocks = _blocks(hmem, 10)
+        for _ in range(5000):
+            hmem.touch(blocks[0])
+        assert len(hmem._tier_heap["L1"]) <= 2 * 10 + 64
+
+    def test_load_state_rebuilds_index(self, hmem, tmp_path, clock):
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        a, b = _blocks(hmem, 2)
+        hmem.touch(b)
+        path = str(tmp_path / "state.json")
+        hmem.save_state(path)
+        fresh = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "nvme2"))
+        assert fresh.load_state(path)
+        assert fresh.tier_count("L1") == 2
+        assert fresh._coldest(("L1",), 2) == [a.id, b.id]
+
+    def test_update_all_scores_materialises_same_decay(self, hmem, clock):
+        (a,) = _blocks(hmem, 1)
+        hmem.touch(a)
+        hmem.touch(a)
+        clock.t += 60
+        hmem.update_all_scores(clock.t)
+        assert hmem._hot_scores[a.id] == pytest.approx(1.0)
+        assert hmem.hotness(a.id) == pytest.approx(1.0)
+
+
+class TestEvictionCycle:
+
+    def test_evicts_coldest_fraction(self, hmem):
+        blocks = _blocks(hmem, 10)
+        for i, b in enumerate(blocks):
+            for _ in range(i):
+                hmem.touch(b)
+        evicted = hmem.eviction_cycle()
+        assert [bid for bid, *_ in evicted] == ["b0", "b1"]
+        assert hmem.tier_count("L1") == 8 and hmem.tier_count("L2") == 2
+
+    def test_does_not_rescore_every_block(self, hmem, monkeypatch):
+        _blocks(hmem, 10)
+
+        def boom(*a, **k):
+            raise AssertionError("eviction must not rescan all blocks")
+        monkeypatch.setattr(hmem, "update_all_scores", boom)
+        assert len(hmem.eviction_cycle(vram_pressure=0.95)) == 4
+
+
+__all__ = [
+    "TestHotnessIndex",
+    "TestEvictionCycle",
+]
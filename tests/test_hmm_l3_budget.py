@@ -0,0 +1,185 @@
+"""Tests for the byte-accounted L3 budget and pressure balancer of HierarchicalMemoryManager."""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+KB = 1024
+
+
+class _SimAllocator:
+    """Hands out host tensors of a given size and registers them with the manager."""
+
+    def __init__(self, hmem):
+        self.hmem = hmem
+        self.n = 0
+
+    def alloc(self, nbytes, tier="L3"):
+        from core.memory_block import MemoryBlock
+        b = MemoryBlock(id=f"sim-{self.n}", size_mb=nbytes / (1024 * 1024))
+        self.n += 1
+        self.hmem.register_block(b, tier, tensor=torch.zeros(nbytes, dtype=torch.uint8))
+        return b
+
+
+def _wait(pred, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.005)
+    return pred()
+
+
+@pytest.fixture
+def hmem(tmp_path, monkeypatch):
+    monkeypatch.setenv("VRM_L3_HIGH_WM", "0.9")
+    monkeypatch.setenv("VRM_L3_LOW_WM", "0.5")
+    from experimental.hierarchical_memory import HierarchicalMemoryManager
+    hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "nvme"),
+                                   l3_budget_mb=1.0)  # 1 MiB: high 921 KB, low 512 KB
+    yield hm
+    hm.stop_balancer()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Byte accounting
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestL3Accounting:
+
+    def test_register_and_migrate_update_bytes(self, hmem):
+        sim = _SimAllocator(hmem)
+        a = sim.alloc(100 * KB)
+        sim.alloc(50 * KB, tier="L1")
+        assert hmem._l3_bytes == 100 * KB
+        hmem.migrate(a, "L5")
+        assert hmem._l3_bytes == 0
+        hmem.migrate(a, "L3")
+        assert hmem._l3_bytes == 100 * KB
+
+    def test_touch_does_not_double_count(self, hmem):
+        sim = _SimAllocator(hmem)
+        a = sim.alloc(64 * KB)
+        for _ in range(10):
+            hmem.touch(a)
+        assert hmem._l3_bytes == 64 * KB
+
+    def test_tensorless_blocks_count_size_mb(self, hmem):
+        from core.memory_block import MemoryBlock
+        hmem.register_block(MemoryBlock(id="meta", size_mb=0.25), "L3")
+        assert hmem._l3_bytes == 256 * KB
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Watermarks + async spill
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestL3Balancer:
+
+    def test_crossing_high_watermark_spills_to_low_immediately(self, hmem):
+        sim = _SimAllocator(hmem)
+        blocks = [sim.alloc(100 * KB) for _ in range(9)]   # 900 KB, under high
+        for b in blocks[4:]:
+            hmem.touch(b)                                  # 0-3 stay cold
+        time.sleep(0.05)
+        assert hmem.summary()["l3"]["spills"] == 0
+        sim.alloc(100 * KB)                                # 1000 KB > high
+        assert _wait(lambda: hmem._l3_bytes <= hmem._l3_low)
+        l3 = hmem.summary()["l3"]
+        # Exactly enough: 1000 KB -> <= 512 KB takes 5 blocks of 100 KB, not more
+        assert l3["spills"] == 5 and l3["spilled_bytes"] == 500 * KB
+        assert l3["high_wm_events"] == 1
+        spilled = {b.id for b in blocks if hmem.get_tier(b.id) == "L5"}
+        assert {b.id for b in blocks[:4]} <= spilled      # coldest went first
+
+    def test_spilled_blocks_reload_intact(self, hmem):
+        sim = _SimAllocator(hmem)
+        blocks = [sim.alloc(200 * KB) for _ in range(5)]
+        assert _wait(lambda: hmem._l3_bytes <= hmem._l3_low)
+        gone = [b for b in blocks if hmem.get_tier(b.id) == "L5"]
+        assert gone
+        out = hmem.load_from_nvme(gone[0])
+        assert out.numel() == 200 * KB and hmem.get_tier(gone[0].id) == "L3"
+
+    def test_burst_never_runs_away(self, hmem):
+        sim = _SimAllocator(hmem)
+        for _ in range(200):
+            sim.alloc(16 * KB)
+        assert _wait(lambda: hmem._l3_bytes <= hmem._l3_low)
+        assert hmem._l3_bytes > hmem._l3_low - 16 * KB   # did not over-spill
+
+    def test_victims_chosen_under_lock_spilled_outside(self, hmem):
+        hm = hmem
+        hm.stop_balancer()
+        time.sleep(0.05)
+        sim = _SimAllocator(hm)
+        for _ in range(10):
+            sim.alloc(100 * KB)
+        held = []
+        coldest, spill = hm._coldest, hm.spill_to_nvme
+        hm._coldest = lambda tiers, k: held.append(("pick", hm._lock.locked())) or coldest(tiers, k)
+        hm.spill_to_nvme = lambda b, t: held.append(("io", hm._lock.locked())) or spill(b, t)
+        assert hm._spill_l3_excess() == 500 * KB
+        assert ("pick", True) in held and ("io", True) not in held
+        assert hm._l3_bytes <= hm._l3_low
+
+    def test_no_budget_never_spills(self, tmp_path):
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "n2"), l3_budget_mb=1.0)
+        hm._l3_budget = 0
+        try:
+            sim = _SimAllocator(hm)
+            for _ in range(20):
+                sim.alloc(100 * KB)
+            assert hm._spill_l3_excess() == 0
+        finally:
+            hm.stop_balancer()
+
+
+class TestPSI:
+
+    def test_read_psi_parses_some_avg10(self, hmem, tmp_path):
+        p = tmp_path / "memory"
+        p.write_text("some avg10=12.50 avg60=3.00 avg300=1.00 total=1\n"
+                     "full avg10=2.00 avg60=0.00 avg300=0.00 total=1\n")
+        hmem._psi_path = str(p)
+        assert hmem._read_psi() == 12.5
+        hmem._psi_path = str(tmp_path / "missing")
+        assert hmem._read_psi() is None
+
+    def test_psi_pressure_spills_below_high_watermark(self, tmp_path, monkeypatch):
+        psi = tmp_path / "memory"
+        psi.write_text("some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+        monkeypatch.setenv("VRM_L3_LOW_WM", "0.5")
+        monkeypatch.setenv("VRM_PSI_THRESHOLD", "10")
+        monkeypatch.setenv("VRM_PSI_POLL_S", "0.01")
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "n3"), l3_budget_mb=1.0)
+        hm._psi_path = str(psi)
+        try:
+            sim = _SimAllocator(hm)
+            for _ in range(8):
+                sim.alloc(100 * KB)                    # 800 KB: under high (921 KB)
+            time.sleep(0.05)
+            assert hm._l3_bytes == 800 * KB
+            psi.write_text("some avg10=42.00 avg60=5.00 avg300=1.00 total=9\n")
+            assert _wait(lambda: hm._l3_bytes <= hm._l3_low)
+            assert hm.summary()["l3"]["psi_events"] >= 1
+        finally:
+            hm.stop_balancer()
+
+
+__all__ = [
+    "TestL3Accounting",
+    "TestL3Balancer",
+    "TestPSI",
+]
@@ -0,0 +1,207 @@
+"""Tests for the shared host staging arena (core.host_arena)."""
+import gc
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+KB = 1024
+
+
+@pytest.fixture
+def arena():
+    from core.host_arena import HostArena
+    return HostArena(cap_bytes=256 * KB, pin=False)
+
+
+class _Event:
+    def __init__(self):
+        self.done = False
+
+    def query(self):
+        return self.done
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Size classes + leases
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestSizeClasses:
+
+    @pytest.mark.parametrize("n,cls", [
+        (0, 4096), (1, 4096), (4096, 4096), (4097, 5120), (5120, 5120),
+        (6000, 6144), (8192, 8192), (8193, 10240), (1_000_000, 1_048_576),
+    ])
+    def test_classes(self, n, cls):
+        from core.host_arena import size_class
+        assert size_class(n) == cls
+
+    def test_waste_bounded(self):
+        from core.host_arena import size_class
+        for n in range(4097, 200_000, 997):
+            assert n <= size_class(n) < n * 1.25 + 1
+
+
+class TestLeases:
+
+    def test_release_then_reuse_same_buffer(self, arena):
+        a = arena.acquire(10 * KB)
+        ptr = a.buffer.data_ptr()
+        a.release()
+        b = arena.acquire(9 * KB)          # same class (10 KB)
+        assert b.buffer.data_ptr() == ptr
+        st = arena.stats()
+        assert (st["leases"], st["reused"], st["allocated"]) == (2, 1, 1)
+        assert st["reuse_rate"] == 0.5
+
+    def test_refcount(self, arena):
+        a = arena.acquire(8 * KB)
+        a.retain()
+        a.release()
+        assert arena.stats()["bytes_cached"] == 0
+        a.release()
+        assert arena.stats()["bytes_cached"] == 8 * KB
+        a.release()                        # extra release is a no-op
+        assert arena.stats()["bytes_cached"] == 8 * KB
+        with pytest.raises(RuntimeError):
+            a.retain()
+
+    def test_typed_view_and_context_manager(self, arena):
+        src = torch.arange(12, dtype=torch.float32).reshape(3, 4)
+        with arena.acquire(src.numel() * 4) as lease:
+            v = lease.view((3, 4), torch.float32)
+            v.copy_(src)
+            assert torch.equal(v, src)
+        del v
+        assert arena.stats()["bytes_leased"] == 0
+
+    def test_live_view_blocks_reuse(self, arena):
+        a = arena.acquire(4 * KB)
+        keep = a.view((KB,), torch.float32)
+        keep.fill_(7)
+        a.release()
+        b = arena.acquire(4 * KB)
+        assert b.buffer.data_ptr() != a.buffer.data_ptr()
+        assert torch.all(keep == 7)
+        assert arena.stats()["busy_skips"] >= 1
+        del keep
+        b.release()
+        c = arena.acquire(4 * KB)
+        assert c.buffer.data_ptr() in (a.buffer.data_ptr(), b.buffer.data_ptr())
+
+    def test_event_defers_reuse(self, arena):
+        a = arena.acquire(4 * KB)
+        ev = _Event()
+        a.release(ev)
+        b = arena.acquire(4 * KB)
+        assert b.buffer.data_ptr() != a.buffer.data_ptr()
+        ev.done = True
+        c = arena.acquire(4 * KB)
+        assert c.buffer.data_ptr() == a.buffer.data_ptr()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Cap, trim, overflow
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestCap:
+
+    def test_cap_trims_free_buffers_then_overflows(self, arena):
+        big = [arena.acquire(64 * KB) for _ in range(4)]      # 256 KB = cap
+        assert arena.stats()["bytes_held"] == 256 * KB
+        over = arena.acquire(16 * KB)
+        assert over.buffer.numel() == 16 * KB
+        assert arena.stats()["overflow"] == 1
+        over.release()
+        assert arena.stats()["bytes_held"] == 256 * KB        # overflow never pooled
+        for b in big[:2]:
+            b.release()
+        small = arena.acquire(16 * KB)                        # trims a cached 64 KB buffer
+        st = arena.stats()
+        assert st["trimmed"] == 1 and st["bytes_held"] <= 256 * KB
+        small.release()
+
+    def test_trim(self, arena):
+        for lease in [arena.acquire(32 * KB) for _ in range(3)]:
+            lease.release()
+        assert arena.trim(keep_bytes=32 * KB) == 64 * KB
+        assert arena.stats()["bytes_cached"] == 32 * KB
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Tensor helpers + call sites
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestTensorHelpers:
+
+    def test_copy_to_host_returns_buffer_when_dropped(self, arena):
+        src = torch.randn(64, 32)
+        host = arena.copy_to_host(src)
+        assert torch.equal(host, src)
+        assert arena.stats()["bytes_leased"] == 8 * KB
+        del host
+        gc.collect()
+        assert arena.stats()["bytes_leased"] == 0
+        again = arena.copy_to_host(src)
+        assert arena.stats()["reused"] == 1
+        assert torch.equal(again, src)
+
+    def test_bf16_and_empty(self, arena):
+        src = torch.randn(5, 3).to(torch.bfloat16)
+        assert torch.equal(arena.copy_to_host(src), src)
+        assert arena.empty((0, 4), torch.float32).shape == (0, 4)
+
+    def test_tensor_to_raw_roundtrip(self):
+        from core.cross_node import raw_to_tensor, tensor_to_raw
+        for t in (torch.randn(3, 4), torch.arange(10, dtype=torch.int64),
+                  torch.randn(2, 2).to(torch.bfloat16)):
+            raw, code, shape, n = tensor_to_raw(t)
+            assert n == t.numel() * t.element_size()
+            assert torch.equal(raw_to_tensor(raw, code, shape), t)
+
+    def test_hmm_host_tensors_pass_through(self, tmp_path):
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path))
+        try:
+            t = torch.ones(4)
+            assert hm._move_gpu_to_cpu(t) is t
+        finally:
+            hm.stop_balancer()
+
+    def test_global_arena_respects_env(self, monkeypatch):
+        import core.host_arena as ha
+        monkeypatch.setattr(ha, "_ARENA", None)
+        monkeypatch.setenv("VRM_HOST_ARENA_MB", "2")
+        arena = ha.get_host_arena()
+        assert arena.cap_bytes == 2 * 1024 * 1024
+        assert ha.get_host_arena() is arena
+        if not torch.cuda.is_available():
+            assert arena.stats()["pinned"] is False
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="needs CUDA")
+class TestPinned:
+
+    def test_pinned_buffers_counted(self):
+        from core.host_arena import HostArena
+        arena = HostArena(cap_bytes=1 << 20, pin=True)
+        src = torch.randn(256, device="cuda")
+        host = arena.copy_to_host(src, stream=torch.cuda.Stream())
+        assert host.is_pinned() and torch.equal(host, src.cpu())
+        assert arena.stats()["bytes_pinned"] == 4 * KB
+
+
+__all__ = [
+    "TestSizeClasses",
+    "TestLeases",
+    "TestCap",
+    "TestTensorHelpers",
+    "TestPinned",
+]
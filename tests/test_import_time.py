@@ -0,0 +1,80 @@
+"""Import-time regression test for the ``vramancer`` CLI subcommands.
+
+Each subcommand runs in a fresh interpreter with ``-X importtime`` and
+without ``VRM_MINIMAL_TEST`` (which would stub torch out), then the
+report is checked against per-subcommand lists of modules that must not
+be loaded and a wall budget for the sum of top-level imports.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_LIGHT = {"torch", "transformers", "numpy", "prometheus_client", "flask", "requests"}
+
+# subcommand -> (modules that must stay unloaded, budget in seconds)
+BUDGETS = {
+    "version": (_LIGHT, 0.5),
+    "history": (_LIGHT, 0.5),
+    # device enumeration needs torch, nothing else heavy
+    "status": ({"transformers", "prometheus_client", "flask", "requests"}, 8.0),
+    # imports the API / backends on purpose, but not transformers
+    "health": ({"transformers"}, 10.0),
+}
+
+
+def _env(tmp_path):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("VRM_")}
+    env.update(PYTHONPATH=ROOT, VRM_HISTORY_DB=str(tmp_path / "history.db"),
+               VRM_DATA_DIR=str(tmp_path))
+    return env
+
+
+def _parse(stderr):
+    """-> (all imported module names, {top-level module: cumulative us})."""
+    modules, top = set(), {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative, name = line.split("|")
+        name = name.rstrip()
+        modules.add(name.strip())
+        if not name.startswith("  "):
+            top[name.strip()] = int(cumulative)
+    return modules, top
+
+
+def _run(args, tmp_path):
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, capture_output=True,
+                          text=True, env=_env(tmp_path), cwd=ROOT, timeout=240)
+    return (proc,) + _parse(proc.stderr)
+
+
+@pytest.mark.parametrize("cmd", sorted(BUDGETS))
+def test_subcommand_import_budget(cmd, tmp_path):
+    forbidden, budget = BUDGETS[cmd]
+    proc, modules, top = _run(["-m", "vramancer.main", cmd], tmp_path)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    loaded = sorted(forbidden & modules)
+    assert not loaded, f"'vramancer {cmd}' imported {loaded}"
+    _, _, startup = _run(["-c", "pass"], tmp_path)      # site, encodings...
+    seconds = sum(us for name, us in top.items() if name not in startup) / 1e6
+    assert seconds < budget, f"'vramancer {cmd}' spent {seconds:.2f}s importing (budget {budget}s)"
+
+
+def test_core_attributes_are_lazy(tmp_path):
+    code = ("import sys, core; assert 'core.utils' not in sys.modules; "
+            "core.get_device_type; assert 'core.utils' in sys.modules; "
+            "assert 'get_device_type' in dir(core)")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          env=_env(tmp_path), cwd=ROOT, timeout=240)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+
+def test_core_unknown_attribute():
+    import core
+    with pytest.raises(AttributeError):
+        core.does_not_exist
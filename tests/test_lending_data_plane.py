@@ -335,6 +335,10 @@ def test_paged_kv_free_releases_borrowed_lease():
     # Create manager bypassing __init__ to avoid torch dependencies
     manager = PagedKVCacheManager.__new__(PagedKVCacheManager)
     manager._lock = __import__('threading').Lock()
+    manager._preempted = {}
+    manager._overflow_slabs = {}
+    manager._spare_page_ids = []
+    manager._slab_releases = 0
     manager._page_tables = {}
     manager._lending_leases = {}
     manager._free_pages = []
@@ -384,6 +388,10 @@ def test_paged_kv_free_no_release_when_not_borrowed():
     # Create manager bypassing __init__
     manager = PagedKVCacheManager.__new__(PagedKVCacheManager)
     manager._lock = __import__('threading').Lock()
+    manager._preempted = {}
+    manager._overflow_slabs = {}
+    manager._spare_page_ids = []
+    manager._slab_releases = 0
     manager._pages = []
     manager._page_tables = {}
     manager._lending_leases = {}
@@ -440,6 +448,10 @@ def test_borrow_overflow_page_phase2_allocates_buffer_when_env_set(monkeypatch):
         device="cuda:0",
     )
     manager._lock = __import__('threading').Lock()
+    manager._preempted = {}
+    manager._overflow_slabs = {}
+    manager._spare_page_ids = []
+    manager._slab_releases = 0
     manager._pages = []
     manager._lending_leases = {}
     manager._overflow_borrows = 0
@@ -493,6 +505,9 @@ def _make_manager_with_pool(num_layers=2, num_kv_heads=4, page_size=8, head_dim=
         device="cuda:0",
     )
     manager._lock = threading.Lock()
+    manager._overflow_slabs = {}
+    manager._spare_page_ids = []
+    manager._slab_releases = 0
     manager._pages = []
     manager._page_tables = {}
     manager._lending_leases = {}
@@ -0,0 +1,283 @@
+"""Tests for online re-placement from live per-layer timings (core.online_placement)."""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.layer_profiler import GPUProfile, LayerProfiler, compute_optimal_placement
+
+
+def _setup(n_layers=16, objective="throughput"):
+    layers = LayerProfiler()._synthetic_profiles(n_layers)
+    gpus = [GPUProfile(g, f"gpu{g}", "cuda", 24000, 20000, 80.0) for g in range(2)]
+    plan = compute_optimal_placement(layers, gpus, 16.0, objective=objective)
+    return layers, gpus, plan
+
+
+def _feed(rebalancer, slowdown, samples=5):
+    """Record timings for the running plan, device ``g`` slowed by ``slowdown[g]``."""
+    for layer, gpu in rebalancer.plan.assignments:
+        for _ in range(samples):
+            rebalancer.timer.record(layer, gpu,
+                                    rebalancer._predicted[(layer, gpu)] * slowdown.get(gpu, 1.0))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# LayerTimer
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestLayerTimer:
+
+    def test_ewma(self):
+        from core.online_placement import LayerTimer
+        timer = LayerTimer(alpha=0.5)
+        for ms in (10.0, 20.0, 20.0):
+            timer.record(3, 0, ms)
+        assert timer.get(3, 0) == pytest.approx(17.5)
+        assert timer.samples(3, 0) == 3
+        assert timer.get(3, 1) is None
+
+    def test_forward_hooks_on_cpu(self):
+        torch = pytest.importorskip("torch")
+        from core.online_placement import CPU_DEVICE, LayerTimer
+        layers = [torch.nn.Linear(8, 8), torch.nn.Linear(8, 8)]
+        timer = LayerTimer(sample_every=2)
+        timer.attach(layers, layer_ids=[5, 6])
+        x = torch.randn(2, 8)
+        for _ in range(6):
+            layers[1](layers[0](x))
+        snap = timer.snapshot()
+        assert set(snap) == {(5, CPU_DEVICE), (6, CPU_DEVICE)}
+        assert timer.samples(5, CPU_DEVICE) == 3
+        timer.detach()
+        layers[0](x)
+        assert timer.samples(5, CPU_DEVICE) == 3
+
+    def test_concurrent_forwards_keep_their_start(self):
+        torch = pytest.importorskip("torch")
+        import threading
+        from core.online_placement import CPU_DEVICE, LayerTimer
+        layer = torch.nn.Linear(2, 2)
+        timer = LayerTimer()
+        pre, post = timer._make_pre(0), timer._make_post(0)
+        pre(layer, ())                               # main thread opens first
+        other = threading.Thread(target=lambda: (pre(layer, ()), post(layer, (), None)))
+        other.start()
+        other.join()
+        post(layer, (), None)
+        assert timer.samples(0, CPU_DEVICE) == 2
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# OnlineRebalancer
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestOnlineRebalancer:
+
+    def test_throttled_gpu_sheds_layers(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup()
+        on_gpu1 = [g for _, g in plan.assignments].count(1)
+        assert 6 <= on_gpu1 <= 10
+        reb = OnlineRebalancer(layers, gpus, plan, transfer_bandwidth_gbps=16.0, cooldown_s=0)
+        _feed(reb, {1: 3.0})
+        assert reb.slowdowns()[1] == pytest.approx(3.0)
+        assert reb.slowdowns()[0] == pytest.approx(1.0)
+        proposal = reb.propose()
+        assert proposal is not None
+        assert all(src == 1 and dst == 0 for _, src, dst in proposal.moves)
+        assert proposal.new_ms < 0.6 * proposal.current_ms
+        # 3x slower GPU should keep about a quarter of the layers
+        kept = [g for _, g in proposal.plan.assignments].count(1)
+        assert 3 <= kept <= 5
+
+    def test_no_drift_no_proposal(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup()
+        reb = OnlineRebalancer(layers, gpus, plan, cooldown_s=0)
+        _feed(reb, {})
+        assert reb.propose() is None
+
+    def test_migration_cost_threshold(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup()
+        reb = OnlineRebalancer(layers, gpus, plan, cooldown_s=0, horizon_requests=1,
+                               migration_bandwidth_gbps=0.01)
+        _feed(reb, {1: 1.5})
+        assert reb.propose() is None
+        reb.horizon_requests = 100_000
+        assert reb.propose() is not None
+
+    def test_needs_enough_samples(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup()
+        reb = OnlineRebalancer(layers, gpus, plan, cooldown_s=0, min_samples=10)
+        _feed(reb, {1: 3.0}, samples=3)
+        assert reb.slowdowns() == {0: 1.0, 1: 1.0}
+        assert reb.propose() is None
+
+    def test_cooldown_after_commit(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup()
+        reb = OnlineRebalancer(layers, gpus, plan, cooldown_s=60)
+        _feed(reb, {1: 3.0})
+        proposal = reb.propose(now=1000.0)
+        reb.commit(proposal, now=1000.0)
+        assert reb.plan is proposal.plan
+        reb.timer.reset()
+        _feed(reb, {0: 4.0})
+        assert reb.propose(now=1030.0) is None
+        assert reb.propose(now=1061.0) is not None
+
+    def test_vram_reclaim_forces_replacement(self):
+        from core.online_placement import OnlineRebalancer
+        layers, gpus, plan = _setup(objective="latency")
+        assert {g for _, g in plan.assignments} == {0}
+        reb = OnlineRebalancer(layers, gpus, plan, cooldown_s=0, horizon_requests=1)
+        reb.update_free_vram(0, 200.0)            # lender reclaimed most of GPU 0
+        proposal = reb.propose()
+        assert proposal is not None
+        used = sum(layers[i].total_memory_mb for i, g in proposal.plan.assignments if g == 0)
+        assert used <= 200.0
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Pipeline integration
+# ═══════════════════════════════════════════════════════════════════════
+
+def _wait(pred, timeout=5.0):
+    deadline = time.time() + timeout
+    while not pred() and time.time() < deadline:
+        time.sleep(0.01)
+    return pred()
+
+
+class _MockTM:
+    def transfer(self, **kwargs):
+        pass
+
+
+def _pipeline(plan):
+    from core.inference_pipeline import InferencePipeline
+    pipe = InferencePipeline(verbose=False, enable_metrics=False)
+    pipe.blocks = [{"gpu_id": g, "layer": f"layer.{i}"} for i, g in plan.assignments]
+    pipe.transfer_manager = _MockTM()
+    return pipe
+
+
+class TestPipelineIntegration:
+
+    def test_migrate_selected_blocks(self):
+        _, _, plan = _setup()
+        pipe = _pipeline(plan)
+        first = next(i for i, g in plan.assignments if g == 1)
+        assert pipe._migrate_blocks(1, 0, block_indices=[first, first + 1]) == 2
+        assert [b["gpu_id"] for b in pipe.blocks[first - 1:first + 3]] == [0, 0, 0, 1]
+
+    def test_applied_between_requests(self):
+        layers, gpus, plan = _setup()
+        pipe = _pipeline(plan)
+        reb = pipe.enable_online_placement(layers, gpus, plan, cooldown_s=0)
+        _feed(reb, {1: 3.0})
+        pipe._enter_request()
+        assert pipe.check_online_placement() is False      # request in flight
+        assert pipe._pending_replacement is not None
+        before = [b["gpu_id"] for b in pipe.blocks]
+        assert before == [g for _, g in plan.assignments]
+        pipe._exit_request()                               # applied on the way out
+        assert pipe._pending_replacement is None
+        assert [b["gpu_id"] for b in pipe.blocks] == [g for _, g in reb.plan.assignments]
+        assert [b["gpu_id"] for b in pipe.blocks].count(1) < before.count(1)
+        assert pipe.online_rebalancer is reb
+
+    def test_partial_migration_starts_cooldown(self):
+        layers, gpus, plan = _setup()
+        pipe = _pipeline(plan)
+        reb = pipe.enable_online_placement(layers, gpus, plan, cooldown_s=60)
+        _feed(reb, {1: 3.0})
+        migrate = pipe._migrate_blocks
+        pipe._migrate_blocks = lambda src, dst, block_indices=None: migrate(
+            src, dst, block_indices=block_indices[:1])
+        assert pipe.check_online_placement() is False
+        assert reb.plan.assignments == [(i, b["gpu_id"]) for i, b in enumerate(pipe.blocks)]
+        assert reb.plan.assignments != plan.assignments
+        assert reb.propose() is None                   # cooling down, no re-migration
+
+    def test_infer_and_batcher_count_as_in_flight(self):
+        from core.continuous_batcher import ContinuousBatcher
+        layers, gpus, plan = _setup()
+        pipe = _pipeline(plan)
+        pipe.enable_online_placement(layers, gpus, plan, cooldown_s=0)
+        pipe._loaded = True
+        seen = []
+        pipe._infer = lambda ids: seen.append(pipe._active_requests)
+        pipe.infer(None)
+        assert seen == [1] and pipe._active_requests == 0
+
+        events = []
+        batcher = ContinuousBatcher(max_batch_size=4)
+        batcher.busy_callback = lambda busy: (events.append(busy), pipe._batcher_busy(busy))
+        batcher.start()
+        try:
+            for f in [batcher.submit(f"p{i}", max_new_tokens=2) for i in range(3)]:
+                try:
+                    f.result(timeout=5)
+                except Exception:
+                    pass
+            assert _wait(lambda: events and events[-1] is False)
+        finally:
+            batcher.stop()
+        assert events[0] is True and all(a != b for a, b in zip(events, events[1:]))
+        assert pipe._active_requests == 0
+
+    def test_module_blocks(self):
+        torch = pytest.importorskip("torch")
+        from types import SimpleNamespace
+        layers, gpus, plan = _setup()
+        pipe = _pipeline(plan)
+        pipe.blocks = [torch.nn.Sequential(torch.nn.Linear(4, 4)) for _ in plan.assignments]
+        pipe.backend = SimpleNamespace(block_devices=[0] * len(pipe.blocks))
+        pipe.transfer_manager = None
+        reb = pipe.enable_online_placement(layers, gpus, plan, cooldown_s=0)
+        assert [b.gpu_id for b in pipe.blocks] == [g for _, g in plan.assignments]
+        assert pipe.backend.block_devices == [g for _, g in plan.assignments]
+        _feed(reb, {1: 3.0})
+        assert pipe.check_online_placement() is True
+        assert [b.gpu_id for b in pipe.blocks] == [g for _, g in reb.plan.assignments]
+        assert pipe.backend.block_devices == [g for _, g in reb.plan.assignments]
+        assert reb.plan.assignments != plan.assignments
+
+    def test_evaluate_placement_rejects_unknown_device(self):
+        from core.layer_profiler import evaluate_placement
+        layers, gpus, plan = _setup()
+        assignments = [(i, None if i == 3 else g) for i, g in plan.assignments]
+        with pytest.raises(ValueError, match="no GPU profile"):
+            evaluate_placement(assignments, layers, gpus, 16.0)
+
+    def test_rebalancing_loop_without_monitor(self):
+        layers, gpus, plan = _setup()
+        pipe = _pipeline(plan)
+        reb = pipe.enable_online_placement(layers, gpus, plan, cooldown_s=0)
+        _feed(reb, {0: 3.0})
+        pipe.start_rebalancing(interval=0.05)
+        try:
+            deadline = time.time() + 5
+            while reb.plan is plan and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            pipe.stop_rebalancing()
+        assert reb.plan is not plan
+        assert ([b["gpu_id"] for b in pipe.blocks].count(0)
+                < [g for _, g in plan.assignments].count(0))
+
+
+__all__ = [
+    "TestLayerTimer",
+    "TestOnlineRebalancer",
+    "TestPipelineIntegration",
+]
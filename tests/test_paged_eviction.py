@@ -0,0 +1,278 @@
+"""Tests for PagedKVCacheManager background eviction (watermark reclaimer).
+
+Tests:
+  1. watermark_reclaim_count policy
+  2. reclaim_cycle: detach → offload → free list, parity from the host copy;
+     live requests preempted (never offloaded) only for a waiting allocation
+  3. worker thread: keeps free pages ready, append_token stalls only when empty
+"""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _manager(max_pages=20, **kw):
+    from core.paged_attention import PagedKVCacheManager, PagedKVConfig
+    cfg = PagedKVConfig(num_layers=1, num_kv_heads=1, head_dim=8, page_size=4,
+                        max_pages=max_pages, device="cpu", enable_lending=False,
+                        evict_low_watermark=0.10, evict_high_watermark=0.25, **kw)
+    return PagedKVCacheManager(cfg)
+
+
+def _fill(mgr, n_requests, tokens_each):
+    for i in range(n_requests):
+        mgr.allocate(f"r{i}", num_tokens=tokens_each)
+
+
+def _orphans(mgr, n):
+    """Allocate *n* pages that no page table references (prefix-cache style)."""
+    with mgr._lock:
+        return [mgr._alloc_page() for _ in range(n)]
+
+
+def _wait_until(pred, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return pred()
+
+
+# ===================================================================
+# 1. Watermark policy
+# ===================================================================
+
+class TestWatermarkPolicy:
+
+    def test_nothing_above_low_watermark(self):
+        from core.paged_attention import watermark_reclaim_count
+        assert watermark_reclaim_count(10, 100, 0.05, 0.10) == 0
+        assert watermark_reclaim_count(5, 100, 0.05, 0.10) == 0
+
+    def test_refills_to_high_watermark(self):
+        from core.paged_attention import watermark_reclaim_count
+        assert watermark_reclaim_count(4, 100, 0.05, 0.10) == 6
+        assert watermark_reclaim_count(0, 100, 0.05, 0.10) == 10
+
+    def test_batch_cap(self):
+        from core.paged_attention import watermark_reclaim_count
+        assert watermark_reclaim_count(0, 1000, 0.05, 0.20, batch_max=32) == 32
+
+    def test_small_pool_rounds_up_to_one_page(self):
+        from core.paged_attention import watermark_reclaim_count
+        assert watermark_reclaim_count(0, 4, 0.01, 0.01) == 1
+        assert watermark_reclaim_count(1, 4, 0.01, 0.01) == 0
+
+
+# ===================================================================
+# 2. reclaim_cycle (synchronous, no thread)
+# ===================================================================
+
+class TestReclaimCycle:
+
+    def test_noop_above_watermark(self):
+        mgr = _manager()
+        _fill(mgr, 5, 4)
+        assert mgr.reclaim_cycle() == 0
+
+    def test_refills_free_list_with_lru_pages(self):
+        mgr = _manager()
+        _fill(mgr, 20, 4)
+        for i in range(20):
+            mgr._pages[mgr._page_tables[f"r{i}"].pages[0]].last_access = float(i)
+        assert mgr.stats()["free_pages"] == 0
+        assert mgr.reclaim_cycle() == 0  # nobody is waiting for a page
+        assert not mgr.stats()["preempted_requests"]
+
+        mgr._alloc_waiters = 1
+        assert mgr.reclaim_cycle() == 5  # 0 free -> high watermark (25% of 20)
+        assert mgr.stats()["free_pages"] == 5
+        # Oldest five requests were preempted whole, the rest are untouched
+        assert all(mgr.was_preempted(f"r{i}") for i in range(5))
+        assert not any(f"r{i}" in mgr._page_tables for i in range(5))
+        assert all(mgr._page_tables[f"r{i}"].pages for i in range(5, 20))
+        assert mgr.stats()["async_evictions"] == 5
+        assert mgr.stats()["preempted_requests"] == 5
+        assert mgr.stats()["evict_in_flight"] == 0
+
+    def test_page_tables_stay_consistent(self):
+        mgr = _manager()
+        _fill(mgr, 20, 4)
+        mgr._alloc_waiters = 1
+        assert mgr.reclaim_cycle() == 5
+        mgr._alloc_waiters = 0
+        for entry in mgr._page_tables.values():
+            assert len(entry.pages) * 4 >= entry.num_tokens
+        assert mgr.append_token("r0") is None          # preempted, no IndexError
+        assert mgr.append_token("r19") is not None     # new page from the free list
+        mgr.allocate("r0", num_tokens=4)               # recomputed
+        assert not mgr.was_preempted("r0")
+
+    def test_unreferenced_pages_reclaimed_before_requests(self):
+        mgr = _manager()
+        _fill(mgr, 19, 4)
+        orphan, = _orphans(mgr, 1)                    # allocated, in no page table
+        mgr._pages[orphan].last_access = 1e18
+        assert mgr.reclaim_cycle() == 1               # no waiter: orphans only
+        assert orphan in mgr._free_pages
+        assert not mgr.stats()["preempted_requests"]
+        mgr._alloc_waiters = 1
+        assert mgr.reclaim_cycle() == 4
+        assert mgr.stats()["preempted_requests"] == 4
+
+    def test_preempted_pages_are_not_offloaded(self):
+        mgr = _manager()
+        _fill(mgr, 18, 4)
+        orphans = _orphans(mgr, 2)
+        offloaded = []
+        mgr._offload_page = offloaded.append
+        mgr._alloc_waiters = 1
+        assert mgr.reclaim_cycle() == 5
+        assert sorted(offloaded) == sorted(orphans)
+        assert mgr.stats()["preempted_requests"] == 3
+        assert mgr.stats()["evict_in_flight"] == 0
+
+    def test_borrowed_pages_reclaimed_first(self):
+        mgr = _manager()
+        _fill(mgr, 20, 4)
+        mgr._pages[17].is_borrowed = True
+        mgr._pages[17].lease_id = "fake"
+        mgr._alloc_waiters = 1
+        mgr.reclaim_cycle()
+        assert 17 in mgr._free_pages
+        assert not mgr._pages[17].is_borrowed
+
+    def test_shared_pages_not_reclaimed(self):
+        mgr = _manager(max_pages=4)
+        _fill(mgr, 4, 4)
+        for p in mgr._pages:
+            p.ref_count = 2
+        assert mgr.reclaim_cycle() == 0
+
+    def test_parity_encoded_from_host_copy(self):
+        torch = pytest.importorskip("torch")
+        import core.paged_attention as pa
+        if not pa._PARITY:
+            pytest.skip("parity memory unavailable")
+        mgr = _manager(max_pages=4)
+        mgr._gpu_pool = torch.arange(4 * 64, dtype=torch.float16).reshape(4, 1, 2, 1, 4, 8)
+        _fill(mgr, 3, 4)
+        victim, = _orphans(mgr, 1)
+
+        assert mgr.reclaim_cycle() == 1
+        recovered = mgr.recover_page(victim, simulate_shard_loss=1)
+        expected = mgr._gpu_pool[victim].contiguous().view(torch.uint8).numpy().tobytes()
+        assert recovered[:len(expected)] == expected
+
+
+# ===================================================================
+# 3. Background worker
+# ===================================================================
+
+class TestEvictionWorker:
+
+    def test_worker_keeps_free_pages_ready(self):
+        mgr = _manager(async_eviction=True)
+        try:
+            assert mgr.stats()["async_eviction"] is True
+            _fill(mgr, 15, 4)
+            _orphans(mgr, 5)
+            mgr._evict_wakeup.set()
+            assert _wait_until(lambda: mgr.stats()["free_pages"] >= 5)
+            assert mgr.stats()["alloc_stalls"] == 0
+            assert not mgr.stats()["preempted_requests"]
+        finally:
+            mgr.stop_eviction_worker()
+
+    def test_append_token_pops_without_stall_when_ready(self):
+        mgr = _manager(async_eviction=True)
+        try:
+            _fill(mgr, 15, 4)
+            _orphans(mgr, 4)
+            mgr._evict_wakeup.set()
+            assert _wait_until(lambda: mgr.stats()["free_pages"] >= 5)
+            mgr.allocate("new")
+            assert mgr.append_token("new") is not None
+            assert mgr.stats()["alloc_stalls"] == 0
+        finally:
+            mgr.stop_eviction_worker()
+
+    def test_append_token_blocks_only_when_empty(self):
+        mgr = _manager()
+        mgr._EVICT_POLL_S = 10.0  # worker reacts to wake-ups only
+        _fill(mgr, 20, 4)
+        mgr.allocate("new")
+        assert mgr.stats()["free_pages"] == 0
+        mgr.start_eviction_worker()
+        try:
+            assert mgr.append_token("new") is not None
+            assert mgr.stats()["alloc_stalls"] == 1
+            assert mgr.stats()["async_evictions"] >= 1
+        finally:
+            mgr.stop_eviction_worker()
+
+    def test_append_token_gives_up_when_nothing_evictable(self):
+        mgr = _manager(max_pages=4, async_eviction=True, evict_wait_timeout_s=5.0)
+        try:
+            _fill(mgr, 4, 4)
+            for p in mgr._pages:
+                p.ref_count = 2
+            mgr.allocate("new")
+            t0 = time.time()
+            assert mgr.append_token("new") is None
+            assert time.time() - t0 < 2.0
+        finally:
+            mgr.stop_eviction_worker()
+
+    def test_stopped_worker_falls_back_to_inline(self):
+        mgr = _manager(max_pages=4, async_eviction=True)
+        mgr.stop_eviction_worker()
+        assert mgr.stats()["async_eviction"] is False
+        _fill(mgr, 4, 4)
+        mgr.allocate("new")
+        assert mgr.append_token("new") is not None
+        assert mgr.stats()["alloc_stalls"] == 0
+        # The inline path preempted another request, never the one growing
+        assert "new" in mgr._page_tables and mgr.stats()["preempted_requests"] == 1
+
+
+# ===================================================================
+# 4. Continuous batcher
+# ===================================================================
+
+class TestBatcherPreemption:
+
+    def test_preempted_request_is_prefilled_again(self):
+        torch = pytest.importorskip("torch")
+        from core.continuous_batcher import ContinuousBatcher, InferenceRequest
+        mgr = _manager()
+        _fill(mgr, 20, 4)
+        batcher = ContinuousBatcher(paged_kv_manager=mgr)
+        reqs = [InferenceRequest(request_id=f"r{i}") for i in (0, 19)]
+        for req in reqs:
+            req.generated_ids = torch.tensor([[1, 2, 3, 4, 5]])
+            req.kv_cache = object()
+        mgr._alloc_waiters = 1
+        mgr.reclaim_cycle()                           # preempts r0 .. r4
+        assert mgr.was_preempted("r0")
+        batcher._requeue_preempted(reqs)
+        assert reqs[0].kv_cache is None               # back to the prefill partition
+        assert reqs[1].kv_cache is not None
+        assert not mgr.was_preempted("r0") and "r0" in mgr._page_tables
+
+
+__all__ = [
+    "TestWatermarkPolicy",
+    "TestReclaimCycle",
+    "TestEvictionWorker",
+    "TestBatcherPreemption",
+]
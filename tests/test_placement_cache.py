@@ -0,0 +1,267 @@
+"""Tests for the on-disk profile / placement plan cache (core.placement_cache)."""
+import json
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _hw(name="RTX 3090", driver="550.54"):
+    return lambda: {"gpus": [{"name": name}], "driver": driver}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from core.placement_cache import PlacementCache
+    return PlacementCache(str(tmp_path), hw_fingerprint=_hw())
+
+
+@pytest.fixture
+def use_cache(monkeypatch, cache):
+    import core.placement_cache as pc
+    monkeypatch.setattr(pc, "_CACHE", cache)
+    return cache
+
+
+def _plan():
+    from core.layer_profiler import PlacementPlan
+    return PlacementPlan(assignments=[(0, 0), (1, 0), (2, 1)], estimated_latency_ms=3.5,
+                         gpu_utilization={0: 0.5, 1: 0.25})
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Store + invalidation
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPlacementCache:
+
+    def test_plan_roundtrip(self, cache):
+        from core.placement_cache import decode_plan
+        fp = cache.fingerprint({"hash": "m1"}, num_gpus=2)
+        assert cache.get("plan", fp) is None
+        cache.put("plan", fp, _plan())
+        plan = decode_plan(cache.get("plan", fp))
+        assert plan == _plan()
+        assert cache.stats == {"hits": 1, "misses": 1, "invalidated": 0, "writes": 1}
+
+    def test_other_model_or_params_miss(self, cache):
+        cache.put("plan", cache.fingerprint({"hash": "m1"}, num_gpus=2), _plan())
+        assert cache.get("plan", cache.fingerprint({"hash": "m2"}, num_gpus=2)) is None
+        assert cache.get("plan", cache.fingerprint({"hash": "m1"}, num_gpus=3)) is None
+
+    @pytest.mark.parametrize("hw", [_hw(name="RTX 4090"), _hw(driver="560.1")])
+    def test_hardware_change_invalidates(self, tmp_path, cache, hw):
+        from core.placement_cache import PlacementCache
+        fp = cache.fingerprint({"hash": "m1"})
+        cache.put("plan", fp, _plan())
+        other = PlacementCache(str(tmp_path), hw_fingerprint=hw)
+        assert other.get("plan", other.fingerprint({"hash": "m1"})) is None
+        assert other.stats["invalidated"] == 1
+        assert os.listdir(str(tmp_path)) == []          # stale entry removed
+
+    def test_version_and_corruption_invalidate(self, tmp_path, cache):
+        fp = cache.fingerprint()
+        cache.put("pcie_bw", fp, 31.5)
+        (path,) = [os.path.join(str(tmp_path), n) for n in os.listdir(str(tmp_path))]
+        entry = json.load(open(path))
+        entry["version"] = -1
+        json.dump(entry, open(path, "w"))
+        assert cache.get("pcie_bw", fp) is None
+        cache.put("pcie_bw", fp, 31.5)
+        open(path, "w").write("{not json")
+        assert cache.get("pcie_bw", fp) is None
+        assert cache.stats["invalidated"] == 2
+
+    def test_refresh_recomputes_and_rewrites(self, tmp_path):
+        from core.placement_cache import PlacementCache
+        calls = []
+        first = PlacementCache(str(tmp_path), hw_fingerprint=_hw())
+        assert first.cached("pcie_bw", first.fingerprint(), lambda: calls.append(1) or 16.0) == 16.0
+        assert first.cached("pcie_bw", first.fingerprint(), lambda: calls.append(1) or 99.0) == 16.0
+        refresh = PlacementCache(str(tmp_path), hw_fingerprint=_hw(), refresh=True)
+        assert refresh.cached("pcie_bw", refresh.fingerprint(), lambda: calls.append(1) or 32.0) == 32.0
+        assert first.get("pcie_bw", first.fingerprint()) == 32.0
+        assert len(calls) == 2
+
+    def test_disabled_never_touches_disk(self, tmp_path):
+        from core.placement_cache import PlacementCache
+        c = PlacementCache(str(tmp_path / "c"), enabled=False, hw_fingerprint=_hw())
+        c.put("plan", c.fingerprint(), _plan())
+        assert c.get("plan", c.fingerprint()) is None
+        assert not (tmp_path / "c").exists()
+
+    def test_minimal_mode_disables_global_cache(self, monkeypatch):
+        import core.placement_cache as pc
+        monkeypatch.setattr(pc, "_CACHE", None)
+        monkeypatch.delenv("VRM_PLACEMENT_CACHE", raising=False)
+        assert pc.get_placement_cache().enabled is False
+
+
+class TestFingerprints:
+
+    def test_model_fingerprint_tracks_config_dtype_quant(self):
+        from core.placement_cache import model_fingerprint
+        a = {"hidden_size": 64, "num_hidden_layers": 4}
+        base = model_fingerprint(a, dtype="bfloat16", quantization="")
+        assert base == model_fingerprint(dict(a), dtype="bfloat16", quantization="")
+        assert base["hash"] != model_fingerprint(dict(a, num_hidden_layers=5),
+                                                 dtype="bfloat16")["hash"]
+        assert base != model_fingerprint(a, dtype="float16", quantization="")
+        assert base != model_fingerprint(a, dtype="bfloat16", quantization="nf4")
+
+    def test_config_object_ignores_checkpoint_path(self):
+        transformers = pytest.importorskip("transformers")
+        from core.placement_cache import model_fingerprint
+        c1 = transformers.LlamaConfig(hidden_size=64, num_hidden_layers=2)
+        c2 = transformers.LlamaConfig(hidden_size=64, num_hidden_layers=2)
+        c2._name_or_path = "/somewhere/else"
+        assert model_fingerprint(c1, dtype="f") == model_fingerprint(c2, dtype="f")
+
+    def test_hardware_fingerprint_is_json(self):
+        from core.placement_cache import hardware_fingerprint
+        fp = hardware_fingerprint()
+        assert json.loads(json.dumps(fp)) == fp and "gpus" in fp
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Integration with the profiler / placement engine
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestIntegration:
+
+    def test_profile_gpus_benchmarks_once(self, use_cache, monkeypatch):
+        import core.layer_profiler as lp
+        monkeypatch.setattr(lp, "enumerate_devices", lambda: [
+            {"backend": "cpu", "index": 0, "name": "CPU"}])
+        calls = []
+        monkeypatch.setattr(lp.LayerProfiler, "_benchmark_cpu_gflops",
+                            lambda self: calls.append("f") or 50.0)
+        monkeypatch.setattr(lp.LayerProfiler, "_benchmark_cpu_bandwidth",
+                            lambda self: calls.append("b") or 20.0)
+        for _ in range(3):
+            prof = lp.LayerProfiler()
+            prof._stub = False
+            (gp,) = prof.profile_gpus()
+            assert (gp.compute_throughput_gflops, gp.memory_bandwidth_gbps) == (50.0, 20.0)
+        assert calls == ["f", "b"]
+
+    def test_profile_gpus_reads_driver_free_vram(self, use_cache, monkeypatch):
+        torch = pytest.importorskip("torch")
+        import core.layer_profiler as lp
+        from core.layer_profiler import GPUProfile
+        monkeypatch.setattr(lp.LayerProfiler, "_benchmark_gpus", lambda self: [
+            GPUProfile(0, "gpu0", "cuda", 24000, 24000, 80.0)])
+        monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+        monkeypatch.setattr(torch.cuda, "device_count", lambda: 1)
+        # Another process holds most of the card; this one allocated nothing
+        monkeypatch.setattr(torch.cuda, "mem_get_info",
+                            lambda idx: (3000 * 1024 * 1024, 24000 * 1024 * 1024))
+        monkeypatch.setattr(torch.cuda, "memory_allocated", lambda idx: 0)
+        prof = lp.LayerProfiler()
+        prof._stub = False
+        (gp,) = prof.profile_gpus()
+        assert gp.free_vram_mb == 3000
+
+    def test_place_model_reuses_plan(self, use_cache):
+        import core.orchestrator.placement_engine as pe
+        if not pe._PROFILER_AVAILABLE:
+            pytest.skip("profiler unavailable")
+        from core.layer_profiler import GPUProfile, LayerProfile
+
+        class _Profiler:
+            calls = 0
+
+            def profile_model(self, model):
+                _Profiler.calls += 1
+                return [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=10)
+                        for i in range(6)]
+
+            def profile_gpus(self):
+                return [GPUProfile(index=i, name="G", backend="cuda", total_vram_mb=1000,
+                                   free_vram_mb=1000, compute_throughput_gflops=100)
+                        for i in range(2)]
+
+        model = {"hidden_size": 8, "num_hidden_layers": 6}
+        eng = pe.PlacementEngine()
+        eng._profiler = _Profiler()
+        first = eng.place_model(model, num_gpus=2, transfer_bandwidth_gbps=16.0)
+        eng2 = pe.PlacementEngine()
+        eng2._profiler = _Profiler()
+        second = eng2.place_model(model, num_gpus=2, transfer_bandwidth_gbps=16.0)
+        assert _Profiler.calls == 1
+        assert second.assignments == first.assignments
+        assert use_cache.stats["hits"] == 1
+
+    def test_cached_plan_resolved_when_free_vram_shrinks(self, use_cache):
+        import core.orchestrator.placement_engine as pe
+        if not pe._PROFILER_AVAILABLE:
+            pytest.skip("profiler unavailable")
+        from core.layer_profiler import GPUProfile, LayerProfile
+
+        class _Profiler:
+            calls = 0
+            free = [1000, 1000]
+
+            def profile_model(self, model):
+                _Profiler.calls += 1
+                return [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=10)
+                        for i in range(6)]
+
+            def profile_gpus(self):
+                return [GPUProfile(index=i, name="G", backend="cuda", total_vram_mb=1000,
+                                   free_vram_mb=f, compute_throughput_gflops=100)
+                        for i, f in enumerate(_Profiler.free)]
+
+        model = {"hidden_size": 8, "num_hidden_layers": 6}
+        eng = pe.PlacementEngine()
+        eng._profiler = _Profiler()
+        first = eng.place_model(model, num_gpus=2, transfer_bandwidth_gbps=16.0)
+        assert sum(first.gpu_memory_mb.values()) == pytest.approx(60)
+
+        # Another process now holds most of the GPU the plan relied on
+        busy = max(first.gpu_memory_mb, key=first.gpu_memory_mb.get)
+        _Profiler.free[busy] = 20
+        eng2 = pe.PlacementEngine()
+        eng2._profiler = _Profiler()
+        second = eng2.place_model(model, num_gpus=2, transfer_bandwidth_gbps=16.0)
+        assert _Profiler.calls == 2
+        assert second.gpu_memory_mb[busy] <= 20
+
+        # The re-solved plan is what the cache serves next
+        eng3 = pe.PlacementEngine()
+        eng3._profiler = _Profiler()
+        assert eng3.place_model(model, num_gpus=2, transfer_bandwidth_gbps=16.0) == second
+        assert _Profiler.calls == 2
+
+    def test_plan_fits_free_vram(self):
+        from core.layer_profiler import GPUProfile, PlacementPlan
+        from core.placement_cache import plan_fits_free_vram
+        gpus = [GPUProfile(index=0, name="G", backend="cuda", free_vram_mb=100),
+                GPUProfile(index=1, name="G", backend="cuda", free_vram_mb=50)]
+        plan = PlacementPlan(assignments=[(0, 0), (1, 1), (2, -1)],
+                             gpu_memory_mb={0: 80.0, 1: 50.0, -1: 4096.0})
+        assert plan_fits_free_vram(plan, gpus)
+        gpus[1].free_vram_mb = 49
+        assert not plan_fits_free_vram(plan, gpus)
+        # Entries cached before per-GPU memory was recorded are re-solved
+        assert not plan_fits_free_vram(_plan(), gpus)
+
+    def test_split_refresh_flag(self, use_cache, monkeypatch):
+        import core.model_splitter as ms
+        from vramancer.main import main
+        seen = []
+        monkeypatch.setattr(ms, "split_model_into_blocks",
+                            lambda **kw: seen.append(use_cache.refresh) or [])
+        main(["split", "some/model", "--refresh"])
+        assert seen == [True]
+
+
+__all__ = [
+    "TestPlacementCache",
+    "TestFingerprints",
+    "TestIntegration",
+]
@@ -0,0 +1,320 @@
+"""Tests for the exact contiguous-partition placement solver and its objectives."""
+import itertools
+import os
+import random
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.layer_profiler import GPUProfile, LayerProfile, compute_optimal_placement
+
+
+def _instance(rng, n_layers, n_gpus):
+    layers = [LayerProfile(index=i, latency_ms=rng.uniform(0.5, 3.0),
+                           total_memory_mb=rng.choice([100.0, 200.0, 300.0]),
+                           param_memory_mb=100.0,
+                           activation_memory_mb=rng.uniform(1.0, 40.0))
+              for i in range(n_layers)]
+    gpus = [GPUProfile(index=g, name=f"gpu{g}", backend="cuda", total_vram_mb=2000,
+                       free_vram_mb=rng.choice([400, 600, 800, 1200]),
+                       compute_throughput_gflops=rng.choice([10.0, 25.0, 50.0]))
+            for g in range(n_gpus)]
+    return layers, gpus
+
+
+def _brute_force(layers, devices, bw, kv_reserve=0.0, kv_per_layer=0.0):
+    """Every layer->device map whose devices each hold one contiguous run."""
+    max_gflops = max(d.compute_throughput_gflops for d in devices)
+    best = None
+    for combo in itertools.product(range(len(devices)), repeat=len(layers)):
+        runs = [g for i, g in enumerate(combo) if i == 0 or combo[i - 1] != g]
+        if len(runs) != len(set(runs)):
+            continue
+        used = [0.0] * len(devices)
+        total = 0.0
+        for i, g in enumerate(combo):
+            d = devices[g]
+            used[g] += layers[i].total_memory_mb + kv_per_layer
+            total += layers[i].latency_ms * max_gflops / d.compute_throughput_gflops
+            if d.backend == "nvme":
+                total += layers[i].param_memory_mb / 1024 / d.memory_bandwidth_gbps * 1000
+            if i and combo[i - 1] != g:
+                total += layers[i - 1].activation_memory_mb * 1024 * 1024 * 8 / (bw * 1e9) * 1000
+        if any(used[g] > devices[g].free_vram_mb - kv_reserve for g in range(len(devices))):
+            continue
+        if best is None or total < best:
+            best = total
+    return best
+
+
+def _brute_force_bottleneck(layers, devices, bw):
+    """Smallest max stage time (stage compute + incoming transfer)."""
+    max_gflops = max(d.compute_throughput_gflops for d in devices)
+    best = None
+    for combo in itertools.product(range(len(devices)), repeat=len(layers)):
+        runs = [g for i, g in enumerate(combo) if i == 0 or combo[i - 1] != g]
+        if len(runs) != len(set(runs)):
+            continue
+        used = [0.0] * len(devices)
+        stages, stage = [], 0.0
+        for i, g in enumerate(combo):
+            if i and combo[i - 1] != g:
+                stages.append(stage)
+                stage = layers[i - 1].activation_memory_mb * 1024 * 1024 * 8 / (bw * 1e9) * 1000
+            used[g] += layers[i].total_memory_mb
+            stage += layers[i].latency_ms * max_gflops / devices[g].compute_throughput_gflops
+        stages.append(stage)
+        if any(used[g] > devices[g].free_vram_mb for g in range(len(devices))):
+            continue
+        if best is None or max(stages) < best:
+            best = max(stages)
+    return best
+
+
+def _check_memory(plan, layers, devices, kv_reserve=0.0, kv_per_layer=0.0):
+    used = {d.index: 0.0 for d in devices}
+    for layer_idx, dev in plan.assignments:
+        used[dev] += layers[layer_idx].total_memory_mb + kv_per_layer
+    for d in devices:
+        assert used[d.index] <= d.free_vram_mb - kv_reserve + 1e-6
+
+
+def _runs(plan):
+    devs = [g for _, g in plan.assignments]
+    return [g for i, g in enumerate(devs) if i == 0 or devs[i - 1] != g]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Exactness against brute force
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestExactPartition:
+
+    @pytest.mark.parametrize("seed", range(12))
+    def test_matches_brute_force(self, seed):
+        rng = random.Random(seed)
+        layers, gpus = _instance(rng, rng.randint(3, 7), rng.randint(2, 3))
+        expected = _brute_force(layers, gpus, bw=1.0)
+        while expected is None:
+            for g in gpus:
+                g.free_vram_mb += 200
+            expected = _brute_force(layers, gpus, bw=1.0)
+        plan = compute_optimal_placement(layers, gpus, transfer_bandwidth_gbps=1.0)
+        assert plan.estimated_latency_ms == pytest.approx(expected, rel=1e-9)
+        _check_memory(plan, layers, gpus)
+        assert len(_runs(plan)) == len(set(_runs(plan)))
+
+    @pytest.mark.parametrize("seed", range(6))
+    def test_kv_reservation(self, seed):
+        rng = random.Random(100 + seed)
+        layers, gpus = _instance(rng, 6, 3)
+        for g in gpus:
+            g.free_vram_mb += 600
+        expected = _brute_force(layers, gpus, 1.0, kv_reserve=150.0, kv_per_layer=50.0)
+        if expected is None:
+            pytest.skip("instance has no feasible partition")
+        plan = compute_optimal_placement(layers, gpus, 1.0, kv_reserve_mb=150.0,
+                                         kv_mb_per_layer=50.0)
+        assert plan.estimated_latency_ms == pytest.approx(expected, rel=1e-9)
+        _check_memory(plan, layers, gpus, 150.0, 50.0)
+
+    def test_per_gpu_reservation(self):
+        layers = [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=100.0,
+                               activation_memory_mb=1.0) for i in range(4)]
+        gpus = [GPUProfile(0, "fast", "cuda", 1000, 500, 50.0),
+                GPUProfile(1, "slow", "cuda", 1000, 500, 10.0)]
+        plan = compute_optimal_placement(layers, gpus, 10.0, kv_reserve_mb={0: 300.0})
+        assert [g for _, g in plan.assignments].count(0) == 2
+
+    def test_offload_tiers(self):
+        rng = random.Random(7)
+        layers, gpus = _instance(rng, 6, 2)
+        for g in gpus:
+            g.free_vram_mb = 400
+        tiers = [GPUProfile(-1, "CPU", "cpu", 0, 600, 2.0, 20.0),
+                 GPUProfile(-2, "NVMe", "nvme", 0, 10000, 2.0, 3.0)]
+        expected = _brute_force(layers, gpus + tiers, bw=1.0)
+        plan = compute_optimal_placement(layers, gpus, 1.0, offload_tiers=tiers)
+        assert plan.estimated_latency_ms == pytest.approx(expected, rel=1e-9)
+        _check_memory(plan, layers, gpus + tiers)
+        assert {g for _, g in plan.assignments} & {-1, -2}
+
+    def test_tiers_unused_when_gpus_fit(self):
+        layers = [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=10.0)
+                  for i in range(8)]
+        gpus = [GPUProfile(0, "gpu", "cuda", 1000, 1000, 50.0)]
+        tiers = [GPUProfile(-1, "CPU", "cpu", 0, 10000, 5.0)]
+        plan = compute_optimal_placement(layers, gpus, 10.0, offload_tiers=tiers)
+        assert {g for _, g in plan.assignments} == {0}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Memory constraint handling
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestMemoryConstraints:
+
+    def test_tight_memory_keeps_one_run_per_gpu(self):
+        layers = [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=100.0,
+                               activation_memory_mb=5.0) for i in range(40)]
+        gpus = [GPUProfile(g, f"gpu{g}", "cuda", 2000, 1050, 50.0 - g) for g in range(4)]
+        plan = compute_optimal_placement(layers, gpus, 10.0)
+        _check_memory(plan, layers, gpus)
+        assert len(_runs(plan)) == 4 == len(set(_runs(plan)))
+
+    def test_infeasible_falls_back(self):
+        layers = [LayerProfile(index=i, latency_ms=1.0, total_memory_mb=500.0)
+                  for i in range(4)]
+        gpus = [GPUProfile(0, "a", "cuda", 1000, 600, 50.0),
+                GPUProfile(1, "b", "cuda", 1000, 600, 50.0)]
+        plan = compute_optimal_placement(layers, gpus, 10.0)
+        assert [i for i, _ in plan.assignments] == [0, 1, 2, 3]
+
+    def test_scales_to_128_layers_8_gpus(self):
+        import time
+        rng = random.Random(0)
+        layers, gpus = _instance(rng, 128, 8)
+        for g in gpus:
+            g.free_vram_mb = 6000
+        t0 = time.perf_counter()
+        plan = compute_optimal_placement(layers, gpus, 16.0)
+        assert time.perf_counter() - t0 < 10.0
+        assert len(plan.assignments) == 128
+        _check_memory(plan, layers, gpus)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Throughput (bottleneck) and combined objectives
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestThroughputObjective:
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_bottleneck_matches_brute_force(self, seed):
+        rng = random.Random(200 + seed)
+        layers, gpus = _instance(rng, rng.randint(3, 7), rng.randint(2, 3))
+        for g in gpus:
+            g.free_vram_mb += 800
+        expected = _brute_force_bottleneck(layers, gpus, bw=1.0)
+        plan = compute_optimal_placement(layers, gpus, 1.0, objective="throughput")
+        assert plan.estimated_bottleneck_ms == pytest.approx(expected, rel=1e-9)
+        assert plan.objective == "throughput"
+        _check_memory(plan, layers, gpus)
+
+    def test_synthetic_profiles_trade_latency_for_throughput(self):
+        from core.layer_profiler import LayerProfiler
+        layers = LayerProfiler()._synthetic_profiles(32)
+        gpus = [GPUProfile(g, f"gpu{g}", "cuda", 24000, 20000, 80.0) for g in range(4)]
+        lat = compute_optimal_placement(layers, gpus, 16.0, objective="latency")
+        thr = compute_optimal_placement(layers, gpus, 16.0, objective="throughput")
+        assert {g for _, g in lat.assignments} == {0}          # no transfers at batch 1
+        assert len({g for _, g in thr.assignments}) == 4
+        assert thr.estimated_bottleneck_ms < lat.estimated_bottleneck_ms / 3
+        assert lat.estimated_latency_ms <= thr.estimated_latency_ms
+
+    def test_heterogeneous_gpus_balance_stage_time(self):
+        from core.layer_profiler import LayerProfiler
+        layers = LayerProfiler()._synthetic_profiles(48)
+        gpus = [GPUProfile(0, "fast", "cuda", 24000, 20000, 90.0),
+                GPUProfile(1, "slow", "cuda", 24000, 20000, 30.0)]
+        plan = compute_optimal_placement(layers, gpus, 16.0, objective="throughput")
+        fast = sum(1 for _, g in plan.assignments if g == 0)
+        assert 33 <= fast <= 39                                   # ~3:1 split
+        assert plan.estimated_bottleneck_ms < 0.8 * sum(lp.latency_ms for lp in layers)
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_combined_between_objectives(self, seed):
+        rng = random.Random(300 + seed)
+        layers, gpus = _instance(rng, 24, 4)
+        for g in gpus:
+            g.free_vram_mb = 3000
+        lat = compute_optimal_placement(layers, gpus, 1.0, objective="latency")
+        thr = compute_optimal_placement(layers, gpus, 1.0, objective="throughput")
+        comb = compute_optimal_placement(layers, gpus, 1.0, objective="combined",
+                                         bottleneck_slack=0.25)
+        assert comb.estimated_bottleneck_ms <= 1.25 * thr.estimated_bottleneck_ms + 1e-9
+        assert lat.estimated_latency_ms - 1e-9 <= comb.estimated_latency_ms
+        assert comb.estimated_latency_ms <= thr.estimated_latency_ms + 1e-9
+
+    def test_unknown_objective(self):
+        with pytest.raises(ValueError):
+            compute_optimal_placement([LayerProfile(index=0)], [GPUProfile(0, "g", "cuda")],
+                                      1.0, objective="energy")
+
+
+class TestServingMode:
+
+    @pytest.mark.parametrize("mode,objective", [
+        ("interactive", "latency"), ("pipeline", "throughput"), ("batch", "throughput"),
+        ("continuous", "combined"), ("throughput", "throughput"),
+    ])
+    def test_mapping(self, mode, objective):
+        from core.layer_profiler import placement_objective_for
+        assert placement_objective_for(mode) == objective
+
+    def test_env_default(self, monkeypatch):
+        from core.layer_profiler import placement_objective_for
+        monkeypatch.delenv("VRM_SERVING_MODE", raising=False)
+        assert placement_objective_for() == "latency"
+        monkeypatch.setenv("VRM_SERVING_MODE", "pipeline")
+        assert placement_objective_for() == "throughput"
+        with pytest.raises(ValueError):
+            placement_objective_for("warp")
+
+    def test_place_model_uses_serving_mode(self, monkeypatch, tmp_path):
+        # Importing the engine opens the ledger; keep it out of the repo root
+        monkeypatch.setenv("VRM_LEDGER_PATH", str(tmp_path / "ledger.db"))
+        import core.orchestrator.placement_engine as pe
+        from core.layer_profiler import LayerProfiler
+        if not pe._PROFILER_AVAILABLE:
+            pytest.skip("profiler unavailable")
+        monkeypatch.setenv("VRM_PLACEMENT_CACHE", "0")
+        monkeypatch.setattr("core.placement_cache._CACHE", None)
+
+        class _Profiler:
+            def profile_model(self, model):
+                return LayerProfiler()._synthetic_profiles(16)
+
+            def profile_gpus(self):
+                return [GPUProfile(i, "G", "cuda", 24000, 20000, 80.0) for i in range(2)]
+
+        eng = pe.PlacementEngine()
+        eng._profiler = _Profiler()
+        lat = eng.place_model(object(), num_gpus=2, transfer_bandwidth_gbps=16.0,
+                              serving_mode="interactive")
+        thr = eng.place_model(object(), num_gpus=2, transfer_bandwidth_gbps=16.0,
+                              serving_mode="pipeline")
+        assert (lat.objective, thr.objective) == ("latency", "throughput")
+        assert len({g for _, g in thr.assignments}) == 2
+        assert thr.estimated_bottleneck_ms < lat.estimated_bottleneck_ms
+
+    def test_auto_configure_throughput_split(self, monkeypatch):
+        import core.hetero_config as hc
+        gib = 1024 ** 3
+        gpus = lambda: [hc.DetectedGPU(0, "big-slow", 24 * gib, 24 * gib),
+                        hc.DetectedGPU(1, "small-fast", 16 * gib, 16 * gib)]
+        monkeypatch.setattr(hc, "detect_gpus", gpus)
+        monkeypatch.setattr(hc, "probe_p2p", lambda a, b: False)
+        monkeypatch.setattr(hc.DetectedGPU, "effective_compute",
+                            property(lambda g: 30.0 if g.index == 0 else 90.0))
+        cfg = hc.auto_configure(model_size_gb=10.0, serving_mode="pipeline")
+        assert cfg.placement_objective == "throughput"
+        assert cfg.split_ratios[1] == pytest.approx(0.75, abs=0.02)
+        # Memory-bound: a 30 GB model cannot follow the compute ratio
+        cfg = hc.auto_configure(model_size_gb=30.0, serving_mode="pipeline")
+        assert cfg.split_ratios[1] <= 15.0 / 30.0 + 0.01
+        cfg = hc.auto_configure(model_size_gb=10.0, serving_mode="interactive")
+        assert cfg.placement_objective == "latency"
+        assert cfg.split_strategy == "balanced"
+
+
+__all__ = [
+    "TestExactPartition",
+    "TestMemoryConstraints",
+    "TestThroughputObjective",
+    "TestServingMode",
+]
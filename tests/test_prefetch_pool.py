@@ -0,0 +1,225 @@
+"""Tests for the bounded HMM prefetch pool (experimental.prefetch_pool)."""
+import os
+import sys
+import threading
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+class _Mover:
+    """Records moves; optionally blocks the first one until released."""
+
+    def __init__(self, gate_first=False):
+        self.moves = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not gate_first:
+            self.release.set()
+
+    def __call__(self, bid, target):
+        self.started.set()
+        self.release.wait(5)
+        self.moves.append((bid, target))
+        return True
+
+
+@pytest.fixture
+def pool_factory():
+    from experimental.prefetch_pool import PrefetchPool
+    pools = []
+
+    def make(mover, **kw):
+        p = PrefetchPool(mover, **kw)
+        pools.append(p)
+        return p
+    yield make
+    for p in pools:
+        p.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Queue, workers, outcomes
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPrefetchPool:
+
+    def test_duplicates_collapse_to_one_move(self, pool_factory):
+        mover = _Mover(gate_first=True)
+        pool = pool_factory(mover, workers=1)
+        pool.submit("busy", "L1", due_at=0)
+        assert mover.started.wait(5)
+        assert pool.submit("a", "L1", due_at=5)
+        assert not pool.submit("a", "L1", due_at=7)
+        assert pool.submit("a", "L1", due_at=1)   # earlier deadline re-queues
+        mover.release.set()
+        assert pool.drain(5)
+        assert [m for m in mover.moves if m[0] == "a"] == [("a", "L1")]
+        assert pool.stats()["deduped"] == 2
+
+    def test_earliest_deadline_first(self, pool_factory):
+        mover = _Mover(gate_first=True)
+        pool = pool_factory(mover, workers=1)
+        pool.submit("busy", "L1", due_at=0)
+        assert mover.started.wait(5)
+        for bid, due in (("late", 30), ("soon", 10), ("mid", 20)):
+            pool.submit(bid, "L1", due_at=due)
+        mover.release.set()
+        assert pool.drain(5)
+        assert [b for b, _ in mover.moves] == ["busy", "soon", "mid", "late"]
+
+    def test_worker_count_is_bounded(self, pool_factory):
+        pool = pool_factory(_Mover(), workers=3)
+        for i in range(100):
+            pool.submit(f"b{i}", "L1")
+        assert pool.drain(5)
+        assert pool.stats()["workers"] == 3
+        assert pool.stats()["completed"] == 100
+
+    def test_cancel_drops_queued_block(self, pool_factory):
+        mover = _Mover(gate_first=True)
+        pool = pool_factory(mover, workers=1)
+        pool.submit("busy", "L1", due_at=0)
+        assert mover.started.wait(5)
+        pool.submit("x", "L1")
+        assert pool.cancel("x")
+        mover.release.set()
+        assert pool.drain(5)
+        assert ("x", "L1") not in mover.moves
+        assert pool.stats()["cancelled"] == 1
+
+    def test_hit_late_wasted(self, pool_factory):
+        mover = _Mover(gate_first=True)
+        pool = pool_factory(mover, workers=1)
+        pool.submit("busy", "L1", due_at=0)
+        assert mover.started.wait(5)
+        pool.submit("queued", "L1", due_at=1)
+        pool.on_access("queued")        # demand beat the prefetch -> late, dropped
+        pool.submit("used", "L1", due_at=2)
+        pool.submit("unused", "L1", due_at=3)
+        mover.release.set()
+        assert pool.drain(5)
+        pool.on_access("used")
+        pool.on_evict("unused")
+        st = pool.stats()
+        assert (st["hits"], st["late"], st["wasted"]) == (1, 1, 1)
+        assert ("queued", "L1") not in mover.moves
+
+    def test_landed_blocks_are_bounded(self, pool_factory):
+        pool = pool_factory(_Mover(), workers=1, max_landed=4)
+        for i in range(10):
+            pool.submit(f"b{i}", "L1", due_at=i)
+        assert pool.drain(5)
+        s = pool.stats()
+        assert s["landed"] == 4 and s["expired"] == 6
+        assert list(pool._landed) == ["b6", "b7", "b8", "b9"]
+        pool.on_access("b9")
+        assert pool.stats()["hits"] == 1 and pool.stats()["landed"] == 3
+        assert pool.submit("b0", "L1")          # forgotten, so prefetchable again
+
+    def test_mover_errors_are_counted(self, pool_factory):
+        def boom(bid, target):
+            raise RuntimeError("no")
+        pool = pool_factory(boom, workers=1)
+        pool.submit("a", "L1")
+        assert pool.drain(5)
+        assert pool.stats()["failed"] == 1
+
+
+class TestThrottling:
+
+    def test_token_bucket_reservations(self):
+        from experimental.prefetch_pool import TokenBucket
+        now = [0.0]
+        b = TokenBucket(1000, burst_bytes=100, clock=lambda: now[0])
+        assert b.reserve(100) == 0
+        assert b.reserve(500) == pytest.approx(0.5)
+        assert b.reserve(500) == pytest.approx(1.0)   # queued behind the first
+        now[0] = 2.0
+        assert b.reserve(50) == 0
+
+    def test_pool_throttles_per_source_tier(self, pool_factory):
+        now, sleeps = [0.0], []
+
+        def sleep(s):
+            sleeps.append(s)
+            now[0] += s
+        pool = pool_factory(
+            _Mover(), workers=1, bandwidth={"L5": 1e6},
+            source_tier=lambda bid: "L5" if bid.startswith("nv") else "L3",
+            clock=lambda: now[0], sleep=sleep,
+        )
+        for i in range(3):
+            pool.submit(f"nv{i}", "L3", due_at=i, nbytes=500_000)
+        pool.submit("ram", "L1", due_at=9, nbytes=10**9)   # other tier: unthrottled
+        assert pool.drain(5)
+        assert len(sleeps) == 3
+        assert sum(sleeps) == pytest.approx(1.5 - 0.05)   # 1.5 MB at 1 MB/s minus burst
+        assert pool.stats()["throttled_s"] == pytest.approx(1.45)
+
+    def test_parse_bandwidth(self):
+        from experimental.prefetch_pool import parse_bandwidth
+        assert parse_bandwidth("L5:2000, L3:8000") == {"L5": 2e9, "L3": 8e9}
+        assert parse_bandwidth("500") == {"*": 5e8}
+        assert parse_bandwidth("") == {}
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HierarchicalMemoryManager integration
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestHMMPrefetch:
+
+    @pytest.fixture
+    def hmem(self, tmp_path):
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "nvme"))
+        yield hm
+        if hm._prefetcher is not None:
+            hm._prefetcher.close()
+
+    def test_prefetch_reloads_spilled_block_and_counts_hit(self, hmem):
+        torch = pytest.importorskip("torch")
+        from core.memory_block import MemoryBlock
+        b = MemoryBlock(id="kv-1", size_mb=1)
+        t = torch.arange(64, dtype=torch.float32)
+        hmem.register_block(b, "L3", tensor=t)
+        hmem.spill_to_nvme(b, t)
+        assert hmem.get_tier(b.id) == "L5"
+
+        hmem.schedule_prefetch([b.id, b.id], "L3")
+        assert hmem._prefetcher.drain(5)
+        assert hmem.get_tier(b.id) == "L3"
+        assert torch.equal(hmem._tensor_registry[b.id], t)
+        hmem.touch(b)
+        st = hmem.summary()["prefetch"]
+        assert st["completed"] == 1 and st["hits"] == 1
+
+    def test_demotion_after_prefetch_is_wasted(self, hmem):
+        from core.memory_block import MemoryBlock
+        b = MemoryBlock(id="kv-2", size_mb=1)
+        hmem.register_block(b, "L4")
+        hmem.schedule_prefetch([b.id], "L3")
+        assert hmem._prefetcher.drain(5)
+        assert hmem.get_tier(b.id) == "L3"
+        hmem.migrate(b, "L4")
+        assert hmem.summary()["prefetch"]["wasted"] == 1
+
+    def test_already_resident_is_skipped(self, hmem):
+        from core.memory_block import MemoryBlock
+        b = MemoryBlock(id="kv-3", size_mb=1)
+        hmem.register_block(b, "L1")
+        hmem.schedule_prefetch([b.id, "unknown"], "L1")
+        assert hmem._prefetcher.drain(5)
+        assert hmem.summary()["prefetch"]["skipped"] == 2
+
+
+__all__ = [
+    "TestPrefetchPool",
+    "TestThrottling",
+    "TestHMMPrefetch",
+]
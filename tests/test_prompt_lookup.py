@@ -0,0 +1,192 @@
+"""Tests for the suffix-automaton prompt-lookup drafter (core.prompt_lookup)."""
+import os
+import random
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+
+def _longest_earlier_suffix(tokens):
+    """Brute force: longest suffix that also ends before the last position."""
+    n, best = len(tokens), 0
+    for length in range(1, n):
+        suffix = tokens[n - length:]
+        if any(tokens[end - length + 1:end + 1] == suffix for end in range(length - 1, n - 1)):
+            best = length
+    return best
+
+
+class _Tok:
+    """Whitespace-separated ids; batched calls are left-padded."""
+
+    eos_token_id = None
+    pad_token_id = 0
+
+    def __call__(self, text, return_tensors=None, padding=False):
+        if isinstance(text, list):
+            rows = [[int(t) for t in x.split()] for x in text]
+            width = max(len(r) for r in rows)
+            return {
+                "input_ids": torch.tensor([[0] * (width - len(r)) + r for r in rows]),
+                "attention_mask": torch.tensor([[0] * (width - len(r)) + [1] * len(r)
+                                                for r in rows]),
+            }
+        return {"input_ids": torch.tensor([[int(t) for t in text.split()]])}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(int(i)) for i in ids)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Suffix automaton
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestSuffixAutomaton:
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_match_equals_brute_force(self, seed):
+        from core.prompt_lookup import SuffixAutomaton
+        rng = random.Random(seed)
+        alphabet = rng.choice([2, 3, 5])
+        sam = SuffixAutomaton()
+        for _ in range(60):
+            sam.append(rng.randrange(alphabet))
+            expected = _longest_earlier_suffix(sam.tokens)
+            assert sam.match_len == expected
+            draft = sam.propose(4)
+            if expected:
+                # The draft follows an earlier occurrence of the matched suffix
+                start = next(s for s in range(len(sam) - expected)
+                             if sam.tokens[s:s + expected] == sam.tokens[-expected:])
+                assert draft == sam.tokens[start + expected:start + expected + 4]
+            else:
+                assert draft == []
+
+    def test_copies_longest_context(self):
+        from core.prompt_lookup import SuffixAutomaton
+        # "7 1 2" occurs twice. Only the longer suffix "3 7 1 2" picks the second
+        sam = SuffixAutomaton([7, 1, 2, 9, 9, 3, 7, 1, 2, 5, 6, 3, 7, 1, 2])
+        assert sam.match_len == 4
+        assert sam.propose(3) == [5, 6, 3]
+        assert sam.propose(3, min_match=5) == []
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Drafter
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPromptLookupDrafter:
+
+    def test_incremental_sync_and_rebuild(self):
+        from core.prompt_lookup import PromptLookupDrafter
+        drafter = PromptLookupDrafter(max_draft=3, min_match=2)
+        ids = torch.tensor([[4, 5, 6, 7, 8, 4, 5]])
+        assert drafter(ids, 10).tolist() == [[6, 7, 8]]
+        index = drafter.index
+        out = drafter(torch.cat([ids, torch.tensor([[6, 9]])], dim=-1), 2)
+        assert drafter.index is index and len(index) == 9
+        assert out.shape == (1, 0)                   # "6 9" never seen
+        drafter(torch.tensor([[1, 2, 1]]), 2)       # new prompt → rebuilt
+        assert drafter.index is not index and drafter.index.tokens == [1, 2, 1]
+        assert drafter.stats["calls"] == 3 and drafter.stats["hits"] == 1
+
+    def test_for_request_isolates_state(self):
+        from core.prompt_lookup import PromptLookupDrafter
+        base = PromptLookupDrafter(max_draft=4, min_match=1)
+        a, b = base.for_request(), base.for_request()
+        a(torch.tensor([[1, 2, 3, 1]]), 4)
+        assert len(b.index) == 0 and (a.max_draft, a.min_match) == (4, 1)
+
+    def test_factory_uses_env(self, monkeypatch):
+        from core.prompt_lookup import PromptLookupDrafter
+        from core.speculative_decoding import create_draft_callable
+        monkeypatch.setenv("VRM_PROMPT_LOOKUP", "6")
+        drafter = create_draft_callable(None)
+        assert isinstance(drafter, PromptLookupDrafter) and drafter.max_draft == 6
+        monkeypatch.setenv("VRM_PROMPT_LOOKUP", "0")
+        assert create_draft_callable(None) is None
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Decoder integration
+# ═══════════════════════════════════════════════════════════════════════
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    transformers = pytest.importorskip("transformers")
+    cfg = transformers.LlamaConfig(hidden_size=32, intermediate_size=64,
+                                   num_hidden_layers=2, num_attention_heads=4,
+                                   num_key_value_heads=2, vocab_size=24)
+    torch.manual_seed(0)
+    return transformers.AutoModelForCausalLM.from_config(cfg).eval()
+
+
+def _greedy(model, ids, n):
+    with torch.no_grad():
+        for _ in range(n):
+            ids = torch.cat([ids, model(ids).logits[:, -1].argmax(-1, keepdim=True)], dim=-1)
+    return ids
+
+
+class TestDecoders:
+
+    def test_swarm_decoder_is_lossless(self, tiny_model):
+        from core.prompt_lookup import PromptLookupDrafter
+        from core.speculative_decoding import CachedCausalLM, SwarmSpeculativeDecoder
+        prompt = torch.tensor([[3, 1, 4, 1, 5, 9, 2, 6]])
+        # Greedy decoding of a random model falls into a cycle that the
+        # drafter can copy from
+        ref = _greedy(tiny_model, prompt, 30)
+        dec = SwarmSpeculativeDecoder(PromptLookupDrafter(max_draft=4, min_match=1),
+                                      CachedCausalLM(tiny_model), gamma=4,
+                                      temperature=0.0, adaptive=False)
+        with torch.no_grad():
+            out = dec.generate(prompt, max_new_tokens=30)
+        assert out[0, :ref.shape[1]].tolist() == ref[0].tolist()
+        assert dec.total_accepted > 0 and dec.total_rounds < 30
+
+    def test_turbo_engine_callable_drafts(self, tiny_model):
+        from core.prompt_lookup import PromptLookupDrafter
+        from core.turbo_engine import SpeculativeTurboEngine
+        prompt = "3 1 4 1 5 9 2 6"
+        ref = _greedy(tiny_model, torch.tensor([[int(t) for t in prompt.split()]]), 20)
+        engine = SpeculativeTurboEngine(
+            tiny_model, None, _Tok(), device="cpu", gamma=4,
+            compile_main=False, compile_draft=False,
+            draft_model_callable=PromptLookupDrafter(max_draft=4, min_match=1),
+        )
+        out = engine.generate(prompt, max_new_tokens=20)
+        assert out == _Tok().decode(ref[0, 8:])
+        assert engine.total_accepted > 0
+        with pytest.raises(ValueError):
+            SpeculativeTurboEngine(tiny_model, None, _Tok(), device="cpu")
+
+    def test_batcher_gives_each_request_its_index(self, tiny_model):
+        from core.continuous_batcher import ContinuousBatcher
+        from core.prompt_lookup import PromptLookupDrafter
+        prompts = ["3 1 4 1 5 9 2 6", "7 7 8 2 8"]
+        batcher = ContinuousBatcher(tiny_model, _Tok(), device="cpu", spec_gamma=4,
+                                    draft_model_callable=PromptLookupDrafter(min_match=1))
+        futures = [batcher.submit(p, max_new_tokens=16) for p in prompts]
+        batcher.start()
+        try:
+            outs = [f.result(timeout=120) for f in futures]
+        finally:
+            batcher.stop()
+        for prompt, out in zip(prompts, outs):
+            ids = torch.tensor([[int(t) for t in prompt.split()]])
+            assert out == _Tok().decode(_greedy(tiny_model, ids, 16)[0])
+        assert batcher.stats()["speculative"]["accepted"] > 0
+
+
+__all__ = [
+    "TestSuffixAutomaton",
+    "TestPromptLookupDrafter",
+    "TestDecoders",
+]
@@ -0,0 +1,185 @@
+"""Tests for the layer-range mmap safetensors loader (core.safetensors_loader)."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+st_torch = pytest.importorskip("safetensors.torch")
+
+
+def _fake_checkpoint(path, layers=6, per_shard=2, dtype=torch.float32):
+    """Llama-style names, ``per_shard`` layers per shard, globals in first/last shard."""
+    import json
+    g = torch.Generator().manual_seed(0)
+    tensors = {}
+    weight_map = {}
+    shards = (layers + per_shard - 1) // per_shard
+    for s in range(shards):
+        fname = f"model-{s + 1:05d}-of-{shards:05d}.safetensors"
+        part = {}
+        if s == 0:
+            part["model.embed_tokens.weight"] = torch.randn(32, 8, generator=g).to(dtype)
+        for i in range(s * per_shard, min(layers, (s + 1) * per_shard)):
+            part[f"model.layers.{i}.mlp.up_proj.weight"] = torch.randn(16, 8, generator=g).to(dtype)
+            part[f"model.layers.{i}.input_layernorm.weight"] = torch.randn(8, generator=g).to(dtype)
+        if s == shards - 1:
+            part["model.norm.weight"] = torch.randn(8, generator=g).to(dtype)
+            part["lm_head.weight"] = torch.randn(32, 8, generator=g).to(dtype)
+        st_torch.save_file(part, os.path.join(path, fname))
+        tensors.update(part)
+        weight_map.update({k: fname for k in part})
+    with open(os.path.join(path, "model.safetensors.index.json"), "w") as f:
+        json.dump({"metadata": {}, "weight_map": weight_map}, f)
+    return tensors
+
+
+@pytest.fixture
+def ckpt(tmp_path):
+    return str(tmp_path), _fake_checkpoint(str(tmp_path))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Index + selection
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestSelection:
+
+    def test_layer_index(self):
+        from core.safetensors_loader import layer_index
+        assert layer_index("model.layers.12.self_attn.q_proj.weight") == 12
+        assert layer_index("transformer.h.3.attn.c_attn.weight") == 3
+        assert layer_index("model.embed_tokens.weight") is None
+        assert layer_index("model.norm.weight") is None
+
+    def test_read_header(self, ckpt):
+        from core.safetensors_loader import read_header
+        path, _ = ckpt
+        header, base = read_header(os.path.join(path, "model-00001-of-00003.safetensors"))
+        assert header["model.embed_tokens.weight"]["shape"] == [32, 8]
+        assert base > 8 and "__metadata__" not in header
+
+    def test_stage_selection(self, ckpt):
+        from core.safetensors_loader import SafetensorsLoader
+        path, _ = ckpt
+        ld = SafetensorsLoader(path)
+        assert ld.num_layers == 6 and len(ld.shards) == 3
+        first = set(ld.tensor_names((0, 2)))
+        mid = set(ld.tensor_names((2, 4)))
+        last = set(ld.tensor_names((4, 6)))
+        assert "model.embed_tokens.weight" in first and "lm_head.weight" not in first
+        assert all(".layers.2." in n or ".layers.3." in n for n in mid)
+        assert {"model.norm.weight", "lm_head.weight"} <= last
+        assert len(ld.tensor_names((2, 4), keep_non_layer=True)) == len(mid) + 3
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Loading
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestLoad:
+
+    def test_reads_only_needed_shards_zero_copy(self, ckpt):
+        from core.safetensors_loader import SafetensorsLoader
+        path, ref = ckpt
+        ld = SafetensorsLoader(path, workers=2)
+        out = ld.load((2, 4))
+        assert ld.stats["shards_read"] == 1 and ld.stats["zero_copy"]
+        assert set(out) == set(ld.tensor_names((2, 4)))
+        for name, t in out.items():
+            assert torch.equal(t, ref[name])
+        # Copy-on-write mapping: writes never reach the file
+        out["model.layers.2.input_layernorm.weight"].zero_()
+        again = SafetensorsLoader(path).load(names=["model.layers.2.input_layernorm.weight"])
+        assert torch.equal(again["model.layers.2.input_layernorm.weight"],
+                           ref["model.layers.2.input_layernorm.weight"])
+
+    def test_dtype_conversion_and_parallel_match_serial(self, ckpt):
+        from core.safetensors_loader import SafetensorsLoader
+        path, ref = ckpt
+        serial = SafetensorsLoader(path, workers=1).load(dtype=torch.float16)
+        parallel = SafetensorsLoader(path, workers=3).load(dtype=torch.float16)
+        assert set(serial) == set(ref)
+        for name in ref:
+            assert serial[name].dtype == torch.float16
+            assert torch.equal(serial[name], parallel[name])
+            assert torch.equal(serial[name], ref[name].half())
+
+    def test_bf16_and_single_file(self, tmp_path):
+        from core.safetensors_loader import SafetensorsLoader
+        t = {"model.layers.0.w": torch.randn(4, 4).to(torch.bfloat16),
+             "model.layers.1.w": torch.randn(4, 4).to(torch.bfloat16)}
+        st_torch.save_file(t, str(tmp_path / "model.safetensors"))
+        out = SafetensorsLoader(str(tmp_path)).load((1, 2))
+        assert list(out) == ["model.layers.1.w"]
+        assert torch.equal(out["model.layers.1.w"], t["model.layers.1.w"])
+
+    def test_missing_checkpoint(self, tmp_path):
+        from core.safetensors_loader import SafetensorsLoader, has_safetensors
+        assert not has_safetensors(str(tmp_path))
+        with pytest.raises(FileNotFoundError):
+            SafetensorsLoader(str(tmp_path))
+
+
+class TestPartialModel:
+
+    @pytest.fixture
+    def llama_dir(self, tmp_path):
+        transformers = pytest.importorskip("transformers")
+        cfg = transformers.LlamaConfig(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=6,
+            num_attention_heads=4, num_key_value_heads=2, vocab_size=64)
+        torch.manual_seed(0)
+        model = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+        model.save_pretrained(str(tmp_path), max_shard_size="20KB")
+        return str(tmp_path), model
+
+    def test_range_matches_full_model(self, llama_dir):
+        from core.cross_node import _worker_forward_tensor
+        from core.safetensors_loader import build_partial_model
+        path, full = llama_dir
+        part, stats = build_partial_model(path, 2, 4)
+        assert stats["shards_read"] < stats["shards_total"]
+        assert part.model.layers[0].mlp.up_proj.weight.is_meta
+        assert not part.model.layers[2].mlp.up_proj.weight.is_meta
+        h = torch.randn(1, 5, 32)
+        assert torch.allclose(_worker_forward_tensor(part, h, 2, 4, seq_len=5),
+                              _worker_forward_tensor(full, h, 2, 4, seq_len=5))
+
+    def test_tied_embeddings_on_last_stage(self, tmp_path):
+        transformers = pytest.importorskip("transformers")
+        from core.safetensors_loader import SafetensorsLoader, build_partial_model
+        cfg = transformers.LlamaConfig(
+            hidden_size=32, intermediate_size=64, num_hidden_layers=4,
+            num_attention_heads=4, num_key_value_heads=2, vocab_size=64,
+            tie_word_embeddings=True)
+        torch.manual_seed(0)
+        full = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+        full.save_pretrained(str(tmp_path))
+        ld = SafetensorsLoader(str(tmp_path))
+        assert not ld.has_lm_head
+        assert "model.embed_tokens.weight" not in ld.tensor_names((2, 4))
+        assert "model.embed_tokens.weight" in ld.tensor_names((2, 4), tied=True)
+        assert "model.embed_tokens.weight" not in ld.tensor_names((1, 3), tied=True)
+        part, _ = build_partial_model(str(tmp_path), 2, 4)
+        assert not part.lm_head.weight.is_meta
+        assert torch.equal(part.lm_head.weight, full.lm_head.weight)
+
+    def test_load_partial_model_uses_mmap_for_local_dir(self, llama_dir):
+        import core.cross_node as cn
+        path, _ = llama_dir
+        info = cn.load_partial_model(path, 4, 99, device="cpu", dtype_str="float32")
+        assert info["loader"] == "mmap"
+        assert info["layers_on_gpu"] == [4, 5] and info["num_layers"] == 6
+        assert not cn._partial_model.lm_head.weight.is_meta
+
+
+__all__ = [
+    "TestSelection",
+    "TestLoad",
+    "TestPartialModel",
+]
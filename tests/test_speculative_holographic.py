@@ -56,9 +56,14 @@ class TestParityMemory:
         kv = self._make_kv()
         data = b"12345678901"  # 11 bytes, 3 shards
         shards, parity = kv.encode_hologram(data, num_shards=3)
-        assert len(shards) == 3
-        # All padded to same length
-        assert all(len(s) == len(shards[0]) for s in shards)
+        # No padded copies: the short tail counts as zero in the parity
+        assert [len(s) for s in shards] == [4, 4, 3]
+        assert len(parity) == 4
+        assert b"".join(shards) == data
+        for i in range(3):
+            lost = list(shards)
+            lost[i] = None
+            assert kv.heal_hologram(lost, parity)[:len(data)] == data
 
     def test_store_and_heal_engram(self):
         kv = self._make_kv()
@@ -108,6 +113,75 @@ class TestParityMemory:
         assert result[:len(data)] == data
 
 
+class TestParityXorBackends:
+    """NumPy uint64-view XOR path must match the pure-Python reference."""
+
+    def _pair(self):
+        pytest.importorskip("numpy")
+        from core.parity_memory import ParityKVManager
+        return ParityKVManager(backend="numpy"), ParityKVManager(backend="python")
+
+    def test_default_backend_not_python_when_numpy_present(self):
+        pytest.importorskip("numpy")
+        from core.parity_memory import ParityKVManager
+        assert ParityKVManager().stats()["backend"] in ("numpy", "native")
+
+    def test_unknown_backend_rejected(self):
+        from core.parity_memory import ParityKVManager
+        with pytest.raises(ValueError):
+            ParityKVManager(backend="avx512")
+
+    @pytest.mark.parametrize("size,num_shards", [
+        (1, 1), (7, 3), (64, 4), (1000, 3), (4099, 5),
+    ])
+    def test_encode_matches_python(self, size, num_shards):
+        fast, ref = self._pair()
+        data = os.urandom(size)
+        assert fast.encode(data, num_shards) == ref.encode(data, num_shards)
+
+    @pytest.mark.parametrize("size", [13, 1024, 4097])
+    def test_heal_every_index_matches_python(self, size):
+        fast, ref = self._pair()
+        data = os.urandom(size)
+        shards, parity = fast.encode(data, num_shards=3)
+        for i in range(3):
+            a, b = list(shards), list(shards)
+            a[i] = b[i] = None
+            healed = fast.heal(a, parity)
+            assert healed == ref.heal(b, parity)
+            assert healed[:size] == data
+
+    def test_encode_streams_across_chunk_boundary(self, monkeypatch):
+        import core.parity_memory as pm
+        monkeypatch.setattr(pm, "_STREAM_CHUNK", 24)
+        fast, ref = self._pair()
+        data = os.urandom(301)
+        shards, parity = fast.encode(data, num_shards=2)
+        assert parity == ref.encode(data, num_shards=2)[1]
+        shards[1] = None
+        assert fast.heal(shards, parity)[:301] == data
+
+    def test_encode_returns_views_without_padding(self):
+        np = pytest.importorskip("numpy")
+        fast, _ = self._pair()
+        arr = np.arange(10, dtype=np.uint8)
+        shards, parity = fast.encode(arr, num_shards=4)
+        assert [len(s) for s in shards] == [3, 3, 3, 1]
+        assert all(isinstance(s, memoryview) for s in shards)
+        assert shards[3].obj is arr
+        assert parity == bytes([0 ^ 3 ^ 6 ^ 9, 1 ^ 4 ^ 7, 2 ^ 5 ^ 8])
+
+    def test_encode_accepts_numpy_buffer(self):
+        np = pytest.importorskip("numpy")
+        fast, _ = self._pair()
+        arr = np.arange(48, dtype=np.float16)
+        info = fast.store_engram("np-1", arr, num_shards=3)
+        assert info["num_shards"] == 3
+        assert fast.active_engrams["np-1"]["original_size"] == arr.nbytes
+        healed = fast.heal_engram("np-1", missing_idx=2)
+        assert healed[:arr.nbytes] == arr.tobytes()
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # Speculative Decoding
 # ═══════════════════════════════════════════════════════════════════════
@@ -0,0 +1,300 @@
+"""Tests for speculative sampling, KV rollback and tree drafts in core.speculative_decoding."""
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+
+def _tv(counts: Counter, expected: dict, n: int) -> float:
+    """Total-variation distance between empirical *counts* and *expected*."""
+    keys = set(counts) | set(expected)
+    return 0.5 * sum(abs(counts.get(k, 0) / n - expected.get(k, 0.0)) for k in keys)
+
+
+class _Bigram:
+    """Toy LM whose next-token logits depend only on the last token."""
+
+    def __init__(self, table):
+        self.logits = torch.log(table)
+
+    def __call__(self, ids):
+        return self.logits[ids[0]][None]
+
+    def verify_tree(self, ids, tree):
+        last = [ids[0, -1].item()] + tree.tokens
+        return self.logits[torch.tensor(last)][None]
+
+
+class _BigramDrafter:
+    """Samples drafts from a bigram table and reports q, or expands top-k trees."""
+
+    def __init__(self, table, generator, sample_tree=False):
+        self.table = table
+        self.generator = generator
+        self.sample_tree = sample_tree
+
+    def __call__(self, ids, n):
+        last, tokens, dists = ids[0, -1].item(), [], []
+        for _ in range(n):
+            q = self.table[last]
+            last = int(torch.multinomial(q, 1, generator=self.generator))
+            tokens.append(last)
+            dists.append(q)
+        return torch.tensor([tokens]), torch.stack(dists)[None]
+
+    def draft_tree(self, ids, widths):
+        from core.speculative_decoding import DraftTree
+        tree, frontier = DraftTree(), [(-1, ids[0, -1].item())]
+        for width in widths:
+            nxt = []
+            for node, token in frontier:
+                q = self.table[token]
+                if self.sample_tree:
+                    tree.draft_probs[node] = q
+                    children = torch.multinomial(q, width, replacement=True,
+                                                 generator=self.generator).tolist()
+                else:
+                    children = q.topk(width).indices.tolist()
+                for child in children:
+                    nxt.append((tree.add(child, node), child))
+            frontier = nxt
+        return tree
+
+
+def _tables(vocab=4, seed=0):
+    g = torch.Generator().manual_seed(seed)
+    target = torch.softmax(torch.randn(vocab, vocab, generator=g) * 1.5, dim=-1)
+    draft = torch.softmax(torch.randn(vocab, vocab, generator=g) * 1.5, dim=-1)
+    return target, draft
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Rejection sampling
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestRejectionSampling:
+
+    P = torch.tensor([0.5, 0.2, 0.2, 0.1])
+    Q = torch.tensor([0.1, 0.1, 0.3, 0.5])
+
+    def test_sampled_draft_preserves_target(self):
+        from core.speculative_decoding import speculative_accept
+        g = torch.Generator().manual_seed(0)
+        probs = torch.stack([self.P, self.P])
+        counts, n = Counter(), 20000
+        for _ in range(n):
+            x = int(torch.multinomial(self.Q, 1, generator=g))
+            accepted, nxt = speculative_accept([x], probs, self.Q[None], g)
+            counts[x if accepted else nxt] += 1
+        assert _tv(counts, dict(enumerate(self.P.tolist())), n) < 0.015
+
+    def test_deterministic_draft_preserves_target(self):
+        from core.speculative_decoding import speculative_accept
+        g = torch.Generator().manual_seed(1)
+        probs = torch.stack([self.P, self.P])
+        counts, n = Counter(), 20000
+        for _ in range(n):
+            accepted, nxt = speculative_accept([3], probs, None, g)
+            counts[3 if accepted else nxt] += 1
+        assert _tv(counts, dict(enumerate(self.P.tolist())), n) < 0.015
+
+    def test_identical_distributions_always_accept(self):
+        from core.speculative_decoding import speculative_accept
+        probs = torch.stack([self.Q] * 3)
+        assert speculative_accept([2, 3], probs, probs[:2])[0] == 2
+
+    def test_greedy_is_exact_match(self):
+        from core.speculative_decoding import speculative_accept, target_probs
+        logits = torch.tensor([[0.0, 3.0, 1.0], [2.0, 0.0, 1.0], [0.0, 0.0, 5.0]])
+        probs = target_probs(logits, 0.0)
+        assert speculative_accept([1, 0], probs) == (2, 2)
+        assert speculative_accept([1, 2], probs) == (1, 0)
+
+    @pytest.mark.parametrize("sampled", [False, True])
+    def test_tree_preserves_target(self, sampled):
+        from core.speculative_decoding import DraftTree, tree_accept
+        g = torch.Generator().manual_seed(2)
+        probs = torch.stack([self.P] * 4)
+        counts, n = Counter(), 20000
+        for _ in range(n):
+            tree = DraftTree()
+            if sampled:
+                tree.draft_probs[-1] = self.Q
+                children = torch.multinomial(self.Q, 3, replacement=True, generator=g)
+            else:
+                children = (3, 2, 1)
+            for token in children:
+                tree.add(token)
+            path, nxt = tree_accept(tree, probs, g)
+            counts[tree.tokens[path[0]] if path else nxt] += 1
+        assert _tv(counts, dict(enumerate(self.P.tolist())), n) < 0.015
+
+    def test_tree_mask_sees_ancestors_only(self):
+        from core.speculative_decoding import DraftTree
+        tree = DraftTree()
+        a = tree.add(5)
+        tree.add(6)
+        tree.add(7, a)
+        mask = tree.attention_mask(2)
+        assert tree.depths() == [1, 1, 2]
+        # rows: root, a, b, c ; cols: 2 prefix, root, a, b, c
+        assert mask[3].tolist() == [True, True, True, True, False, True]
+        assert mask[2].tolist() == [True, True, True, False, True, False]
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# End-to-end distribution
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestDecoderDistribution:
+
+    @pytest.mark.parametrize("tree,sampled", [(None, False), ((2, 2), False), ((2, 2), True)])
+    def test_two_token_joint_matches_target(self, tree, sampled):
+        from core.speculative_decoding import SwarmSpeculativeDecoder
+        target, draft = _tables()
+        g = torch.Generator().manual_seed(3)
+        drafter = _BigramDrafter(draft, g, sample_tree=sampled)
+        dec = SwarmSpeculativeDecoder(drafter, _Bigram(target), gamma=3,
+                                      temperature=1.0, adaptive=False,
+                                      tree_widths=tree, generator=g)
+        prompt = torch.tensor([[0]])
+        counts, n = Counter(), 8000
+        for _ in range(n):
+            out = dec.generate(prompt, max_new_tokens=2)[0, 1:3].tolist()
+            counts[tuple(out)] += 1
+        expected = {(a, b): float(target[0, a] * target[a, b])
+                    for a in range(4) for b in range(4)}
+        assert _tv(counts, expected, n) < 0.04
+        assert dec.total_accepted > 0
+
+    def test_greedy_matches_target_argmax(self):
+        from core.speculative_decoding import SwarmSpeculativeDecoder
+        target, draft = _tables()
+        g = torch.Generator().manual_seed(4)
+        dec = SwarmSpeculativeDecoder(_BigramDrafter(draft, g), _Bigram(target), gamma=4,
+                                      temperature=0.0, generator=g)
+        out = dec.generate(torch.tensor([[1]]), max_new_tokens=12)[0].tolist()
+        for prev, nxt in zip(out, out[1:]):
+            assert nxt == int(target[prev].argmax())
+
+    def test_tree_needs_tree_capable_models(self):
+        from core.speculative_decoding import SwarmSpeculativeDecoder
+        with pytest.raises(ValueError):
+            SwarmSpeculativeDecoder(lambda ids, n: ids, lambda ids: ids, tree_widths=(2,))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# KV reuse and rollback
+# ═══════════════════════════════════════════════════════════════════════
+
+@pytest.fixture(scope="module")
+def tiny_models():
+    transformers = pytest.importorskip("transformers")
+    cfg = transformers.LlamaConfig(hidden_size=32, intermediate_size=64,
+                                   num_hidden_layers=2, num_attention_heads=4,
+                                   num_key_value_heads=2, vocab_size=24)
+    torch.manual_seed(0)
+    target = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+    draft = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+    with torch.no_grad():
+        for pt, pd in zip(target.parameters(), draft.parameters()):
+            pd.copy_(pt + 0.3 * pt.std() * torch.randn_like(pt))
+    return target, draft
+
+
+class TestKVCache:
+
+    def test_incremental_matches_full_and_rolls_back(self, tiny_models):
+        from core.speculative_decoding import CachedCausalLM
+        target, _ = tiny_models
+        lm = CachedCausalLM(target)
+        ids = torch.tensor([[1, 2, 3, 4, 5, 6]])
+        with torch.no_grad():
+            full = target(ids).logits
+            assert torch.allclose(lm(ids[:, :4]), full[:, :4], atol=1e-5)
+            assert torch.allclose(lm(ids)[:, -2:], full[:, -2:], atol=1e-5)
+            other = torch.tensor([[1, 2, 3, 9, 8]])      # diverges at position 3
+            new = lm(other)
+            assert new.shape[1] == 2 and lm.seq_len == 5
+            assert torch.allclose(new, target(other).logits[:, 3:], atol=1e-5)
+
+    def test_tree_verify_and_keep_path(self, tiny_models):
+        from core.speculative_decoding import CachedCausalLM, DraftTree
+        target, _ = tiny_models
+        lm = CachedCausalLM(target)
+        tree = DraftTree()
+        a = tree.add(7)
+        tree.add(8)
+        c = tree.add(9, a)
+        ids = torch.tensor([[1, 2, 3]])
+        with torch.no_grad():
+            logits = lm.verify_tree(ids, tree)
+            ref = target(torch.tensor([[1, 2, 3, 7, 9]])).logits
+            assert torch.allclose(logits[0, 0], ref[0, 2], atol=1e-5)
+            assert torch.allclose(logits[0, c + 1], ref[0, 4], atol=1e-5)
+            ref_b = target(torch.tensor([[1, 2, 3, 8]])).logits
+            assert torch.allclose(logits[0, 2], ref_b[0, 3], atol=1e-5)
+            lm.keep_path([a, c])
+            assert lm.seq_len == 5 and lm.cache.get_seq_length() == 5
+            nxt = torch.tensor([[1, 2, 3, 7, 9, 4]])
+            assert torch.allclose(lm(nxt)[0, -1], target(nxt).logits[0, -1], atol=1e-5)
+
+    def test_keep_path_legacy_cache(self, tiny_models):
+        from types import SimpleNamespace
+        from core.speculative_decoding import CachedCausalLM, DraftTree
+        lm = CachedCausalLM(tiny_models[0])
+        tree = DraftTree()
+        a = tree.add(7)
+        b = tree.add(8)
+        lm._tokens, lm._tree = [1, 2], tree
+        keys = torch.arange(4.0).reshape(1, 1, 4, 1)         # 2 committed + 2 tree
+        lm.cache = SimpleNamespace(key_cache=[keys], value_cache=[-keys])
+        lm.keep_path([b])
+        assert lm.cache.key_cache[0].flatten().tolist() == [0.0, 1.0, 3.0]
+        assert lm.cache.value_cache[0].flatten().tolist() == [0.0, -1.0, -3.0]
+        assert lm._tokens == [1, 2, 8]
+        lm._tree, lm.cache = tree, object()
+        with pytest.raises(TypeError, match="keep_path"):
+            lm.keep_path([a])
+
+    @pytest.mark.parametrize("tree", [None, (2, 2, 1)])
+    def test_greedy_decode_matches_target(self, tiny_models, tree):
+        from core.speculative_decoding import (
+            CachedCausalLM, CachedDrafter, SwarmSpeculativeDecoder,
+        )
+        target, draft = tiny_models
+        prompt = torch.tensor([[3, 1, 4, 1, 5]])
+        ref = prompt
+        with torch.no_grad():
+            for _ in range(10):
+                nxt = target(ref).logits[:, -1].argmax(dim=-1, keepdim=True)
+                ref = torch.cat([ref, nxt], dim=-1)
+        verifier = CachedCausalLM(target)
+        dec = SwarmSpeculativeDecoder(CachedDrafter(draft), verifier, gamma=3,
+                                      temperature=0.0, adaptive=False, tree_widths=tree)
+        out = dec.generate(prompt, max_new_tokens=10)
+        assert out[0, :15].tolist() == ref[0].tolist()
+        # KV reuse: the verifier never re-reads the prompt after round one
+        per_round = (1 + 2 + 4 + 4) if tree else 4
+        assert verifier.tokens_processed <= prompt.shape[1] + per_round * dec.total_rounds
+
+    def test_sampled_drafter_returns_distributions(self, tiny_models):
+        from core.speculative_decoding import CachedDrafter
+        _, draft = tiny_models
+        tokens, probs = CachedDrafter(draft, temperature=1.0)(torch.tensor([[1, 2]]), 3)
+        assert tokens.shape == (1, 3) and probs.shape == (1, 3, 24)
+        assert torch.allclose(probs.sum(-1), torch.ones(1, 3))
+
+
+__all__ = [
+    "TestRejectionSampling",
+    "TestDecoderDistribution",
+    "TestKVCache",
+]
@@ -0,0 +1,177 @@
+"""Tests for the log-structured L5 spill store (experimental.spill_store)."""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+os.environ.setdefault("VRM_AUTOSAVE_MEMORY", "0")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.fixture
+def store(tmp_path):
+    from experimental.spill_store import SegmentSpillStore
+    st = SegmentSpillStore(tmp_path / "seg", segment_bytes=64 * 1024, background=False)
+    yield st
+    st.close()
+
+
+def _segment_files(path):
+    return sorted(p.name for p in path.glob("seg_*.dat"))
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# SegmentSpillStore
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestSegmentSpillStore:
+
+    @pytest.mark.parametrize("dtype", [torch.float32, torch.float16,
+                                       torch.bfloat16, torch.int8, torch.int64])
+    def test_roundtrip_dtype_and_shape(self, store, dtype):
+        t = (torch.randn(3, 5, 7) * 10).to(dtype)
+        entry = store.put("blk", t)
+        assert entry.shape == (3, 5, 7)
+        assert entry.offset % 4096 == 0
+        out = store.get("blk")
+        assert out.dtype == dtype and torch.equal(out, t)
+
+    def test_many_blocks_share_segments(self, store, tmp_path):
+        blocks = {f"b{i}": torch.randn(256) for i in range(40)}  # 1 KB each
+        store.put_many(blocks.items())
+        assert len(store) == 40
+        # 40 page-aligned extents fit in 3 x 64 KB segments, not 40 files
+        assert len(_segment_files(store.root)) == 3
+        for bid, t in blocks.items():
+            assert torch.equal(store.get(bid), t)
+
+    def test_get_many_matches_get(self, store):
+        blocks = {f"b{i}": torch.arange(i * 10, dtype=torch.float32) for i in range(1, 6)}
+        store.put_many(blocks.items())
+        out = store.get_many(list(blocks) + ["missing"])
+        assert out[-1] is None
+        for t, ref in zip(out, blocks.values()):
+            assert torch.equal(t, ref)
+
+    def test_overwrite_marks_old_extent_dead(self, store):
+        store.put("blk", torch.zeros(1024))
+        store.put("blk", torch.ones(1024))
+        assert torch.equal(store.get("blk"), torch.ones(1024))
+        assert store.stats()["dead_bytes"] == 4096
+
+    def test_delete(self, store):
+        store.put("blk", torch.ones(8))
+        assert store.delete("blk")
+        assert store.get("blk") is None
+        assert not store.delete("blk")
+
+    def test_large_block_gets_dedicated_segment(self, store, tmp_path):
+        big = torch.randn(64 * 1024)  # 256 KB > 64 KB segment
+        store.put("big", big)
+        assert torch.equal(store.get("big"), big)
+        n = len(_segment_files(store.root))
+        store.delete("big")
+        assert len(_segment_files(store.root)) == n - 1
+
+    def test_compaction_reclaims_segments_and_keeps_data(self, store, tmp_path):
+        blocks = {f"b{i}": torch.randn(1024) for i in range(64)}  # 4 KB each
+        store.put_many(blocks.items())
+        before = len(_segment_files(store.root))
+        for i in range(0, 64, 4):
+            for j in range(3):
+                store.delete(f"b{i + j}")
+        reclaimed = store.compact()
+        assert reclaimed >= 1
+        assert len(_segment_files(store.root)) < before
+        for i in range(3, 64, 4):
+            assert torch.equal(store.get(f"b{i}"), blocks[f"b{i}"])
+        assert store.stats()["compactions"] == reclaimed
+
+    def test_zero_copy_view(self, store):
+        t = torch.arange(16, dtype=torch.float32)
+        store.put("blk", t)
+        view = store.get("blk", copy=False)
+        assert torch.equal(view, t)
+
+    def test_stores_sharing_root_keep_their_segments(self, tmp_path):
+        from experimental.spill_store import SegmentSpillStore
+        root = tmp_path / "seg"
+        a = SegmentSpillStore(root, background=False)
+        a.put("blk", torch.ones(8))
+        b = SegmentSpillStore(root, background=False)
+        assert a.root != b.root and a.root.parent == b.root.parent == root
+        assert _segment_files(a.root) and torch.equal(a.get("blk"), torch.ones(8))
+        b.close()
+        assert not b.root.exists() and a.root.exists()
+        a.close()
+        assert list(root.iterdir()) == []
+
+    def test_only_orphaned_directories_reclaimed(self, tmp_path):
+        from experimental import spill_store
+        if spill_store.fcntl is None:
+            pytest.skip("needs fcntl")
+        root = tmp_path / "seg"
+        live = spill_store.SegmentSpillStore(root, background=False)
+        live.put("blk", torch.ones(8))
+        dead = spill_store.SegmentSpillStore(root, background=False)
+        dead.put("blk", torch.ones(8))
+        dead.close(remove=False)                # crashed: files stay, lock released
+        (root / "seg_000042.dat").write_bytes(b"foreign")
+        fresh = spill_store.SegmentSpillStore(root, background=False)
+        assert not dead.root.exists()
+        assert torch.equal(live.get("blk"), torch.ones(8))
+        assert (root / "seg_000042.dat").exists()
+        fresh.close()
+        live.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# HierarchicalMemoryManager integration
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestHMMSegmentSpill:
+
+    @pytest.fixture
+    def hmem(self, tmp_path):
+        from experimental.hierarchical_memory import HierarchicalMemoryManager
+        hm = HierarchicalMemoryManager(nvme_dir=str(tmp_path / "nvme"))
+        yield hm
+        if hm._spill_store is not None:
+            hm._spill_store.close()
+
+    def test_tensor_spill_uses_segment_store(self, hmem, tmp_path):
+        from core.memory_block import MemoryBlock
+        block = MemoryBlock(id="seg-block", size_mb=1)
+        t = torch.randn(4, 128, dtype=torch.float16)
+        hmem.register_block(block, "L3", t)
+        hmem.spill_to_nvme(block, t)
+
+        assert hmem.get_tier(block.id) == "L5"
+        assert hmem.registry[block.id]["meta"]["storage_type"] == "segment"
+        assert not list((tmp_path / "nvme").glob("seg-block.*"))
+
+        loaded = hmem.load_from_nvme(block)
+        assert torch.equal(loaded, t)
+        assert hmem.get_tier(block.id) == "L3"
+        assert block.id not in hmem._spill_store
+
+    def test_store_disabled_falls_back_to_bin_file(self, hmem, tmp_path, monkeypatch):
+        from core.memory_block import MemoryBlock
+        monkeypatch.setenv("VRM_NVME_SPILL_STORE", "0")
+        block = MemoryBlock(id="file-block", size_mb=1)
+        t = torch.randn(64)
+        hmem.register_block(block, "L3", t)
+        hmem.spill_to_nvme(block, t)
+
+        assert (tmp_path / "nvme" / "file-block.bin").exists()
+        assert torch.equal(hmem.load_from_nvme(block), t)
+
+
+__all__ = [
+    "TestSegmentSpillStore",
+    "TestHMMSegmentSpill",
+]
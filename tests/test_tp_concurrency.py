@@ -0,0 +1,137 @@
+"""Tests for concurrent shard execution and the ring all-reduce in core.tensor_parallel."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Ring all-reduce
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestRingAllReduce:
+
+    @pytest.mark.parametrize("n", [2, 3, 4])
+    @pytest.mark.parametrize("shape", [(7,), (2, 5, 3)])
+    def test_matches_sum(self, n, shape):
+        from core.tensor_parallel import _ring_all_reduce
+        g = torch.Generator().manual_seed(n)
+        tensors = [torch.randn(*shape, generator=g, dtype=torch.float64) for _ in range(n)]
+        expected = sum(t.clone() for t in tensors)
+        _ring_all_reduce(tensors)
+        for t in tensors:
+            assert torch.allclose(t, expected)
+
+    def test_fallback_on_cpu(self, monkeypatch):
+        import core.tensor_parallel as tp
+        calls = []
+        monkeypatch.setattr(tp, "_ring_transfer",
+                            lambda src, dev: calls.append(src.numel()) or src.to(dev))
+        tensors = [torch.ones(8), torch.full((8,), 2.0)]
+        tp._nccl_all_reduce(tensors)
+        assert tensors[0].tolist() == tensors[1].tolist() == [3.0] * 8
+        # 2 shards: 1 reduce-scatter + 1 all-gather step, each moving half
+        assert calls == [4, 4, 4, 4]
+
+    @pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA not available")
+    def test_gpu_hop_stages_through_arena(self):
+        from core.host_arena import get_host_arena
+        from core.tensor_parallel import _ring_transfer
+        src = torch.arange(16.0, device="cuda")
+        before = get_host_arena().stats()["leases"]
+        assert _ring_transfer(src, "cpu").tolist() == src.tolist()
+        assert get_host_arena().stats()["leases"] > before
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Concurrent shards + overlapped all-reduce
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestConcurrentShards:
+
+    def test_shards_run_on_separate_threads(self):
+        from core.tensor_parallel import _run_shards
+        barrier = threading.Barrier(3, timeout=5)
+
+        def work(i):
+            barrier.wait()                   # deadlocks unless all 3 run at once
+            return i * 10
+
+        assert _run_shards(["cpu"] * 3, work, concurrent=True) == [0, 10, 20]
+
+    def test_sequential_when_disabled(self):
+        from core.tensor_parallel import _run_shards
+        names = []
+        _run_shards(["cpu", "cpu"], lambda i: names.append(threading.current_thread().name),
+                    concurrent=False)
+        assert names == [threading.current_thread().name] * 2
+
+    @pytest.mark.parametrize("chunks", [1, 2, 3, 64])
+    def test_chunked_row_parallel_matches(self, chunks):
+        from core.tensor_parallel import TPLinear, _row_parallel_reduce
+        g = torch.Generator().manual_seed(0)
+        w = torch.randn(10, 6, generator=g)
+        b = torch.randn(10, generator=g)
+        x = torch.randn(2, 16, 6, generator=g)
+        shards = [TPLinear(w[:, :3], b, "cpu"), TPLinear(w[:, 3:], None, "cpu")]
+        out = _row_parallel_reduce([x[..., :3], x[..., 3:]], shards, ["cpu", "cpu"],
+                                   concurrent=True, chunks=chunks)
+        assert torch.allclose(out, torch.nn.functional.linear(x, w, b), atol=1e-6)
+
+    def test_allreduce_overlaps_next_chunk(self, monkeypatch):
+        import core.tensor_parallel as tp
+        events = []
+        real = tp._all_reduce_sum
+
+        def slow_reduce(parts):
+            events.append(("reduce_start", time.perf_counter()))
+            time.sleep(0.05)
+            return real(parts)
+
+        class _Lin:
+            weight = torch.zeros(4, 2)
+
+            def __call__(self, x, rows=None):
+                events.append(("compute", time.perf_counter()))
+                time.sleep(0.02)
+                return torch.zeros(*x.shape[:-1], rows[1] - rows[0])
+
+        monkeypatch.setattr(tp, "_all_reduce_sum", slow_reduce)
+        x = torch.zeros(32, 2)
+        t0 = time.perf_counter()
+        tp._row_parallel_reduce([x, x], [_Lin(), _Lin()], ["cpu", "cpu"], True, 4)
+        elapsed = time.perf_counter() - t0
+        # Serial would be 4 * (0.02 + 0.05) = 0.28 s; overlapped ~0.02 + 4 * 0.05
+        assert elapsed < 0.26
+        first_reduce = next(t for e, t in events if e == "reduce_start")
+        assert any(e == "compute" and t > first_reduce for e, t in events)
+
+    def test_model_matches_hf_in_every_mode(self):
+        transformers = pytest.importorskip("transformers")
+        from core.tensor_parallel import TPModel
+        cfg = transformers.LlamaConfig(hidden_size=64, intermediate_size=96,
+                                       num_hidden_layers=2, num_attention_heads=4,
+                                       num_key_value_heads=2, vocab_size=50)
+        torch.manual_seed(0)
+        model = transformers.AutoModelForCausalLM.from_config(cfg).eval()
+        ids = torch.randint(0, 50, (1, 20))
+        tpm = TPModel(model, ["cpu", "cpu"])
+        with torch.no_grad():
+            ref = model(ids).logits
+            for concurrent, chunks in ((False, 1), (True, 1), (True, 3)):
+                tpm.set_execution(concurrent=concurrent, overlap_chunks=chunks)
+                assert torch.allclose(tpm(ids), ref, atol=1e-5)
+
+
+__all__ = [
+    "TestRingAllReduce",
+    "TestConcurrentShards",
+]
@@ -0,0 +1,148 @@
+"""Tests for KV-cached incremental decode in core.tensor_parallel (TPKVCache).
+
+Two "devices" on CPU (``["cpu", "cpu"]``) exercise the sharding, the
+per-shard caches and the all-reduce fallback without GPUs.
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+DEVICES = ["cpu", "cpu"]
+
+
+def _llama(layers=2):
+    cfg = transformers.LlamaConfig(
+        hidden_size=64, intermediate_size=128, num_hidden_layers=layers,
+        num_attention_heads=4, num_key_value_heads=2, vocab_size=101)
+    torch.manual_seed(0)
+    return transformers.AutoModelForCausalLM.from_config(cfg).eval()
+
+
+def _gpt2():
+    cfg = transformers.GPT2Config(n_embd=64, n_layer=2, n_head=4, vocab_size=101,
+                                  bos_token_id=0, eos_token_id=0)
+    torch.manual_seed(0)
+    return transformers.AutoModelForCausalLM.from_config(cfg).eval()
+
+
+@pytest.fixture(scope="module")
+def llama():
+    from core.tensor_parallel import TPModel
+    model = _llama()
+    return model, TPModel(model, DEVICES)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Cache
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestTPKVCache:
+
+    def test_update_grows_and_crops(self):
+        from core.tensor_parallel import TPKVCache
+        c = TPKVCache(num_layers=1, num_shards=2, capacity=2)
+        k = torch.arange(3.0).view(1, 1, 3, 1)
+        full_k, _ = c.update(0, 1, k, k)
+        assert full_k.shape[2] == 3
+        c.advance(3)
+        full_k, _ = c.update(0, 1, k[:, :, :1] + 10, k[:, :, :1])
+        assert full_k.view(-1).tolist() == [0.0, 1.0, 2.0, 10.0]
+        c.advance(1)
+        c.crop(2)
+        full_k, _ = c.update(0, 1, k[:, :, :1] - 1, k[:, :, :1])
+        assert full_k.view(-1).tolist() == [0.0, 1.0, -1.0]
+        assert c._k[0][0] is None                       # shard 0 never written
+
+    def test_each_shard_holds_its_kv_heads(self, llama):
+        _, tp = llama
+        cache = tp.new_cache()
+        tp(torch.randint(0, 101, (1, 5)), past_key_values=cache)
+        assert cache.seq_len == 5
+        kv_heads = tp.tp_layers[0].tp_attn.kv_heads_per_shard
+        for shard in range(len(DEVICES)):
+            assert cache._k[0][shard].shape[:2] == (1, kv_heads)
+        assert kv_heads == 1                            # 2 KV heads over 2 shards
+        assert sum(cache.memory_bytes().values()) > 0
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Equivalence with the unsharded HF model
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestEquivalence:
+
+    def test_chunked_prefill_and_decode_match_full_forward(self, llama):
+        model, tp = llama
+        ids = torch.randint(0, 101, (2, 9), generator=torch.Generator().manual_seed(1))
+        with torch.no_grad():
+            ref = model(ids).logits
+            cache = tp.new_cache(capacity=4)
+            parts = [tp(ids[:, a:b], past_key_values=cache)
+                     for a, b in ((0, 4), (4, 5), (5, 9))]
+        assert torch.allclose(torch.cat(parts, dim=1), ref, atol=1e-5)
+
+    def test_greedy_matches_hf_generate(self, llama):
+        model, tp = llama
+        ids = torch.randint(0, 101, (1, 6), generator=torch.Generator().manual_seed(2))
+        with torch.no_grad():
+            hf = model.generate(ids, max_new_tokens=24, do_sample=False,
+                                min_new_tokens=24, pad_token_id=0)
+        cached = tp.generate(ids, max_new_tokens=24, eos_token_id=-1)
+        uncached = tp.generate(ids, max_new_tokens=24, eos_token_id=-1, use_cache=False)
+        assert cached.tolist() == hf.tolist() == uncached.tolist()
+
+    def test_gpt2_absolute_positions(self):
+        from core.tensor_parallel import TPModel
+        model = _gpt2()
+        tp = TPModel(model, DEVICES)
+        ids = torch.randint(1, 101, (1, 5), generator=torch.Generator().manual_seed(3))
+        with torch.no_grad():
+            hf = model.generate(ids, max_new_tokens=12, do_sample=False,
+                                min_new_tokens=12, pad_token_id=0)
+        assert tp.generate(ids, max_new_tokens=12, eos_token_id=-1).tolist() == hf.tolist()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Sampling
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestSampling:
+
+    def test_seeded_sampling_is_reproducible_and_cache_independent(self, llama):
+        _, tp = llama
+        ids = torch.randint(0, 101, (1, 4), generator=torch.Generator().manual_seed(4))
+        kw = dict(max_new_tokens=16, do_sample=True, temperature=0.8, top_k=20,
+                  top_p=0.9, eos_token_id=-1)
+        torch.manual_seed(7)
+        a = tp.generate(ids, **kw)
+        torch.manual_seed(7)
+        b = tp.generate(ids, use_cache=False, **kw)
+        assert a.tolist() == b.tolist()
+
+    def test_top_k_one_is_greedy(self, llama):
+        _, tp = llama
+        ids = torch.randint(0, 101, (1, 4), generator=torch.Generator().manual_seed(5))
+        sampled = tp.generate(ids, max_new_tokens=8, do_sample=True, top_k=1, eos_token_id=-1)
+        assert sampled.tolist() == tp.generate(ids, max_new_tokens=8, eos_token_id=-1).tolist()
+
+    def test_stops_on_eos(self, llama):
+        _, tp = llama
+        ids = torch.randint(0, 101, (1, 4), generator=torch.Generator().manual_seed(6))
+        first = tp.generate(ids, max_new_tokens=1, eos_token_id=-1)[0, -1].item()
+        out = tp.generate(ids, max_new_tokens=10, eos_token_id=[first, 1000])
+        assert out.shape[1] == ids.shape[1] + 1
+
+
+__all__ = [
+    "TestTPKVCache",
+    "TestEquivalence",
+    "TestSampling",
+]
@@ -29,6 +29,7 @@ from experimental.vram_lending import (
     VRAMLease,
     GPUBudget,
     LendingPolicy,
+    LendingArena,
     LeaseState,
     ReclaimUrgency,
     get_lending_pool,
@@ -436,6 +437,153 @@ class TestVRAMLendingPool:
         assert budget.kv_cache_bytes == 4e9
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# Lending buffer allocator tests
+# ═══════════════════════════════════════════════════════════════════════════
+
+class TestLendingArena:
+    """Test the best-fit free-list allocator over the lending buffer."""
+
+    def test_alloc_aligns_and_packs(self):
+        arena = LendingArena(4096, alignment=256)
+        assert arena.alloc(100) == 0
+        assert arena.alloc(256) == 256
+        assert arena.stats()["allocated_bytes"] == 512
+
+    def test_released_hole_is_reused(self):
+        arena = LendingArena(4096, alignment=256)
+        a = arena.alloc(1024)
+        b = arena.alloc(1024)
+        arena.alloc(1024)
+        arena.free(b)
+        # The bump allocator would have returned 3072 here
+        assert arena.alloc(1024) == b
+        assert a == 0
+
+    def test_best_fit_prefers_smallest_hole(self):
+        arena = LendingArena(8192, alignment=256)
+        offs = [arena.alloc(1024) for _ in range(6)]
+        arena.free(offs[1])                  # 1 KB hole
+        arena.free(offs[3])
+        arena.free(offs[4])                  # 2 KB hole (coalesced)
+        assert arena.alloc(1024) == offs[1]
+        assert arena.alloc(2048) == offs[3]
+
+    def test_free_coalesces_neighbours(self):
+        arena = LendingArena(3072, alignment=256)
+        offs = [arena.alloc(1024) for _ in range(3)]
+        arena.free(offs[0])
+        arena.free(offs[2])
+        assert arena.stats()["free_blocks"] == 2
+        arena.free(offs[1])
+        st = arena.stats()
+        assert st["free_blocks"] == 1
+        assert st["largest_free_block"] == 3072
+        assert st["fragmentation"] == 0.0
+
+    def test_exhausted_returns_none(self):
+        arena = LendingArena(1024, alignment=256)
+        assert arena.alloc(1024) == 0
+        assert arena.alloc(1) is None
+        assert arena.stats()["failed_allocs"] == 1
+
+    def test_double_free_is_noop(self):
+        arena = LendingArena(1024, alignment=256)
+        off = arena.alloc(512)
+        assert arena.free(off) is True
+        assert arena.free(off) is False
+        assert arena.free_bytes == 1024
+
+    def test_fragmentation_metric(self):
+        arena = LendingArena(4096, alignment=256)
+        offs = [arena.alloc(1024) for _ in range(4)]
+        arena.free(offs[0])
+        arena.free(offs[2])
+        # 2 KB free split into two 1 KB holes
+        assert arena.stats()["fragmentation"] == pytest.approx(0.5)
+
+    def test_compact_closes_holes(self):
+        arena = LendingArena(4096, alignment=256)
+        offs = [arena.alloc(1024) for _ in range(4)]
+        arena.free(offs[0])
+        arena.free(offs[2])
+        assert arena.alloc(2048) is None
+        moves = arena.compact()
+        assert moves == {offs[1]: 0, offs[3]: 1024}
+        assert arena.alloc(2048) == 2048
+
+    def test_pool_reuses_released_offsets(self):
+        pool = VRAMLendingPool()
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        l1 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        l2 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert l2.offset == l1.offset + (1 << 20)
+        pool.release(l1.lease_id)
+        l3 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert l3.offset == l1.offset
+        frag = pool.fragmentation_stats(1)[1]
+        assert frag["live_allocations"] == 2
+        assert "arena" in pool.stats()["per_gpu"][1]
+        pool.close()
+
+    def test_pool_compaction_relocates_leases(self):
+        policy = LendingPolicy(compact_on_fragmentation=True)
+        pool = VRAMLendingPool(policy=policy)
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        # Shrink the logical arena so holes matter
+        pool._arenas[1] = LendingArena(4 << 20, alignment=256)
+        leases = [pool.borrow(borrower_gpu=0, size_bytes=1 << 20) for _ in range(4)]
+        pool.release(leases[0].lease_id)
+        pool.release(leases[2].lease_id)
+        moved = []
+        pool.on_relocate(lambda lease, old: moved.append((lease.lease_id, old)))
+        big = pool.borrow(borrower_gpu=0, size_bytes=2 << 20)
+        assert big.offset == 2 << 20
+        assert leases[1].offset == 0
+        assert leases[3].offset == 1 << 20
+        assert len(moved) == 2
+        pool.close()
+
+    def test_compaction_moves_only_buffer_views(self):
+        torch = pytest.importorskip("torch")
+        pool = VRAMLendingPool()
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        pool._arenas[1] = LendingArena(4 << 20, alignment=256)
+        buf = pool._budgets[1].lending_buffer = torch.zeros(4 << 20, dtype=torch.uint8)
+        leases = [pool.borrow(borrower_gpu=0, size_bytes=1 << 20) for _ in range(3)]
+        view = buf[1 << 20:2 << 20]
+        view.fill_(7)
+        leases[1].tensor_ref = view
+        own = torch.full((1 << 20,), 9, dtype=torch.uint8)   # materialize_lease-style
+        leases[2].tensor_ref = own
+        buf[2 << 20:3 << 20].fill_(5)
+        pool.release(leases[0].lease_id)
+
+        assert pool.compact(1) == 2
+        assert leases[1].tensor_ref.data_ptr() == buf.data_ptr()
+        assert int(leases[1].tensor_ref.min()) == 7
+        # The separately allocated tensor kept its memory and bytes
+        assert leases[2].tensor_ref is own and int(own.min()) == int(own.max()) == 9
+        assert leases[2].offset == 1 << 20
+        pool.close()
+
+    def test_pool_lease_outside_arena_when_full(self):
+        pool = VRAMLendingPool()
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        pool._arenas[1] = LendingArena(1 << 20, alignment=256)
+        l1 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        l2 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert l1.offset == 0
+        assert l2 is not None and l2.offset == -1
+        pool.release(l2.lease_id)
+        assert pool.fragmentation_stats(1)[1]["live_allocations"] == 1
+        pool.close()
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # Singleton tests
 # ═══════════════════════════════════════════════════════════════════════════
@@ -552,6 +700,86 @@ class TestPagedKVIntegration:
         victim = mgr._evict_lru()
         assert victim == 3
 
+    def _slab_manager(self, slab_pages=4):
+        from core.paged_attention import PagedKVCacheManager, PagedKVConfig
+        pool = VRAMLendingPool()
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        config = PagedKVConfig(device="cuda:0", max_pages=2, page_size=4,
+                               enable_lending=False,
+                               overflow_slab_pages=slab_pages)
+        mgr = PagedKVCacheManager(config)
+        mgr._lending_pool = pool
+        return mgr, pool
+
+    def test_overflow_borrows_one_lease_per_slab(self):
+        mgr, pool = self._slab_manager(slab_pages=4)
+        mgr.allocate("req1", num_tokens=8)          # exhausts the 2 local pages
+        for _ in range(16):                         # 4 more pages
+            assert mgr.append_token("req1") is not None
+        assert pool.stats()["total_leases_created"] == 1
+        lease = next(iter(mgr._lending_leases.values()))
+        assert lease.size_bytes == 4 * mgr.config.page_size_bytes
+        s = mgr.stats()
+        assert s["borrowed_pages"] == 4
+        assert s["overflow_slabs"] == 1
+        # Fifth overflow page needs a second slab
+        mgr.append_token("req1")
+        assert pool.stats()["total_leases_created"] == 2
+        pool.close()
+
+    def test_slab_released_only_when_all_pages_free(self):
+        mgr, pool = self._slab_manager(slab_pages=2)
+        mgr.allocate("local", num_tokens=8)
+        mgr.allocate("a", num_tokens=4)
+        mgr.allocate("b", num_tokens=4)
+        assert len(pool.get_active_leases()) == 1
+        mgr.free("a")
+        assert len(pool.get_active_leases()) == 1
+        # The freed slab page is reused without a new lease
+        mgr.allocate("c", num_tokens=4)
+        assert pool.stats()["total_leases_created"] == 1
+        mgr.free("b")
+        mgr.free("c")
+        # Local pool still full: the idle slab is kept for the next overflow
+        assert len(pool.get_active_leases()) == 1
+        assert mgr.stats()["slab_releases"] == 0
+        mgr.free("local")
+        assert pool.get_active_leases() == []
+        assert mgr.stats()["slab_releases"] == 1
+        assert mgr.stats()["overflow_slabs"] == 0
+        pool.close()
+
+    def test_slab_churn_reuses_lease_and_page_ids(self):
+        mgr, pool = self._slab_manager(slab_pages=4)
+        mgr.allocate("local", num_tokens=8)
+        for i in range(50):
+            mgr.allocate(f"r{i}", num_tokens=4)
+            mgr.free(f"r{i}")
+        assert pool.stats()["total_leases_created"] == 1
+        assert len(mgr._pages) == 2 + 4
+        # Released slabs hand their page ids to the next one
+        mgr.free("local")
+        assert mgr.stats()["slab_releases"] == 1 and len(mgr._spare_page_ids) == 4
+        mgr.allocate("big", num_tokens=8 + 4)
+        assert len(mgr._pages) == 2 + 4 and mgr._spare_page_ids == []
+        pool.close()
+
+    def test_lender_choice_cached_between_borrows(self):
+        pool = VRAMLendingPool()
+        pool.register_gpu(0, total_bytes=int(24e9), model_bytes=int(12e9))
+        pool.register_gpu(1, total_bytes=int(16e9), model_bytes=int(4e9))
+        l1 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert pool._lender_cache[0][0] == l1.owner_gpu
+        # A better lender appears; the cached choice is kept until TTL expiry
+        pool._budgets[2] = GPUBudget(gpu_id=2, total_bytes=int(48e9), pcie_gen=5)
+        l2 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert l2.owner_gpu == l1.owner_gpu
+        pool._lender_cache.clear()
+        l3 = pool.borrow(borrower_gpu=0, size_bytes=1 << 20)
+        assert l3.owner_gpu == 2
+        pool.close()
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # Bug fix verification tests
@@ -687,6 +915,7 @@ __all__ = [
     "TestVRAMLease",
     "TestLendingPolicy",
     "TestVRAMLendingPool",
+    "TestLendingArena",
     "TestSingleton",
     "TestPagedKVIntegration",
     "TestBugFixes",
@@ -0,0 +1,271 @@
+"""Tests for layer-weight streaming (core.weight_streaming).
+
+All tests run on CPU: the copy engine is ``SimulatedCopyEngine`` with an
+optional per-copy latency standing in for PCIe transfers.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("VRM_MINIMAL_TEST", "1")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+nn = torch.nn
+
+
+class _Block(nn.Module):
+    def __init__(self, dim, compute_s=0.0):
+        super().__init__()
+        self.fc = nn.Linear(dim, dim)
+        self.norm = nn.LayerNorm(dim)
+        self.register_buffer("scale", torch.full((dim,), 0.5))
+        self.compute_s = compute_s
+
+    def forward(self, x):
+        if self.compute_s:
+            time.sleep(self.compute_s)
+        return x + self.norm(self.fc(x)) * self.scale
+
+
+class _Inner(nn.Module):
+    def __init__(self, n_layers, dim, compute_s):
+        super().__init__()
+        self.layers = nn.ModuleList(_Block(dim, compute_s) for _ in range(n_layers))
+
+
+class _TinyLM(nn.Module):
+    """HF-shaped toy model: ``model.layers`` between embed and head."""
+
+    def __init__(self, n_layers=6, dim=16, vocab=32, compute_s=0.0):
+        super().__init__()
+        torch.manual_seed(0)
+        self.embed = nn.Embedding(vocab, dim)
+        self.model = _Inner(n_layers, dim, compute_s)
+        self.head = nn.Linear(dim, vocab, bias=False)
+
+    def forward(self, ids):
+        x = self.embed(ids)
+        for layer in self.model.layers:
+            x = layer(x)
+        return self.head(x)
+
+
+def _ids():
+    return torch.arange(8).reshape(2, 4)
+
+
+def _stream(model, resident, latency_s=0.0):
+    from core.weight_streaming import SimulatedCopyEngine, enable_weight_streaming
+    return enable_weight_streaming(
+        model, device="cpu", resident_layers=resident,
+        copy_engine=SimulatedCopyEngine(latency_s=latency_s),
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Resident-layer sizing
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPlanResidentLayers:
+
+    def test_everything_fits(self):
+        from core.weight_streaming import plan_resident_layers
+        assert plan_resident_layers([10] * 8, 80) == 8
+
+    def test_partial_residency_leaves_room_for_two_slots(self):
+        from core.weight_streaming import plan_resident_layers
+        # 5 resident (50) + 2 slots (20) = 70 <= 75; 6 + 2 = 80 > 75
+        assert plan_resident_layers([10] * 8, 75) == 5
+
+    def test_slots_sized_to_largest_streamed_layer(self):
+        from core.weight_streaming import plan_resident_layers
+        # Streaming the 40-byte layer costs 2 x 40 of staging, so the plan
+        # keeps it resident and streams the small tail instead.
+        sizes = [10, 10, 40, 10, 10, 10]
+        assert plan_resident_layers(sizes, 85) == 3   # 60 + 2 x 10
+        assert plan_resident_layers(sizes, 79) == 0   # nothing fits
+
+    def test_empty_budget(self):
+        from core.weight_streaming import plan_resident_layers
+        assert plan_resident_layers([10] * 4, 0) == 0
+
+
+class TestFindDecoderLayers:
+
+    def test_hf_layout(self):
+        from core.weight_streaming import find_decoder_layers
+        model = _TinyLM(n_layers=3)
+        assert find_decoder_layers(model) == list(model.model.layers)
+
+    def test_gpt2_layout(self):
+        from core.weight_streaming import find_decoder_layers
+        model = nn.Module()
+        model.transformer = nn.Module()
+        model.transformer.h = nn.ModuleList(nn.Linear(2, 2) for _ in range(2))
+        assert len(find_decoder_layers(model)) == 2
+
+    def test_unknown_layout(self):
+        from core.weight_streaming import enable_weight_streaming, find_decoder_layers
+        assert find_decoder_layers(nn.Linear(2, 2)) is None
+        with pytest.raises(ValueError):
+            enable_weight_streaming(nn.Linear(2, 2), device="cpu")
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Streaming scheduler
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestWeightStreamer:
+
+    @pytest.mark.parametrize("resident", [0, 1, 3, 5, 6])
+    def test_output_matches_resident_model(self, resident):
+        model = _TinyLM()
+        with torch.no_grad():
+            ref = model(_ids()).clone()
+            streamer = _stream(model, resident)
+            try:
+                for _ in range(3):
+                    assert torch.allclose(model(_ids()), ref)
+            finally:
+                streamer.close()
+        assert streamer.resident_layers == resident
+        assert streamer.streamed_layers == 6 - resident
+
+    def test_layers_prefetched_in_model_order(self):
+        model = _TinyLM()
+        streamer = _stream(model, resident=2)
+        try:
+            with torch.no_grad():
+                model(_ids())
+                model(_ids())
+            st = streamer.stats()
+            assert st["passes"] == 2
+            assert st["sync_fetches"] == 0
+            # One cold copy at the first pass start; after that the last
+            # streamed layer prefetches the first one for the next pass.
+            assert st["prefetches"] == 1 + 2 * 4
+            assert st["slot_hits"] == 2 * 4
+        finally:
+            streamer.close()
+
+    def test_params_rebound_to_masters_after_forward(self):
+        model = _TinyLM()
+        streamer = _stream(model, resident=2)
+        try:
+            masters = {id(p): p.data.data_ptr() for p in model.model.layers[4].parameters()}
+            with torch.no_grad():
+                model(_ids())
+            for p in model.model.layers[4].parameters():
+                assert p.data.data_ptr() == masters[id(p)]
+        finally:
+            streamer.close()
+
+    def test_two_streamed_layers_stay_in_slots(self):
+        model = _TinyLM()
+        streamer = _stream(model, resident=4)
+        try:
+            with torch.no_grad():
+                model(_ids())
+                copied = streamer.stats()["bytes_copied"]
+                model(_ids())
+                model(_ids())
+            assert streamer.stats()["bytes_copied"] == copied
+        finally:
+            streamer.close()
+
+    def test_out_of_order_layer_call_fetches_synchronously(self):
+        model = _TinyLM()
+        streamer = _stream(model, resident=2)
+        try:
+            x = torch.randn(2, 4, 16)
+            with torch.no_grad():
+                layer = model.model.layers[5]
+                ref = x + layer.norm(torch.nn.functional.linear(
+                    x, layer.fc.weight.data.clone(), layer.fc.bias.data.clone())) * layer.scale
+                assert torch.allclose(layer(x), ref)
+            assert streamer.stats()["sync_fetches"] == 1
+        finally:
+            streamer.close()
+
+    def test_copy_overlaps_compute(self):
+        latency, compute = 0.02, 0.03
+        model = _TinyLM(n_layers=6, compute_s=compute)
+        streamer = _stream(model, resident=2, latency_s=latency)
+        try:
+            with torch.no_grad():
+                for _ in range(3):
+                    model(_ids())
+            st = streamer.stats()
+            serial_ms = st["prefetches"] * latency * 1e3
+            # Each copy hides behind the previous layer's compute
+            assert st["stall_ms"] < 0.25 * serial_ms
+        finally:
+            streamer.close()
+
+    def test_stall_visible_when_copy_slower_than_compute(self):
+        model = _TinyLM(n_layers=4)
+        streamer = _stream(model, resident=0, latency_s=0.02)
+        try:
+            with torch.no_grad():
+                model(_ids())
+            assert streamer.stats()["stall_ms"] >= 4 * 20 * 0.5
+        finally:
+            streamer.close()
+
+    def test_close_removes_hooks(self):
+        model = _TinyLM()
+        with torch.no_grad():
+            ref = model(_ids()).clone()
+        streamer = _stream(model, resident=2)
+        streamer.close()
+        with torch.no_grad():
+            assert torch.allclose(model(_ids()), ref)
+        assert streamer.stats()["passes"] == 0
+
+    def test_cpu_auto_size_keeps_everything_resident(self):
+        from core.weight_streaming import enable_weight_streaming
+        model = _TinyLM()
+        streamer = enable_weight_streaming(model, device="cpu")
+        assert streamer.streamed_layers == 0
+        streamer.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Pipeline wiring
+# ═══════════════════════════════════════════════════════════════════════
+
+class TestPipelineWeightStreaming:
+
+    def test_load_flags_backend_and_reports_status(self):
+        from core.inference_pipeline import InferencePipeline
+        p = InferencePipeline(enable_metrics=False)
+        try:
+            p.load("stub-model", weight_streaming=True)
+            assert getattr(p.backend, "_weight_streaming", False) is True
+            # Stub model: nothing to place
+            assert p.weight_streamer is None
+            assert p.status()["weight_streaming"] is None
+        finally:
+            p.shutdown()
+
+    def test_env_flag_default(self, monkeypatch):
+        from core.inference_pipeline import InferencePipeline
+        monkeypatch.setenv("VRM_WEIGHT_STREAMING", "1")
+        p = InferencePipeline(enable_metrics=False)
+        try:
+            p.load("stub-model")
+            assert getattr(p.backend, "_weight_streaming", False) is True
+        finally:
+            p.shutdown()
+
+
+__all__ = [
+    "TestPlanResidentLayers",
+    "TestFindDecoderLayers",
+    "TestWeightStreamer",
+    "TestPipelineWeightStreaming",
+]
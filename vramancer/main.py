@@ -91,6 +91,8 @@ def main(argv=None):
                          help="Utiliser le profiler (defaut)")
     p_split.add_argument("--no-profile", dest="profile", action="store_false",
                          help="Split VRAM-proportionnel simple")
+    p_split.add_argument("--refresh", action="store_true",
+                         help="Ignorer le cache de placement (re-profiler et re-ecrire)")
 
     # ---- dashboard ----
     p_dash = sub.add_parser("dashboard",
@@ -684,6 +686,10 @@ def _cmd_split(args):
     print(f"  Strategy: {'profiler' if args.profile else 'vram-proportional'}")
     print()
     try:
+        if getattr(args, "refresh", False):
+            from core.placement_cache import get_placement_cache
+            get_placement_cache().refresh = True
+            print("  Placement cache: refresh (profiles and plan recomputed)")
         from core.model_splitter import split_model_into_blocks
         blocks = split_model_into_blocks(
             model_name=args.model,